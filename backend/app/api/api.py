@@ -1,10 +1,17 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import auth, users, properties, tenants, contracts
+from app.api.endpoints import admin, auth, users, properties, tenants, contracts, owners, market, searches, events
+from app.api.responses import NegotiatedResponse
 
-api_router = APIRouter()
+# JSON or MessagePack, whichever the client prefers
+api_router = APIRouter(default_response_class=NegotiatedResponse)
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(properties.router, prefix="/properties", tags=["properties"])
 api_router.include_router(tenants.router, prefix="/tenants", tags=["tenants"])
 api_router.include_router(contracts.router, prefix="/contracts", tags=["contracts"])
+api_router.include_router(owners.router, prefix="/owners", tags=["owners"])
+api_router.include_router(market.router, prefix="/market", tags=["market"])
+api_router.include_router(searches.router, prefix="/searches", tags=["searches"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
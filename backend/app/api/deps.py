@@ -7,7 +7,9 @@ from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.request_context import get_request_context
 from app.core.security import ALGORITHM
+from app.core.tracing import traced, tracer
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import UserInDB
@@ -17,6 +19,7 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 
+@traced("deps.get_current_user", kind="dependency")
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
@@ -29,9 +32,10 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[ALGORITHM]
-        )
+        with tracer.span("jwt.decode"):
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[ALGORITHM]
+            )
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -46,9 +50,13 @@ def get_current_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
+    context = get_request_context()
+    if context is not None:
+        context.user_id = user.id
     return user
 
 
+@traced("deps.get_current_active_user", kind="dependency")
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -63,6 +71,7 @@ def get_current_active_user(
     return current_user
 
 
+@traced("deps.get_current_property_owner", kind="dependency")
 def get_current_property_owner(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -77,6 +86,7 @@ def get_current_property_owner(
     return current_user
 
 
+@traced("deps.get_current_tenant", kind="dependency")
 def get_current_tenant(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -89,3 +99,18 @@ def get_current_tenant(
             detail="Not a tenant"
         )
     return current_user
+
+
+@traced("deps.get_current_active_superuser", kind="dependency")
+def get_current_active_superuser(
+    current_user: User = Depends(get_current_user),
+) -> User:
+    """
+    Get current user if they are a superuser.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return current_user
@@ -0,0 +1,98 @@
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app import models, schemas
+from app.api import deps
+from app.api.routing import TracedRoute
+from app.core.profiler import ProfilerBusy, profiler
+from app.core.tracing import InMemorySpanExporter, tracer
+from app.db.slow_query import slow_query_log
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/slow-queries", response_model=List[schemas.SlowQuery])
+def read_slow_queries(
+    limit: int = 50,
+    route: Optional[str] = None,
+    min_duration_ms: float = 0.0,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Most recent slow queries, newest first.
+    """
+    return slow_query_log.entries(
+        limit=limit, route=route, min_duration_ms=min_duration_ms
+    )
+
+
+@router.delete("/slow-queries", response_model=List[schemas.SlowQuery])
+def clear_slow_queries(
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Empty the slow query log.
+    """
+    slow_query_log.clear()
+    return []
+
+
+def _span_store() -> InMemorySpanExporter:
+    if not isinstance(tracer.exporter, InMemorySpanExporter):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Spans are only kept in memory with TRACING_EXPORTER=memory",
+        )
+    return tracer.exporter
+
+
+@router.get("/traces", response_model=List[schemas.TraceSpan])
+def read_traces(
+    limit: int = 1000,
+    trace_id: Optional[str] = None,
+    name: Optional[str] = None,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Most recently exported spans, newest first.
+    """
+    spans = _span_store().get_finished_spans()
+    spans.reverse()
+    return [
+        s for s in spans
+        if (trace_id is None or s["trace_id"] == trace_id)
+        and (name is None or s["name"] == name)
+    ][:limit]
+
+
+@router.delete("/traces", response_model=List[schemas.TraceSpan])
+def clear_traces(
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Drop all spans kept in memory.
+    """
+    _span_store().clear()
+    return []
+
+
+@router.post("/profile", response_model=schemas.Profile)
+def profile_worker(
+    seconds: float = Query(5.0, gt=0, le=60),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    memory: bool = True,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Sample the stacks of this worker process for a few seconds.
+    """
+    try:
+        result = profiler.profile(seconds, interval=interval_ms / 1000.0, memory=memory)
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return result
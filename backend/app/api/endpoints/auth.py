@@ -7,10 +7,11 @@ from sqlalchemy.orm import Session
 
 from app import crud, schemas
 from app.api import deps
+from app.api.routing import TracedRoute
 from app.core import security
 from app.core.config import settings
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.post("/login", response_model=schemas.Token)
@@ -50,13 +51,13 @@ def register_user(
     """
     Create new user without the need to be logged in.
     """
-    user = crud.user.get_by_email(db, email=user_in.email)
-    if user:
+    try:
+        user = crud.user.create(db, obj_in=user_in)
+    except crud.DuplicateError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user with this email already exists in the system",
         )
-    user = crud.user.create(db, obj_in=user_in)
     return user
 
 
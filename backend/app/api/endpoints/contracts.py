@@ -1,12 +1,29 @@
-from typing import Any, List
+import io
+import tempfile
+from datetime import date
+from typing import Any, Callable, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.batch import batch_ids, render_batch
+from app.api.fieldsets import FieldSet, fieldset
+from app.api.responses import BlobResponse
+from app.api.routing import TracedRoute
+from app.api.totals import add_total
+from app.api.uploads import receive_into_store
+from app.core.blobstore import BlobStore, get_blob_store
+from app.core.config import settings
+from app.services.reconciliation import Reconciler, StatementError, encode_result, read_statement
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+# Reconciliation results beyond this size are spooled to disk until sent
+RESULTS_IN_MEMORY = 1024 * 1024
 
 
 @router.post("/", response_model=schemas.RentalContract)
@@ -40,8 +57,12 @@ def create_rental_contract(
             detail="Tenant not found",
         )
     
+    _check_term(contract_in.start_date, contract_in.end_date)
     # Create contract
-    contract = crud.rental_contract.create(db, obj_in=contract_in)
+    try:
+        contract = crud.rental_contract.create(db, obj_in=contract_in)
+    except crud.OverlapError as exc:
+        raise _overlap(exc)
     
     # Update property availability
     property_update = schemas.PropertyUpdate(is_available=False)
@@ -52,40 +73,112 @@ def create_rental_contract(
 
 @router.get("/", response_model=List[schemas.RentalContract])
 def read_contracts(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     current_user: models.User = Depends(deps.get_current_active_user),
+    fields: FieldSet = Depends(fieldset(schemas.RentalContract)),
+    ids: Optional[List[int]] = Depends(batch_ids),
+    with_total: bool = False,
+    include_archived: bool = False,
 ) -> Any:
     """
-    Retrieve contracts.
+    Retrieve contracts, or the contracts `ids` in that order. `with_total`
+    adds the exact number of contracts. `include_archived` lists archived
+    contracts after the live ones.
     """
+    if ids is not None:
+        return _read_contract_batch(db, ids, fields, current_user)
+
     if current_user.is_property_owner:
         # Get contracts for properties owned by current user
-        properties = crud.property.get_multi_by_owner(db, owner_id=current_user.id)
-        property_ids = [p.id for p in properties]
-        
-        contracts = []
-        for property_id in property_ids:
-            property_contracts = crud.rental_contract.get_by_property(
-                db, property_id=property_id, skip=skip, limit=limit
+        contracts = crud.rental_contract.get_multi_by_owner(
+            db, owner_id=current_user.id, skip=skip, limit=limit, fields=fields.columns()
+        )
+        if include_archived:
+            contracts = _with_archived(
+                contracts,
+                skip,
+                limit,
+                lambda: crud.rental_contract.count_by_owner(db, owner_id=current_user.id),
+                lambda skip, limit: crud.archive.get_multi_by_owner(
+                    db, owner_id=current_user.id, skip=skip, limit=limit, fields=fields.columns()
+                ),
             )
-            contracts.extend(property_contracts)
-        
-        return contracts
+        if not with_total:
+            return fields.render(contracts)
+        total = crud.rental_contract.count_by_owner(db, owner_id=current_user.id)
+        if include_archived:
+            archived = crud.archive.count_by_owner(db, owner_id=current_user.id)
+            total = crud.Total(total.count + archived.count, "exact")
+        return add_total(fields.render(contracts), response, total)
     
     elif current_user.is_tenant:
         # Get contracts for current tenant
         tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id)
         if not tenant:
-            return []
+            return add_total([], response, crud.Total(0, "exact")) if with_total else []
         
         contracts = crud.rental_contract.get_by_tenant(
-            db, tenant_id=tenant.id, skip=skip, limit=limit
+            db, tenant_id=tenant.id, skip=skip, limit=limit, fields=fields.columns()
         )
-        return contracts
+        if include_archived:
+            contracts = _with_archived(
+                contracts,
+                skip,
+                limit,
+                lambda: crud.rental_contract.count_by_tenant(db, tenant_id=tenant.id),
+                lambda skip, limit: crud.archive.get_by_tenant(
+                    db, tenant_id=tenant.id, skip=skip, limit=limit, fields=fields.columns()
+                ),
+            )
+        if not with_total:
+            return fields.render(contracts)
+        total = crud.rental_contract.count_by_tenant(db, tenant_id=tenant.id)
+        if include_archived:
+            archived = crud.archive.count_by_tenant(db, tenant_id=tenant.id)
+            total = crud.Total(total.count + archived.count, "exact")
+        return add_total(fields.render(contracts), response, total)
     
-    return []
+    return add_total([], response, crud.Total(0, "exact")) if with_total else []
+
+
+def _with_archived(
+    live: List[Any],
+    skip: int,
+    limit: int,
+    count_live: Callable[[], crud.Total],
+    read_archived: Callable[[int, int], List[Any]],
+) -> List[Any]:
+    """
+    The page of live contracts at `skip`, filled up with archived ones once
+    the live ones run out. Live contracts are only counted for a page that
+    starts past the last of them.
+    """
+    if len(live) >= limit:
+        return live
+    live_count = skip + len(live) if live or not skip else count_live().count
+    return live + read_archived(max(skip - live_count, 0), limit - len(live))
+
+
+def _read_contract_batch(
+    db: Session, ids: List[int], fields: FieldSet, current_user: models.User
+) -> Any:
+    # Same checks as read_contract, for all contracts at once
+    rows = crud.rental_contract.get_many_with_owner(
+        db, ids=ids, fields=fields.columns("tenant_id")
+    )
+    if current_user.is_property_owner:
+        forbidden = {c.id for c, owner_id in rows if owner_id != current_user.id}
+    elif current_user.is_tenant:
+        tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id)
+        forbidden = {c.id for c, _ in rows if not tenant or c.tenant_id != tenant.id}
+    else:
+        forbidden = {c.id for c, _ in rows}
+    return render_batch(
+        ids, {c.id: c for c, _ in rows}, fields, not_found="Contract not found", forbidden=forbidden
+    )
 
 
 @router.get("/{contract_id}", response_model=schemas.RentalContract)
@@ -94,39 +187,27 @@ def read_contract(
     db: Session = Depends(deps.get_db),
     contract_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    fields: FieldSet = Depends(fieldset(schemas.RentalContract)),
+    include_archived: bool = False,
 ) -> Any:
     """
-    Get contract by ID.
+    Get contract by ID; with `include_archived`, archived contracts too.
     """
-    contract = crud.rental_contract.get(db, id=contract_id)
+    contract = crud.rental_contract.get(
+        db, id=contract_id, fields=fields.columns("property_id", "tenant_id")
+    )
+    if not contract and include_archived:
+        contract = crud.archive.get(
+            db, id=contract_id, fields=fields.columns("property_id", "tenant_id")
+        )
     if not contract:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contract not found",
         )
     
-    # Check permissions
-    if current_user.is_property_owner:
-        property = crud.property.get(db, id=contract.property_id)
-        if property.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-            )
-    elif current_user.is_tenant:
-        tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id)
-        if not tenant or tenant.id != contract.tenant_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-            )
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    
-    return contract
+    _check_party(db, contract, current_user)
+    return fields.render(contract)
 
 
 @router.put("/{contract_id}", response_model=schemas.RentalContract)
@@ -155,32 +236,39 @@ def update_contract(
             detail="Not enough permissions",
         )
     
-    contract = crud.rental_contract.update(db, db_obj=contract, obj_in=contract_in)
+    update_data = contract_in.dict(exclude_unset=True)
+    _check_term(
+        update_data.get("start_date", contract.start_date),
+        update_data.get("end_date", contract.end_date),
+    )
+    try:
+        contract = crud.rental_contract.update(db, db_obj=contract, obj_in=update_data)
+    except crud.OverlapError as exc:
+        raise _overlap(exc)
     return contract
 
 
-@router.post("/{contract_id}/payments", response_model=schemas.RentPayment)
-def create_rent_payment(
-    *,
-    db: Session = Depends(deps.get_db),
-    contract_id: int,
-    payment_in: schemas.RentPaymentCreate,
-    current_user: models.User = Depends(deps.get_current_active_user),
-) -> Any:
-    """
-    Create a rent payment.
-    """
-    contract = crud.rental_contract.get(db, id=contract_id)
-    if not contract:
+def _check_term(start_date: date, end_date: date) -> None:
+    if start_date is None or end_date is None or end_date < start_date:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contract not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A contract cannot end before it starts",
         )
-    
-    # Check permissions
+
+
+def _overlap(exc: crud.OverlapError) -> HTTPException:
+    detail = "The property is already let on some of these dates"
+    if exc.conflicting_id is not None:
+        detail += f" (contract {exc.conflicting_id})"
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+def _check_party(db: Session, contract: Any, current_user: models.User) -> None:
+    """403 unless the current user is the contract's property owner or its tenant."""
     if current_user.is_property_owner:
+        # Archived contracts may outlive their property
         property = crud.property.get(db, id=contract.property_id)
-        if property.owner_id != current_user.id:
+        if not property or property.owner_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions",
@@ -197,22 +285,59 @@ def create_rent_payment(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    
-    payment = crud.rent_payment.create(db, obj_in=payment_in)
-    return payment
 
 
-@router.get("/{contract_id}/payments", response_model=List[schemas.RentPayment])
-def read_rent_payments(
+def get_party_contract(
+    contract_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> models.RentalContract:
+    """
+    The contract, if the current user is its property's owner or its tenant.
+    A dependency so that uploads are refused before their body is read.
+    """
+    contract = crud.rental_contract.get(db, id=contract_id)
+    if not contract:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contract not found",
+        )
+    _check_party(db, contract, current_user)
+    return contract
+
+
+def get_readable_contract(
+    contract_id: int,
+    include_archived: bool = False,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Union[models.RentalContract, models.ArchivedRentalContract]:
+    """
+    Like get_party_contract, for reads: with `include_archived`, a contract
+    no longer live is looked up in the archive.
+    """
+    contract = crud.rental_contract.get(db, id=contract_id)
+    if not contract and include_archived:
+        contract = crud.archive.get(db, id=contract_id)
+    if not contract:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contract not found",
+        )
+    _check_party(db, contract, current_user)
+    return contract
+
+
+@router.post("/{contract_id}/payments", response_model=schemas.RentPayment)
+def create_rent_payment(
     *,
     db: Session = Depends(deps.get_db),
     contract_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    payment_in: schemas.RentPaymentCreate,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get rent payments for a contract.
+    Create a rent payment.
     """
     contract = crud.rental_contract.get(db, id=contract_id)
     if not contract:
@@ -242,8 +367,26 @@ def read_rent_payments(
             detail="Not enough permissions",
         )
     
+    payment = crud.rent_payment.create(db, obj_in=payment_in)
+    return payment
+
+
+@router.get("/{contract_id}/payments", response_model=List[schemas.RentPayment])
+def read_rent_payments(
+    *,
+    db: Session = Depends(deps.get_db),
+    contract: Any = Depends(get_readable_contract),
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    Get rent payments for a contract; `include_archived` reads those of an
+    archived contract.
+    """
+    if isinstance(contract, models.ArchivedRentalContract):
+        return crud.archive.get_payments(db, contract_id=contract.id, skip=skip, limit=limit)
     payments = crud.rent_payment.get_by_contract(
-        db, contract_id=contract_id, skip=skip, limit=limit
+        db, contract_id=contract.id, skip=skip, limit=limit
     )
     return payments
 
@@ -282,46 +425,247 @@ def create_maintenance_request(
 def read_maintenance_requests(
     *,
     db: Session = Depends(deps.get_db),
-    contract_id: int,
+    contract: Any = Depends(get_readable_contract),
     skip: int = 0,
     limit: int = 100,
+) -> Any:
+    """
+    Get maintenance requests for a contract; `include_archived` reads those
+    of an archived contract.
+    """
+    if isinstance(contract, models.ArchivedRentalContract):
+        return crud.archive.get_maintenance_requests(
+            db, contract_id=contract.id, skip=skip, limit=limit
+        )
+    maintenance_requests = crud.maintenance_request.get_by_contract(
+        db, contract_id=contract.id, skip=skip, limit=limit
+    )
+    return maintenance_requests
+
+
+def _record_document(
+    db: Session,
+    contract: models.RentalContract,
+    obj_in: schemas.ContractDocumentCreate,
+) -> models.ContractDocument:
+    document = crud.contract_document.create(db, obj_in=obj_in)
+    url = f"{settings.API_V1_STR}/contracts/{contract.id}/documents/{document.id}/content"
+    crud.rental_contract.update(db, db_obj=contract, obj_in={"contract_file_url": url})
+    return document
+
+
+@router.post("/{contract_id}/documents", response_model=schemas.ContractDocument)
+async def upload_contract_document(
+    *,
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    contract: models.RentalContract = Depends(get_party_contract),
+    filename: Optional[str] = Query(None, max_length=255),
+    store: BlobStore = Depends(get_blob_store),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get maintenance requests for a contract.
+    Upload a contract document as the raw request body, with its media type as
+    Content-Type. The body is streamed into the blob store, never held whole
+    in memory; identical content is stored once. The newest document becomes
+    the contract's file URL.
     """
-    contract = crud.rental_contract.get(db, id=contract_id)
-    if not contract:
+    blob = await receive_into_store(
+        request, store, limit=settings.CONTRACT_DOCUMENT_MAX_BYTES
+    )
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    document_in = schemas.ContractDocumentCreate(
+        contract_id=contract.id,
+        digest=blob.digest,
+        size=blob.size,
+        content_type=content_type or "application/octet-stream",
+        filename=filename,
+        uploaded_by_id=current_user.id,
+    )
+    return await run_in_threadpool(_record_document, db, contract, document_in)
+
+
+@router.get("/{contract_id}/documents", response_model=List[schemas.ContractDocument])
+def read_contract_documents(
+    *,
+    db: Session = Depends(deps.get_db),
+    contract: Any = Depends(get_readable_contract),
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    Get the documents of a contract; `include_archived` reads those of an
+    archived contract.
+    """
+    if isinstance(contract, models.ArchivedRentalContract):
+        return crud.archive.get_documents(db, contract_id=contract.id, skip=skip, limit=limit)
+    return crud.contract_document.get_by_contract(
+        db, contract_id=contract.id, skip=skip, limit=limit
+    )
+
+
+@router.api_route(
+    "/{contract_id}/documents/{document_id}/content",
+    methods=["GET", "HEAD"],
+    response_class=BlobResponse,
+)
+def download_contract_document(
+    *,
+    db: Session = Depends(deps.get_db),
+    contract: Any = Depends(get_readable_contract),
+    document_id: int,
+    store: BlobStore = Depends(get_blob_store),
+) -> Any:
+    """
+    Download a contract document. Supports single byte ranges, If-Range and
+    If-None-Match with the content digest as ETag. `include_archived` reads
+    documents of archived contracts.
+    """
+    if isinstance(contract, models.ArchivedRentalContract):
+        document = crud.archive.get_document(db, contract_id=contract.id, id=document_id)
+    else:
+        document = crud.contract_document.get_for_contract(
+            db, contract_id=contract.id, id=document_id
+        )
+    if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contract not found",
+            detail="Document not found",
+        )
+    blob = store.stat(document.digest)
+    if blob is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Document content is no longer stored",
+        )
+    return BlobResponse(
+        store, blob, media_type=document.content_type, filename=document.filename
+    )
+
+
+@router.post("/payments/reconcile", response_class=StreamingResponse)
+def reconcile_bank_statement(
+    *,
+    db: Session = Depends(deps.get_db),
+    statement: UploadFile = File(...),
+    window_days: int = Query(3, ge=0, le=31),
+    dry_run: bool = False,
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Reconcile a bank statement CSV with the payments of the current owner's contracts,
+    creating missing ones unless `dry_run`. Responds with JSON lines: a summary, then
+    one result per statement line.
+    """
+    results = tempfile.SpooledTemporaryFile(max_size=RESULTS_IN_MEMORY)
+    text = io.TextIOWrapper(statement.file, encoding="utf-8-sig", newline="")
+    reconciler = Reconciler(db, owner_id=current_user.id, window_days=window_days)
+    try:
+        summary = reconciler.run(
+            read_statement(text), lambda result: results.write(encode_result(result))
+        )
+    except StatementError as e:
+        results.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except UnicodeDecodeError:
+        results.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Statement is not UTF-8 text"
+        )
+    finally:
+        # Leave closing the upload to FastAPI
+        text.detach()
+    if dry_run:
+        db.rollback()
+    results.seek(0)
+
+    def body():
+        yield encode_result({"summary": summary, "dry_run": dry_run})
+        with results:
+            yield from iter(lambda: results.read(65536), b"")
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.get("/maintenance/queue", response_model=List[schemas.MaintenanceRequest])
+def read_maintenance_queue(
+    db: Session = Depends(deps.get_db),
+    status: str = "pending",
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Maintenance requests on all own properties, most urgent and oldest first.
+    """
+    return crud.maintenance_request.get_queue(
+        db, owner_id=current_user.id, status=status, skip=skip, limit=limit
+    )
+
+
+@router.post("/maintenance/queue/claim", response_model=schemas.MaintenanceRequest)
+def claim_maintenance_request(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Take the next pending maintenance request and mark it in progress.
+    """
+    maintenance_request = crud.maintenance_request.claim_next(
+        db, owner_id=current_user.id, assignee_id=current_user.id
+    )
+    if not maintenance_request:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No pending maintenance requests",
+        )
+    return maintenance_request
+
+
+@router.post(
+    "/maintenance/{request_id}/transition", response_model=schemas.MaintenanceRequest
+)
+def transition_maintenance_request(
+    *,
+    db: Session = Depends(deps.get_db),
+    request_id: int,
+    transition_in: schemas.MaintenanceTransition,
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Move a maintenance request to another status (property owner only).
+    """
+    maintenance_request = crud.maintenance_request.get(db, id=request_id)
+    if not maintenance_request:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Maintenance request not found",
         )
     
-    # Check permissions
-    if current_user.is_property_owner:
-        property = crud.property.get(db, id=contract.property_id)
-        if property.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-            )
-    elif current_user.is_tenant:
-        tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id)
-        if not tenant or tenant.id != contract.tenant_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-            )
-    else:
+    # Verify property belongs to current user
+    contract = crud.rental_contract.get(db, id=maintenance_request.contract_id)
+    property = crud.property.get(db, id=contract.property_id)
+    if property.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    maintenance_requests = crud.maintenance_request.get_by_contract(
-        db, contract_id=contract_id, skip=skip, limit=limit
-    )
-    return maintenance_requests
+    allowed = crud.maintenance_request.transitions.get(maintenance_request.status, set())
+    if transition_in.status not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot move a {maintenance_request.status} request to {transition_in.status}",
+        )
+    if not crud.maintenance_request.transition(
+        db, db_obj=maintenance_request, status=transition_in.status, assignee_id=current_user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The request was changed by someone else",
+        )
+    return maintenance_request
 
 
 @router.put("/maintenance/{request_id}", response_model=schemas.MaintenanceRequest)
@@ -0,0 +1,40 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+
+from app import models
+from app.api import deps
+from app.api.routing import TracedRoute
+from app.core.config import settings
+from app.core.events import broadcaster, encode_sse
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/", response_class=StreamingResponse)
+async def stream_events(
+    types: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream change events visible to the current user as Server-Sent Events.
+    `types` filters by comma separated types or groups, e.g. "property,maintenance".
+    """
+    events = broadcaster.subscribe(
+        current_user.id,
+        last_event_id=last_event_id,
+        types=[t.strip() for t in types.split(",") if t.strip()] if types else None,
+        heartbeat=settings.EVENTS_HEARTBEAT_SECONDS,
+    )
+
+    async def body():
+        async for event in events:
+            yield encode_sse(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
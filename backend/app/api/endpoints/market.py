@@ -0,0 +1,33 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.api import deps
+from app.api.routing import TracedRoute
+from app.core import rent_stats
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/rent-stats", response_model=schemas.RentStats)
+def read_rent_stats(
+    db: Session = Depends(deps.get_db),
+    city: str = Query(..., min_length=1),
+    bedrooms: Optional[int] = Query(None, ge=0),
+    property_type: Optional[str] = None,
+) -> Any:
+    """
+    Median and quartiles of the asking rents of the city's properties,
+    optionally of one bedroom count and property type only.
+    """
+    crud.rent_sketch.sync(db)
+    sketch = rent_stats.stats.lookup(city, bedrooms=bedrooms, property_type=property_type)
+    return {
+        "city": city,
+        "bedrooms": bedrooms,
+        "property_type": property_type,
+        "relative_accuracy": rent_stats.RELATIVE_ACCURACY,
+        **sketch.summary(),
+    }
@@ -0,0 +1,89 @@
+from datetime import date
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.api import deps
+from app.api.routing import TracedRoute
+from app.core.config import settings
+from app.services import affordability, cashflow
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get("/me/summary", response_model=schemas.OwnerSummary)
+def read_owner_summary(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Dashboard figures of the current owner's portfolio.
+    """
+    summary = crud.owner_summary.get_by_owner(db, owner_id=current_user.id)
+    return crud.owner_summary.figures(summary)
+
+
+@router.get("/me/cashflow", response_model=schemas.CashFlowProjection)
+def read_owner_cashflow(
+    db: Session = Depends(deps.get_db),
+    months: int = Query(12, ge=1, le=cashflow.MAX_MONTHS),
+    start: Optional[date] = None,
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Expected rent, expirations and vacancies of the current owner's portfolio, month by month.
+    """
+    start_month = (start or date.today()).replace(day=1)
+    roll = cashflow.load_rent_roll(db, owner_id=current_user.id)
+    records = cashflow.to_records(cashflow.project(roll, start=start_month, months=months))
+    return {
+        "start_month": start_month,
+        "months": records,
+        "expected_rent": round(sum(r["expected_rent"] for r in records), 2),
+        "vacancy_loss": round(sum(r["vacancy_loss"] for r in records), 2),
+    }
+
+
+@router.post("/me/affordability", response_model=schemas.AffordabilityRanking)
+def score_affordability(
+    *,
+    db: Session = Depends(deps.get_db),
+    scoring_in: schemas.AffordabilityRequest,
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> Any:
+    """
+    Rank tenants by how well they can afford each of the given own properties,
+    from their income, current rent obligations and payment history.
+    """
+    property_ids = list(dict.fromkeys(scoring_in.property_ids))
+    tenant_ids = list(dict.fromkeys(scoring_in.tenant_ids))
+    if len(property_ids) * len(tenant_ids) > settings.AFFORDABILITY_MAX_PAIRS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AFFORDABILITY_MAX_PAIRS} tenant and property pairs per request",
+        )
+    properties = {
+        p.id: p
+        for p in crud.property.get_many(db, ids=property_ids, fields=["owner_id", "monthly_rent"])
+    }
+    for id in property_ids:
+        if id not in properties:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Property not found",
+            )
+        if properties[id].owner_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+    applicants = affordability.load_applicants(db, tenant_ids=tenant_ids)
+    rent = np.array([properties[id].monthly_rent for id in property_ids], dtype=np.float64)
+    known = set(applicants.tenant_id.tolist())
+    return {
+        "properties": affordability.rank(applicants, property_ids, rent, top=scoring_in.top),
+        "unknown_tenant_ids": [id for id in tenant_ids if id not in known],
+    }
@@ -1,16 +1,31 @@
+from datetime import date
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.batch import batch_ids, render_batch
+from app.api.fieldsets import FieldSet, fieldset
+from app.api.responses import BlobResponse
+from app.api.routing import TracedRoute
+from app.api.totals import add_total, cached_total
+from app.api.uploads import receive_into_store
+from app.core import similarity
+from app.core.blobstore import BlobInfo, BlobStore, get_blob_store
+from app.core.config import settings
+from app.core.disk_cache import DiskLRUCache
+from app.services import images
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[schemas.Property])
 def read_properties(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
@@ -19,11 +34,32 @@ def read_properties(
     min_bedrooms: Optional[int] = None,
     max_rent: Optional[float] = None,
     property_type: Optional[str] = None,
+    available_from: Optional[date] = None,
+    available_to: Optional[date] = None,
+    fields: FieldSet = Depends(fieldset(schemas.Property)),
+    ids: Optional[List[int]] = Depends(batch_ids),
+    with_total: bool = False,
 ) -> Any:
     """
-    Retrieve properties with optional filtering.
+    Retrieve properties with optional filtering, or the properties `ids`
+    (available or not) in that order, ignoring the filters. With
+    `available_from` and/or `available_to`, listed properties (or ones only
+    unlisted because they are let, now or ahead) that no active contract
+    occupies on any of those dates (from `available_from` on, without
+    `available_to`). `with_total` adds the number of matches, counted by
+    PROPERTY_SEARCH_TOTAL.
     """
-    if any([city, state, min_bedrooms, max_rent, property_type]):
+    if ids is not None:
+        properties = crud.property.get_many(db, ids=ids, fields=fields.columns())
+        return render_batch(
+            ids, {p.id: p for p in properties}, fields, not_found="Property not found"
+        )
+    if available_from and available_to and available_to < available_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="available_to cannot be before available_from",
+        )
+    if any([city, state, min_bedrooms, max_rent, property_type, available_from, available_to]):
         properties = crud.property.search_properties(
             db, 
             city=city,
@@ -31,12 +67,35 @@ def read_properties(
             min_bedrooms=min_bedrooms,
             max_rent=max_rent,
             property_type=property_type,
+            available_from=available_from,
+            available_to=available_to,
             skip=skip, 
-            limit=limit
+            limit=limit,
+            fields=fields.columns(),
         )
     else:
-        properties = crud.property.get_available_properties(db, skip=skip, limit=limit)
-    return properties
+        properties = crud.property.get_available_properties(
+            db, skip=skip, limit=limit, fields=fields.columns()
+        )
+    if not with_total:
+        return fields.render(properties)
+    filters = dict(
+        city=city,
+        state=state,
+        min_bedrooms=min_bedrooms,
+        max_rent=max_rent,
+        property_type=property_type,
+        available_from=available_from,
+        available_to=available_to,
+    )
+    strategy = settings.PROPERTY_SEARCH_TOTAL
+    total = cached_total(
+        ("properties", strategy, *filters.values()),
+        lambda: crud.property.count_search(
+            db, strategy=strategy, cap=settings.LIST_TOTAL_CAP, **filters
+        ),
+    )
+    return add_total(fields.render(properties), response, total)
 
 
 @router.post("/", response_model=schemas.Property)
@@ -49,7 +108,7 @@ def create_property(
     """
     Create new property.
     """
-    property = crud.property.create(
+    property = crud.property.create_with_owner(
         db, obj_in=property_in, owner_id=current_user.id
     )
     return property
@@ -57,18 +116,24 @@ def create_property(
 
 @router.get("/my-properties", response_model=List[schemas.Property])
 def read_user_properties(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     current_user: models.User = Depends(deps.get_current_property_owner),
+    fields: FieldSet = Depends(fieldset(schemas.Property)),
+    with_total: bool = False,
 ) -> Any:
     """
-    Retrieve properties owned by current user.
+    Retrieve properties owned by current user; `with_total` adds their exact number.
     """
     properties = crud.property.get_multi_by_owner(
-        db, owner_id=current_user.id, skip=skip, limit=limit
+        db, owner_id=current_user.id, skip=skip, limit=limit, fields=fields.columns()
     )
-    return properties
+    if not with_total:
+        return fields.render(properties)
+    total = crud.property.count_by_owner(db, owner_id=current_user.id)
+    return add_total(fields.render(properties), response, total)
 
 
 @router.get("/{property_id}", response_model=schemas.Property)
@@ -76,17 +141,51 @@ def read_property(
     *,
     db: Session = Depends(deps.get_db),
     property_id: int,
+    fields: FieldSet = Depends(fieldset(schemas.Property)),
 ) -> Any:
     """
     Get property by ID.
     """
+    property = crud.property.get(db, id=property_id, fields=fields.columns())
+    if not property:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found",
+        )
+    return fields.render(property)
+
+
+@router.get("/{property_id}/similar", response_model=List[schemas.Property])
+def read_similar_properties(
+    *,
+    db: Session = Depends(deps.get_db),
+    property_id: int,
+    limit: int = Query(10, ge=1, le=similarity.MAX_RESULTS),
+    fields: FieldSet = Depends(fieldset(schemas.Property)),
+) -> Any:
+    """
+    Properties available for rent most like this one, most similar first:
+    same city and type, then closest in rooms, area, rent and amenities.
+    """
     property = crud.property.get(db, id=property_id)
     if not property:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found",
         )
-    return property
+    nearest = similarity.index.similar(
+        similarity.features_of(property), limit, load=lambda: crud.property.get_features(db)
+    )
+    found = {
+        p.id: p
+        for p in crud.property.get_many(
+            db, ids=[id for id, _ in nearest], fields=fields.columns("is_available")
+        )
+    }
+    # The index may not have seen the latest writes of other workers yet
+    return fields.render([
+        found[id] for id, _ in nearest if id in found and found[id].is_available
+    ])
 
 
 @router.put("/{property_id}", response_model=schemas.Property)
@@ -138,3 +237,151 @@ def delete_property(
         )
     property = crud.property.remove(db, id=property_id)
     return property
+
+
+def get_owned_property(
+    property_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_property_owner),
+) -> models.Property:
+    """
+    The property, if the current user owns it. A dependency so that uploads
+    are refused before their body is read.
+    """
+    property = crud.property.get(db, id=property_id)
+    if not property:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found",
+        )
+    if property.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return property
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Image processing is busy, try again shortly",
+        headers={"Retry-After": "5"},
+    )
+
+
+@router.post(
+    "/{property_id}/images",
+    response_model=schemas.PropertyImage,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_property_image(
+    *,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(deps.get_db),
+    property: models.Property = Depends(get_owned_property),
+    store: BlobStore = Depends(get_blob_store),
+) -> Any:
+    """
+    Upload a property image (JPEG, PNG, WebP or GIF) as the raw request body.
+    Variants are rendered in the background; once they are, the image is
+    `ready` and its gallery variant's URL is appended to the property's images.
+    """
+    sniffed = {}
+
+    def check_start(data: bytes) -> None:
+        sniffed["content_type"] = images.sniff(data)
+        if sniffed["content_type"] is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Images must be JPEG, PNG, WebP or GIF",
+            )
+
+    blob = await receive_into_store(
+        request, store, limit=settings.IMAGE_MAX_BYTES, check_start=check_start
+    )
+    try:
+        job = images.submit_variants(store, blob.digest)
+    except images.PoolBusy:
+        raise _busy()
+    image_in = schemas.PropertyImageCreate(
+        property_id=property.id, digest=blob.digest, content_type=sniffed["content_type"]
+    )
+    image = await run_in_threadpool(crud.property_image.create, db, obj_in=image_in)
+    # Runs once the response is sent and the new row committed
+    background_tasks.add_task(images.process_upload, image.id, store, blob.digest, job)
+    return image
+
+
+@router.get("/{property_id}/images", response_model=List[schemas.PropertyImage])
+def read_property_images(
+    *,
+    db: Session = Depends(deps.get_db),
+    property_id: int,
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    Get the uploaded images of a property with the URLs of their variants.
+    """
+    return crud.property_image.get_by_property(
+        db, property_id=property_id, skip=skip, limit=limit
+    )
+
+
+@router.get("/images/{image_id}/{variant}", response_class=BlobResponse)
+async def read_property_image_variant(
+    *,
+    db: Session = Depends(deps.get_db),
+    image_id: int,
+    variant: str,
+    store: BlobStore = Depends(get_blob_store),
+    cache: DiskLRUCache = Depends(images.get_variant_cache),
+) -> Any:
+    """
+    Get an image variant by name (thumb, small, medium, large) or, as a width
+    in pixels, rendered on demand and cached.
+    """
+    image = await run_in_threadpool(crud.property_image.get, db, id=image_id)
+    if not image or image.status != "ready":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found",
+        )
+    cache_control = {"cache-control": "public, max-age=31536000, immutable"}
+    if variant in image.variants:
+        rendition = image.variants[variant]
+        return BlobResponse(
+            store,
+            BlobInfo(digest=rendition["digest"], size=rendition["size"]),
+            media_type=images.MEDIA_TYPE,
+            disposition="inline",
+            headers=cache_control,
+        )
+    if not variant.isdigit() or int(variant) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown image variant",
+        )
+
+    width = images.on_demand_width(int(variant))
+    # The smallest rendition at least as wide, or else the original
+    candidates = sorted(
+        (r for r in image.variants.values() if r["width"] >= width), key=lambda r: r["width"]
+    )
+    if candidates and candidates[0]["width"] == width:
+        rendition = candidates[0]
+        return BlobResponse(
+            store,
+            BlobInfo(digest=rendition["digest"], size=rendition["size"]),
+            media_type=images.MEDIA_TYPE,
+            disposition="inline",
+            headers=cache_control,
+        )
+    source = candidates[0]["digest"] if candidates else image.digest
+    try:
+        path = await images.render_on_demand(store, cache, source, width)
+    except images.PoolBusy:
+        raise _busy()
+    return FileResponse(path, media_type=images.MEDIA_TYPE, headers=cache_control)
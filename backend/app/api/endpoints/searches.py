@@ -0,0 +1,79 @@
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.api import deps
+from app.api.routing import TracedRoute
+from app.core.config import settings
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.post("/", response_model=schemas.SavedSearch)
+def create_saved_search(
+    *,
+    db: Session = Depends(deps.get_db),
+    search_in: schemas.SavedSearchCreate,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Save a property search: new and re-listed properties matching it are
+    queued into the inbox.
+    """
+    if crud.saved_search.count_by_user(db, user_id=current_user.id) >= settings.SAVED_SEARCHES_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.SAVED_SEARCHES_PER_USER} saved searches per user",
+        )
+    return crud.saved_search.create_with_user(db, obj_in=search_in, user_id=current_user.id)
+
+
+@router.get("/", response_model=List[schemas.SavedSearch])
+def read_saved_searches(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve the current user's saved searches.
+    """
+    return crud.saved_search.get_multi_by_user(db, user_id=current_user.id)
+
+
+@router.get("/inbox", response_model=List[schemas.SearchMatch])
+def read_search_inbox(
+    db: Session = Depends(deps.get_db),
+    after_id: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Properties that matched the current user's saved searches, oldest first.
+    Pass the id of the last match seen as `after_id` to get only newer ones.
+    """
+    return crud.saved_search.get_inbox(db, user_id=current_user.id, after_id=after_id, limit=limit)
+
+
+@router.delete("/{search_id}", response_model=schemas.SavedSearch)
+def delete_saved_search(
+    *,
+    db: Session = Depends(deps.get_db),
+    search_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Delete a saved search and its matches.
+    """
+    search = crud.saved_search.get(db, id=search_id)
+    if not search:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Saved search not found",
+        )
+    if search.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return crud.saved_search.remove(db, id=search_id)
@@ -1,12 +1,15 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.batch import batch_ids, render_batch
+from app.api.fieldsets import FieldSet, fieldset
+from app.api.routing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.post("/register", response_model=schemas.Tenant)
@@ -19,26 +22,15 @@ def register_tenant(
     """
     Register as a tenant.
     """
-    # Check if user is already a tenant
-    tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id)
-    if tenant:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User is already registered as a tenant",
-        )
-    
-    # Check if identification number is already used
-    existing_tenant = crud.tenant.get_by_identification(
-        db, identification_number=tenant_in.identification_number
-    )
-    if existing_tenant:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Identification number already registered",
-        )
-    
-    # Create tenant profile
-    tenant = crud.tenant.create_with_user(db, obj_in=tenant_in, user_id=current_user.id)
+    # The unique constraints on user_id and identification_number reject duplicates
+    try:
+        tenant = crud.tenant.create_with_user(db, obj_in=tenant_in, user_id=current_user.id)
+    except crud.DuplicateError as exc:
+        if exc.column == "user_id":
+            detail = "User is already registered as a tenant"
+        else:
+            detail = "Identification number already registered"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
     
     # Update user to mark as tenant
     user_update = schemas.UserUpdate(is_tenant=True)
@@ -47,21 +39,41 @@ def register_tenant(
     return tenant
 
 
+@router.get("/", response_model=List[schemas.Tenant])
+def read_tenants(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+    fields: FieldSet = Depends(fieldset(schemas.Tenant)),
+    ids: Optional[List[int]] = Depends(batch_ids),
+) -> Any:
+    """
+    Get the tenants `ids`, in that order.
+    """
+    if ids is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids is required",
+        )
+    tenants = crud.tenant.get_many(db, ids=ids, fields=fields.columns())
+    return render_batch(ids, {t.id: t for t in tenants}, fields, not_found="Tenant not found")
+
+
 @router.get("/me", response_model=schemas.Tenant)
 def read_tenant_me(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_tenant),
+    fields: FieldSet = Depends(fieldset(schemas.Tenant)),
 ) -> Any:
     """
     Get current tenant profile.
     """
-    tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id)
+    tenant = crud.tenant.get_by_user_id(db, user_id=current_user.id, fields=fields.columns())
     if not tenant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tenant profile not found",
         )
-    return tenant
+    return fields.render(tenant)
 
 
 @router.put("/me", response_model=schemas.Tenant)
@@ -90,14 +102,15 @@ def read_tenant(
     db: Session = Depends(deps.get_db),
     tenant_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    fields: FieldSet = Depends(fieldset(schemas.Tenant)),
 ) -> Any:
     """
     Get tenant by ID.
     """
-    tenant = crud.tenant.get(db, id=tenant_id)
+    tenant = crud.tenant.get(db, id=tenant_id, fields=fields.columns())
     if not tenant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tenant not found",
         )
-    return tenant
+    return fields.render(tenant)
@@ -7,8 +7,10 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.fieldsets import FieldSet, fieldset
+from app.api.routing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/", response_model=List[schemas.User])
@@ -17,22 +19,24 @@ def read_users(
     skip: int = 0,
     limit: int = 100,
     current_user: models.User = Depends(deps.get_current_user),
+    fields: FieldSet = Depends(fieldset(schemas.User)),
 ) -> Any:
     """
     Retrieve users.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
-    return users
+    users = crud.user.get_multi(db, skip=skip, limit=limit, fields=fields.columns())
+    return fields.render(users)
 
 
 @router.get("/me", response_model=schemas.User)
 def read_user_me(
     current_user: models.User = Depends(deps.get_current_active_user),
+    fields: FieldSet = Depends(fieldset(schemas.User)),
 ) -> Any:
     """
     Get current user.
     """
-    return current_user
+    return fields.render(current_user)
 
 
 @router.put("/me", response_model=schemas.User)
@@ -67,14 +71,15 @@ def read_user_by_id(
     user_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db),
+    fields: FieldSet = Depends(fieldset(schemas.User)),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = crud.user.get(db, id=user_id)
+    user = crud.user.get(db, id=user_id, fields=fields.columns())
     if user == current_user:
-        return user
-    return user
+        return fields.render(user)
+    return fields.render(user)
 
 
 @router.put("/{user_id}", response_model=schemas.User)
@@ -0,0 +1,89 @@
+"""
+Sparse fieldsets: `?fields=id,title,city` on read endpoints.
+
+`fieldset(schema)` is a dependency that parses the parameter against the
+fields of the endpoint's response schema. Its columns go to the CRUD layer,
+which loads only those (`CRUDBase._only`), and `render` answers with a model
+trimmed to them, so neither the query nor the response touches the others.
+Without the parameter both are unchanged.
+"""
+import functools
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple, Type, get_origin, get_type_hints
+
+from fastapi import HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, create_model
+
+from app.api.responses import NegotiatedResponse
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_fields(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Field name -> annotation, in the schema's order."""
+    return {
+        name: hint
+        for name, hint in get_type_hints(schema).items()
+        if not name.startswith("_") and get_origin(hint) is not ClassVar
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def _trimmed(schema: Type[BaseModel], names: Tuple[str, ...]) -> Type[BaseModel]:
+    hints = _schema_fields(schema)
+    return create_model(f"{schema.__name__}Fields", **{name: (hints[name], ...) for name in names})
+
+
+class FieldSet:
+    def __init__(self, schema: Type[BaseModel], names: Optional[Tuple[str, ...]]) -> None:
+        self.schema = schema
+        # None: every field
+        self.names = names
+
+    def columns(self, *needed: str) -> Optional[List[str]]:
+        """Columns to load: the selected ones plus those the endpoint `needed` itself."""
+        if self.names is None:
+            return None
+        return list(dict.fromkeys(self.names + needed))
+
+    def dump(self, obj: Any) -> Dict[str, Any]:
+        """The selected fields of the ORM object `obj`, or all of the schema's, JSON-ready."""
+        names = self.names or tuple(_schema_fields(self.schema))
+        model = _trimmed(self.schema, names)
+        return jsonable_encoder(model(**{name: getattr(obj, name) for name in names}))
+
+    def render(self, content: Any) -> Any:
+        """
+        `content` (an ORM object or a list of them) as the endpoint returns
+        it: as is for the response model when no fields were selected or
+        there is nothing to trim, otherwise as a response holding only the
+        selected fields.
+        """
+        if self.names is None or content is None:
+            return content
+        if isinstance(content, list):
+            return NegotiatedResponse([self.dump(obj) for obj in content])
+        return NegotiatedResponse(self.dump(content))
+
+
+def fieldset(schema: Type[BaseModel]) -> Callable[..., FieldSet]:
+    """Dependency parsing `fields` against `schema`; unknown names are a 400."""
+    known = _schema_fields(schema)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None,
+            description=f"Comma-separated fields to return, out of: {', '.join(known)}",
+        ),
+    ) -> FieldSet:
+        if fields is None:
+            return FieldSet(schema, None)
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(requested - known.keys())
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields selected",
+            )
+        return FieldSet(schema, tuple(name for name in known if name in requested))
+
+    return dependency
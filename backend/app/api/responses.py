@@ -0,0 +1,312 @@
+import json
+import os
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is then simply not offered
+    msgpack = None
+
+from app.core.blobstore import BlobInfo, BlobStore, LocalBlobStore
+from app.core.config import settings
+
+
+class _Unsatisfiable(Exception):
+    pass
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    [start, end) of a single `bytes=` range. None means serve the whole
+    content: malformed and multi-range requests may be ignored (RFC 9110).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first.isdigit() or last.isdigit()):
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise _Unsatisfiable()
+        return max(size - suffix, 0), size
+    start = int(first)
+    if last and not last.isdigit():
+        return None
+    end = min(int(last) + 1, size) if last else size
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise _Unsatisfiable()
+    return start, end
+
+
+def _matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison, which is weak: W/ prefixes are ignored."""
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class BlobResponse(Response):
+    """
+    Download of an immutable blob, with the digest as strong ETag.
+
+    Handles conditional requests (If-None-Match, If-Range), HEAD and single
+    byte ranges. The body is sent without passing through Python where
+    possible: handed to nginx with X-Accel-Redirect when
+    BLOB_STORE_ACCEL_REDIRECT is set, or via the ASGI zero-copy (sendfile)
+    and path-send extensions when the server offers them; otherwise it is
+    read in chunks in a worker thread.
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        blob: BlobInfo,
+        *,
+        media_type: str = "application/octet-stream",
+        filename: Optional[str] = None,
+        disposition: str = "attachment",
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.store = store
+        self.blob = blob
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.body = b""
+        self.init_headers()
+        self.etag = f'"{blob.digest}"'
+        if filename:
+            disposition += f"; filename*=utf-8''{quote(filename)}"
+        self.headers.update({
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "cache-control": "private, max-age=31536000, immutable",
+            "content-disposition": disposition,
+            "x-content-type-options": "nosniff",
+            "content-type": media_type,
+        })
+        if headers:
+            self.headers.update(headers)
+        # Set per request in __call__
+        del self.headers["content-length"]
+
+    async def _start(self, send: Send, status_code: int, headers: Mapping[str, str]) -> None:
+        raw = self.raw_headers + [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        await send({"type": "http.response.start", "status": status_code, "headers": raw})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        size = self.blob.size
+        if _matches(request_headers.get("if-none-match", ""), self.etag):
+            await self._start(send, 304, {})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        start, end = 0, size
+        status_code = 200
+        headers = {}
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() == self.etag):
+            try:
+                requested = _parse_range(range_header, size)
+            except _Unsatisfiable:
+                await self._start(send, 416, {"content-range": f"bytes */{size}", "content-length": "0"})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if requested is not None:
+                start, end = requested
+                status_code = 206
+                headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+
+        accel = settings.BLOB_STORE_ACCEL_REDIRECT
+        if accel and isinstance(self.store, LocalBlobStore) and scope["method"] != "HEAD":
+            # nginx serves the file, ranges included, from its internal location
+            location = accel.rstrip("/") + "/" + self.store.relative_path(self.blob.digest)
+            await self._start(send, 200, {"x-accel-redirect": location, "content-length": "0"})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers["content-length"] = str(end - start)
+        await self._start(send, status_code, headers)
+        if scope["method"] == "HEAD" or end == start:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        path = self.store.local_path(self.blob.digest)
+        if path is not None and "http.response.zerocopysend" in extensions:
+            with open(path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": start,
+                    "count": end - start,
+                })
+            return
+        if path is not None and status_code == 200 and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": os.fspath(path)})
+            return
+
+        # Stop reading the file as soon as the client goes away
+        async with anyio.create_task_group() as task_group:
+
+            async def wrap(func) -> None:
+                await func()
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(wrap, partial(self._stream, send, start, end))
+            await wrap(partial(self._wait_for_disconnect, receive))
+
+    async def _stream(self, send: Send, start: int, end: int) -> None:
+        chunks = self.store.read(self.blob.digest, start, end)
+        async for chunk in iterate_in_threadpool(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _wait_for_disconnect(self, receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# Names MessagePack goes by; responses use the registered application/msgpack
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+# List items encoded per body chunk when streaming
+STREAM_BATCH_ITEMS = 200
+
+
+def _quality(accept: str) -> Dict[str, float]:
+    """Media range -> q of an Accept header."""
+    ranges = {}
+    for part in accept.split(","):
+        media_range, *params = [p.strip() for p in part.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media_range.lower()] = max(q, ranges.get(media_range.lower(), 0.0))
+    return ranges
+
+
+def preferred_media_type(accept: Optional[str]) -> str:
+    """
+    JSON unless MessagePack is asked for by name with at least JSON's
+    quality; wildcards only ever select JSON.
+    """
+    if not accept or msgpack is None:
+        return JSON
+    q = _quality(accept)
+    q_msgpack = max(q.get(alias, 0.0) for alias in MSGPACK_ALIASES)
+    if q_msgpack <= 0:
+        return JSON
+    q_json = q.get(JSON, q.get("application/*", q.get("*/*", 0.0)))
+    return MSGPACK if q_msgpack >= q_json else JSON
+
+
+def _encode_json(content: Any) -> bytes:
+    # Same output as JSONResponse
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _stream_json(items: List[Any]) -> Iterator[bytes]:
+    yield b"["
+    for start in range(0, len(items), STREAM_BATCH_ITEMS):
+        chunk = b",".join(_encode_json(item) for item in items[start:start + STREAM_BATCH_ITEMS])
+        yield chunk if start == 0 else b"," + chunk
+    yield b"]"
+
+
+def _encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content)
+
+
+def _stream_msgpack(items: List[Any]) -> Iterator[bytes]:
+    packer = msgpack.Packer()
+    yield packer.pack_array_header(len(items))
+    for start in range(0, len(items), STREAM_BATCH_ITEMS):
+        yield b"".join(packer.pack(item) for item in items[start:start + STREAM_BATCH_ITEMS])
+
+
+ENCODERS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[List[Any]], Iterator[bytes]]]] = {
+    JSON: (_encode_json, _stream_json),
+    MSGPACK: (_encode_msgpack, _stream_msgpack),
+}
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    JSON, or MessagePack for clients whose Accept header prefers it. The
+    format depends on the request, so the content is encoded when the
+    response is sent rather than when it is created. Lists of at least
+    RESPONSE_STREAM_MIN_ITEMS items are sent in chunks as they are encoded,
+    which the compression middleware compresses as a stream, instead of
+    being encoded (and compressed) whole first.
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        self.content = content
+        self.status_code = status_code
+        if media_type is not None:
+            self.media_type = media_type
+        self.background = background
+        self.body = b""
+        self.init_headers(headers)
+        # Set once the format is known
+        del self.headers["content-length"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        media_type = preferred_media_type(Headers(scope=scope).get("accept"))
+        self.headers["content-type"] = media_type
+        self.headers.add_vary_header("Accept")
+        encode, stream = ENCODERS[media_type]
+        if self.status_code < 200 or self.status_code in (204, 304):
+            self.body = b""
+        elif (
+            isinstance(self.content, list)
+            and len(self.content) >= settings.RESPONSE_STREAM_MIN_ITEMS
+            and scope["method"] != "HEAD"
+        ):
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            for chunk in stream(self.content):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+            if self.background is not None:
+                await self.background()
+            return
+        else:
+            self.body = encode(self.content)
+            self.headers["content-length"] = str(len(self.body))
+        await super().__call__(scope, receive, send)
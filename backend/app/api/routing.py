@@ -0,0 +1,31 @@
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.tracing import traced, tracer
+
+
+class TracedRoute(APIRoute):
+    """
+    Route that opens a `route.handler` span around dependency resolution,
+    the endpoint and response serialization, and an `endpoint.<name>` span
+    around the endpoint alone. Serialization time is what is left of the
+    handler span after its children.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        endpoint = traced(f"endpoint.{endpoint.__name__}", kind="endpoint")(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:
+            if not tracer.is_recording():
+                return await handler(request)
+            with tracer.span("route.handler", kind="handler"):
+                return await handler(request)
+
+        return traced_handler
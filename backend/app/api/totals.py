@@ -0,0 +1,59 @@
+"""
+Totals of paginated lists, for clients that ask with `?with_total=true`.
+
+The total goes in the `X-Total-Count` header ("1000+" when capped), and
+how it was obtained (exact, estimated, counter or capped) in
+`X-Total-Count-Method`, so list bodies keep their shape. Public search
+totals are cached for LIST_TOTAL_CACHE_SECONDS per set of filters: the same
+searches repeat often, and a total a few seconds old is good enough.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+from fastapi import Response
+
+from app.core.config import settings
+from app.crud.totals import Total
+
+TOTAL_HEADER = "X-Total-Count"
+METHOD_HEADER = "X-Total-Count-Method"
+# Distinct filter combinations remembered
+CACHE_ENTRIES = 1024
+
+_cache: "OrderedDict[Hashable, Tuple[float, Total]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def cached_total(key: Hashable, compute: Callable[[], Total]) -> Total:
+    """The total cached under `key`, or `compute()`d and cached."""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(key)
+            return entry[1]
+    result = compute()
+    with _cache_lock:
+        _cache[key] = (now + settings.LIST_TOTAL_CACHE_SECONDS, result)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return result
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def add_total(result: Any, response: Response, total: Total) -> Any:
+    """
+    `result` with the total headers: on `result` itself when the endpoint
+    answers with a response, else on the `response` FastAPI merges in.
+    """
+    target = result if isinstance(result, Response) else response
+    target.headers[TOTAL_HEADER] = str(total)
+    target.headers[METHOD_HEADER] = total.method
+    return result
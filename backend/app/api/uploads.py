@@ -0,0 +1,57 @@
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.blobstore import BlobInfo, BlobStore
+
+# Request bodies are written to the blob store in batches of at least this size
+UPLOAD_WRITE_SIZE = 1024 * 1024
+
+
+async def receive_into_store(
+    request: Request,
+    store: BlobStore,
+    *,
+    limit: int,
+    check_start: Optional[Callable[[bytes], None]] = None,
+) -> BlobInfo:
+    """
+    Stream the raw request body into `store`, never holding it whole in memory.
+    Bodies over `limit` bytes get 413 and empty ones 400. `check_start` sees the
+    first batch before anything is written and may reject it by raising.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Uploads are limited to {limit} bytes",
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise too_large
+
+    writer = await run_in_threadpool(store.writer)
+    try:
+        # Disk writes go to a worker thread, a batch of request chunks at a time
+        pending = bytearray()
+        async for chunk in request.stream():
+            if writer.size + len(pending) + len(chunk) > limit:
+                raise too_large
+            pending += chunk
+            if len(pending) >= UPLOAD_WRITE_SIZE:
+                if check_start is not None and not writer.size:
+                    check_start(bytes(pending))
+                await run_in_threadpool(writer.write, bytes(pending))
+                pending.clear()
+        if pending:
+            if check_start is not None and not writer.size:
+                check_start(bytes(pending))
+            await run_in_threadpool(writer.write, bytes(pending))
+        if not writer.size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Empty upload",
+            )
+        return await run_in_threadpool(writer.commit)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
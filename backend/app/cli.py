@@ -0,0 +1,188 @@
+"""
+Command line tools run against the configured database:
+
+    python -m app.cli cashflow --owner-id 3 --months 24
+    python -m app.cli cashflow --months 36 --start 2025-01-01 --format csv > cashflow.csv
+    python -m app.cli reconcile statement.csv --owner-id 3 --output results.jsonl
+    python -m app.cli reconcile statement.csv --dry-run
+    python -m app.cli archive --after-days 730 --dry-run
+    python -m app.cli partitions --months 6
+    python -m app.cli market-stats
+    python -m app.cli contract-overlaps
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+
+
+def _cashflow(args: argparse.Namespace) -> None:
+    from app.db.session import SessionLocal
+    from app.services.cashflow import load_rent_roll, project, to_records
+
+    start = (args.start or date.today()).replace(day=1)
+    with SessionLocal() as db:
+        roll = load_rent_roll(db, owner_id=args.owner_id)
+    records = to_records(project(roll, start=start, months=args.months))
+
+    if args.format == "json":
+        print(json.dumps(records, indent=2, default=str))
+        return
+    if args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+        return
+    print(f"{len(roll):,} active contracts, {len(roll.property_ids):,} properties")
+    print(
+        f"{'month':<10} {'expected':>14} {'paying':>8} {'expiring':>9} "
+        f"{'vacant':>8} {'vacancy loss':>14}"
+    )
+    for r in records:
+        print(
+            f"{r['month']:%Y-%m}    {r['expected_rent']:>14,.2f} {r['paying_contracts']:>8} "
+            f"{r['expiring_contracts']:>9} {r['vacant_units']:>8} {r['vacancy_loss']:>14,.2f}"
+        )
+
+
+def _reconcile(args: argparse.Namespace) -> None:
+    from app.db.session import SessionLocal
+    from app.services.reconciliation import Reconciler, StatementError, encode_result, read_statement
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    with SessionLocal() as db, open(args.statement, encoding="utf-8-sig", newline="") as statement:
+        reconciler = Reconciler(
+            db, owner_id=args.owner_id, window_days=args.window_days, chunk_size=args.chunk_size
+        )
+        try:
+            summary = reconciler.run(
+                read_statement(statement),
+                lambda result: output.write(encode_result(result)),
+                # Dry runs keep one transaction open and roll it back at the end
+                after_chunk=None if args.dry_run else db.commit,
+            )
+        except StatementError as e:
+            sys.exit(str(e))
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if args.dry_run:
+            db.rollback()
+    print(
+        ", ".join(f"{count:,} {status}" for status, count in summary.items())
+        + (" (dry run, nothing written)" if args.dry_run else ""),
+        file=sys.stderr,
+    )
+
+
+def _archive(args: argparse.Namespace) -> None:
+    from app.db.session import SessionLocal
+    from app.services.archive import archive_cutoff, archive_ended_contracts
+
+    with SessionLocal() as db:
+        summary = archive_ended_contracts(
+            db,
+            after_days=args.after_days,
+            batch_size=args.batch_size,
+            # Dry runs keep one transaction open and roll it back at the end
+            after_batch=None if args.dry_run else db.commit,
+        )
+        if args.dry_run:
+            db.rollback()
+    batches = summary.pop("batches")
+    print(
+        f"Before {archive_cutoff(date.today(), args.after_days)}, {batches:,} batches: "
+        + (", ".join(f"{count:,} {table}" for table, count in summary.items()) or "nothing to archive")
+        + (" (dry run, nothing moved)" if args.dry_run else ""),
+        file=sys.stderr,
+    )
+
+
+def _partitions(args: argparse.Namespace) -> None:
+    from app.db.partitions import ensure_partitions
+    from app.db.session import engine
+    from app.models import RentPayment
+
+    if engine.dialect.name != "postgresql":
+        sys.exit(f"Partitioning needs PostgreSQL, not {engine.dialect.name}")
+    with engine.begin() as connection:
+        created = ensure_partitions(
+            connection, RentPayment.__table__, args.start or date.today(), args.months
+        )
+    print(", ".join(created) or "All partitions exist", file=sys.stderr)
+
+
+def _market_stats(args: argparse.Namespace) -> None:
+    from app import crud
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        segments = crud.rent_sketch.rebuild(db)
+        db.commit()
+    print(f"{segments:,} market segments", file=sys.stderr)
+
+
+def _contract_overlaps(args: argparse.Namespace) -> None:
+    from app.db.occupancy import ensure_occupancy
+    from app.db.session import engine
+
+    with engine.begin() as connection:
+        overlaps = ensure_occupancy(connection)
+    for overlap in overlaps:
+        print(
+            f"property {overlap.property_id}: contracts {overlap.contract_id} and {overlap.other_id}"
+        )
+    if overlaps:
+        sys.exit(f"{len(overlaps):,} overlapping pairs; deactivate one contract of each and run again")
+    print("No overlapping active contracts", file=sys.stderr)
+
+
+def main() -> None:
+    from app.core.config import settings
+    from app.services.cashflow import MAX_MONTHS
+
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cash = commands.add_parser("cashflow", help="Project expected rent month by month")
+    cash.add_argument("--owner-id", type=int, help="Only this owner's portfolio (default: all)")
+    cash.add_argument("--months", type=int, default=12, choices=range(1, MAX_MONTHS + 1), metavar="1-36")
+    cash.add_argument("--start", type=date.fromisoformat, help="First month (YYYY-MM-DD; default: this month)")
+    cash.add_argument("--format", default="table", choices=["table", "json", "csv"])
+    cash.set_defaults(func=_cashflow)
+
+    rec = commands.add_parser("reconcile", help="Match a bank statement CSV with rent payments")
+    rec.add_argument("statement", help="CSV with date, amount and optional reference, contract_id columns")
+    rec.add_argument("--owner-id", type=int, help="Only this owner's contracts (default: all)")
+    rec.add_argument("--window-days", type=int, default=3, help="Date tolerance when matching without a reference")
+    rec.add_argument("--chunk-size", type=int, default=5000)
+    rec.add_argument("--dry-run", action="store_true", help="Report without creating or updating payments")
+    rec.add_argument("--output", help="Write JSON-lines results here instead of stdout")
+    rec.set_defaults(func=_reconcile)
+
+    arc = commands.add_parser("archive", help="Move ended contracts and their history to the archive tables")
+    arc.add_argument("--after-days", type=int, default=settings.ARCHIVE_AFTER_DAYS, help="Days without activity")
+    arc.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE, help="Contracts per transaction")
+    arc.add_argument("--dry-run", action="store_true", help="Report without moving anything")
+    arc.set_defaults(func=_archive)
+
+    part = commands.add_parser("partitions", help="Create the monthly rent_payments partitions (PostgreSQL)")
+    part.add_argument("--start", type=date.fromisoformat, help="First month (YYYY-MM-DD; default: this month)")
+    part.add_argument("--months", type=int, default=settings.PAYMENT_PARTITION_MONTHS_AHEAD + 1)
+    part.set_defaults(func=_partitions)
+
+    market = commands.add_parser("market-stats", help="Recompute the market rent sketches from the properties")
+    market.set_defaults(func=_market_stats)
+
+    overlaps = commands.add_parser(
+        "contract-overlaps", help="Check active contracts for overlaps and add the occupancy index"
+    )
+    overlaps.set_defaults(func=_contract_overlaps)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
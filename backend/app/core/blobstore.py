@@ -0,0 +1,173 @@
+"""
+Content-addressed blob storage.
+
+Blobs are immutable and named by the SHA-256 of their content, so storing
+the same bytes twice keeps one copy. Writers stream: chunks are hashed and
+written to a temporary file as they arrive, and the file is moved into place
+under its digest on commit.
+
+`BlobStore` is the interface the application codes against; it only needs
+what object storage offers (put, ranged get, stat, delete). `LocalBlobStore`
+keeps blobs on the local filesystem and doubles as a stand-in for object
+storage in development and tests. Stores that can expose a blob as a local
+file (`local_path`) let downloads use sendfile.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from app.core.config import settings
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    digest: str  # Hex SHA-256 of the content
+    size: int
+
+
+class BlobWriter:
+    """Incremental upload of one blob; call `commit` or `abort` exactly once."""
+
+    size: int = 0
+
+    def write(self, chunk: bytes) -> None:
+        raise NotImplementedError
+
+    def commit(self) -> BlobInfo:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        raise NotImplementedError
+
+
+class BlobStore:
+    def writer(self) -> BlobWriter:
+        raise NotImplementedError
+
+    def stat(self, digest: str) -> Optional[BlobInfo]:
+        raise NotImplementedError
+
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Content from byte `start` up to, not including, `end` (default: the end)."""
+        raise NotImplementedError
+
+    def delete(self, digest: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, digest: str) -> Optional[str]:
+        """Filesystem path of the blob, if the store keeps it on a local disk."""
+        return None
+
+    def put(self, chunks: Iterable[bytes]) -> BlobInfo:
+        writer = self.writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+
+class _LocalWriter(BlobWriter):
+    def __init__(self, store: "LocalBlobStore") -> None:
+        self.store = store
+        self.size = 0
+        self._hash = hashlib.sha256()
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.tmp_dir)
+        self._file: BinaryIO = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> BlobInfo:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        digest = self._hash.hexdigest()
+        path = self.store._path(digest)
+        if os.path.exists(path):
+            # Same content is already stored
+            os.unlink(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        return BlobInfo(digest=digest, size=self.size)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs under `root`/objects/<first two hex digits>/<digest>."""
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Not a SHA-256 digest: {digest!r}")
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def writer(self) -> BlobWriter:
+        return _LocalWriter(self)
+
+    def stat(self, digest: str) -> Optional[BlobInfo]:
+        try:
+            return BlobInfo(digest=digest, size=os.stat(self._path(digest)).st_size)
+        except FileNotFoundError:
+            return None
+
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._path(digest), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.unlink(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, digest: str) -> Optional[str]:
+        return self._path(digest)
+
+    def relative_path(self, digest: str) -> str:
+        """Path below `root`, for web servers serving the store directly."""
+        return os.path.relpath(self._path(digest), self.root)
+
+
+def _build_store() -> BlobStore:
+    if settings.BLOB_STORE_BACKEND == "local":
+        return LocalBlobStore(settings.BLOB_STORE_PATH)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {settings.BLOB_STORE_BACKEND}")
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """The configured store, created on first use."""
+    global _store
+    if _store is None:
+        _store = _build_store()
+    return _store
@@ -0,0 +1,163 @@
+"""
+Response compression negotiated with Accept-Encoding: brotli when the
+client accepts it and the `brotli` package is installed, otherwise gzip.
+
+Bodies sent in one piece are compressed only from `minimum_size` bytes on,
+and sent uncompressed if that does not make them smaller. Streamed bodies
+are compressed as they go, without buffering the whole response. Left
+alone are Server-Sent Events (compressors hold data back, which would delay
+events), responses that already have a Content-Encoding, ranged and
+range-capable downloads, whose byte offsets must refer to the stored
+content, and media types that are compressed already.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/")
+INCOMPRESSIBLE_TYPES = {
+    "text/event-stream",
+    "application/gzip",
+    "application/zip",
+    "application/pdf",
+    "application/octet-stream",
+}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br', 'gzip' or None, by the client's q-values and then by preference for br."""
+    q = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        q[coding.lower()] = weight
+    star = q.get("*", 0.0)
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    ranked = [(q.get(coding, star), coding) for coding in available]
+    best = max(weight for weight, _ in ranked)
+    if best <= 0:
+        return None
+    return next(coding for weight, coding in ranked if weight == best)
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits 31: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                if (
+                    "content-encoding" in headers
+                    or "content-range" in headers
+                    or headers.get("accept-ranges", "none") != "none"
+                    or media_type in INCOMPRESSIBLE_TYPES
+                    or media_type.startswith(INCOMPRESSIBLE_PREFIXES)
+                ):
+                    passthrough = True
+                    await send(message)
+                return
+
+            if compressor is None:
+                if message["type"] != "http.response.body":
+                    # Zero-copy and path sends bypass the body
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body:
+                    passthrough = True
+                    if len(body) >= self.minimum_size:
+                        one_shot = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                        compressed = one_shot.compress(body) + one_shot.finish()
+                        headers.add_vary_header("Accept-Encoding")
+                        if len(compressed) < len(body):
+                            headers["content-encoding"] = encoding
+                            headers["content-length"] = str(len(compressed))
+                            message = {**message, "body": compressed}
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                await send(start)
+
+            body = compressor.compress(message.get("body", b""))
+            if message.get("more_body", False):
+                if body:
+                    await send({"type": "http.response.body", "body": body, "more_body": True})
+                return
+            await send({"type": "http.response.body", "body": body + compressor.finish()})
+
+        await self.app(scope, receive, send_compressed)
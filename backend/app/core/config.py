@@ -22,6 +22,102 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = None
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
 
+    # DIAGNOSTICS
+    # Statements slower than this are kept in the slow query log (None disables it)
+    SLOW_QUERY_THRESHOLD_MS: Optional[float] = 200.0
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN: bool = True
+    # Fraction of requests traced; spans go to the exporter: memory, file, otel or none
+    TRACING_SAMPLE_RATE: float = 0.0
+    TRACING_EXPORTER: str = "memory"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_MEMORY_SPANS: int = 10000
+    # Let the sampled flag of an incoming traceparent header force tracing
+    # (only behind a proxy that sets or strips it)
+    TRACING_TRUST_PARENT: bool = False
+    # Record sampled requests for replay (see benchmarks/replay.py); None disables capture
+    TRAFFIC_CAPTURE_PATH: Optional[str] = None
+    TRAFFIC_CAPTURE_SAMPLE_RATE: float = 0.01
+    TRAFFIC_CAPTURE_MAX_BODY: int = 65536
+
+    # CHANGE EVENTS
+    # "memory" reaches subscribers of the same worker only; "redis" fans out across workers
+    EVENTS_BACKEND: str = "memory"
+    EVENTS_REDIS_URL: Optional[str] = None
+    # Events kept for clients resuming with Last-Event-ID
+    EVENTS_HISTORY: int = 1000
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # RESPONSE ENCODING
+    # Responses from this size on are compressed (br or gzip, per Accept-Encoding)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Lists this long are encoded and compressed as a stream
+    RESPONSE_STREAM_MIN_ITEMS: int = 500
+
+    # BATCH READS
+    # Most ids one ?ids= request may ask for
+    BATCH_MAX_IDS: int = 100
+
+    # LIST TOTALS
+    # How ?with_total=true counts public property searches: "exact", "estimated"
+    # (planner statistics, or the owner counters when unfiltered) or "capped"
+    PROPERTY_SEARCH_TOTAL: str = "capped"
+    # Capped totals stop counting here and report "1000+"
+    LIST_TOTAL_CAP: int = 1000
+    # Search totals are reused for the same filters this long
+    LIST_TOTAL_CACHE_SECONDS: float = 30.0
+
+    # SIMILAR PROPERTIES
+    # Each worker rebuilds its index this often, to pick up other workers' writes
+    SIMILAR_INDEX_MAX_AGE_SECONDS: float = 600.0
+
+    # SAVED SEARCHES
+    # Most searches one user may save
+    SAVED_SEARCHES_PER_USER: int = 20
+
+    # MARKET RENT STATISTICS
+    # Each worker adds the rent changes it committed to the stored sketches this often
+    MARKET_STATS_SAVE_SECONDS: float = 60.0
+    # ...and reloads them, with the changes of other workers, this often
+    MARKET_STATS_MAX_AGE_SECONDS: float = 300.0
+
+    # AFFORDABILITY SCORING
+    # Most tenant x property pairs one request may score
+    AFFORDABILITY_MAX_PAIRS: int = 50_000
+
+    # ARCHIVAL
+    # Inactive contracts with no payment or maintenance request for this long
+    # move to the archive tables (python -m app.cli archive)
+    ARCHIVE_AFTER_DAYS: int = 730
+    # Contracts moved per transaction
+    ARCHIVE_BATCH_SIZE: int = 500
+    # Monthly rent_payments partitions kept ready ahead of time (PostgreSQL;
+    # python -m app.cli partitions)
+    PAYMENT_PARTITION_MONTHS_AHEAD: int = 3
+
+    # BLOB STORAGE
+    # Contract documents and other uploads; "local" keeps them under BLOB_STORE_PATH
+    BLOB_STORE_BACKEND: str = "local"
+    BLOB_STORE_PATH: str = "blobs"
+    # nginx internal location serving BLOB_STORE_PATH; downloads are then handed
+    # to nginx with X-Accel-Redirect (None streams them from the application)
+    BLOB_STORE_ACCEL_REDIRECT: Optional[str] = None
+    CONTRACT_DOCUMENT_MAX_BYTES: int = 25 * 1024 * 1024
+
+    # PROPERTY IMAGES
+    # Decoding, resizing and WebP encoding run in this many worker processes
+    IMAGE_WORKERS: int = 2
+    # Images queued or being processed at once; further uploads get 503
+    IMAGE_MAX_PENDING: int = 16
+    IMAGE_MAX_BYTES: int = 20 * 1024 * 1024
+    IMAGE_MAX_PIXELS: int = 50_000_000
+    IMAGE_WEBP_QUALITY: int = 80
+    # On-demand sizes are kept here, least recently used evicted first
+    IMAGE_CACHE_PATH: str = "image-cache"
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
         if isinstance(v, str):
@@ -0,0 +1,86 @@
+"""
+Size-bounded on-disk cache with least-recently-used eviction.
+
+Entries are files named by key under `root`. Recency and sizes are tracked in
+memory, seeded from file modification times when the cache is first used, so
+lookups never scan the directory. Several processes may share a directory:
+each evicts by its own view, and an entry removed under another process is
+simply a miss.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class DiskLRUCache:
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._size = 0
+
+    def _path(self, key: str) -> str:
+        if not key or os.sep in key or key.startswith("."):
+            raise ValueError(f"Invalid cache key: {key!r}")
+        return os.path.join(self.root, key)
+
+    def _load(self) -> "OrderedDict[str, int]":
+        if self._entries is None:
+            os.makedirs(self.root, exist_ok=True)
+            found = []
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name, stat.st_size))
+            self._entries = OrderedDict((name, size) for _, name, size in sorted(found))
+            self._size = sum(self._entries.values())
+        return self._entries
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached file, marked as most recently used; None on a miss."""
+        path = self._path(key)
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                return None
+            if not os.path.exists(path):
+                self._size -= entries.pop(key)
+                return None
+            entries.move_to_end(key)
+        try:
+            os.utime(path)  # Keeps the order across restarts
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store `data` under `key` and evict until the cache fits; returns its path."""
+        path = self._path(key)
+        with self._lock:
+            entries = self._load()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - entries.pop(key, 0)
+            entries[key] = len(data)
+            # The newest entry stays even if it alone exceeds the limit
+            while self._size > self.max_bytes and len(entries) > 1:
+                old_key, old_size = entries.popitem(last=False)
+                self._size -= old_size
+                try:
+                    os.unlink(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            self._load()
+            return self._size
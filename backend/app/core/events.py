@@ -0,0 +1,303 @@
+"""
+Change events for the Server-Sent Events feed.
+
+CRUD write paths `stage()` events on the session; they are published when
+the session commits and discarded if it rolls back, so subscribers never see
+a change that did not happen. Publishing goes through an `EventBackend`,
+which assigns ids, keeps recent history for clients resuming with
+Last-Event-ID, and delivers every event to the `Broadcaster` of each worker.
+The in-memory backend only reaches subscribers of the same process; the
+Redis stream backend fans out across workers.
+
+Each event carries an audience: None for public events (property listings),
+otherwise the ids of the users allowed to see it.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import count
+from typing import (
+    Any, AsyncIterator, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set
+)
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# A subscriber this far behind is disconnected; it resumes from its last event id
+MAX_QUEUED_EVENTS = 1000
+
+
+@dataclass
+class Event:
+    type: str
+    data: Dict[str, Any]
+    audience: Optional[FrozenSet[int]] = None
+    id: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def visible_to(self, user_id: int) -> bool:
+        return self.audience is None or user_id in self.audience
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "type": self.type,
+                "data": self.data,
+                "audience": sorted(self.audience) if self.audience is not None else None,
+                "created_at": self.created_at.isoformat(),
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, raw: str, event_id: str) -> "Event":
+        payload = json.loads(raw)
+        audience = payload["audience"]
+        return cls(
+            type=payload["type"],
+            data=payload["data"],
+            audience=frozenset(audience) if audience is not None else None,
+            id=event_id,
+            created_at=datetime.fromisoformat(payload["created_at"]),
+        )
+
+
+class EventBackend:
+    """Transport between publishers and the broadcasters of every worker."""
+
+    def publish(self, event: Event) -> None:
+        raise NotImplementedError
+
+    def since(self, last_event_id: str) -> List[Event]:
+        """Retained events published after `last_event_id`, oldest first."""
+        raise NotImplementedError
+
+    def start(self, deliver: Callable[[Event], None]) -> None:
+        """Call `deliver` with every event published from now on, by any worker."""
+        raise NotImplementedError
+
+
+class InMemoryEventBackend(EventBackend):
+    def __init__(self, history: int = 1000) -> None:
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._deliver: Optional[Callable[[Event], None]] = None
+
+    def publish(self, event: Event) -> None:
+        with self._lock:
+            event.id = str(next(self._ids))
+            self._history.append(event)
+        if self._deliver is not None:
+            self._deliver(event)
+
+    def since(self, last_event_id: str) -> List[Event]:
+        try:
+            last = int(last_event_id)
+        except ValueError:
+            return []
+        with self._lock:
+            return [e for e in self._history if int(e.id) > last]
+
+    def start(self, deliver: Callable[[Event], None]) -> None:
+        self._deliver = deliver
+
+
+class RedisStreamEventBackend(EventBackend):
+    """
+    Events are appended to a capped Redis stream; stream entry ids double as
+    event ids. Requires the optional `redis` package (Redis 6.2 or later).
+    """
+
+    def __init__(self, url: str, stream: str = "events", history: int = 1000) -> None:
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.stream = stream
+        self.history = history
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, event: Event) -> None:
+        entry_id = self._redis.xadd(
+            self.stream, {"event": event.to_json()}, maxlen=self.history, approximate=True
+        )
+        event.id = entry_id.decode()
+
+    def since(self, last_event_id: str) -> List[Event]:
+        entries = self._redis.xrange(self.stream, min=f"({last_event_id}", count=self.history)
+        return [Event.from_json(fields[b"event"], entry_id.decode()) for entry_id, fields in entries]
+
+    def start(self, deliver: Callable[[Event], None]) -> None:
+        last_id = "$"
+
+        def listen() -> None:
+            nonlocal last_id
+            while True:
+                try:
+                    response = self._redis.xread({self.stream: last_id}, block=5000)
+                except Exception:
+                    logger.exception("Reading the event stream failed")
+                    threading.Event().wait(1.0)
+                    continue
+                for _, entries in response or ():
+                    for entry_id, fields in entries:
+                        last_id = entry_id.decode()
+                        deliver(Event.from_json(fields[b"event"], last_id))
+
+        self._thread = threading.Thread(target=listen, name="event-stream", daemon=True)
+        self._thread.start()
+
+
+class _Subscriber:
+    def __init__(self, user_id: int, types: Optional[Set[str]]) -> None:
+        self.user_id = user_id
+        self.types = types
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue()
+        self.overflowed = False
+
+    def wants(self, event: Event) -> bool:
+        if not event.visible_to(self.user_id):
+            return False
+        if self.types is None or event.type in self.types:
+            return True
+        # 'property' selects property.created, property.updated, ...
+        return event.type.split(".", 1)[0] in self.types
+
+    def offer(self, event: Event) -> None:
+        """Called from any thread."""
+        if self.wants(event):
+            try:
+                self.loop.call_soon_threadsafe(self._put, event)
+            except RuntimeError:  # Event loop already closed; the subscription is going away
+                pass
+
+    def _put(self, event: Event) -> None:
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= MAX_QUEUED_EVENTS:
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+
+class Broadcaster:
+    def __init__(self, backend: EventBackend) -> None:
+        self.backend = backend
+        self._subscribers: Set[_Subscriber] = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def publish(self, event: Event) -> None:
+        self.backend.publish(event)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if not self._started:
+                self.backend.start(self._deliver)
+                self._started = True
+
+    def _deliver(self, event: Event) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.offer(event)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(
+        self,
+        user_id: int,
+        *,
+        last_event_id: Optional[str] = None,
+        types: Optional[Iterable[str]] = None,
+        heartbeat: Optional[float] = None,
+    ) -> AsyncIterator[Optional[Event]]:
+        """
+        Events visible to `user_id`, starting after `last_event_id` if given.
+        Yields None every `heartbeat` seconds without events, and stops if the
+        subscriber falls too far behind.
+        """
+        self._ensure_started()
+        subscriber = _Subscriber(user_id, set(types) if types else None)
+        # Register before reading history so nothing published in between is lost
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            seen: Set[str] = set()
+            if last_event_id:
+                for event in await asyncio.to_thread(self.backend.since, last_event_id):
+                    if subscriber.wants(event):
+                        seen.add(event.id)
+                        yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                if event.id in seen:
+                    seen.discard(event.id)
+                    continue
+                yield event
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+def encode_sse(event: Optional[Event]) -> str:
+    """Wire format of one event; None encodes a keep-alive comment."""
+    if event is None:
+        return ": keep-alive\n\n"
+    data = json.dumps(event.data, separators=(",", ":"))
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+
+def _build_backend() -> EventBackend:
+    if settings.EVENTS_BACKEND == "redis":
+        return RedisStreamEventBackend(settings.EVENTS_REDIS_URL, history=settings.EVENTS_HISTORY)
+    return InMemoryEventBackend(settings.EVENTS_HISTORY)
+
+
+broadcaster = Broadcaster(_build_backend())
+
+
+def stage(
+    db: Session, type: str, data: Dict[str, Any], audience: Optional[Iterable[int]] = None
+) -> None:
+    """Publish an event once `db` commits."""
+    db.info.setdefault("pending_events", []).append(
+        Event(
+            type=type,
+            data=jsonable_encoder(data),
+            audience=frozenset(a for a in audience if a is not None) if audience is not None else None,
+        )
+    )
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for event in session.info.pop("pending_events", ()):
+        try:
+            broadcaster.publish(event)
+        except Exception:  # The change is committed; losing its event must not fail the request
+            logger.exception("Publishing %s event failed", event.type)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("pending_events", None)
@@ -0,0 +1,137 @@
+"""
+On-demand sampling profiler.
+
+Nothing is installed until a profile is requested: no tracing hooks, no timer
+signals. While a profile runs, the calling thread wakes every `interval`
+seconds, reads the stacks of all other threads with `sys._current_frames()`
+and counts identical stacks. The result is written in the collapsed format
+read by flamegraph.pl, speedscope and similar tools:
+
+    thread;module:function;module:function <samples>
+
+Optionally tracemalloc runs for the same window, and the lines that allocated
+the most memory still alive at the end are reported.
+"""
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+MAX_DEPTH = 128
+TRACEMALLOC_FRAMES = 1
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}:{name}"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    # ';' separates frames and the trailing space the count, so neither may appear in a label
+    return ";".join(label.replace(";", ":").replace(" ", "_") for label in labels)
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    stats = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        )
+    ).statistics("lineno")
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024.0, 1),
+            "count": stat.count,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+class SamplingProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(
+        self,
+        duration: float,
+        *,
+        interval: float = 0.01,
+        memory: bool = True,
+        top_allocations: int = 25,
+    ) -> Dict[str, Any]:
+        """
+        Sample every thread except the caller for `duration` seconds. Blocks
+        the calling thread; only one profile can run at a time.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._profile(duration, interval, memory, top_allocations)
+        finally:
+            self._lock.release()
+
+    def _profile(
+        self, duration: float, interval: float, memory: bool, top_allocations: int
+    ) -> Dict[str, Any]:
+        own_thread = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started_tracemalloc = memory and not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        deadline = started + duration
+        try:
+            while True:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                frames = sys._current_frames()
+                for ident, frame in frames.items():
+                    if ident != own_thread:
+                        stacks[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+                # Holding on to frames would keep their locals alive
+                del frames, frame
+                samples += 1
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                time.sleep(min(interval, deadline - now))
+            allocations: Optional[List[Dict[str, Any]]] = None
+            if memory:
+                allocations = _top_allocations(tracemalloc.take_snapshot(), top_allocations)
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        return {
+            "started_at": started_at,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "interval_ms": round(interval * 1000.0, 3),
+            "samples": samples,
+            "collapsed": "".join(
+                f"{stack} {count}\n" for stack, count in stacks.most_common()
+            ),
+            "allocations": allocations,
+        }
+
+
+profiler = SamplingProfiler()
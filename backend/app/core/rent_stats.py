@@ -0,0 +1,243 @@
+"""
+Market rent statistics for `GET /market/rent-stats`.
+
+Asking rents are summarised per segment (city, bedrooms, property type) by
+a quantile sketch: a histogram over logarithmic buckets, each RELATIVE_ACCURACY
+wider than the last, so that any percentile read from it is within 1% of the
+true rent whatever the size of the segment. Unlike t-digest or KLL, bucket
+counts can be decremented as well as merged: an updated or deleted listing
+is taken out of its segment exactly, and segments add up into coarser ones
+(a whole city, or every type of a bedroom count) by adding their counts.
+
+Each worker holds the sketches in memory. `crud.property` write paths stage
+their changes on the session; when it commits, they apply to this worker's
+sketches and are kept as unsaved deltas. `crud.rent_sketch.sync` adds the
+deltas of the worker to the `rent_sketches` table every
+MARKET_STATS_SAVE_SECONDS and reloads the table, with the saved deltas of
+every worker, after MARKET_STATS_MAX_AGE_SECONDS. A lookup reads the
+sketches of one city only, however many properties they count. Deltas not
+saved yet are lost when a worker stops; `python -m app.cli market-stats`
+recomputes the table from the properties. The rows it writes carry the time
+of the rebuild: a worker drops its unsaved changes counted before then,
+which the rebuild already includes, instead of adding them again, and
+reloads.
+"""
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# Changing this invalidates stored sketches: rebuild them afterwards
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+# Lower rents are counted as this; they are not real asking rents
+MIN_RENT = 1.0
+
+QUANTILES = {"p25": 0.25, "median": 0.5, "p75": 0.75}
+
+Segment = Tuple[str, int, str]  # City, bedrooms, property type
+
+
+class Listing(NamedTuple):
+    city: str
+    bedrooms: int
+    property_type: str
+    monthly_rent: float
+
+    @property
+    def segment(self) -> Segment:
+        return self.city, self.bedrooms, self.property_type
+
+
+def listing_of(property: Any) -> Listing:
+    return Listing(*(getattr(property, name) for name in Listing._fields))
+
+
+class QuantileSketch:
+    """Counts of rents per logarithmic bucket; a bucket's index is its key."""
+
+    __slots__ = ("buckets", "count")
+
+    def __init__(self, buckets: Optional[Dict[Any, int]] = None) -> None:
+        self.buckets: Dict[int, int] = {int(i): n for i, n in (buckets or {}).items() if n}
+        self.count = sum(self.buckets.values())
+
+    def add(self, rent: float, weight: int = 1) -> None:
+        """Count `rent` `weight` times; a negative weight takes it out again."""
+        index = math.ceil(math.log(max(rent, MIN_RENT)) / _LOG_GAMMA)
+        total = self.buckets.get(index, 0) + weight
+        if total:
+            self.buckets[index] = total
+        else:
+            del self.buckets[index]
+        self.count += weight
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for index, n in other.buckets.items():
+            total = self.buckets.get(index, 0) + n
+            if total:
+                self.buckets[index] = total
+            else:
+                del self.buckets[index]
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                break
+        # The value that is within RELATIVE_ACCURACY of every rent in the bucket
+        return round(2 * _GAMMA ** index / (_GAMMA + 1), 2)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"count": self.count, **{name: self.quantile(q) for name, q in QUANTILES.items()}}
+
+    def to_json(self) -> Dict[str, int]:
+        return {str(i): n for i, n in self.buckets.items()}
+
+
+# An unsaved change: when it was counted (UTC, as rebuilds record), listing, +1 or -1
+Change = Tuple[datetime, Listing, int]
+
+
+def deltas_of(changes: Iterable[Change]) -> Dict[Segment, QuantileSketch]:
+    """The changes summed up per segment."""
+    deltas: Dict[Segment, QuantileSketch] = {}
+    for _, listing, weight in changes:
+        deltas.setdefault(listing.segment, QuantileSketch()).add(listing.monthly_rent, weight)
+    return {segment: delta for segment, delta in deltas.items() if delta.buckets}
+
+
+class RentStats:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        # City -> (bedrooms, property type) -> sketch
+        self._sketches: Dict[str, Dict[Tuple[int, str], QuantileSketch]] = {}
+        self._unsaved: List[Change] = []
+        self._loaded_at: Optional[float] = None
+        self._saved_at = time.monotonic()
+        self.rebuilt_at: Optional[datetime] = None  # Of the table last loaded
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sketches = {}
+            self._unsaved = []
+            self._loaded_at = None
+            self.rebuilt_at = None
+
+    def load(
+        self,
+        rows: Iterable[Tuple[str, int, str, Dict[str, int]]],
+        *,
+        rebuilt_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Replace the sketches with (city, bedrooms, property_type, buckets)
+        rows, of the table as last rebuilt at `rebuilt_at`.
+        """
+        sketches: Dict[str, Dict[Tuple[int, str], QuantileSketch]] = {}
+        for city, bedrooms, property_type, buckets in rows:
+            sketches.setdefault(city, {})[bedrooms, property_type] = QuantileSketch(buckets)
+        with self._lock:
+            self._sketches = sketches
+            self._loaded_at = time.monotonic()
+            self.rebuilt_at = rebuilt_at
+
+    def apply(self, changes: Iterable[Tuple[Listing, int]]) -> None:
+        """Count committed (listing, +1 or -1) changes, here and as unsaved."""
+        now = datetime.utcnow()
+        with self._lock:
+            for listing, weight in changes:
+                self._unsaved.append((now, listing, weight))
+                if self.loaded:
+                    segments = self._sketches.setdefault(listing.city, {})
+                    segments.setdefault(
+                        (listing.bedrooms, listing.property_type), QuantileSketch()
+                    ).add(listing.monthly_rent, weight)
+
+    def take_unsaved(self, *, after: Optional[datetime] = None) -> List[Change]:
+        """The unsaved changes, but for those counted by `after` (dropped)."""
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+            self._saved_at = time.monotonic()
+        if after is None:
+            return unsaved
+        return [change for change in unsaved if change[0] > after]
+
+    def restore_unsaved(self, changes: List[Change]) -> None:
+        with self._lock:
+            self._unsaved[:0] = changes
+
+    def due(self) -> Tuple[bool, bool]:
+        """Whether the unsaved deltas are to be saved, and the sketches reloaded."""
+        now = time.monotonic()
+        with self._lock:
+            reload = (
+                self._loaded_at is None
+                or now - self._loaded_at > settings.MARKET_STATS_MAX_AGE_SECONDS
+            )
+            save = bool(self._unsaved) and (
+                reload or now - self._saved_at > settings.MARKET_STATS_SAVE_SECONDS
+            )
+        return save, reload
+
+    def lookup(
+        self, city: str, bedrooms: Optional[int] = None, property_type: Optional[str] = None
+    ) -> QuantileSketch:
+        """
+        The sketch of one segment, or the merge of the city's segments
+        matching the bedrooms and property type given.
+        """
+        merged = QuantileSketch()
+        with self._lock:
+            segments = self._sketches.get(city, {})
+            if bedrooms is not None and property_type is not None:
+                sketch = segments.get((bedrooms, property_type))
+                return QuantileSketch(sketch.buckets if sketch else None)
+            for (b, t), sketch in segments.items():
+                if (bedrooms is None or b == bedrooms) and (property_type is None or t == property_type):
+                    merged.merge(sketch)
+        return merged
+
+
+stats = RentStats()
+
+
+def stage(db: Session, listing: Listing, weight: int) -> None:
+    """Count `listing` (`weight` +1) or take it out (-1) once `db` commits."""
+    db.info.setdefault("pending_rent_stats", []).append((listing, weight))
+
+
+def stage_saved(db: Session, changes: List[Change]) -> None:
+    """Changes written with `db`, unsaved again if it rolls back."""
+    db.info.setdefault("saved_rent_stats", []).append(changes)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    session.info.pop("saved_rent_stats", None)
+    changes = session.info.pop("pending_rent_stats", ())
+    if changes:
+        stats.apply(changes)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("pending_rent_stats", None)
+    for changes in session.info.pop("saved_rent_stats", ()):
+        stats.restore_unsaved(changes)
@@ -0,0 +1,78 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class RequestContext:
+    """
+    Per-request information that code far from the endpoint (engine event
+    hooks, logging) needs, such as which route a SQL statement belongs to.
+    """
+
+    def __init__(self, scope: Scope) -> None:
+        self.app = scope.get("app")
+        self.method: str = scope.get("method", "")
+        self.path: str = scope.get("path", "")
+        self.root_path: str = scope.get("root_path", "")
+        # Set by deps.get_current_user once the token has been validated
+        self.user_id: Optional[int] = None
+        self._route: Optional[str] = None
+
+    @property
+    def route(self) -> Optional[str]:
+        """
+        Path template of the matched route, e.g. '/api/v1/properties/{property_id}'.
+        Resolved on first use, since most requests never need it.
+        """
+        if self._route is None:
+            scope = {
+                "type": "http",
+                "method": self.method,
+                "path": self.path,
+                "root_path": self.root_path,
+            }
+            for route in getattr(self.app, "routes", ()):
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    self._route = getattr(route, "path", None)
+                    break
+        return self._route
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "user_id": self.user_id,
+        }
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar(
+    "request_context", default=None
+)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    return _request_context.get()
+
+
+class RequestContextMiddleware:
+    """
+    Make the current request available through `get_request_context()`,
+    including inside sync endpoints running in the threadpool.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_context.set(RequestContext(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_context.reset(token)
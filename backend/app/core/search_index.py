@@ -0,0 +1,216 @@
+"""
+Inverted index of saved searches, for matching new listings against them.
+
+A saved search is a conjunction of the `search_properties` filters: city,
+state and property type must equal the listing's, bedrooms must be at least
+`min_bedrooms` and the rent at most `max_rent`. A search setting any of the
+equality filters is filed under one of them only, the most selective it
+sets (city, else state, else type): a listing reads the three posting lists
+of its own city, state and type, and checks the searches on them with
+`SearchFilters.accepts`. The work is proportional to the searches naming
+the listing's city (or its state or type without a city), not to the
+number saved.
+
+The few searches that set range filters only are on a posting list per
+filter: ("min_bedrooms", 2), or ("rent", bucket) with `max_rent` rounded
+down to a logarithmic bucket RENT_BUCKET_STEP wide. A listing reads those
+of every `min_bedrooms` up to its bedrooms and of every rent bucket from
+its rent's on, and the searches found on as many lists as they set filters
+are the candidates, checked exactly (rents within the listing's own bucket
+may be too low). Searches without any filter match every listing.
+
+The index of each worker is loaded on first use and kept current by
+`crud.saved_search`: searches saved or deleted through this worker apply
+when their transaction commits, and other workers' show up in the count and
+highest id checked before each match.
+"""
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+RENT_BUCKET_STEP = 1.1  # Rent buckets are 10% wide
+
+
+class SearchFilters(NamedTuple):
+    id: int
+    user_id: int
+    city: Optional[str]
+    state: Optional[str]
+    min_bedrooms: Optional[int]
+    max_rent: Optional[float]
+    property_type: Optional[str]
+
+    def accepts(self, listing: "Listing") -> bool:
+        """The filtering of `crud.property.search_properties`, for one listing."""
+        return (
+            (not self.city or listing.city == self.city)
+            and (not self.state or listing.state == self.state)
+            and (not self.property_type or listing.property_type == self.property_type)
+            and (not self.min_bedrooms or listing.bedrooms >= self.min_bedrooms)
+            and (not self.max_rent or listing.monthly_rent <= self.max_rent)
+        )
+
+
+class Listing(NamedTuple):
+    id: int
+    owner_id: int
+    city: str
+    state: str
+    property_type: str
+    bedrooms: int
+    monthly_rent: float
+
+
+def listing_of(property: Any) -> Listing:
+    return Listing(*(getattr(property, name) for name in Listing._fields))
+
+
+def _rent_bucket(rent: float) -> int:
+    return math.floor(math.log(max(rent, 1.0)) / math.log(RENT_BUCKET_STEP))
+
+
+EQUALITY_FILTERS = ("city", "state", "property_type")  # Most selective first
+
+
+def _postings(search: SearchFilters) -> Tuple[Optional[Tuple[str, Any]], List[Tuple[str, Any]]]:
+    """The equality posting list `search` is filed under, else its range ones."""
+    for name in EQUALITY_FILTERS:
+        if getattr(search, name):
+            return (name, getattr(search, name)), []
+    keys: List[Tuple[str, Any]] = []
+    if search.min_bedrooms:
+        keys.append(("min_bedrooms", search.min_bedrooms))
+    if search.max_rent:
+        keys.append(("rent", _rent_bucket(search.max_rent)))
+    return None, keys
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._reset()
+        self.loaded = False
+
+    def _reset(self) -> None:
+        self._searches: Dict[int, SearchFilters] = {}
+        self._postings: Dict[Tuple[str, Any], Set[int]] = {}
+        self._required: Dict[int, int] = {}  # Range-only search id -> posting lists it is on
+        self._match_all: Set[int] = set()
+        # Range keys in use, sorted, for the range lookups
+        self._bedrooms: List[int] = []
+        self._rent_buckets: List[int] = []
+        self.max_id = 0
+
+    def __len__(self) -> int:
+        return len(self._searches)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self.loaded = False
+
+    def load(self, rows: Iterable[Tuple]) -> None:
+        """Replace the contents with searches given as SearchFilters rows."""
+        with self._lock:
+            self._reset()
+            self.add_all(rows)
+            self.loaded = True
+
+    def add_all(self, rows: Iterable[Tuple]) -> None:
+        with self._lock:
+            for row in rows:
+                self._add(SearchFilters(*row))
+
+    def _add(self, search: SearchFilters) -> None:
+        if search.id in self._searches:
+            return
+        self._searches[search.id] = search
+        self.max_id = max(self.max_id, search.id)
+        anchor, ranges = _postings(search)
+        if anchor:
+            self._postings.setdefault(anchor, set()).add(search.id)
+            return
+        if not ranges:
+            self._match_all.add(search.id)
+        self._required[search.id] = len(ranges)
+        for key in ranges:
+            posting = self._postings.setdefault(key, set())
+            if not posting:
+                insort(self._bedrooms if key[0] == "min_bedrooms" else self._rent_buckets, key[1])
+            posting.add(search.id)
+
+    def remove(self, id: int) -> None:
+        with self._lock:
+            search = self._searches.pop(id, None)
+            if search is None:
+                return
+            if id == self.max_id:
+                self.max_id = max(self._searches, default=0)
+            self._required.pop(id, None)
+            self._match_all.discard(id)
+            anchor, ranges = _postings(search)
+            for key in [anchor] if anchor else ranges:
+                posting = self._postings[key]
+                posting.discard(id)
+                if not posting:
+                    del self._postings[key]
+                    if key in ranges:
+                        (self._bedrooms if key[0] == "min_bedrooms" else self._rent_buckets).remove(key[1])
+
+    def matches(self, listing: Listing) -> List[SearchFilters]:
+        """The searches `listing` satisfies, by id."""
+        with self._lock:
+            candidates = [
+                self._searches[id]
+                for name in EQUALITY_FILTERS
+                for id in self._postings.get((name, getattr(listing, name)), ())
+            ]
+            hits: Counter = Counter()
+            for bedrooms in self._bedrooms[: bisect_left(self._bedrooms, (listing.bedrooms or 0) + 1)]:
+                hits.update(self._postings[("min_bedrooms", bedrooms)])
+            cheapest = bisect_left(self._rent_buckets, _rent_bucket(listing.monthly_rent))
+            for bucket in self._rent_buckets[cheapest:]:
+                hits.update(self._postings[("rent", bucket)])
+            candidates.extend(self._searches[id] for id, count in hits.items() if count == self._required[id])
+            candidates.extend(self._searches[id] for id in self._match_all)
+        return sorted((s for s in candidates if s.accepts(listing)), key=lambda s: s.id)
+
+
+index = SearchIndex()
+
+
+def stage_add(db: Session, search: Any) -> None:
+    """Index `search` once `db` commits."""
+    row = SearchFilters(*(getattr(search, name) for name in SearchFilters._fields))
+    db.info.setdefault("pending_saved_searches", []).append(row)
+
+
+def stage_remove(db: Session, id: int) -> None:
+    """Drop search `id` from the index once `db` commits."""
+    db.info.setdefault("pending_saved_searches", []).append(id)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    changes = session.info.pop("pending_saved_searches", ())
+    if not changes:
+        return
+    # An index not loaded yet reads the committed rows when it is
+    with index._lock:
+        if not index.loaded:
+            return
+        for change in changes:
+            if isinstance(change, SearchFilters):
+                index.add_all([change])
+            else:
+                index.remove(change)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("pending_saved_searches", None)
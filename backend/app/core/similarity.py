@@ -0,0 +1,291 @@
+"""
+Similar-property index for `GET /properties/{id}/similar`.
+
+Every property is encoded into a fixed-width feature vector, scaled so that
+one unit of distance means a comparable difference whatever the feature:
+
+- city and property type: hashed one-hot blocks, weighted so that another
+  city or type outweighs any difference in size or rent
+- bedrooms and bathrooms: one unit per room
+- area and rent: log scale, one unit per AREA_STEP / RENT_STEP ratio
+- amenities: hashed multi-hot block of unit length
+
+Hashing keeps the width fixed as new cities and amenities appear, so a
+vector never has to be re-encoded because of other properties; rare bucket
+collisions only make two cities or amenities look alike.
+
+Vectors are rows of one contiguous float32 matrix, and a query computes
+the squared Euclidean distance to all of them with one matrix-vector
+product before `np.argpartition` picks the nearest. The index of each
+worker is loaded from the database on first use. `crud.property` write
+paths stage changes on the session, like change events: they apply to
+this worker's index when the session commits. The index is rebuilt after
+SIMILAR_INDEX_MAX_AGE_SECONDS, so writes of other workers and bulk loads
+show up within that time; the table is read and encoded outside the lock,
+and only the finished arrays are swapped in under it.
+"""
+import json
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+MAX_RESULTS = 50
+
+CITY_BUCKETS = 64
+TYPE_BUCKETS = 8
+AMENITY_BUCKETS = 32
+CITY_WEIGHT = 4.0
+TYPE_WEIGHT = 2.0
+AMENITY_WEIGHT = 1.0
+BATHROOM_WEIGHT = 0.5
+AREA_STEP = 1.5  # 50% larger is one unit away
+RENT_STEP = 1.25  # 25% dearer is one unit away
+# Area assumed per bedroom when a listing has none
+AREA_PER_BEDROOM = 450.0
+
+_CITY = 0
+_TYPE = _CITY + CITY_BUCKETS
+_AMENITIES = _TYPE + TYPE_BUCKETS
+_NUMERIC = _AMENITIES + AMENITY_BUCKETS
+DIMENSIONS = _NUMERIC + 4
+
+
+class PropertyFeatures(NamedTuple):
+    id: int
+    city: str
+    property_type: str
+    bedrooms: int
+    bathrooms: float
+    area_sqft: Optional[float]
+    monthly_rent: float
+    amenities: Optional[str]
+    is_available: Optional[bool]
+
+
+def features_of(property: Any) -> PropertyFeatures:
+    return PropertyFeatures(*(getattr(property, name) for name in PropertyFeatures._fields))
+
+
+def _bucket(value: str, buckets: int) -> int:
+    # crc32 rather than hash(): buckets must agree across processes and restarts
+    return zlib.crc32(value.strip().lower().encode()) % buckets
+
+
+def _amenities(raw: Optional[str]) -> List[str]:
+    """Amenity names from the JSON list or object (or comma-separated text) stored."""
+    if not raw:
+        return []
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw.split(",")
+    if isinstance(value, dict):
+        value = [name for name, present in value.items() if present]
+    elif isinstance(value, str):
+        value = [value]
+    elif not isinstance(value, list):
+        return []
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def encode(features: PropertyFeatures) -> np.ndarray:
+    vector = np.zeros(DIMENSIONS, np.float32)
+    vector[_CITY + _bucket(features.city or "", CITY_BUCKETS)] = CITY_WEIGHT
+    vector[_TYPE + _bucket(features.property_type or "", TYPE_BUCKETS)] = TYPE_WEIGHT
+    amenities = {_bucket(name, AMENITY_BUCKETS) for name in _amenities(features.amenities)}
+    for bucket in amenities:
+        vector[_AMENITIES + bucket] = AMENITY_WEIGHT / np.sqrt(len(amenities))
+    bedrooms = features.bedrooms or 0
+    area = features.area_sqft or max(bedrooms, 1) * AREA_PER_BEDROOM
+    vector[_NUMERIC:] = (
+        bedrooms,
+        (features.bathrooms or 0.0) * BATHROOM_WEIGHT,
+        np.log(max(area, 1.0)) / np.log(AREA_STEP),
+        np.log(max(features.monthly_rent or 0.0, 1.0)) / np.log(RENT_STEP),
+    )
+    return vector
+
+
+class SimilarityIndex:
+    def __init__(self, capacity: int = 1024) -> None:
+        self._lock = threading.RLock()
+        self._allocate(capacity)
+        self._loaded_at: Optional[float] = None
+        # While reloads read the table, changes applied meanwhile, to replay
+        self._reloading = 0
+        self._recent: List[Tuple[float, Any]] = []
+
+    def _allocate(self, capacity: int) -> None:
+        self._vectors = np.zeros((capacity, DIMENSIONS), np.float32)
+        self._norms = np.zeros(capacity, np.float32)  # Squared, kept for the distance formula
+        self._ids = np.zeros(capacity, np.int64)
+        self._alive = np.zeros(capacity, bool)
+        self._available = np.zeros(capacity, bool)
+        self._rows: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._used = 0  # Rows ever handed out; freed ones are reused first
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._allocate(len(self._ids))
+            self._loaded_at = None
+
+    def load(self, rows: Iterable[Tuple], *, since: Optional[float] = None) -> None:
+        """
+        Replace the contents with properties given as PropertyFeatures rows,
+        encoded outside the lock. With `since`, the time the rows were read
+        from, changes applied after it are replayed onto them, and a load
+        done in the meantime is kept instead.
+        """
+        fresh = SimilarityIndex(0)
+        features = [PropertyFeatures(*row) for row in rows]
+        fresh._allocate(max(1024, 2 * len(features)))
+        for f in features:
+            fresh._put(f)
+        with self._lock:
+            if since is not None:
+                if self._loaded_at is not None and self._loaded_at >= since:
+                    return
+                fresh.apply(change for at, change in self._recent if at >= since)
+            for name in ("_vectors", "_norms", "_ids", "_alive", "_available", "_rows", "_free", "_used"):
+                setattr(self, name, getattr(fresh, name))
+            self._loaded_at = time.monotonic()
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._ids)
+        for name in ("_vectors", "_norms", "_ids", "_alive", "_available"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def _put(self, features: PropertyFeatures) -> None:
+        row = self._rows.get(features.id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self._used == len(self._ids):
+                    self._grow()
+                row = self._used
+                self._used += 1
+            self._rows[features.id] = row
+        vector = encode(features)
+        self._vectors[row] = vector
+        self._norms[row] = vector @ vector
+        self._ids[row] = features.id
+        self._alive[row] = True
+        self._available[row] = features.is_available is not False
+
+    def upsert(self, features: PropertyFeatures) -> None:
+        self.apply([features])
+
+    def remove(self, id: int) -> None:
+        self.apply([id])
+
+    def apply(self, changes: Iterable[Any]) -> None:
+        """Apply PropertyFeatures to upsert and ids to remove."""
+        with self._lock:
+            for change in changes:
+                if self._reloading:
+                    self._recent.append((time.monotonic(), change))
+                if isinstance(change, PropertyFeatures):
+                    self._put(change)
+                    continue
+                row = self._rows.pop(change, None)
+                if row is not None:
+                    self._alive[row] = False
+                    self._free.append(row)
+
+    def nearest(
+        self, vector: np.ndarray, k: int, *, exclude: Optional[int] = None, available_only: bool = True
+    ) -> List[Tuple[int, float]]:
+        """(id, distance) of the `k` properties nearest `vector`, nearest first, ties by id."""
+        with self._lock:
+            n = self._used
+            distances = self._norms[:n] - 2.0 * (self._vectors[:n] @ vector) + vector @ vector
+            candidates = self._available[:n] if available_only else self._alive[:n]
+            candidates = candidates & self._alive[:n]
+            if exclude is not None and exclude in self._rows:
+                candidates[self._rows[exclude]] = False
+            ids = self._ids[:n].copy()
+        rows = np.flatnonzero(candidates)
+        if len(rows) > k:
+            rows = rows[np.argpartition(distances[rows], k - 1)[:k]]
+        rows = rows[np.lexsort((ids[rows], distances[rows]))]
+        # Rounding can leave tiny negative squares for identical vectors
+        return list(zip(ids[rows].tolist(), np.sqrt(np.maximum(distances[rows], 0.0)).tolist()))
+
+    def similar(
+        self,
+        features: PropertyFeatures,
+        k: int,
+        *,
+        load: Callable[[], Iterable[Tuple]],
+        available_only: bool = True,
+    ) -> List[Tuple[int, float]]:
+        """
+        The `k` properties most like `features`' (itself excluded), loading
+        the index with `load()` first when it is missing or too old. The
+        table is read without holding the lock, so writes and other queries
+        carry on against the current contents meanwhile.
+        """
+        with self._lock:
+            stale = self._loaded_at is None or (
+                time.monotonic() - self._loaded_at > settings.SIMILAR_INDEX_MAX_AGE_SECONDS
+            )
+            if stale:
+                self._reloading += 1
+        if stale:
+            started = time.monotonic()
+            try:
+                self.load(load(), since=started)
+            finally:
+                with self._lock:
+                    self._reloading -= 1
+                    if not self._reloading:
+                        self._recent = []
+        return self.nearest(encode(features), k, exclude=features.id, available_only=available_only)
+
+
+index = SimilarityIndex()
+
+
+def stage_upsert(db: Session, property: Any) -> None:
+    """Index `property` as it is now once `db` commits."""
+    db.info.setdefault("pending_similarity", []).append(features_of(property))
+
+
+def stage_remove(db: Session, id: int) -> None:
+    """Drop property `id` from the index once `db` commits."""
+    db.info.setdefault("pending_similarity", []).append(id)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    changes = session.info.pop("pending_similarity", ())
+    if not changes:
+        return
+    # An index not loaded yet reads the committed rows when it is
+    with index._lock:
+        if index.loaded or index._reloading:
+            index.apply(changes)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("pending_similarity", None)
@@ -0,0 +1,424 @@
+"""
+Lightweight in-process tracing.
+
+A trace is started per sampled HTTP request by `TracingMiddleware`; nested
+spans are opened with `tracer.span()` or the `traced` decorator and are
+parented through a context variable, which Starlette copies into the
+threadpool that runs sync dependencies and endpoints. Outside a sampled trace
+`tracer.span()` is a no-op costing one context variable lookup, so the
+instrumentation can stay enabled in production with a low sample rate.
+
+Finished traces are handed to a background thread that passes them to the
+configured exporter. Exporters follow the OpenTelemetry `SpanExporter` shape
+(`export`, `force_flush`, `shutdown`) and serialise spans using OTLP field
+names, so their output can be loaded into OpenTelemetry tooling.
+"""
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 2000
+
+
+class Span:
+    __slots__ = (
+        "trace", "span_id", "parent_id", "name", "kind",
+        "start_ns", "end_ns", "attributes", "status", "status_message",
+    )
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[int], kind: str) -> None:
+        self.trace = trace
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status = "UNSET"
+        self.status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.spans.append(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": f"{self.trace.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_span_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: Optional[int] = None) -> None:
+        self.trace_id = trace_id or random.getrandbits(128)
+        # list.append is atomic, so spans ending in threadpool workers need no lock
+        self.spans: List[Span] = []
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """Interface of span exporters, mirroring opentelemetry.sdk.trace.export.SpanExporter."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        raise NotImplementedError
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the most recent finished spans, e.g. for the admin endpoint or tests."""
+
+    def __init__(self, max_spans: int = 10000) -> None:
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        with self._lock:
+            self._spans.extend(span.to_dict() for span in spans)
+
+    def get_finished_spans(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a file, for offline analysis."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetrySpanExporter(SpanExporter):
+    """
+    Re-emits finished traces through an OpenTelemetry tracer, so that any
+    OpenTelemetry SDK exporter (OTLP, Jaeger, console) can receive them.
+    Requires the optional `opentelemetry-api` package and a configured SDK.
+    """
+
+    def __init__(self) -> None:
+        from opentelemetry import trace as otel_trace
+
+        self._otel_trace = otel_trace
+        self._tracer = otel_trace.get_tracer("app")
+
+    def export(self, spans: Sequence[Span]) -> None:
+        otel_spans: Dict[int, Any] = {}
+        for span in sorted(spans, key=lambda s: s.start_ns):
+            parent = otel_spans.get(span.parent_id)
+            context = self._otel_trace.set_span_in_context(parent) if parent else None
+            otel_span = self._tracer.start_span(
+                span.name, context=context, attributes=span.attributes, start_time=span.start_ns
+            )
+            if span.status == "ERROR":
+                otel_span.set_status(
+                    self._otel_trace.Status(self._otel_trace.StatusCode.ERROR, span.status_message)
+                )
+            otel_spans[span.span_id] = otel_span
+        for span in spans:
+            otel_spans[span.span_id].end(end_time=span.end_ns)
+
+
+class Tracer:
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        exporter: Optional[SpanExporter] = None,
+        trust_parent: bool = False,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.trust_parent = trust_parent
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=1000)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def is_recording(self) -> bool:
+        return _current_span.get() is not None
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def start_trace(
+        self, name: str, *, traceparent: Optional[str] = None, kind: str = "server"
+    ) -> Iterator[Optional[Span]]:
+        """
+        Open the root span of a new trace if the request is sampled. An incoming
+        W3C `traceparent` header continues the caller's trace. Its sampled flag
+        only decides alone with `trust_parent`; otherwise a sampled caller is
+        still traced at `sample_rate`, so clients cannot force tracing on.
+        """
+        trace_id = parent_id = None
+        sampled = None
+        if traceparent:
+            parts = traceparent.split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                try:
+                    trace_id, parent_id = int(parts[1], 16), int(parts[2], 16)
+                    sampled = int(parts[3], 16) & 1 == 1
+                except ValueError:
+                    trace_id = parent_id = None
+        if sampled is None or (sampled and not self.trust_parent):
+            sampled = self.exporter is not None and random.random() < self.sample_rate
+        if not sampled or self.exporter is None:
+            yield None
+            return
+
+        trace = Trace(trace_id)
+        span = Span(trace, name, parent_id, kind)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._enqueue(trace.spans)
+
+    @contextmanager
+    def span(self, name: str, *, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+        """Child span of the current span; does nothing outside a sampled trace."""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace, name, parent.span_id, kind)
+        if attributes:
+            span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def begin_span(self, name: str, *, kind: str = "internal") -> Optional[Span]:
+        """
+        Child span that is not made current, for callers such as engine events
+        that start and end a span in different callbacks. Call `span.end()`.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.trace, name, parent.span_id, kind)
+
+    def _enqueue(self, spans: List[Span]) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True
+                    )
+                    self._worker.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.warning("Trace export queue is full; dropping a trace")
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                if spans is not None and self.exporter is not None:
+                    self.exporter.export(spans)
+            except Exception:
+                logger.exception("Span export failed")
+            finally:
+                self._queue.task_done()
+
+    def force_flush(self) -> None:
+        """Block until every finished trace has been exported."""
+        if self._worker is not None:
+            self._queue.join()
+        if self.exporter is not None:
+            self.exporter.force_flush()
+
+
+def _build_exporter() -> Optional[SpanExporter]:
+    name = settings.TRACING_EXPORTER
+    if name == "memory":
+        return InMemorySpanExporter(settings.TRACING_MEMORY_SPANS)
+    if name == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if name == "otel":
+        return OpenTelemetrySpanExporter()
+    return None
+
+
+tracer = Tracer(
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+    exporter=_build_exporter(),
+    trust_parent=settings.TRACING_TRUST_PARENT,
+)
+
+
+def traced(name: Optional[str] = None, *, kind: str = "internal") -> Callable:
+    """
+    Decorator opening a span around each call. The wrapper keeps the wrapped
+    function's signature, so it can decorate FastAPI dependencies and endpoints.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if getattr(func, "__traced__", False):
+            return func
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with tracer.span(span_name, kind=kind):
+                    return await func(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return func(*args, **kwargs)
+                with tracer.span(span_name, kind=kind):
+                    return func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = tracer.begin_span("db.execute", kind="client")
+    if span is not None:
+        span.attributes["db.system"] = conn.engine.dialect.name
+        span.attributes["db.statement"] = statement[:MAX_STATEMENT_LENGTH]
+        if executemany:
+            span.attributes["db.executemany"] = True
+        context._trace_span = span
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.attributes["db.rowcount"] = cursor.rowcount
+        span.end()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record a span for every statement executed through `engine`."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """Root span per sampled HTTP request, named after the matched route."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or tracer.exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with tracer.start_trace(f"{scope['method']} {scope['path']}", traceparent=traceparent) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.attributes["http.status_code"] = message["status"]
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                await send(message)
+
+            span.attributes["http.method"] = scope["method"]
+            span.attributes["http.target"] = scope["path"]
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                context = get_request_context()
+                route = context.route if context else None
+                if route:
+                    span.name = f"{scope['method']} {route}"
+                    span.attributes["http.route"] = route
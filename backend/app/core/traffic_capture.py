@@ -0,0 +1,188 @@
+"""
+Traffic capture.
+
+`TrafficCaptureMiddleware` records a sample of real requests to an
+append-only JSON-lines file, one compact object per request:
+
+    {"ts": 1718000000.123, "method": "GET", "path": "/api/v1/properties/",
+     "query": "city=Pune", "route": "/api/v1/properties/", "user": 42,
+     "status": 200, "duration_ms": 12.4}
+
+plus `content_type` and `body` (or `body_b64` for binary bodies) when the
+request has one. Credentials are never written: the Authorization header is
+replaced by the authenticated user id, and password fields in JSON and form
+bodies are redacted. `benchmarks/replay.py` re-issues a capture file.
+
+Requests carrying a bearer token are sampled per token, so a sampled client
+is captured with its whole request stream; anonymous requests are sampled
+individually.
+"""
+import base64
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "<redacted>"
+_SAMPLE_BUCKETS = 1_000_000
+
+
+def redact_body(body: bytes, content_type: str) -> bytes:
+    """Replace the value of every field whose name contains 'password'."""
+    if content_type.startswith("application/json"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+        if isinstance(data, dict):
+            data = {k: REDACTED if "password" in k.lower() else v for k, v in data.items()}
+            return json.dumps(data, separators=(",", ":")).encode()
+        return body
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        fields = parse_qsl(body.decode("latin-1"), keep_blank_values=True)
+        return urlencode(
+            [(k, REDACTED if "password" in k.lower() else v) for k, v in fields]
+        ).encode("latin-1")
+    return body
+
+
+class CaptureWriter:
+    """Appends records from a background thread, so requests never wait on disk."""
+
+    def __init__(self, path: str, max_pending: int = 10000) -> None:
+        self.path = path
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            logger.warning("Traffic capture queue is full; dropping a request")
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                try:
+                    if record is None:
+                        return
+                    f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+                    if self._queue.empty():
+                        f.flush()
+                finally:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+class TrafficCaptureMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        writer: CaptureWriter,
+        sample_rate: float,
+        max_body: int = 65536,
+        exclude_prefixes: tuple = (),
+    ) -> None:
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.max_body = max_body
+        self.exclude_prefixes = exclude_prefixes
+
+    def _sampled(self, scope: Scope) -> bool:
+        for key, value in scope.get("headers", ()):
+            if key == b"authorization":
+                bucket = zlib.crc32(value) % _SAMPLE_BUCKETS
+                return bucket < self.sample_rate * _SAMPLE_BUCKETS
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(self.exclude_prefixes)
+            or not self._sampled(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        truncated = False
+        status = 500
+
+        async def receive_wrapper() -> Message:
+            nonlocal size, truncated
+            message = await receive()
+            if message["type"] == "http.request" and not truncated:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > self.max_body:
+                    truncated = True
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        ts = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            context = get_request_context()
+            record: Dict[str, Any] = {
+                "ts": round(ts, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "route": context.route if context else None,
+                "user": context.user_id if context else None,
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+            }
+            if truncated:
+                record["body_truncated"] = True
+            elif size:
+                self._add_body(record, scope, b"".join(chunks))
+            self.writer.write(record)
+
+    @staticmethod
+    def _add_body(record: Dict[str, Any], scope: Scope, body: bytes) -> None:
+        content_type = ""
+        for key, value in scope.get("headers", ()):
+            if key == b"content-type":
+                content_type = value.decode("latin-1")
+                break
+        record["content_type"] = content_type
+        body = redact_body(body, content_type)
+        try:
+            record["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_b64"] = base64.b64encode(body).decode("ascii")
@@ -1,4 +1,10 @@
+from app.crud.base import DuplicateError, OverlapError
 from app.crud.user import user
-from app.crud.property import property
+from app.crud.property import property, property_image
 from app.crud.tenant import tenant
-from app.crud.rental_contract import rental_contract, rent_payment, maintenance_request
+from app.crud.rental_contract import rental_contract, rent_payment, maintenance_request, contract_document
+from app.crud.owner_summary import owner_summary
+from app.crud.rent_sketch import rent_sketch
+from app.crud.saved_search import saved_search
+from app.crud.totals import Total
+from app.crud.archive import archive
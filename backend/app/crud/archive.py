@@ -0,0 +1,183 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, exists, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.crud.owner_summary import OPEN_MAINTENANCE_STATUSES
+from app.crud.totals import Total, exact_total
+from app.models.archive import (
+    ArchivedContractDocument,
+    ArchivedMaintenanceRequest,
+    ArchivedRentalContract,
+    ArchivedRentPayment,
+)
+from app.models.property import Property
+from app.models.rental_contract import ContractDocument, MaintenanceRequest, RentalContract, RentPayment
+from app.schemas.rental_contract import RentalContractCreate, RentalContractUpdate
+
+# Live table -> its archive, contracts first: children are archived after them
+# and deleted before them
+ARCHIVES = (
+    (RentalContract, ArchivedRentalContract),
+    (RentPayment, ArchivedRentPayment),
+    (MaintenanceRequest, ArchivedMaintenanceRequest),
+    (ContractDocument, ArchivedContractDocument),
+)
+
+
+class CRUDArchive(CRUDBase[ArchivedRentalContract, RentalContractCreate, RentalContractUpdate]):
+    """
+    Archived contracts, read-only to the API, and the moves that fill them.
+    """
+
+    def archivable_ids(self, db: Session, *, cutoff: date, limit: int) -> List[int]:
+        """
+        Ids of inactive contracts that ended before `cutoff`, with no payment
+        and no maintenance request since and none still open, oldest first.
+        """
+        recent_payment = exists().where(
+            RentPayment.contract_id == RentalContract.id, RentPayment.payment_date >= cutoff
+        )
+        live_maintenance = exists().where(
+            MaintenanceRequest.contract_id == RentalContract.id,
+            or_(
+                MaintenanceRequest.request_date >= cutoff,
+                MaintenanceRequest.status.in_(OPEN_MAINTENANCE_STATUSES),
+            ),
+        )
+        return db.scalars(
+            select(RentalContract.id)
+            .where(
+                RentalContract.is_active == False,
+                RentalContract.end_date < cutoff,
+                ~recent_payment,
+                ~live_maintenance,
+            )
+            .order_by(RentalContract.end_date, RentalContract.id)
+            .limit(limit)
+        ).all()
+
+    def archive_contracts(
+        self, db: Session, *, ids: Sequence[int], archived_at: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Copy the contracts `ids` and their payments, maintenance requests and
+        documents into the archive tables and delete them from the live ones,
+        with one INSERT ... SELECT and one DELETE per table. Returns the rows
+        moved per table.
+        """
+        archived_at = archived_at or datetime.utcnow()
+        moved = {}
+        for live, archived in ARCHIVES:
+            key = live.id if live is RentalContract else live.contract_id
+            columns = [c.name for c in live.__table__.columns]
+            source = select(
+                *[live.__table__.c[name] for name in columns], literal(archived_at)
+            ).where(key.in_(list(ids)))
+            result = db.execute(
+                insert(archived).from_select(columns + ["archived_at"], source)
+            )
+            moved[live.__tablename__] = result.rowcount
+        for live, _ in reversed(ARCHIVES):
+            key = live.id if live is RentalContract else live.contract_id
+            db.execute(
+                delete(live).where(key.in_(list(ids))),
+                execution_options={"synchronize_session": False},
+            )
+        return moved
+
+    def _by_owner(self, db: Session, owner_id: int):
+        return (
+            db.query(self.model)
+            .join(Property, ArchivedRentalContract.property_id == Property.id)
+            .filter(Property.owner_id == owner_id)
+        )
+
+    def get_multi_by_owner(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[ArchivedRentalContract]:
+        query = self._only(self._by_owner(db, owner_id), fields)
+        return query.order_by(ArchivedRentalContract.id).offset(skip).limit(limit).all()
+
+    def count_by_owner(self, db: Session, *, owner_id: int) -> Total:
+        return exact_total(db, self._by_owner(db, owner_id).with_entities(ArchivedRentalContract.id))
+
+    def get_by_tenant(
+        self,
+        db: Session,
+        *,
+        tenant_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[ArchivedRentalContract]:
+        return (
+            self._only(db.query(self.model), fields)
+            .filter(ArchivedRentalContract.tenant_id == tenant_id)
+            .order_by(ArchivedRentalContract.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def count_by_tenant(self, db: Session, *, tenant_id: int) -> Total:
+        return exact_total(
+            db,
+            db.query(ArchivedRentalContract.id).filter(ArchivedRentalContract.tenant_id == tenant_id),
+        )
+
+    def get_payments(
+        self, db: Session, *, contract_id: int, skip: int = 0, limit: int = 100
+    ) -> List[ArchivedRentPayment]:
+        return (
+            db.query(ArchivedRentPayment)
+            .filter(ArchivedRentPayment.contract_id == contract_id)
+            .order_by(ArchivedRentPayment.payment_date, ArchivedRentPayment.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_maintenance_requests(
+        self, db: Session, *, contract_id: int, skip: int = 0, limit: int = 100
+    ) -> List[ArchivedMaintenanceRequest]:
+        return (
+            db.query(ArchivedMaintenanceRequest)
+            .filter(ArchivedMaintenanceRequest.contract_id == contract_id)
+            .order_by(ArchivedMaintenanceRequest.request_date, ArchivedMaintenanceRequest.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_documents(
+        self, db: Session, *, contract_id: int, skip: int = 0, limit: int = 100
+    ) -> List[ArchivedContractDocument]:
+        return (
+            db.query(ArchivedContractDocument)
+            .filter(ArchivedContractDocument.contract_id == contract_id)
+            .order_by(ArchivedContractDocument.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_document(
+        self, db: Session, *, contract_id: int, id: int
+    ) -> Optional[ArchivedContractDocument]:
+        return (
+            db.query(ArchivedContractDocument)
+            .filter(ArchivedContractDocument.id == id, ArchivedContractDocument.contract_id == contract_id)
+            .first()
+        )
+
+
+archive = CRUDArchive(ArchivedRentalContract)
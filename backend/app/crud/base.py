@@ -1,9 +1,14 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import functools
+import inspect
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session, load_only
 
+from app.core.tracing import tracer
+from app.db.errors import exclusion_violation, unique_violation
 from app.db.session import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -11,10 +16,64 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+class DuplicateError(Exception):
+    """A write collided with a unique constraint on `column`."""
+
+    def __init__(self, column: str) -> None:
+        super().__init__(f"Duplicate value for {column}")
+        self.column = column
+
+
+class OverlapError(Exception):
+    """
+    A write would make rows overlap that `constraint` keeps apart; the row
+    it collided with is `conflicting_id` when known.
+    """
+
+    def __init__(self, constraint: str, conflicting_id: Optional[Any] = None) -> None:
+        super().__init__(f"Overlaps an existing row ({constraint})")
+        self.constraint = constraint
+        self.conflicting_id = conflicting_id
+
+
+def _traced_method(func: Callable) -> Callable:
+    # The first parameter is deliberately not called `self`: the slow query log
+    # attributes statements to the frame holding `self`, which must stay the
+    # real CRUD method rather than this wrapper.
+    @functools.wraps(func)
+    def wrapper(crud, *args, **kwargs):
+        if not tracer.is_recording():
+            return func(crud, *args, **kwargs)
+        with tracer.span(f"{type(crud).__name__}.{func.__name__}", kind="crud"):
+            return func(crud, *args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def _trace_methods(cls: type) -> None:
+    """Open a span around every public method of `cls` that takes a session."""
+    for name, value in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(value):
+            continue
+        if getattr(value, "__traced__", False):
+            continue
+        params = list(inspect.signature(value).parameters)
+        if len(params) > 1 and params[1] == "db":
+            setattr(cls, name, _traced_method(value))
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        _trace_methods(cls)
+
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
+
+        Writes are flushed, not committed: the caller owns the transaction
+        (for requests, `get_db` commits once after the endpoint returns).
         
         **Parameters**
         
@@ -23,20 +82,64 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+    def _flush(self, db: Session) -> None:
+        """
+        Flush pending writes, letting the database enforce unique constraints
+        instead of checking with a SELECT first (which races anyway). Raises
+        DuplicateError, or OverlapError for exclusion constraints; the
+        transaction must then be rolled back.
+        """
+        try:
+            db.flush()
+        except IntegrityError as exc:
+            column = unique_violation(exc)
+            if column is not None:
+                raise DuplicateError(column) from exc
+            constraint = exclusion_violation(exc)
+            if constraint is not None:
+                raise OverlapError(constraint) from exc
+            raise
+
+    def _only(self, query: Query, fields: Optional[Sequence[str]]) -> Query:
+        """
+        Load only the columns `fields` (and the primary key) of the rows of
+        `query`; reading any other column of them raises instead of issuing
+        a query. All columns when `fields` is None.
+        """
+        if fields is None:
+            return query
+        columns = [getattr(self.model, field) for field in fields]
+        return query.options(load_only(*columns, raiseload=True))
+
+    def get(
+        self, db: Session, id: Any, *, fields: Optional[Sequence[str]] = None
+    ) -> Optional[ModelType]:
+        query = db.query(self.model).filter(self.model.id == id)
+        return self._only(query, fields).first()
+
+    def get_many(
+        self, db: Session, *, ids: Iterable[Any], fields: Optional[Sequence[str]] = None
+    ) -> List[ModelType]:
+        """The rows among `ids`, in no particular order, with one query."""
+        query = db.query(self.model).filter(self.model.id.in_(list(ids)))
+        return self._only(query, fields).all()
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self._only(db.query(self.model), fields).offset(skip).limit(limit).all()
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
+        # Keep native types (e.g. dates) intact; not every driver accepts strings
+        obj_in_data = obj_in.dict()
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._flush(db)
         return db_obj
 
     def update(
@@ -55,12 +158,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._flush(db)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
         db.delete(obj)
-        db.commit()
+        db.flush()
         return obj
+
+
+_trace_methods(CRUDBase)
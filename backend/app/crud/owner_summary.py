@@ -0,0 +1,322 @@
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, load_only
+
+from app.crud.base import CRUDBase, DuplicateError
+from app.crud.totals import Total
+from app.models.owner_summary import OwnerSummary
+from app.models.property import Property
+from app.models.rental_contract import (
+    PRIORITY_RANKS, MaintenanceRequest, RentalContract, RentPayment
+)
+from app.schemas.owner import OwnerSummary as OwnerSummarySchema
+
+OPEN_MAINTENANCE_STATUSES = ("pending", "in_progress")
+URGENT_PRIORITY_RANK = PRIORITY_RANKS["high"]  # This rank and more urgent count as urgent
+
+COUNTERS = (
+    "property_count",
+    "occupied_count",
+    "active_contracts",
+    "pending_maintenance",
+    "urgent_maintenance",
+)
+
+
+def maintenance_counts(status: Optional[str], priority_rank: Optional[int]) -> Dict[str, int]:
+    """What one maintenance request contributes to the counters."""
+    is_open = status in OPEN_MAINTENANCE_STATUSES
+    return {
+        "pending_maintenance": int(status == "pending"),
+        "urgent_maintenance": int(
+            is_open and priority_rank is not None and priority_rank <= URGENT_PRIORITY_RANK
+        ),
+    }
+
+
+def _first_of_month(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _last_of_month(month: date) -> date:
+    return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+def due_date(month: date, due_day: int) -> date:
+    """Rent due on the 29th-31st falls on the last day of shorter months."""
+    return month.replace(day=min(due_day, _last_of_month(month).day))
+
+
+def contract_terms(contract: RentalContract, month: Optional[date] = None) -> Dict[int, float]:
+    """
+    Rent an active contract adds to its due day in `month` (this month by
+    default): none unless its term covers that month's due date.
+    """
+    month = _first_of_month(month or date.today())
+    if not contract.is_active or not contract.payment_due_day:
+        return {}
+    due = due_date(month, contract.payment_due_day)
+    if not contract.start_date <= due <= contract.end_date:
+        return {}
+    return {contract.payment_due_day: contract.monthly_rent}
+
+
+def _next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+class CRUDOwnerSummary(CRUDBase[OwnerSummary, OwnerSummarySchema, OwnerSummarySchema]):
+    def get_by_owner(self, db: Session, *, owner_id: int) -> OwnerSummary:
+        """The owner's counters, computed from scratch the first time."""
+        summary = db.get(OwnerSummary, owner_id)
+        if summary is None:
+            try:
+                summary = self.rebuild(db, owner_id=owner_id)
+            except DuplicateError:
+                summary = db.get(OwnerSummary, owner_id, populate_existing=True)
+        elif summary.rent_month != _first_of_month(date.today()):
+            # A new month: other contracts are due, and nothing collected yet
+            summary = self.rebuild(db, owner_id=owner_id)
+        return summary
+
+    def available_total(self, db: Session) -> Total:
+        """
+        Properties available for rent, summed from the counters of all owners:
+        one row per owner is read, not one per property. Owners without
+        counters yet (after a bulk load) are left out until first rebuilt.
+        """
+        count = db.query(
+            func.coalesce(func.sum(OwnerSummary.property_count - OwnerSummary.occupied_count), 0)
+        ).scalar()
+        return Total(int(count), "counter")
+
+    def adjust(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        rent_due: Optional[Dict[int, float]] = None,
+        **deltas: int,
+    ) -> None:
+        """
+        Add `deltas` to the named counters and `rent_due` (due day -> amount,
+        of this month) to the rent due by day. Call after flushing the change
+        being counted: an owner without a summary yet, or with one of an
+        earlier month, gets one rebuilt from the tables.
+        """
+        deltas = {k: v for k, v in deltas.items() if v}
+        rent_due = {day: amount for day, amount in (rent_due or {}).items() if amount}
+        if not deltas and not rent_due:
+            return
+        if rent_due:
+            # JSON can't be incremented in SQL: lock the row and rewrite it
+            summary = (
+                db.query(OwnerSummary)
+                .filter(OwnerSummary.owner_id == owner_id)
+                .with_for_update()
+                .populate_existing()
+                .first()
+            )
+            if summary is None:
+                if not self._rebuild_first(db, owner_id=owner_id):
+                    self.adjust(db, owner_id=owner_id, rent_due=rent_due, **deltas)
+                return
+            if summary.rent_month != _first_of_month(date.today()):
+                self.rebuild(db, owner_id=owner_id)
+                return
+            due = dict(summary.rent_due_by_day)
+            for day, amount in rent_due.items():
+                total = round(due.get(str(day), 0.0) + amount, 2)
+                if total:
+                    due[str(day)] = total
+                else:
+                    due.pop(str(day), None)
+            summary.rent_due_by_day = due
+            for name, delta in deltas.items():
+                setattr(summary, name, getattr(summary, name) + delta)
+            summary.updated_at = datetime.utcnow()
+            self._flush(db)
+            return
+        values = {getattr(OwnerSummary, k): getattr(OwnerSummary, k) + v for k, v in deltas.items()}
+        values[OwnerSummary.updated_at] = datetime.utcnow()
+        updated = (
+            db.query(OwnerSummary)
+            .filter(OwnerSummary.owner_id == owner_id)
+            .update(values, synchronize_session=False)
+        )
+        if not updated and not self._rebuild_first(db, owner_id=owner_id):
+            self.adjust(db, owner_id=owner_id, **deltas)
+
+    def record_payment(
+        self, db: Session, *, owner_id: int, amount: float, payment_date: date
+    ) -> None:
+        """
+        Count a payment towards the rent collected in its month. A payment for
+        a later month than the one tracked starts that month over, with the
+        rent due in it; one for an earlier month no longer shows on the
+        dashboard.
+        """
+        month = _first_of_month(payment_date)
+        updated = (
+            db.query(OwnerSummary)
+            .filter(OwnerSummary.owner_id == owner_id, OwnerSummary.rent_month >= month)
+            .update(
+                {
+                    OwnerSummary.rent_collected: case(
+                        (OwnerSummary.rent_month == month, OwnerSummary.rent_collected + amount),
+                        else_=OwnerSummary.rent_collected,
+                    ),
+                    OwnerSummary.updated_at: datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+        if updated:
+            return
+        summary = db.get(OwnerSummary, owner_id, with_for_update=True, populate_existing=True)
+        if summary is None:
+            if not self._rebuild_first(db, owner_id=owner_id):
+                self.record_payment(db, owner_id=owner_id, amount=amount, payment_date=payment_date)
+        elif summary.rent_month is not None and summary.rent_month >= month:
+            # Rolled over by another transaction while this one waited for the lock
+            self.record_payment(db, owner_id=owner_id, amount=amount, payment_date=payment_date)
+        else:
+            summary.rent_month = month
+            summary.rent_collected = amount
+            summary.rent_due_by_day = self._rent_due(db, owner_id=owner_id, month=month)
+            summary.updated_at = datetime.utcnow()
+            self._flush(db)
+
+    def _rebuild_first(self, db: Session, *, owner_id: int) -> bool:
+        """
+        Build the counters of an owner without any yet, the change being
+        counted included. False if another transaction created them first:
+        they may miss the change, which the caller applies to them instead.
+        """
+        try:
+            self.rebuild(db, owner_id=owner_id)
+        except DuplicateError:
+            return False
+        return True
+
+    def rebuild(self, db: Session, *, owner_id: int, today: Optional[date] = None) -> OwnerSummary:
+        """
+        Recompute the owner's counters, and the rent due and collected in
+        `today`'s month, from the tables and store them. A row created
+        meanwhile by another transaction raises DuplicateError, with only this
+        insert rolled back.
+        """
+        month = _first_of_month(today or date.today())
+        # Locked first, so that no change counted meanwhile is overwritten
+        summary = db.get(OwnerSummary, owner_id, with_for_update=True, populate_existing=True)
+        properties = db.query(
+            func.count(Property.id),
+            func.count(case((Property.is_available == False, Property.id))),
+        ).filter(Property.owner_id == owner_id).one()
+        active_contracts = (
+            db.query(func.count(RentalContract.id))
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(Property.owner_id == owner_id, RentalContract.is_active == True)
+            .scalar()
+        )
+        rent_due = self._rent_due(db, owner_id=owner_id, month=month)
+        maintenance = (
+            db.query(
+                func.count(case((MaintenanceRequest.status == "pending", MaintenanceRequest.id))),
+                func.count(case((
+                    MaintenanceRequest.status.in_(OPEN_MAINTENANCE_STATUSES)
+                    & (MaintenanceRequest.priority_rank <= URGENT_PRIORITY_RANK),
+                    MaintenanceRequest.id,
+                ))),
+            )
+            .join(RentalContract, MaintenanceRequest.contract_id == RentalContract.id)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(Property.owner_id == owner_id)
+            .one()
+        )
+        collected = (
+            db.query(func.coalesce(func.sum(RentPayment.amount), 0.0))
+            .join(RentalContract, RentPayment.contract_id == RentalContract.id)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(
+                Property.owner_id == owner_id,
+                RentPayment.payment_date >= month,
+                RentPayment.payment_date < _next_month(month),
+            )
+            .scalar()
+        )
+        created = summary is None
+        if created:
+            summary = OwnerSummary(owner_id=owner_id)
+        summary.property_count, summary.occupied_count = properties
+        summary.active_contracts = active_contracts
+        summary.rent_due_by_day = rent_due
+        summary.pending_maintenance, summary.urgent_maintenance = maintenance
+        summary.rent_month = month
+        summary.rent_collected = collected
+        summary.updated_at = datetime.utcnow()
+        if created:
+            with db.begin_nested():
+                db.add(summary)
+                self._flush(db)
+        else:
+            self._flush(db)
+        return summary
+
+    def _rent_due(self, db: Session, *, owner_id: int, month: date) -> Dict[str, float]:
+        """Rent due by day in `month` of the owner's contracts whose term covers its due date."""
+        # Contracts whose term overlaps the month; contract_terms checks the due date
+        contracts = (
+            db.query(RentalContract)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(
+                Property.owner_id == owner_id,
+                RentalContract.is_active == True,
+                RentalContract.start_date <= _last_of_month(month),
+                RentalContract.end_date >= month,
+            )
+            .options(load_only(
+                RentalContract.is_active,
+                RentalContract.payment_due_day,
+                RentalContract.start_date,
+                RentalContract.end_date,
+                RentalContract.monthly_rent,
+            ))
+            .all()
+        )
+        rent_due: Dict[str, float] = {}
+        for contract in contracts:
+            for day, rent in contract_terms(contract, month).items():
+                rent_due[str(day)] = round(rent_due.get(str(day), 0.0) + rent, 2)
+        return rent_due
+
+    def figures(self, summary: OwnerSummary, *, today: Optional[date] = None) -> Dict[str, object]:
+        """Dashboard figures as of `today`, derived from the counters alone."""
+        today = today or date.today()
+        collected = summary.rent_collected if summary.rent_month == _first_of_month(today) else 0.0
+        due_so_far = sum(
+            amount
+            for day, amount in summary.rent_due_by_day.items()
+            if due_date(_first_of_month(today), int(day)) <= today
+        )
+        return {
+            "as_of": today,
+            "property_count": summary.property_count,
+            "occupied_count": summary.occupied_count,
+            "occupancy_rate": (
+                round(summary.occupied_count / summary.property_count, 4)
+                if summary.property_count else 0.0
+            ),
+            "active_contracts": summary.active_contracts,
+            "pending_maintenance": summary.pending_maintenance,
+            "urgent_maintenance": summary.urgent_maintenance,
+            "rent_due_this_month": round(sum(summary.rent_due_by_day.values()), 2),
+            "rent_collected_this_month": round(collected, 2),
+            "overdue_amount": round(max(due_so_far - collected, 0.0), 2),
+        }
+
+
+owner_summary = CRUDOwnerSummary(OwnerSummary)
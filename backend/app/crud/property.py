@@ -1,29 +1,147 @@
-from typing import List, Optional
+import json
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Query, Session
 
+from app.core import rent_stats, similarity
+from app.core.events import stage
 from app.crud.base import CRUDBase
-from app.models.property import Property
-from app.schemas.property import PropertyCreate, PropertyUpdate
+from app.crud.owner_summary import owner_summary
+from app.crud.saved_search import saved_search
+from app.crud.totals import Total, exact_total, total
+from app.models.property import Property, PropertyImage
+from app.models.rental_contract import RentalContract
+from app.models.saved_search import SearchMatch
+from app.schemas.property import (
+    PropertyCreate, PropertyUpdate, PropertyImageCreate, PropertyImageUpdate
+)
 
 
 class CRUDProperty(CRUDBase[Property, PropertyCreate, PropertyUpdate]):
+    def create_with_owner(
+        self, db: Session, *, obj_in: PropertyCreate, owner_id: int
+    ) -> Property:
+        obj_in_data = obj_in.dict()
+        db_obj = self.model(**obj_in_data, owner_id=owner_id)
+        db.add(db_obj)
+        self._flush(db)
+        owner_summary.adjust(
+            db,
+            owner_id=owner_id,
+            property_count=1,
+            occupied_count=int(db_obj.is_available is False),
+        )
+        stage(db, "property.created", {
+            "id": db_obj.id,
+            "owner_id": db_obj.owner_id,
+            **obj_in_data,
+        })
+        similarity.stage_upsert(db, db_obj)
+        rent_stats.stage(db, rent_stats.listing_of(db_obj), 1)
+        if db_obj.is_available is not False:
+            saved_search.match_listing(db, property=db_obj)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Property,
+        obj_in: Union[PropertyUpdate, Dict[str, Any]]
+    ) -> Property:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        previous = {k: getattr(db_obj, k) for k in update_data if hasattr(db_obj, k)}
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        changes = {
+            k: {"old": old, "new": getattr(db_obj, k)}
+            for k, old in previous.items()
+            if getattr(db_obj, k) != old
+        }
+        if "is_available" in changes:
+            owner_summary.adjust(
+                db,
+                owner_id=db_obj.owner_id,
+                occupied_count=(
+                    int(changes["is_available"]["new"] is False)
+                    - int(changes["is_available"]["old"] is False)
+                ),
+            )
+        if changes:
+            stage(db, "property.updated", {"id": db_obj.id, "changes": changes})
+            if changes.get("is_available", {}).get("new") is False:
+                stage(db, "property.unavailable", {"id": db_obj.id})
+            elif changes.get("is_available", {}).get("new") is True:
+                # Back on the market
+                saved_search.match_listing(db, property=db_obj)
+        if not changes.keys().isdisjoint(similarity.PropertyFeatures._fields):
+            similarity.stage_upsert(db, db_obj)
+        if not changes.keys().isdisjoint(rent_stats.Listing._fields):
+            listing = rent_stats.listing_of(db_obj)
+            old = {k: changes[k]["old"] for k in rent_stats.Listing._fields if k in changes}
+            rent_stats.stage(db, listing._replace(**old), -1)
+            rent_stats.stage(db, listing, 1)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Property:
+        db.query(SearchMatch).filter(SearchMatch.property_id == id).delete(
+            synchronize_session=False
+        )
+        db_obj = super().remove(db, id=id)
+        owner_summary.adjust(
+            db,
+            owner_id=db_obj.owner_id,
+            property_count=-1,
+            occupied_count=-int(db_obj.is_available is False),
+        )
+        stage(db, "property.deleted", {"id": id})
+        similarity.stage_remove(db, id)
+        rent_stats.stage(db, rent_stats.listing_of(db_obj), -1)
+        return db_obj
+
     def get_multi_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
     ) -> List[Property]:
         return (
-            db.query(self.model)
+            self._only(db.query(self.model), fields)
             .filter(Property.owner_id == owner_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
     
+    def get_features(self, db: Session) -> List[Tuple]:
+        """Rows of similarity.PropertyFeatures of every property, for the similarity index."""
+        columns = [getattr(Property, name) for name in similarity.PropertyFeatures._fields]
+        return db.query(*columns).all()
+
+    def get_asking_rents(self, db: Session, *, owner_id: Optional[int] = None) -> List[Tuple]:
+        """(id, monthly_rent) of every property, or of `owner_id`'s."""
+        query = db.query(Property.id, Property.monthly_rent)
+        if owner_id is not None:
+            query = query.filter(Property.owner_id == owner_id)
+        return query.all()
+
     def get_available_properties(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
     ) -> List[Property]:
         return (
-            db.query(self.model)
+            self._only(db.query(self.model), fields)
             .filter(Property.is_available == True)
             .offset(skip)
             .limit(limit)
@@ -39,11 +157,91 @@ class CRUDProperty(CRUDBase[Property, PropertyCreate, PropertyUpdate]):
         min_bedrooms: Optional[int] = None,
         max_rent: Optional[float] = None,
         property_type: Optional[str] = None,
+        available_from: Optional[date] = None,
+        available_to: Optional[date] = None,
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
     ) -> List[Property]:
-        query = db.query(self.model).filter(Property.is_available == True)
-        
+        query = self._search(
+            self._only(db.query(self.model), fields),
+            city=city,
+            state=state,
+            min_bedrooms=min_bedrooms,
+            max_rent=max_rent,
+            property_type=property_type,
+            available_from=available_from,
+            available_to=available_to,
+        )
+        return query.offset(skip).limit(limit).all()
+
+    def count_search(
+        self,
+        db: Session,
+        *,
+        strategy: str,
+        cap: int,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        min_bedrooms: Optional[int] = None,
+        max_rent: Optional[float] = None,
+        property_type: Optional[str] = None,
+        available_from: Optional[date] = None,
+        available_to: Optional[date] = None,
+    ) -> Total:
+        """
+        Total of `search_properties` (and `get_available_properties`) by
+        `strategy`. An estimate of all available properties comes from the
+        owner counters instead of the planner.
+        """
+        filters = dict(
+            city=city,
+            state=state,
+            min_bedrooms=min_bedrooms,
+            max_rent=max_rent,
+            property_type=property_type,
+            available_from=available_from,
+            available_to=available_to,
+        )
+        if strategy == "estimated" and not any(filters.values()):
+            return owner_summary.available_total(db)
+        query = self._search(db.query(Property.id), **filters)
+        return total(db, query, strategy=strategy, cap=cap)
+
+    def count_by_owner(self, db: Session, *, owner_id: int) -> Total:
+        return exact_total(db, db.query(Property.id).filter(Property.owner_id == owner_id))
+
+    def _search(
+        self,
+        query: Query,
+        *,
+        city: Optional[str],
+        state: Optional[str],
+        min_bedrooms: Optional[int],
+        max_rent: Optional[float],
+        property_type: Optional[str],
+        available_from: Optional[date] = None,
+        available_to: Optional[date] = None,
+    ) -> Query:
+        if available_from or available_to:
+            # Free for the whole period (open-ended without `available_to`).
+            # Listed, or unlisted only because it is let (now or ahead):
+            # properties delisted without any active contract stay out
+            let = exists().where(
+                RentalContract.property_id == Property.id,
+                RentalContract.is_active == True,
+            )
+            query = query.filter(or_(Property.is_available == True, let))
+            overlapping = [
+                RentalContract.property_id == Property.id,
+                RentalContract.is_active == True,
+                RentalContract.end_date >= (available_from or date.today()),
+            ]
+            if available_to:
+                overlapping.append(RentalContract.start_date <= available_to)
+            query = query.filter(~exists().where(*overlapping))
+        else:
+            query = query.filter(Property.is_available == True)
         if city:
             query = query.filter(Property.city == city)
         if state:
@@ -54,8 +252,60 @@ class CRUDProperty(CRUDBase[Property, PropertyCreate, PropertyUpdate]):
             query = query.filter(Property.monthly_rent <= max_rent)
         if property_type:
             query = query.filter(Property.property_type == property_type)
-            
-        return query.offset(skip).limit(limit).all()
+        return query
+
+
+class CRUDPropertyImage(CRUDBase[PropertyImage, PropertyImageCreate, PropertyImageUpdate]):
+    def get_by_property(
+        self, db: Session, *, property_id: int, skip: int = 0, limit: int = 100
+    ) -> List[PropertyImage]:
+        return (
+            db.query(self.model)
+            .filter(PropertyImage.property_id == property_id)
+            .order_by(PropertyImage.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def complete(
+        self,
+        db: Session,
+        *,
+        db_obj: PropertyImage,
+        width: int,
+        height: int,
+        variants: Dict[str, Any],
+        gallery_url: str,
+    ) -> PropertyImage:
+        """Record the rendered variants and append `gallery_url` to the property's images."""
+        db_obj.status = "ready"
+        db_obj.width = width
+        db_obj.height = height
+        db_obj.variants = variants
+        # Locked, so that images finishing together do not overwrite each other's URL
+        prop = (
+            db.query(Property)
+            .filter(Property.id == db_obj.property_id)
+            .with_for_update()
+            .populate_existing()
+            .one()
+        )
+        try:
+            images = json.loads(prop.images) if prop.images else []
+        except ValueError:
+            images = [prop.images]
+        if not isinstance(images, list):
+            images = [images]
+        property.update(db, db_obj=prop, obj_in={"images": json.dumps(images + [gallery_url])})
+        return db_obj
+
+    def fail(self, db: Session, *, db_obj: PropertyImage, error: str) -> PropertyImage:
+        db_obj.status = "failed"
+        db_obj.error = error
+        self._flush(db)
+        return db_obj
 
 
 property = CRUDProperty(Property)
+property_image = CRUDPropertyImage(PropertyImage)
@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.core import rent_stats
+from app.core.rent_stats import QuantileSketch, Segment
+from app.crud.base import CRUDBase, DuplicateError
+from app.models.property import Property
+from app.models.rent_sketch import RentSketch
+from app.schemas.market import RentStats
+
+
+class CRUDRentSketch(CRUDBase[RentSketch, RentStats, RentStats]):
+    def get_all(self, db: Session) -> List[Tuple]:
+        """(city, bedrooms, property_type, buckets) of every segment."""
+        return db.query(
+            RentSketch.city, RentSketch.bedrooms, RentSketch.property_type, RentSketch.buckets
+        ).all()
+
+    def rebuilt_at(self, db: Session) -> Optional[datetime]:
+        """When the table was last recomputed from the properties."""
+        return db.query(func.max(RentSketch.rebuilt_at)).scalar()
+
+    def add_deltas(
+        self,
+        db: Session,
+        *,
+        deltas: Dict[Segment, QuantileSketch],
+        rebuilt_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Merge `deltas` into the stored sketches of their segments. The rows are
+        locked, so that workers saving at the same time add up; a segment
+        created by two of them at once raises DuplicateError.
+        """
+        if not deltas:
+            return
+        key = tuple_(RentSketch.city, RentSketch.bedrooms, RentSketch.property_type)
+        rows = {
+            (row.city, row.bedrooms, row.property_type): row
+            for row in db.query(RentSketch)
+            .filter(key.in_(list(deltas)))
+            .order_by(RentSketch.city, RentSketch.bedrooms, RentSketch.property_type)
+            .with_for_update()
+            .populate_existing()
+        }
+        now = datetime.utcnow()
+        for segment, delta in deltas.items():
+            row = rows.get(segment)
+            sketch = QuantileSketch(row.buckets if row is not None else None)
+            sketch.merge(delta)
+            if row is None:
+                city, bedrooms, property_type = segment
+                row = RentSketch(
+                    city=city,
+                    bedrooms=bedrooms,
+                    property_type=property_type,
+                    rebuilt_at=rebuilt_at,
+                )
+                db.add(row)
+            row.buckets = sketch.to_json()
+            row.count = sketch.count
+            row.updated_at = now
+        self._flush(db)
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute every segment's sketch from the properties; returns the number of segments."""
+        # Changes counted by workers before the properties are read are in them
+        now = datetime.utcnow()
+        sketches: Dict[Segment, QuantileSketch] = {}
+        listings = db.query(
+            Property.city, Property.bedrooms, Property.property_type, Property.monthly_rent
+        ).execution_options(yield_per=10_000)
+        for city, bedrooms, property_type, monthly_rent in listings:
+            sketches.setdefault((city, bedrooms, property_type), QuantileSketch()).add(monthly_rent)
+        db.query(RentSketch).delete(synchronize_session=False)
+        db.add_all(
+            RentSketch(
+                city=city,
+                bedrooms=bedrooms,
+                property_type=property_type,
+                count=sketch.count,
+                buckets=sketch.to_json(),
+                updated_at=now,
+                rebuilt_at=now,
+            )
+            for (city, bedrooms, property_type), sketch in sketches.items()
+        )
+        self._flush(db)
+        return len(sketches)
+
+    def sync(self, db: Session) -> None:
+        """
+        Save this worker's unsaved deltas and reload its sketches, each when
+        due. Call before anything else is written with `db`: a conflicting
+        save rolls the transaction back, and the deltas are saved next time.
+        Changes counted before the table was last rebuilt are already in it
+        and are dropped instead; the sketches are then reloaded.
+        """
+        save, reload = rent_stats.stats.due()
+        if not (save or reload):
+            return
+        rebuilt_at = self.rebuilt_at(db)
+        if rebuilt_at != rent_stats.stats.rebuilt_at:
+            reload = True
+        if save:
+            changes = rent_stats.stats.take_unsaved(after=rebuilt_at)
+            # Unsaved again if the transaction does not commit
+            rent_stats.stage_saved(db, changes)
+            try:
+                self.add_deltas(db, deltas=rent_stats.deltas_of(changes), rebuilt_at=rebuilt_at)
+            except DuplicateError:
+                db.rollback()
+                return
+        if reload:
+            rent_stats.stats.load(self.get_all(db), rebuilt_at=rebuilt_at)
+
+
+rent_sketch = CRUDRentSketch(RentSketch)
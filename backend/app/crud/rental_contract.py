@@ -1,18 +1,163 @@
-from datetime import date
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
+from sqlalchemy import case, func, insert, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 
-from app.crud.base import CRUDBase
-from app.models.rental_contract import RentalContract, RentPayment, MaintenanceRequest
+from app.core.events import stage
+from app.crud.base import CRUDBase, OverlapError
+from app.crud.owner_summary import contract_terms, maintenance_counts, owner_summary
+from app.crud.totals import Total, exact_total
+from app.models.property import Property
+from app.models.tenant import Tenant
+from app.models.rental_contract import (
+    OVERLAP_CONSTRAINT, RentalContract, RentPayment, MaintenanceRequest, ContractDocument
+)
 from app.schemas.rental_contract import (
     RentalContractCreate, RentalContractUpdate,
     RentPaymentCreate, RentPaymentUpdate,
-    MaintenanceRequestCreate, MaintenanceRequestUpdate
+    MaintenanceRequestCreate, MaintenanceRequestUpdate,
+    ContractDocumentCreate, ContractDocumentUpdate,
 )
 
 
+def _contract_parties(db: Session, contract_id: int) -> Tuple[int, int]:
+    """
+    User ids of the owner and the tenant of a contract: whose counters its
+    changes update and who may see their events.
+    """
+    # Endpoints have usually loaded all three already; otherwise one query
+    contract = db.identity_map.get(identity_key(RentalContract, contract_id))
+    if contract is not None:
+        property = db.identity_map.get(identity_key(Property, contract.property_id))
+        tenant = db.identity_map.get(identity_key(Tenant, contract.tenant_id))
+        if property is not None and tenant is not None:
+            return property.owner_id, tenant.user_id
+    owner_id, tenant_user_id = (
+        db.query(Property.owner_id, Tenant.user_id)
+        .select_from(RentalContract)
+        .join(Property, RentalContract.property_id == Property.id)
+        .join(Tenant, RentalContract.tenant_id == Tenant.id)
+        .filter(RentalContract.id == contract_id)
+        .one()
+    )
+    return owner_id, tenant_user_id
+
+
+def _maintenance_change(
+    before: Dict[str, int], after: Dict[str, int]
+) -> Dict[str, int]:
+    return {name: after[name] - before[name] for name in after}
+
+
+# Claimers skipped by a concurrent claim retry this many times (SQLite fallback)
+CLAIM_ATTEMPTS = 5
+
+
+# Contract fields that decide which dates of which property it occupies
+OCCUPANCY_FIELDS = ("property_id", "start_date", "end_date", "is_active")
+
+
 class CRUDRentalContract(CRUDBase[RentalContract, RentalContractCreate, RentalContractUpdate]):
+    def create(self, db: Session, *, obj_in: RentalContractCreate) -> RentalContract:
+        if obj_in.is_active is not False:
+            self._occupy(
+                db,
+                property_id=obj_in.property_id,
+                start_date=obj_in.start_date,
+                end_date=obj_in.end_date,
+            )
+        db_obj = super().create(db, obj_in=obj_in)
+        owner_id, _ = _contract_parties(db, db_obj.id)
+        owner_summary.adjust(
+            db,
+            owner_id=owner_id,
+            active_contracts=int(bool(db_obj.is_active)),
+            rent_due=contract_terms(db_obj),
+        )
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: RentalContract,
+        obj_in: Union[RentalContractUpdate, Dict[str, Any]]
+    ) -> RentalContract:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        if any(k in update_data for k in OCCUPANCY_FIELDS):
+            occupancy = {k: update_data.get(k, getattr(db_obj, k)) for k in OCCUPANCY_FIELDS}
+            if occupancy.pop("is_active") is not False:
+                self._occupy(db, **occupancy, exclude_id=db_obj.id)
+        was_active = bool(db_obj.is_active)
+        previous_terms = contract_terms(db_obj)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        terms = contract_terms(db_obj)
+        if terms != previous_terms or bool(db_obj.is_active) != was_active:
+            rent_due = {day: -amount for day, amount in previous_terms.items()}
+            for day, amount in terms.items():
+                rent_due[day] = rent_due.get(day, 0.0) + amount
+            owner_id, _ = _contract_parties(db, db_obj.id)
+            owner_summary.adjust(
+                db,
+                owner_id=owner_id,
+                active_contracts=int(bool(db_obj.is_active)) - int(was_active),
+                rent_due=rent_due,
+            )
+        return db_obj
+
+    def find_overlap(
+        self,
+        db: Session,
+        *,
+        property_id: int,
+        start_date: date,
+        end_date: date,
+        exclude_id: Optional[int] = None,
+    ) -> Optional[RentalContract]:
+        """
+        The active contract of the property overlapping `start_date` to
+        `end_date` (both inclusive), if any. Active contracts of a property
+        never overlap, so only the one starting last on or before `end_date`
+        can: one probe of the occupancy index, however long the history.
+        Databases from before the check are verified by `app.db.occupancy`.
+        """
+        query = db.query(RentalContract).filter(
+            RentalContract.property_id == property_id,
+            RentalContract.is_active == True,
+            RentalContract.start_date <= end_date,
+        )
+        if exclude_id is not None:
+            query = query.filter(RentalContract.id != exclude_id)
+        latest = query.order_by(RentalContract.start_date.desc()).first()
+        if latest is None or latest.end_date < start_date:
+            return None
+        return latest
+
+    def _occupy(
+        self,
+        db: Session,
+        *,
+        property_id: int,
+        start_date: date,
+        end_date: date,
+        exclude_id: Optional[int] = None,
+    ) -> None:
+        """Raise OverlapError unless the property is free on those dates."""
+        # Contracts of one property are checked and written one at a time
+        # (PostgreSQL also has the exclusion constraint as a last resort)
+        db.query(Property.id).filter(Property.id == property_id).with_for_update().scalar()
+        overlap = self.find_overlap(
+            db, property_id=property_id, start_date=start_date, end_date=end_date, exclude_id=exclude_id
+        )
+        if overlap is not None:
+            raise OverlapError(OVERLAP_CONSTRAINT, overlap.id)
+
     def get_by_property(
         self, db: Session, *, property_id: int, skip: int = 0, limit: int = 100
     ) -> List[RentalContract]:
@@ -24,11 +169,110 @@ class CRUDRentalContract(CRUDBase[RentalContract, RentalContractCreate, RentalCo
             .all()
         )
     
+    def get_multi_by_owner(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[RentalContract]:
+        return (
+            self._only(db.query(self.model), fields)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(Property.owner_id == owner_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+    
+    def count_by_owner(self, db: Session, *, owner_id: int) -> Total:
+        query = (
+            db.query(RentalContract.id)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(Property.owner_id == owner_id)
+        )
+        return exact_total(db, query)
+
+    def count_by_tenant(self, db: Session, *, tenant_id: int) -> Total:
+        return exact_total(db, db.query(RentalContract.id).filter(RentalContract.tenant_id == tenant_id))
+
+    def get_many_with_owner(
+        self, db: Session, *, ids: Iterable[int], fields: Optional[Sequence[str]] = None
+    ) -> List[Tuple[RentalContract, int]]:
+        """(contract, owner id of its property) of the contracts among `ids`, with one query."""
+        query = (
+            db.query(self.model, Property.owner_id)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(RentalContract.id.in_(list(ids)))
+        )
+        return self._only(query, fields).all()
+
+    def get_terms(self, db: Session, *, owner_id: Optional[int] = None) -> List[Tuple]:
+        """
+        (id, property_id, start_date, end_date, monthly_rent, payment_due_day)
+        of active contracts, of `owner_id`'s properties if given. Plain rows,
+        no ORM objects: the cash-flow projection loads whole portfolios.
+        """
+        query = db.query(
+            RentalContract.id,
+            RentalContract.property_id,
+            RentalContract.start_date,
+            RentalContract.end_date,
+            RentalContract.monthly_rent,
+            RentalContract.payment_due_day,
+        ).filter(RentalContract.is_active == True)
+        if owner_id is not None:
+            query = query.join(Property, RentalContract.property_id == Property.id).filter(
+                Property.owner_id == owner_id
+            )
+        return query.all()
+
+    def get_terms_by_ids(
+        self, db: Session, *, ids: Iterable[int], owner_id: Optional[int] = None
+    ) -> List[Tuple]:
+        """
+        (id, owner_id, start_date, end_date, monthly_rent, payment_due_day,
+        is_active) of the contracts among `ids`, of `owner_id`'s properties if given.
+        """
+        query = (
+            db.query(
+                RentalContract.id,
+                Property.owner_id,
+                RentalContract.start_date,
+                RentalContract.end_date,
+                RentalContract.monthly_rent,
+                RentalContract.payment_due_day,
+                RentalContract.is_active,
+            )
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(RentalContract.id.in_(list(ids)))
+        )
+        if owner_id is not None:
+            query = query.filter(Property.owner_id == owner_id)
+        return query.all()
+
+    def get_obligations(self, db: Session, *, tenant_ids: Iterable[int]) -> List[Tuple]:
+        """(tenant_id, monthly rent of their active contracts) of `tenant_ids` renting."""
+        return (
+            db.query(RentalContract.tenant_id, func.sum(RentalContract.monthly_rent))
+            .filter(RentalContract.tenant_id.in_(list(tenant_ids)), RentalContract.is_active == True)
+            .group_by(RentalContract.tenant_id)
+            .all()
+        )
+
     def get_by_tenant(
-        self, db: Session, *, tenant_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        tenant_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
     ) -> List[RentalContract]:
         return (
-            db.query(self.model)
+            self._only(db.query(self.model), fields)
             .filter(RentalContract.tenant_id == tenant_id)
             .offset(skip)
             .limit(limit)
@@ -65,6 +309,25 @@ class CRUDRentalContract(CRUDBase[RentalContract, RentalContractCreate, RentalCo
 
 
 class CRUDRentPayment(CRUDBase[RentPayment, RentPaymentCreate, RentPaymentUpdate]):
+    def create(self, db: Session, *, obj_in: RentPaymentCreate) -> RentPayment:
+        db_obj = super().create(db, obj_in=obj_in)
+        parties = _contract_parties(db, db_obj.contract_id)
+        owner_summary.record_payment(
+            db, owner_id=parties[0], amount=db_obj.amount, payment_date=db_obj.payment_date
+        )
+        stage(
+            db,
+            "payment.posted",
+            {
+                "id": db_obj.id,
+                "contract_id": db_obj.contract_id,
+                "amount": db_obj.amount,
+                "payment_date": db_obj.payment_date,
+            },
+            audience=set(parties),
+        )
+        return db_obj
+
     def get_by_contract(
         self, db: Session, *, contract_id: int, skip: int = 0, limit: int = 100
     ) -> List[RentPayment]:
@@ -76,6 +339,107 @@ class CRUDRentPayment(CRUDBase[RentPayment, RentPaymentCreate, RentPaymentUpdate
             .all()
         )
     
+    def create_many(
+        self, db: Session, *, objs_in: List[Dict[str, Any]], owner_by_contract: Dict[int, int]
+    ) -> List[int]:
+        """
+        Insert payments in one executemany and return their ids, in order.
+        Counters are updated once per owner and month; each owner gets a
+        single payment.bulk_posted event instead of one per payment.
+        """
+        if not objs_in:
+            return []
+        ids = db.scalars(
+            insert(RentPayment).returning(RentPayment.id, sort_by_parameter_order=True),
+            objs_in,
+        ).all()
+        collected: Dict[Tuple[int, date], float] = {}
+        totals: Dict[int, Tuple[int, float]] = {}
+        for obj in objs_in:
+            owner_id = owner_by_contract[obj["contract_id"]]
+            key = (owner_id, obj["payment_date"].replace(day=1))
+            collected[key] = collected.get(key, 0.0) + obj["amount"]
+            count, amount = totals.get(owner_id, (0, 0.0))
+            totals[owner_id] = (count + 1, amount + obj["amount"])
+        # Oldest month first, so each owner's counters end on the latest one
+        for (owner_id, month), amount in sorted(collected.items(), key=lambda item: item[0][1]):
+            owner_summary.record_payment(db, owner_id=owner_id, amount=amount, payment_date=month)
+        for owner_id, (count, amount) in totals.items():
+            stage(
+                db,
+                "payment.bulk_posted",
+                {"count": count, "amount": round(amount, 2)},
+                audience={owner_id},
+            )
+        return ids
+
+    def set_transaction_ids(self, db: Session, *, transaction_ids: Dict[int, str]) -> None:
+        """Record bank references of existing payments, by payment id."""
+        if transaction_ids:
+            db.execute(
+                update(RentPayment),
+                [{"id": id, "transaction_id": ref} for id, ref in transaction_ids.items()],
+            )
+
+    def get_by_transaction_ids(
+        self, db: Session, *, transaction_ids: Iterable[str], owner_id: Optional[int] = None
+    ) -> List[Tuple]:
+        """
+        (id, contract_id, amount, payment_date, transaction_id) of payments
+        with any of `transaction_ids`, on `owner_id`'s properties if given.
+        """
+        query = db.query(
+            RentPayment.id,
+            RentPayment.contract_id,
+            RentPayment.amount,
+            RentPayment.payment_date,
+            RentPayment.transaction_id,
+        ).filter(RentPayment.transaction_id.in_(list(transaction_ids)))
+        if owner_id is not None:
+            query = (
+                query.join(RentalContract, RentPayment.contract_id == RentalContract.id)
+                .join(Property, RentalContract.property_id == Property.id)
+                .filter(Property.owner_id == owner_id)
+            )
+        return query.all()
+
+    def get_in_period(
+        self, db: Session, *, contract_ids: Iterable[int], date_from: date, date_to: date
+    ) -> List[Tuple]:
+        """
+        (id, contract_id, amount, payment_date, transaction_id) of payments of
+        `contract_ids` dated between `date_from` and `date_to` inclusive.
+        """
+        return (
+            db.query(
+                RentPayment.id,
+                RentPayment.contract_id,
+                RentPayment.amount,
+                RentPayment.payment_date,
+                RentPayment.transaction_id,
+            )
+            .filter(
+                RentPayment.contract_id.in_(list(contract_ids)),
+                RentPayment.payment_date >= date_from,
+                RentPayment.payment_date <= date_to,
+            )
+            .all()
+        )
+
+    def get_history_by_tenant(self, db: Session, *, tenant_ids: Iterable[int]) -> List[Tuple]:
+        """(tenant_id, payments, late payments) of `tenant_ids` with any payment."""
+        return (
+            db.query(
+                RentalContract.tenant_id,
+                func.count(RentPayment.id),
+                func.count(case((RentPayment.is_late == True, RentPayment.id))),
+            )
+            .join(RentalContract, RentPayment.contract_id == RentalContract.id)
+            .filter(RentalContract.tenant_id.in_(list(tenant_ids)))
+            .group_by(RentalContract.tenant_id)
+            .all()
+        )
+
     def get_late_payments(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[RentPayment]:
@@ -89,6 +453,63 @@ class CRUDRentPayment(CRUDBase[RentPayment, RentPaymentCreate, RentPaymentUpdate
 
 
 class CRUDMaintenanceRequest(CRUDBase[MaintenanceRequest, MaintenanceRequestCreate, MaintenanceRequestUpdate]):
+    # Moves allowed through the queue: status -> statuses it can go to
+    transitions = {
+        "pending": {"in_progress", "rejected"},
+        "in_progress": {"completed", "pending", "rejected"},
+    }
+
+    def create(self, db: Session, *, obj_in: MaintenanceRequestCreate) -> MaintenanceRequest:
+        db_obj = super().create(db, obj_in=obj_in)
+        parties = _contract_parties(db, db_obj.contract_id)
+        owner_summary.adjust(
+            db, owner_id=parties[0], **maintenance_counts(db_obj.status, db_obj.priority_rank)
+        )
+        stage(
+            db,
+            "maintenance.created",
+            {
+                "id": db_obj.id,
+                "contract_id": db_obj.contract_id,
+                "title": db_obj.title,
+                "status": db_obj.status,
+                "priority": db_obj.priority,
+            },
+            audience=set(parties),
+        )
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: MaintenanceRequest,
+        obj_in: Union[MaintenanceRequestUpdate, Dict[str, Any]]
+    ) -> MaintenanceRequest:
+        previous_status = db_obj.status
+        previous_counts = maintenance_counts(db_obj.status, db_obj.priority_rank)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        counts = maintenance_counts(db_obj.status, db_obj.priority_rank)
+        if counts == previous_counts and db_obj.status == previous_status:
+            return db_obj
+        parties = _contract_parties(db, db_obj.contract_id)
+        owner_summary.adjust(
+            db, owner_id=parties[0], **_maintenance_change(previous_counts, counts)
+        )
+        if db_obj.status != previous_status:
+            stage(
+                db,
+                "maintenance.status_changed",
+                {
+                    "id": db_obj.id,
+                    "contract_id": db_obj.contract_id,
+                    "old": previous_status,
+                    "new": db_obj.status,
+                },
+                audience=set(parties),
+            )
+        return db_obj
+
     def get_by_contract(
         self, db: Session, *, contract_id: int, skip: int = 0, limit: int = 100
     ) -> List[MaintenanceRequest]:
@@ -100,6 +521,95 @@ class CRUDMaintenanceRequest(CRUDBase[MaintenanceRequest, MaintenanceRequestCrea
             .all()
         )
     
+    def _queue(self, db: Session, *, owner_id: int, status: str):
+        return (
+            db.query(self.model)
+            .join(RentalContract, MaintenanceRequest.contract_id == RentalContract.id)
+            .join(Property, RentalContract.property_id == Property.id)
+            .filter(Property.owner_id == owner_id, MaintenanceRequest.status == status)
+            .order_by(
+                MaintenanceRequest.priority_rank,
+                MaintenanceRequest.request_date,
+                MaintenanceRequest.id,
+            )
+        )
+
+    def get_queue(
+        self, db: Session, *, owner_id: int, status: str = "pending", skip: int = 0, limit: int = 100
+    ) -> List[MaintenanceRequest]:
+        """Requests on `owner_id`'s properties, most urgent and oldest first."""
+        return self._queue(db, owner_id=owner_id, status=status).offset(skip).limit(limit).all()
+
+    def claim_next(
+        self, db: Session, *, owner_id: int, assignee_id: int
+    ) -> Optional[MaintenanceRequest]:
+        """
+        Move the next pending request of `owner_id`'s properties to in_progress,
+        assigned to `assignee_id`. Concurrent claimers never get the same one.
+        """
+        queue = self._queue(db, owner_id=owner_id, status="pending")
+        if db.get_bind().dialect.name == "postgresql":
+            # Requests locked by another claimer are skipped rather than waited for
+            db_obj = queue.with_for_update(skip_locked=True, of=MaintenanceRequest).first()
+            if db_obj is not None and self.transition(
+                db, db_obj=db_obj, status="in_progress", assignee_id=assignee_id
+            ):
+                return db_obj
+            return None
+        # No row locks elsewhere: claim with a compare-and-set and retry on a lost race
+        for _ in range(CLAIM_ATTEMPTS):
+            db_obj = queue.first()
+            if db_obj is None:
+                return None
+            if self.transition(db, db_obj=db_obj, status="in_progress", assignee_id=assignee_id):
+                return db_obj
+            db.expire(db_obj)
+        return None
+
+    def transition(
+        self,
+        db: Session,
+        *,
+        db_obj: MaintenanceRequest,
+        status: str,
+        assignee_id: Optional[int] = None,
+    ) -> bool:
+        """
+        Atomically move `db_obj` from the status it was read with to `status`.
+        Returns False if another transaction changed the status in between.
+        """
+        previous = db_obj.status
+        values: Dict[str, Any] = {"status": status}
+        if status == "in_progress":
+            values.update(assigned_to_id=assignee_id, claimed_at=datetime.utcnow())
+        elif status == "pending":
+            values.update(assigned_to_id=None, claimed_at=None)
+        elif status == "completed" and db_obj.completion_date is None:
+            values["completion_date"] = date.today()
+        updated = (
+            db.query(self.model)
+            .filter(MaintenanceRequest.id == db_obj.id, MaintenanceRequest.status == previous)
+            .update(values, synchronize_session=False)
+        )
+        if not updated:
+            return False
+        previous_counts = maintenance_counts(previous, db_obj.priority_rank)
+        for key, value in values.items():
+            set_committed_value(db_obj, key, value)
+        parties = _contract_parties(db, db_obj.contract_id)
+        owner_summary.adjust(
+            db,
+            owner_id=parties[0],
+            **_maintenance_change(previous_counts, maintenance_counts(status, db_obj.priority_rank)),
+        )
+        stage(
+            db,
+            "maintenance.status_changed",
+            {"id": db_obj.id, "contract_id": db_obj.contract_id, "old": previous, "new": status},
+            audience=set(parties),
+        )
+        return True
+
     def get_by_status(
         self, db: Session, *, status: str, skip: int = 0, limit: int = 100
     ) -> List[MaintenanceRequest]:
@@ -123,6 +633,45 @@ class CRUDMaintenanceRequest(CRUDBase[MaintenanceRequest, MaintenanceRequestCrea
         )
 
 
+class CRUDContractDocument(CRUDBase[ContractDocument, ContractDocumentCreate, ContractDocumentUpdate]):
+    def create(self, db: Session, *, obj_in: ContractDocumentCreate) -> ContractDocument:
+        db_obj = super().create(db, obj_in=obj_in)
+        stage(
+            db,
+            "contract.document_uploaded",
+            {
+                "id": db_obj.id,
+                "contract_id": db_obj.contract_id,
+                "filename": db_obj.filename,
+                "size": db_obj.size,
+            },
+            audience=set(_contract_parties(db, db_obj.contract_id)),
+        )
+        return db_obj
+
+    def get_by_contract(
+        self, db: Session, *, contract_id: int, skip: int = 0, limit: int = 100
+    ) -> List[ContractDocument]:
+        return (
+            db.query(self.model)
+            .filter(ContractDocument.contract_id == contract_id)
+            .order_by(ContractDocument.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_for_contract(
+        self, db: Session, *, contract_id: int, id: int
+    ) -> Optional[ContractDocument]:
+        return (
+            db.query(self.model)
+            .filter(ContractDocument.id == id, ContractDocument.contract_id == contract_id)
+            .first()
+        )
+
+
 rental_contract = CRUDRentalContract(RentalContract)
 rent_payment = CRUDRentPayment(RentPayment)
 maintenance_request = CRUDMaintenanceRequest(MaintenanceRequest)
+contract_document = CRUDContractDocument(ContractDocument)
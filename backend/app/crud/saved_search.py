@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager
+
+from app.core import search_index
+from app.core.events import stage
+from app.crud.base import CRUDBase
+from app.models.saved_search import SavedSearch, SearchMatch
+from app.schemas.saved_search import SavedSearchCreate
+
+
+class CRUDSavedSearch(CRUDBase[SavedSearch, SavedSearchCreate, SavedSearchCreate]):
+    def create_with_user(
+        self, db: Session, *, obj_in: SavedSearchCreate, user_id: int
+    ) -> SavedSearch:
+        db_obj = self.model(**obj_in.dict(), user_id=user_id)
+        db.add(db_obj)
+        self._flush(db)
+        search_index.stage_add(db, db_obj)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> SavedSearch:
+        db.query(SearchMatch).filter(SearchMatch.saved_search_id == id).delete(
+            synchronize_session=False
+        )
+        db_obj = super().remove(db, id=id)
+        search_index.stage_remove(db, id)
+        return db_obj
+
+    def get_multi_by_user(self, db: Session, *, user_id: int) -> List[SavedSearch]:
+        return (
+            db.query(self.model)
+            .filter(SavedSearch.user_id == user_id)
+            .order_by(SavedSearch.id)
+            .all()
+        )
+
+    def count_by_user(self, db: Session, *, user_id: int) -> int:
+        return db.query(func.count(SavedSearch.id)).filter(SavedSearch.user_id == user_id).scalar()
+
+    def get_inbox(
+        self, db: Session, *, user_id: int, after_id: int = 0, limit: int = 100
+    ) -> List[SearchMatch]:
+        """The user's matches after `after_id`, oldest first, with their properties."""
+        return (
+            db.query(SearchMatch)
+            .join(SearchMatch.property)
+            .options(contains_eager(SearchMatch.property))
+            .filter(SearchMatch.user_id == user_id, SearchMatch.id > after_id)
+            .order_by(SearchMatch.id)
+            .limit(limit)
+            .all()
+        )
+
+    def match_listing(self, db: Session, *, property: Any) -> List[SearchMatch]:
+        """
+        Queue `property`, just listed, into the inbox of every user with a
+        saved search it matches (other than its owner), and tell them with a
+        `search.matched` event once `db` commits.
+        """
+        self._refresh_index(db)
+        listing = search_index.listing_of(property)
+        by_user: Dict[int, List[int]] = {}
+        for search in search_index.index.matches(listing):
+            if search.user_id != listing.owner_id:
+                by_user.setdefault(search.user_id, []).append(search.id)
+        if not by_user:
+            return []
+        now = datetime.utcnow()
+        matches = [
+            SearchMatch(user_id=user_id, saved_search_id=id, property_id=listing.id, matched_at=now)
+            for user_id, ids in by_user.items()
+            for id in ids
+        ]
+        db.add_all(matches)
+        self._flush(db)
+        for user_id, ids in by_user.items():
+            stage(
+                db,
+                "search.matched",
+                {"property_id": listing.id, "saved_search_ids": ids},
+                audience={user_id},
+            )
+        return matches
+
+    def _refresh_index(self, db: Session) -> None:
+        """
+        Bring this worker's index up to date with the table: searches saved
+        since it last looked are added, and any other difference in the count
+        (searches deleted by other workers) reloads it whole.
+        """
+        index = search_index.index
+        count, max_id = db.query(
+            func.count(SavedSearch.id), func.coalesce(func.max(SavedSearch.id), 0)
+        ).one()
+        if index.loaded and (len(index), index.max_id) == (count, max_id):
+            return
+        if index.loaded and max_id > index.max_id:
+            index.add_all(self._filters(db, after_id=index.max_id))
+            if (len(index), index.max_id) == (count, max_id):
+                return
+        index.load(self._filters(db))
+
+    def _filters(self, db: Session, *, after_id: int = 0) -> List[tuple]:
+        columns = [getattr(SavedSearch, name) for name in search_index.SearchFilters._fields]
+        return db.query(*columns).filter(SavedSearch.id > after_id).all()
+
+
+saved_search = CRUDSavedSearch(SavedSearch)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -8,8 +8,11 @@ from app.schemas.tenant import TenantCreate, TenantUpdate
 
 
 class CRUDTenant(CRUDBase[Tenant, TenantCreate, TenantUpdate]):
-    def get_by_user_id(self, db: Session, *, user_id: int) -> Optional[Tenant]:
-        return db.query(self.model).filter(Tenant.user_id == user_id).first()
+    def get_by_user_id(
+        self, db: Session, *, user_id: int, fields: Optional[Sequence[str]] = None
+    ) -> Optional[Tenant]:
+        query = db.query(self.model).filter(Tenant.user_id == user_id)
+        return self._only(query, fields).first()
     
     def get_by_identification(
         self, db: Session, *, identification_number: str
@@ -20,6 +23,10 @@ class CRUDTenant(CRUDBase[Tenant, TenantCreate, TenantUpdate]):
             .first()
         )
     
+    def get_incomes(self, db: Session, *, ids: Iterable[int]) -> List[Tuple]:
+        """(id, annual_income) of the tenants among `ids`."""
+        return db.query(Tenant.id, Tenant.annual_income).filter(Tenant.id.in_(list(ids))).all()
+
     def create_with_user(
         self, db: Session, *, obj_in: TenantCreate, user_id: int
     ) -> Tenant:
@@ -36,8 +43,7 @@ class CRUDTenant(CRUDBase[Tenant, TenantCreate, TenantUpdate]):
             user_id=user_id,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._flush(db)
         return db_obj
 
 
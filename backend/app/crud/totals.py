@@ -0,0 +1,75 @@
+"""
+Total row counts for paginated lists, at the cost each list can afford.
+
+`exact` counts every matching row. `capped` stops counting at `cap` and
+reports "at least cap" beyond it. `estimated` reads the planner's row
+estimate for the query (PostgreSQL), so it costs no scan at all; it falls
+back to `capped` on other databases.
+"""
+import json
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+
+STRATEGIES = ("exact", "estimated", "capped")
+
+
+class Total:
+    def __init__(self, count: int, method: str, at_least: bool = False) -> None:
+        self.count = count
+        # exact, estimated, counter or capped
+        self.method = method
+        # True when there are `count` rows or more
+        self.at_least = at_least
+
+    def __str__(self) -> str:
+        return f"{self.count}+" if self.at_least else str(self.count)
+
+    def __repr__(self) -> str:
+        return f"Total({self}, {self.method})"
+
+
+def exact_total(db: Session, query: Query) -> Total:
+    count = db.query(func.count()).select_from(query.order_by(None).subquery()).scalar()
+    return Total(count, "exact")
+
+
+def capped_total(db: Session, query: Query, cap: int) -> Total:
+    # Counts at most cap + 1 rows: enough to tell "more than cap"
+    limited = query.order_by(None).limit(cap + 1).subquery()
+    count = db.query(func.count()).select_from(limited).scalar()
+    if count > cap:
+        return Total(cap, "capped", at_least=True)
+    return Total(count, "capped")
+
+
+def _plan_rows(db: Session, query: Query) -> Optional[int]:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimated_total(db: Session, query: Query, cap: int) -> Total:
+    rows = _plan_rows(db, query)
+    if rows is None:
+        return capped_total(db, query, cap)
+    return Total(rows, "estimated")
+
+
+def total(db: Session, query: Query, *, strategy: str, cap: int) -> Total:
+    """Total of `query`'s rows by `strategy`, one of STRATEGIES."""
+    if strategy == "exact":
+        return exact_total(db, query)
+    if strategy == "estimated":
+        return estimated_total(db, query, cap)
+    if strategy == "capped":
+        return capped_total(db, query, cap)
+    raise ValueError(f"Unknown total strategy: {strategy!r}")
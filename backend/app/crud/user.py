@@ -23,8 +23,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             is_tenant=obj_in.is_tenant,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._flush(db)
         return db_obj
 
     def update(
@@ -57,5 +56,8 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def is_tenant(self, user: User) -> bool:
         return user.is_tenant
 
+    def is_superuser(self, user: User) -> bool:
+        return user.is_superuser
+
 
 user = CRUDUser(User)
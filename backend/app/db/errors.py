@@ -0,0 +1,34 @@
+import re
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+_UNIQUE_VIOLATIONS = (
+    # PostgreSQL: 'Key (email)=(owner@example.com) already exists.'
+    re.compile(r"Key \((?P<column>[^)]+)\)=\(.*\) already exists"),
+    # SQLite: 'UNIQUE constraint failed: users.email'
+    re.compile(r"UNIQUE constraint failed: \w+\.(?P<column>\w+)"),
+)
+
+
+def unique_violation(exc: IntegrityError) -> Optional[str]:
+    """
+    Column whose unique constraint `exc` reports, or None for other integrity
+    errors (foreign keys, NOT NULL, multi-column constraints).
+    """
+    message = str(exc.orig)
+    for pattern in _UNIQUE_VIOLATIONS:
+        match = pattern.search(message)
+        if match and "," not in match.group("column"):
+            return match.group("column")
+    return None
+
+
+# PostgreSQL: 'conflicting key value violates exclusion constraint "rental_contracts_no_overlap"'
+_EXCLUSION_VIOLATION = re.compile(r'violates exclusion constraint "(?P<constraint>[^"]+)"')
+
+
+def exclusion_violation(exc: IntegrityError) -> Optional[str]:
+    """Name of the exclusion constraint `exc` reports, or None for other integrity errors."""
+    match = _EXCLUSION_VIOLATION.search(str(exc.orig))
+    return match.group("constraint") if match else None
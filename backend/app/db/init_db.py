@@ -1,8 +1,12 @@
 import logging
+from datetime import date
+
 from sqlalchemy.orm import Session
 
-from app import crud, schemas
+from app import crud, models, schemas
 from app.core.config import settings
+from app.db.occupancy import ensure_occupancy
+from app.db.partitions import ensure_partitions
 from app.db.session import Base, engine
 
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +17,28 @@ def init_db(db: Session) -> None:
     # Create tables
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created")
+    with engine.begin() as connection:
+        created = ensure_partitions(
+            connection,
+            models.RentPayment.__table__,
+            date.today(),
+            settings.PAYMENT_PARTITION_MONTHS_AHEAD + 1,
+        )
+    if created:
+        logger.info("Payment partitions created: %s", ", ".join(created))
+    with engine.begin() as connection:
+        overlaps = ensure_occupancy(connection)
+    if overlaps:
+        logger.warning(
+            "%d pairs of overlapping active contracts; list them with "
+            "`python -m app.cli contract-overlaps` and deactivate one of each",
+            len(overlaps),
+        )
+
+    if not crud.rent_sketch.get_all(db):
+        segments = crud.rent_sketch.rebuild(db)
+        db.commit()
+        logger.info("Market rent sketches built: %d segments", segments)
 
     # Create initial admin user if it doesn't exist
     user = crud.user.get_by_email(db, email="admin@example.com")
@@ -25,13 +51,18 @@ def init_db(db: Session) -> None:
             is_active=True,
         )
         user = crud.user.create(db, obj_in=user_in)
+        crud.user.update(db, db_obj=user, obj_in={"is_superuser": True})
+        db.commit()
         logger.info("Initial admin user created")
 
 
 def main() -> None:
     from app.db.session import SessionLocal
     db = SessionLocal()
-    init_db(db)
+    try:
+        init_db(db)
+    finally:
+        db.close()
 
 
 if __name__ == "__main__":
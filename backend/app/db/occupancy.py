@@ -0,0 +1,71 @@
+"""
+Upgrade step for the no-overlap rule of active contracts.
+
+`crud.rental_contract.find_overlap` probes only the active contract of a
+property starting last before a date, which is exact as long as active
+contracts never overlap. New databases get the occupancy index (and on
+PostgreSQL the exclusion constraint) with the table; `create_all` adds
+neither to an existing `rental_contracts` table, whose rows were written
+before overlaps were refused. `ensure_occupancy` creates the index, lists
+the overlapping active contracts, and adds the constraint once there are
+none. Overlaps are reported, not resolved: which contract stays active is
+the owner's decision (`PUT /contracts/{id}` with `is_active: false`).
+"""
+from typing import List, NamedTuple
+
+from sqlalchemy import and_, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import aliased
+
+from app.models.rental_contract import OVERLAP_CONSTRAINT, OVERLAP_CONSTRAINT_DDL, RentalContract
+
+OCCUPANCY_INDEX = "ix_rental_contracts_occupancy"
+
+
+class Overlap(NamedTuple):
+    property_id: int
+    contract_id: int
+    other_id: int  # Starting on or after `contract_id`
+
+
+def find_overlaps(connection: Connection) -> List[Overlap]:
+    """Pairs of active contracts of a property whose terms overlap (one scan, run once)."""
+    first, second = aliased(RentalContract), aliased(RentalContract)
+    query = (
+        select(first.property_id, first.id, second.id)
+        .join(
+            second,
+            and_(
+                second.property_id == first.property_id,
+                second.id != first.id,
+                second.is_active == True,
+                second.start_date <= first.end_date,
+                second.end_date >= first.start_date,
+                # Each pair once
+                (second.start_date > first.start_date)
+                | ((second.start_date == first.start_date) & (second.id > first.id)),
+            ),
+        )
+        .where(first.is_active == True)
+        .order_by(first.property_id, first.id, second.id)
+    )
+    return [Overlap(*row) for row in connection.execute(query)]
+
+
+def ensure_occupancy(connection: Connection) -> List[Overlap]:
+    """
+    Create the occupancy index if missing and, on PostgreSQL, the exclusion
+    constraint if there are no overlaps left; returns the overlaps found.
+    """
+    for index in RentalContract.__table__.indexes:
+        if index.name == OCCUPANCY_INDEX:
+            index.create(connection, checkfirst=True)
+    overlaps = find_overlaps(connection)
+    if connection.dialect.name == "postgresql" and not overlaps:
+        exists = connection.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": OVERLAP_CONSTRAINT}
+        ).first()
+        if exists is None:
+            connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            connection.exec_driver_sql(OVERLAP_CONSTRAINT_DDL)
+    return overlaps
@@ -0,0 +1,97 @@
+"""
+Monthly range partitioning (PostgreSQL).
+
+`partition_by_month(table, column)` declares `table` partitioned on
+`column`. Its primary key is widened with the partition key in the DDL,
+as PostgreSQL requires, while the ORM keeps identifying rows by `id`. A
+DEFAULT partition is created with the table, so inserts never fail for
+want of a partition; `ensure_partitions` creates the monthly ones ahead of
+time (`python -m app.cli partitions`), moving any rows of a new month out
+of the default partition first.
+
+Other databases get a plain table: everything here is a no-op for them.
+"""
+from datetime import date
+from typing import List
+
+from sqlalchemy import PrimaryKeyConstraint, Table, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+
+PARTITION_KEY = "partition_key"
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _primary_key_with_partition_key(constraint, compiler, **kw):
+    key = constraint.table.info.get(PARTITION_KEY) if constraint.table is not None else None
+    if key is None or key in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = [c.name for c in constraint.columns] + [key]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(c) for c in columns)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(table: Table, month: date) -> str:
+    return f"{table.name}_{month:%Y_%m}"
+
+
+def default_partition_name(table: Table) -> str:
+    return f"{table.name}_default"
+
+
+def partition_by_month(table: Table, column: str) -> None:
+    table.info[PARTITION_KEY] = column
+    table.dialect_options["postgresql"]["partition_by"] = f"RANGE ({column})"
+
+    @event.listens_for(table, "after_create")
+    def _create_default_partition(target, connection, **kw):
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"CREATE TABLE {default_partition_name(table)} PARTITION OF {table.name} DEFAULT"
+            )
+
+
+def ensure_partitions(connection: Connection, table: Table, start: date, months: int) -> List[str]:
+    """
+    Create the missing monthly partitions of `table` for `months` months
+    from `start`'s on; returns the names of those created.
+    """
+    if connection.dialect.name != "postgresql":
+        return []
+    key = table.info[PARTITION_KEY]
+    existing = set(connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table.name},
+    ).scalars())
+    created = []
+    month = start.replace(day=1)
+    for _ in range(months):
+        end = _next_month(month)
+        name = partition_name(table, month)
+        if name not in existing:
+            # A partition cannot be attached while the default one holds rows
+            # of its range: build it as a plain table, move them, then attach
+            connection.exec_driver_sql(
+                f"CREATE TABLE {name} (LIKE {table.name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+            connection.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {default_partition_name(table)} "
+                    f"WHERE {key} >= :start AND {key} < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                {"start": month, "end": end},
+            )
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table.name} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            created.append(name)
+        month = end
+    return created
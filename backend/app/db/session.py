@@ -3,18 +3,33 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.tracing import instrument_engine
+from app.db import slow_query
 
 # Convert PostgresDsn to string if needed
 db_url = str(settings.SQLALCHEMY_DATABASE_URI)
 engine = create_engine(db_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+slow_query.install(engine)
+instrument_engine(engine)
+# Objects stay usable after the request's single commit without reloading them
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 
 Base = declarative_base()
 
 # Dependency to get DB session
 def get_db():
+    """
+    One unit of work per request: everything the endpoint writes is committed
+    together once it returns, and rolled back if it raises.
+    """
     db = SessionLocal()
     try:
         yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
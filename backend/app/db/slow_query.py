@@ -0,0 +1,175 @@
+"""
+Slow query log.
+
+Engine event hooks time every statement. Statements slower than
+`settings.SLOW_QUERY_THRESHOLD_MS` are recorded, with redacted parameters and
+the route and CRUD method that issued them, in a bounded in-memory ring
+buffer. The query plan is captured afterwards by a background worker, so the
+request that ran the slow statement is not slowed down further.
+"""
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import count
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+# Execution option set on connections whose statements must not be logged
+SKIP_OPTION = "skip_slow_query_log"
+# Do not queue more EXPLAIN jobs than this; extra slow queries are logged without a plan
+MAX_PENDING_EXPLAINS = 16
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_SAFE_TYPES = (bool, int, float, date, datetime, type(None))
+
+
+def redact(parameters: Any) -> Any:
+    """
+    Keep numbers, dates and NULLs, which help reproduce a plan, and hide
+    everything else (emails, names, password hashes, free text).
+    """
+    if isinstance(parameters, dict):
+        return {k: redact(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(v) for v in parameters]
+    if isinstance(parameters, _SAFE_TYPES):
+        return parameters.isoformat() if isinstance(parameters, (date, datetime)) else parameters
+    return f"<{type(parameters).__name__}>"
+
+
+def _crud_method() -> Optional[str]:
+    """Outermost CRUD method on the current call stack, e.g. 'CRUDProperty.search_properties'."""
+    found = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_globals.get("__name__", "").startswith("app.crud."):
+            owner = frame.f_locals.get("self")
+            if owner is not None:
+                found = f"{type(owner).__name__}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return found
+
+
+class SlowQueryLog:
+    def __init__(self, size: int) -> None:
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._ids = count(1)
+        self._explainer: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    def record(
+        self,
+        engine: Engine,
+        statement: str,
+        parameters: Any,
+        duration_ms: float,
+        executemany: bool,
+    ) -> Dict[str, Any]:
+        context = get_request_context()
+        entry = {
+            "id": next(self._ids),
+            "recorded_at": datetime.utcnow(),
+            "duration_ms": round(duration_ms, 3),
+            "statement": statement,
+            "parameters": redact(parameters[:10] if executemany else parameters),
+            "executemany": executemany,
+            "route": context.route if context else None,
+            "method": context.method if context else None,
+            "path": context.path if context else None,
+            "crud_method": _crud_method(),
+            "plan": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms) %s %s via %s: %s",
+            duration_ms, entry["method"] or "-", entry["route"] or "-",
+            entry["crud_method"] or "-", " ".join(statement.split()),
+        )
+        if settings.SLOW_QUERY_EXPLAIN and not executemany:
+            self._explain_later(engine, entry, statement, parameters)
+        return entry
+
+    def _explain_later(
+        self, engine: Engine, entry: Dict[str, Any], statement: str, parameters: Any
+    ) -> None:
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return
+        with self._lock:
+            if self._pending >= MAX_PENDING_EXPLAINS:
+                return
+            self._pending += 1
+            if self._explainer is None:
+                self._explainer = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="slow-query-explain"
+                )
+        self._explainer.submit(self._explain, engine, entry, statement, parameters)
+
+    def _explain(
+        self, engine: Engine, entry: Dict[str, Any], statement: str, parameters: Any
+    ) -> None:
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with engine.connect().execution_options(**{SKIP_OPTION: True}) as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+                conn.rollback()
+            entry["plan"] = "\n".join(" ".join(str(col) for col in row) for row in rows)
+        except Exception as exc:  # The plan is best effort; never break logging
+            entry["plan"] = f"EXPLAIN failed: {exc}"
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def entries(
+        self,
+        *,
+        limit: int = 50,
+        route: Optional[str] = None,
+        min_duration_ms: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return [
+            e for e in entries
+            if e["duration_ms"] >= min_duration_ms and (route is None or e["route"] == route)
+        ][:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None:
+        return
+    duration_ms = (time.perf_counter() - context._slow_query_started) * 1000.0
+    if duration_ms >= threshold and not conn.get_execution_options().get(SKIP_OPTION):
+        slow_query_log.record(conn.engine, statement, parameters, duration_ms, executemany)
+
+
+def install(engine: Engine) -> None:
+    """Start timing every statement executed through `engine`."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
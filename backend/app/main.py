@@ -3,7 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.api.api import api_router
+from app.api.totals import METHOD_HEADER, TOTAL_HEADER
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.request_context import RequestContextMiddleware
+from app.core.tracing import TracingMiddleware
+from app.core.traffic_capture import CaptureWriter, TrafficCaptureMiddleware
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -17,10 +22,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TOTAL_HEADER, METHOD_HEADER],
 )
 
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 
+app.add_middleware(TracingMiddleware)
+
+if settings.TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        writer=CaptureWriter(settings.TRAFFIC_CAPTURE_PATH),
+        sample_rate=settings.TRAFFIC_CAPTURE_SAMPLE_RATE,
+        max_body=settings.TRAFFIC_CAPTURE_MAX_BODY,
+        exclude_prefixes=(f"{settings.API_V1_STR}/admin",),
+    )
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Outermost, so that everything below can see the current request
+app.add_middleware(RequestContextMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
@@ -1,14 +1,33 @@
 from app.models.user import User
-from app.models.property import Property
+from app.models.property import Property, PropertyImage
 from app.models.tenant import Tenant
-from app.models.rental_contract import RentalContract, RentPayment, MaintenanceRequest
+from app.models.rental_contract import RentalContract, RentPayment, MaintenanceRequest, ContractDocument
+from app.models.owner_summary import OwnerSummary
+from app.models.rent_sketch import RentSketch
+from app.models.saved_search import SavedSearch, SearchMatch
+from app.models.archive import (
+    ArchivedRentalContract,
+    ArchivedRentPayment,
+    ArchivedMaintenanceRequest,
+    ArchivedContractDocument,
+)
 
 # For Alembic to detect all models
 __all__ = [
     "User",
     "Property",
+    "PropertyImage",
     "Tenant",
     "RentalContract",
     "RentPayment",
     "MaintenanceRequest",
+    "ContractDocument",
+    "OwnerSummary",
+    "RentSketch",
+    "SavedSearch",
+    "SearchMatch",
+    "ArchivedRentalContract",
+    "ArchivedRentPayment",
+    "ArchivedMaintenanceRequest",
+    "ArchivedContractDocument",
 ]
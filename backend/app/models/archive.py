@@ -0,0 +1,80 @@
+"""
+Ended contracts and their history, moved out of the live tables by
+`python -m app.cli archive` (see app/services/archive.py).
+
+Rows keep their ids and columns, plus when they were archived. There are
+no foreign keys: archived contracts outlive nothing they point to, and the
+live tables stay small for the queries that run all day.
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, Float, Integer, String, Text
+
+from app.db.session import Base
+
+
+class ArchivedRentalContract(Base):
+    __tablename__ = "archived_rental_contracts"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    monthly_rent = Column(Float, nullable=False)
+    security_deposit = Column(Float, nullable=False)
+    is_active = Column(Boolean, default=False)
+    payment_due_day = Column(Integer, nullable=False, default=1)
+    contract_terms = Column(Text)
+    signed_by_owner = Column(Boolean, default=False)
+    signed_by_tenant = Column(Boolean, default=False)
+    contract_file_url = Column(String)
+    property_id = Column(Integer, nullable=False, index=True)
+    tenant_id = Column(Integer, nullable=False, index=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ArchivedRentPayment(Base):
+    __tablename__ = "archived_rent_payments"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    amount = Column(Float, nullable=False)
+    payment_date = Column(Date, nullable=False)
+    payment_method = Column(String)
+    transaction_id = Column(String)
+    is_late = Column(Boolean, default=False)
+    late_fee = Column(Float, default=0.0)
+    notes = Column(Text)
+    contract_id = Column(Integer, nullable=False, index=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ArchivedMaintenanceRequest(Base):
+    __tablename__ = "archived_maintenance_requests"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=False)
+    request_date = Column(Date, nullable=False)
+    status = Column(String)
+    priority = Column(String)
+    priority_rank = Column(Integer, nullable=False)
+    completion_date = Column(Date)
+    cost = Column(Float)
+    notes = Column(Text)
+    claimed_at = Column(DateTime)
+    contract_id = Column(Integer, nullable=False, index=True)
+    assigned_to_id = Column(Integer)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ArchivedContractDocument(Base):
+    __tablename__ = "archived_contract_documents"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    digest = Column(String(64), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=False)
+    filename = Column(String)
+    uploaded_at = Column(DateTime, nullable=False)
+    contract_id = Column(Integer, nullable=False, index=True)
+    uploaded_by_id = Column(Integer)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, JSON
+
+from app.db.session import Base
+
+
+class OwnerSummary(Base):
+    """
+    Dashboard counters of one owner, kept up to date by the CRUD write paths
+    in the same transaction as the change they count.
+    """
+    __tablename__ = "owner_summaries"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    property_count = Column(Integer, nullable=False, default=0)
+    occupied_count = Column(Integer, nullable=False, default=0)  # Properties not available for rent
+    active_contracts = Column(Integer, nullable=False, default=0)
+    pending_maintenance = Column(Integer, nullable=False, default=0)
+    urgent_maintenance = Column(Integer, nullable=False, default=0)  # Open and high or emergency priority
+    rent_due_by_day = Column(JSON, nullable=False, default=dict)  # Payment due day -> monthly rent of active contracts
+    rent_month = Column(Date)  # First day of the month rent_collected covers
+    rent_collected = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime)
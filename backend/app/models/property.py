@@ -1,4 +1,6 @@
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String, Text
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
@@ -31,3 +33,22 @@ class Property(Base):
     # Relationships
     owner = relationship("User", back_populates="owned_properties")
     rental_contracts = relationship("RentalContract", back_populates="property")
+
+
+class PropertyImage(Base):
+    __tablename__ = "property_images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    digest = Column(String(64), nullable=False)  # Original upload in the blob store
+    content_type = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="processing")  # processing, ready, failed
+    width = Column(Integer)
+    height = Column(Integer)
+    variants = Column(JSON)  # Name -> digest, size, width, height and url of each rendition
+    error = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Foreign Keys
+    property_id = Column(
+        Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False, index=True
+    )
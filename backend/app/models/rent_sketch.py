@@ -0,0 +1,20 @@
+from sqlalchemy import JSON, Column, DateTime, Integer, String
+
+from app.db.session import Base
+
+
+class RentSketch(Base):
+    """
+    Quantile sketch of the asking rents of one market segment: rent bucket
+    index -> number of properties (see app/core/rent_stats.py).
+    """
+    __tablename__ = "rent_sketches"
+
+    city = Column(String, primary_key=True)
+    bedrooms = Column(Integer, primary_key=True)
+    property_type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    buckets = Column(JSON, nullable=False, default=dict)
+    updated_at = Column(DateTime)
+    # When `python -m app.cli market-stats` last recomputed the table
+    rebuilt_at = Column(DateTime)
@@ -1,11 +1,37 @@
-from sqlalchemy import Boolean, Column, Date, Float, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
+from datetime import datetime
 
+from sqlalchemy import (
+    DDL, BigInteger, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, event, text
+)
+from sqlalchemy.orm import relationship, validates
+
+from app.db.partitions import partition_by_month
 from app.db.session import Base
 
 
+# PostgreSQL constraint keeping the active contracts of a property from overlapping
+OVERLAP_CONSTRAINT = "rental_contracts_no_overlap"
+OVERLAP_CONSTRAINT_DDL = (
+    f"ALTER TABLE rental_contracts ADD CONSTRAINT {OVERLAP_CONSTRAINT} EXCLUDE USING gist "
+    "(property_id WITH =, daterange(start_date, end_date, '[]') WITH &&) WHERE (is_active)"
+)
+
+
 class RentalContract(Base):
     __tablename__ = "rental_contracts"
+    __table_args__ = (
+        # Occupancy of a property: active contracts never overlap, so the one
+        # starting last on or before a date is the only one that can cover it
+        Index(
+            "ix_rental_contracts_occupancy",
+            "property_id",
+            "start_date",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        # Ids of archived rows are never handed out again
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     start_date = Column(Date, nullable=False)
@@ -28,10 +54,31 @@ class RentalContract(Base):
     tenant = relationship("Tenant", back_populates="rental_contracts")
     payments = relationship("RentPayment", back_populates="contract")
     maintenance_requests = relationship("MaintenanceRequest", back_populates="contract")
+    documents = relationship("ContractDocument", back_populates="contract")
+
+
+# Both ends are inclusive: a contract may start the day after another ends
+event.listen(
+    RentalContract.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+event.listen(
+    RentalContract.__table__,
+    "after_create",
+    DDL(OVERLAP_CONSTRAINT_DDL).execute_if(dialect="postgresql"),
+)
 
 
 class RentPayment(Base):
     __tablename__ = "rent_payments"
+    __table_args__ = (
+        # Bank statement reconciliation: equality lookups by bank reference...
+        Index("ix_rent_payments_transaction_id", "transaction_id", postgresql_using="hash"),
+        # ...and payments of a contract around a date
+        Index("ix_rent_payments_contract_date", "contract_id", "payment_date"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Float, nullable=False)
@@ -48,9 +95,29 @@ class RentPayment(Base):
     # Relationships
     contract = relationship("RentalContract", back_populates="payments")
 
+    # The partitioned table's primary key includes payment_date; rows are
+    # still identified by id alone
+    __mapper_args__ = {"primary_key": [id]}
+
+
+partition_by_month(RentPayment.__table__, "payment_date")
+
+
+# Queue order of maintenance priorities, most urgent first
+PRIORITY_RANKS = {"emergency": 0, "high": 1, "medium": 2, "low": 3}
+UNKNOWN_PRIORITY_RANK = 4
+
 
 class MaintenanceRequest(Base):
     __tablename__ = "maintenance_requests"
+    __table_args__ = (
+        # Work queue order within a status: most urgent, then oldest
+        Index(
+            "ix_maintenance_requests_queue",
+            "status", "priority_rank", "request_date", "id",
+        ),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -58,12 +125,39 @@ class MaintenanceRequest(Base):
     request_date = Column(Date, nullable=False)
     status = Column(String, default="pending")  # pending, in_progress, completed, rejected
     priority = Column(String, default="medium")  # low, medium, high, emergency
+    priority_rank = Column(Integer, nullable=False, default=PRIORITY_RANKS["medium"])  # Kept in sync with priority
     completion_date = Column(Date)
     cost = Column(Float)
     notes = Column(Text)
+    claimed_at = Column(DateTime)
     
     # Foreign Keys
     contract_id = Column(Integer, ForeignKey("rental_contracts.id"), nullable=False)
+    assigned_to_id = Column(Integer, ForeignKey("users.id"))  # Who claimed it from the queue
     
     # Relationships
     contract = relationship("RentalContract", back_populates="maintenance_requests")
+
+    @validates("priority")
+    def _set_priority_rank(self, key: str, priority: str) -> str:
+        self.priority_rank = PRIORITY_RANKS.get(priority, UNKNOWN_PRIORITY_RANK)
+        return priority
+
+
+class ContractDocument(Base):
+    __tablename__ = "contract_documents"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    digest = Column(String(64), nullable=False)  # SHA-256 of the content, its key in the blob store
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=False)
+    filename = Column(String)
+    uploaded_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Foreign Keys
+    contract_id = Column(Integer, ForeignKey("rental_contracts.id"), nullable=False, index=True)
+    uploaded_by_id = Column(Integer, ForeignKey("users.id"))
+
+    # Relationships
+    contract = relationship("RentalContract", back_populates="documents")
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+
+class SavedSearch(Base):
+    """
+    Property search filters a user is notified about: listings created or
+    put back on the market that match them land in the user's inbox.
+    """
+    __tablename__ = "saved_searches"
+    # Ids are never reused: the search index tells changes apart by count and highest id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    # The filters of `crud.property.search_properties`; None matches anything
+    city = Column(String)
+    state = Column(String)
+    min_bedrooms = Column(Integer)
+    max_rent = Column(Float)
+    property_type = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Foreign Keys
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+
+class SearchMatch(Base):
+    __tablename__ = "search_matches"
+    __table_args__ = (
+        # Inbox of a user, read forward from the last match seen
+        Index("ix_search_matches_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    matched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Foreign Keys
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    saved_search_id = Column(
+        Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    property_id = Column(
+        Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    # Relationships
+    property = relationship("Property")
@@ -15,6 +15,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_property_owner = Column(Boolean, default=False)
     is_tenant = Column(Boolean, default=False)
+    is_superuser = Column(Boolean, default=False)  # Access to admin/diagnostic endpoints
     
     # Relationships
     owned_properties = relationship("Property", back_populates="owner")
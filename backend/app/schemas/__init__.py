@@ -1,9 +1,21 @@
 from app.schemas.user import User, UserCreate, UserInDB, UserUpdate
-from app.schemas.property import Property, PropertyCreate, PropertyInDB, PropertyUpdate
+from app.schemas.property import (
+    Property, PropertyCreate, PropertyInDB, PropertyUpdate,
+    ImageVariant, PropertyImage, PropertyImageCreate, PropertyImageInDB, PropertyImageUpdate,
+)
 from app.schemas.tenant import Tenant, TenantCreate, TenantInDB, TenantUpdate
 from app.schemas.rental_contract import (
     RentalContract, RentalContractCreate, RentalContractInDB, RentalContractUpdate,
     RentPayment, RentPaymentCreate, RentPaymentInDB, RentPaymentUpdate,
-    MaintenanceRequest, MaintenanceRequestCreate, MaintenanceRequestInDB, MaintenanceRequestUpdate
+    MaintenanceRequest, MaintenanceRequestCreate, MaintenanceRequestInDB, MaintenanceRequestUpdate,
+    MaintenanceTransition,
+    ContractDocument, ContractDocumentCreate, ContractDocumentInDB, ContractDocumentUpdate,
+)
+from app.schemas.owner import (
+    AffordabilityRanking, AffordabilityRequest, ApplicantScore, PropertyRanking,
+    CashFlowMonth, CashFlowProjection, OwnerSummary,
 )
+from app.schemas.market import RentStats
+from app.schemas.saved_search import SavedSearch, SavedSearchCreate, SearchMatch
 from app.schemas.token import Token, TokenPayload
+from app.schemas.admin import Allocation, Profile, SlowQuery, TraceSpan
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class SlowQuery(BaseModel):
+    id: int
+    recorded_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: Any = None  # Redacted: only numbers, dates and NULLs are kept
+    executemany: bool = False
+    route: Optional[str] = None
+    method: Optional[str] = None
+    path: Optional[str] = None
+    crud_method: Optional[str] = None
+    plan: Optional[str] = None  # Filled in asynchronously; may still be null
+
+
+class TraceSpan(BaseModel):
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    name: str
+    kind: str
+    start_time_unix_nano: int
+    end_time_unix_nano: Optional[int] = None
+    duration_ms: Optional[float] = None
+    attributes: Dict[str, Any] = {}
+    status: Dict[str, Optional[str]] = {}
+
+
+class Allocation(BaseModel):
+    location: str
+    size_kb: float
+    count: int
+
+
+class Profile(BaseModel):
+    started_at: datetime
+    duration_seconds: float
+    interval_ms: float
+    samples: int
+    collapsed: str  # One "frame;frame;frame count" line per distinct stack
+    allocations: Optional[List[Allocation]] = None
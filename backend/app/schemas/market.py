@@ -0,0 +1,14 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class RentStats(BaseModel):
+    city: str
+    bedrooms: Optional[int] = None  # Every bedroom count when not asked for
+    property_type: Optional[str] = None  # Every type when not asked for
+    count: int  # Properties counted
+    p25: Optional[float] = None
+    median: Optional[float] = None
+    p75: Optional[float] = None
+    relative_accuracy: float  # Largest relative error of the percentiles
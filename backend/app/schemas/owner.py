@@ -0,0 +1,61 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class OwnerSummary(BaseModel):
+    as_of: date
+    property_count: int
+    occupied_count: int
+    occupancy_rate: float  # Share of properties not available for rent
+    active_contracts: int
+    pending_maintenance: int
+    urgent_maintenance: int  # Pending or in progress with high or emergency priority
+    rent_due_this_month: float
+    rent_collected_this_month: float
+    overdue_amount: float  # Rent due by today not covered by this month's payments
+
+
+class CashFlowMonth(BaseModel):
+    month: date  # First day of the month
+    expected_rent: float
+    paying_contracts: int
+    expiring_contracts: int  # Contracts whose term ends this month
+    expiring_rent: float
+    vacant_units: int  # Properties no contract pays rent for
+    vacancy_loss: float  # Asking rent of the vacant properties
+    vacancies_starting: int  # Properties becoming vacant this month
+
+
+class CashFlowProjection(BaseModel):
+    start_month: date
+    months: List[CashFlowMonth]
+    expected_rent: float
+    vacancy_loss: float
+
+
+class AffordabilityRequest(BaseModel):
+    tenant_ids: List[int] = Field(..., min_length=1)
+    property_ids: List[int] = Field(..., min_length=1)
+    top: Optional[int] = Field(None, ge=1)  # Best applicants kept per property
+
+
+class ApplicantScore(BaseModel):
+    tenant_id: int
+    score: float  # 0-100
+    rent_burden: Optional[float]  # Share of monthly income this rent and obligations take; None without income
+    obligations: float  # Monthly rent of the tenant's active contracts
+    payments: int
+    late_payments: int
+
+
+class PropertyRanking(BaseModel):
+    property_id: int
+    monthly_rent: float
+    ranking: List[ApplicantScore]  # Best score first
+
+
+class AffordabilityRanking(BaseModel):
+    properties: List[PropertyRanking]
+    unknown_tenant_ids: List[int]  # Requested ids that are not tenants
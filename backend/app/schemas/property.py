@@ -1,4 +1,5 @@
-from typing import List, Optional, Union
+from datetime import datetime
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel, Field
 
 
@@ -57,3 +58,52 @@ class Property(PropertyInDBBase):
 # Additional properties stored in DB
 class PropertyInDB(PropertyInDBBase):
     pass
+
+
+# One rendition of an uploaded image
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+    size: int
+
+
+# Shared properties for PropertyImage
+class PropertyImageBase(BaseModel):
+    content_type: Optional[str] = None
+
+
+# Properties stored once the original is in the blob store
+class PropertyImageCreate(PropertyImageBase):
+    content_type: str
+    property_id: int
+    digest: str
+
+
+# Properties to receive on property image update
+class PropertyImageUpdate(PropertyImageBase):
+    pass
+
+
+class PropertyImageInDBBase(PropertyImageBase):
+    id: int
+    property_id: int
+    status: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variants: Optional[Dict[str, ImageVariant]] = None
+    error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+# Additional properties to return via API
+class PropertyImage(PropertyImageInDBBase):
+    pass
+
+
+# Additional properties stored in DB
+class PropertyImageInDB(PropertyImageInDBBase):
+    pass
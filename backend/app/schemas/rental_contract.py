@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional
 
 from pydantic import BaseModel
@@ -121,6 +121,8 @@ class MaintenanceRequestUpdate(MaintenanceRequestBase):
 class MaintenanceRequestInDBBase(MaintenanceRequestBase):
     id: int
     contract_id: int
+    assigned_to_id: Optional[int] = None
+    claimed_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -134,3 +136,50 @@ class MaintenanceRequest(MaintenanceRequestInDBBase):
 # Additional properties stored in DB
 class MaintenanceRequestInDB(MaintenanceRequestInDBBase):
     pass
+
+
+# Shared properties for ContractDocument
+class ContractDocumentBase(BaseModel):
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+
+
+# Properties stored once the content is in the blob store
+class ContractDocumentCreate(ContractDocumentBase):
+    content_type: str
+    contract_id: int
+    digest: str
+    size: int
+    uploaded_by_id: Optional[int] = None
+
+
+# Properties to receive on contract document update
+class ContractDocumentUpdate(ContractDocumentBase):
+    pass
+
+
+class ContractDocumentInDBBase(ContractDocumentBase):
+    id: int
+    contract_id: int
+    digest: str
+    size: int
+    uploaded_at: datetime
+    uploaded_by_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+
+# Additional properties to return via API
+class ContractDocument(ContractDocumentInDBBase):
+    pass
+
+
+# Additional properties stored in DB
+class ContractDocumentInDB(ContractDocumentInDBBase):
+    pass
+
+
+# Status change through the maintenance queue
+class MaintenanceTransition(BaseModel):
+    status: str
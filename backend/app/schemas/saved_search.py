@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.property import Property
+
+
+# The filters of GET /properties that a saved search keeps
+class SavedSearchBase(BaseModel):
+    name: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    min_bedrooms: Optional[int] = Field(None, ge=0)
+    max_rent: Optional[float] = Field(None, ge=0)
+    property_type: Optional[str] = None
+
+
+class SavedSearchCreate(SavedSearchBase):
+    pass
+
+
+class SavedSearch(SavedSearchBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+# A listing that matched one of the user's saved searches
+class SearchMatch(BaseModel):
+    id: int
+    saved_search_id: int
+    matched_at: datetime
+    property: Property
+
+    class Config:
+        orm_mode = True
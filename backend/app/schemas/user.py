@@ -27,6 +27,8 @@ class UserUpdate(UserBase):
 
 class UserInDBBase(UserBase):
     id: Optional[int] = None
+    # Not part of UserBase so that it cannot be set through create/update payloads
+    is_superuser: Optional[bool] = False
 
     class Config:
         orm_mode = True
@@ -0,0 +1,149 @@
+"""
+Affordability scoring of prospective tenants against properties.
+
+The features of all applicants (monthly income, rent of their active
+contracts, payment history) are loaded with one grouped query each and held
+in NumPy arrays; every tenant x property pair is then scored at once as a
+matrix, so thousands of pairs cost a few array operations.
+
+A score runs from 0 to 100. AFFORDABILITY_WEIGHT of it comes from the rent
+burden, the share of monthly income the property's rent and the tenant's
+current rent obligations would take: full marks up to COMFORTABLE_BURDEN,
+nothing from MAX_BURDEN on (or without a known income). The rest comes from
+payment reliability, the share of the tenant's past payments made on time;
+tenants without history get full reliability.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import crud
+
+COMFORTABLE_BURDEN = 0.3
+MAX_BURDEN = 0.6
+AFFORDABILITY_WEIGHT = 0.7
+
+
+@dataclass
+class Applicants:
+    """Columnar features of tenants, one array element per tenant, sorted by id."""
+
+    tenant_id: np.ndarray  # int64
+    monthly_income: np.ndarray  # float64, 0 when unknown
+    obligations: np.ndarray  # float64, monthly rent of their active contracts
+    payments: np.ndarray  # int64
+    late_payments: np.ndarray  # int64
+
+    def __len__(self) -> int:
+        return len(self.tenant_id)
+
+    @classmethod
+    def from_rows(
+        cls,
+        tenants: Sequence[Tuple[int, Optional[int]]],
+        obligations: Sequence[Tuple[int, float]],
+        history: Sequence[Tuple[int, int, int]],
+    ) -> "Applicants":
+        """
+        Build from (id, annual_income), (tenant_id, monthly rent) and
+        (tenant_id, payments, late payments) rows; tenants missing from the
+        last two have no obligations or history.
+        """
+        n = len(tenants)
+        tenant_id = np.fromiter((t[0] for t in tenants), np.int64, n)
+        income = np.fromiter((t[1] or 0 for t in tenants), np.float64, n) / 12.0
+        order = np.argsort(tenant_id)
+        tenant_id, income = tenant_id[order], income[order]
+
+        def column(rows: Sequence[Tuple], index: int, dtype: type) -> np.ndarray:
+            values = np.zeros(n, dtype)
+            if rows:
+                ids = np.fromiter((r[0] for r in rows), np.int64, len(rows))
+                values[np.searchsorted(tenant_id, ids)] = [r[index] for r in rows]
+            return values
+
+        return cls(
+            tenant_id=tenant_id,
+            monthly_income=income,
+            obligations=column(obligations, 1, np.float64),
+            payments=column(history, 1, np.int64),
+            late_payments=column(history, 2, np.int64),
+        )
+
+
+def load_applicants(db: Session, *, tenant_ids: Sequence[int]) -> Applicants:
+    """Features of the tenants among `tenant_ids` that exist."""
+    return Applicants.from_rows(
+        crud.tenant.get_incomes(db, ids=tenant_ids),
+        crud.rental_contract.get_obligations(db, tenant_ids=tenant_ids),
+        crud.rent_payment.get_history_by_tenant(db, tenant_ids=tenant_ids),
+    )
+
+
+def score(applicants: Applicants, rent: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Tenant x property matrices of `burden` (inf without income) and `score`
+    for properties asking `rent`, and the `reliability` of each tenant.
+    """
+    income = applicants.monthly_income[:, None]
+    outgoing = applicants.obligations[:, None] + rent[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        burden = np.where(income > 0, outgoing / income, np.inf)
+    affordability = np.clip(
+        (MAX_BURDEN - burden) / (MAX_BURDEN - COMFORTABLE_BURDEN), 0.0, 1.0
+    )
+    reliability = 1.0 - applicants.late_payments / np.maximum(applicants.payments, 1)
+    return {
+        "burden": burden,
+        "reliability": reliability,
+        "score": 100.0 * (
+            AFFORDABILITY_WEIGHT * affordability
+            + (1.0 - AFFORDABILITY_WEIGHT) * reliability[:, None]
+        ),
+    }
+
+
+def rank(
+    applicants: Applicants,
+    property_ids: Sequence[int],
+    rent: np.ndarray,
+    *,
+    top: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Per property, its applicants best score first (ties by tenant id), the
+    `top` best only if given. Plain Python values, ready to serialize.
+    """
+    scores = score(applicants, rent)
+    # Stable sort of the negated scores: equal scores keep tenant id order
+    order = np.argsort(-scores["score"], axis=0, kind="stable")[:top]
+    burden = np.round(scores["burden"], 4)
+    results = []
+    for column, property_id in enumerate(property_ids):
+        rows = order[:, column]
+        ranking = [
+            {
+                "tenant_id": tenant_id,
+                "score": round(value, 1),
+                "rent_burden": None if b == np.inf else b,
+                "obligations": obligations,
+                "payments": payments,
+                "late_payments": late,
+            }
+            for tenant_id, value, b, obligations, payments, late in zip(
+                applicants.tenant_id[rows].tolist(),
+                scores["score"][rows, column].tolist(),
+                burden[rows, column].tolist(),
+                applicants.obligations[rows].tolist(),
+                applicants.payments[rows].tolist(),
+                applicants.late_payments[rows].tolist(),
+            )
+        ]
+        results.append({
+            "property_id": property_id,
+            "monthly_rent": float(rent[column]),
+            "ranking": ranking,
+        })
+    return results
@@ -0,0 +1,54 @@
+"""
+Archival of ended contracts: `python -m app.cli archive`, run periodically.
+
+Contracts that are inactive and whose last payment and maintenance request
+are older than ARCHIVE_AFTER_DAYS move, with that history and their
+documents, to the archive tables (app/models/archive.py), a batch of
+ARCHIVE_BATCH_SIZE contracts per transaction. The live tables keep only
+what current reads and the dashboard counters need: nothing archived is
+counted by the owner summaries, since the cutoff is never later than the
+current month and open maintenance requests hold their contract back.
+"""
+import logging
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+
+logger = logging.getLogger(__name__)
+
+
+def archive_cutoff(today: date, after_days: int) -> date:
+    """Contracts with no activity from this day on may be archived."""
+    return min(today - timedelta(days=after_days), today.replace(day=1))
+
+
+def archive_ended_contracts(
+    db: Session,
+    *,
+    after_days: int,
+    batch_size: int,
+    today: Optional[date] = None,
+    after_batch: Optional[Callable[[], None]] = None,
+) -> Dict[str, int]:
+    """
+    Archive every eligible contract, `batch_size` at a time, calling
+    `after_batch` (typically `db.commit`) after each batch. Returns the rows
+    moved per table, and the number of batches.
+    """
+    cutoff = archive_cutoff(today or date.today(), after_days)
+    summary: Dict[str, int] = {"batches": 0}
+    while True:
+        ids = crud.archive.archivable_ids(db, cutoff=cutoff, limit=batch_size)
+        if not ids:
+            break
+        moved = crud.archive.archive_contracts(db, ids=ids)
+        for table, count in moved.items():
+            summary[table] = summary.get(table, 0) + count
+        summary["batches"] += 1
+        logger.info("Archived %s contracts ended before %s", len(ids), cutoff)
+        if after_batch is not None:
+            after_batch()
+    return summary
@@ -0,0 +1,260 @@
+"""
+Property image processing.
+
+Uploaded originals go to the blob store as they are. Decoding, resizing and
+WebP encoding are CPU-bound and hold the GIL, so they run in a bounded pool
+of worker processes: at most IMAGE_MAX_PENDING images are queued or in
+progress, and callers are turned away (`PoolBusy`) beyond that rather than
+queueing without limit. Workers read originals from and write variants to
+the blob store themselves, so image data never crosses the process boundary.
+
+Every upload is rendered into the standard VARIANTS, each bounded by its
+size on the longer edge and never upscaled. Other widths are rendered on
+demand from the smallest variant that is large enough, snapped to multiples
+of ON_DEMAND_STEP, and kept in an on-disk LRU cache.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import ExifTags, Image, ImageOps
+
+from app import crud
+from app.core.blobstore import BlobStore
+from app.core.config import settings
+from app.core.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Name -> longest edge in pixels
+VARIANTS = {"thumb": 160, "small": 480, "medium": 960, "large": 1920}
+# Variant appended to Property.images, the one for full-screen galleries
+GALLERY_VARIANT = "large"
+ON_DEMAND_STEP = 32
+MEDIA_TYPE = "image/webp"
+
+
+class ImageError(ValueError):
+    pass
+
+
+class PoolBusy(Exception):
+    pass
+
+
+def sniff(data: bytes) -> Optional[str]:
+    """Media type of an image format Pillow decodes, from its first bytes."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def variant_url(image_id: int, variant: str) -> str:
+    return f"{settings.API_V1_STR}/properties/images/{image_id}/{variant}"
+
+
+def on_demand_width(width: int) -> int:
+    """`width` rounded up to a multiple of ON_DEMAND_STEP, within the largest variant."""
+    step = ON_DEMAND_STEP
+    return min(max(-(-width // step) * step, step), max(VARIANTS.values()))
+
+
+# Worker side
+
+def _open(
+    store: BlobStore, digest: str, max_pixels: int, fit: Optional[int] = None
+) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Decoded, upright image and the upright size of the original. JPEGs are
+    decoded at a reduced scale when `fit` allows.
+    """
+    Image.MAX_IMAGE_PIXELS = None  # Checked below, before decoding
+    try:
+        image = Image.open(io.BytesIO(b"".join(store.read(digest))))
+    except (OSError, SyntaxError) as e:
+        raise ImageError(f"Not a supported image: {e}")
+    if image.width * image.height > max_pixels:
+        raise ImageError(f"Image has more than {max_pixels} pixels")
+    # EXIF orientations 5-8 swap width and height
+    size = image.size[::-1] if image.getexif().get(ExifTags.Base.Orientation, 1) > 4 else image.size
+    if fit is not None:
+        # DCT scaling: only decodes what the largest output needs
+        image.draft("RGB", (fit, fit))
+    try:
+        image = ImageOps.exif_transpose(image)
+    except (OSError, SyntaxError) as e:
+        raise ImageError(f"Image could not be decoded: {e}")
+    if image.mode not in ("RGB", "RGBA"):
+        transparent = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if transparent else "RGB")
+    return image, size
+
+
+def _encode(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def _fit(image: Image.Image, edge: int) -> Image.Image:
+    scale = edge / max(image.size)
+    if scale >= 1:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def render_variants(
+    store: BlobStore, digest: str, *, variants: Dict[str, int], quality: int, max_pixels: int
+) -> Dict[str, Any]:
+    """Store every variant of the original `digest`; runs in a worker process."""
+    image, (width, height) = _open(store, digest, max_pixels, fit=max(variants.values()))
+    rendered = {}
+    # Largest first, each resized from the previous one: cheaper than from the original
+    current = image
+    for name, edge in sorted(variants.items(), key=lambda v: -v[1]):
+        current = _fit(current, edge)
+        blob = store.put([_encode(current, quality)])
+        rendered[name] = {
+            "digest": blob.digest,
+            "size": blob.size,
+            "width": current.width,
+            "height": current.height,
+        }
+    return {"width": width, "height": height, "variants": rendered}
+
+
+def render_width(
+    store: BlobStore, digest: str, *, width: int, quality: int, max_pixels: int
+) -> bytes:
+    """WebP of `digest` scaled down to `width`; runs in a worker process."""
+    image, _ = _open(store, digest, max_pixels)
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return _encode(image, quality)
+
+
+# Application side
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+_cache: Optional[DiskLRUCache] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            # Forking a threaded server process is unsafe; workers start fresh
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _slots = threading.BoundedSemaphore(settings.IMAGE_MAX_PENDING)
+        return _pool
+
+
+def submit(fn: Callable, *args: Any, **kwargs: Any) -> Future:
+    """Run `fn` in the pool; raises PoolBusy when IMAGE_MAX_PENDING jobs are pending."""
+    pool = _get_pool()
+    if not _slots.acquire(blocking=False):
+        raise PoolBusy()
+    try:
+        future = pool.submit(fn, *args, **kwargs)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def get_variant_cache() -> DiskLRUCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskLRUCache(settings.IMAGE_CACHE_PATH, settings.IMAGE_CACHE_MAX_BYTES)
+    return _cache
+
+
+def _record(image_id: int, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        image = crud.property_image.get(db, id=image_id)
+        if image is None:  # Property deleted meanwhile
+            return
+        if result is None:
+            crud.property_image.fail(db, db_obj=image, error=error)
+        else:
+            variants = {
+                name: {**variant, "url": variant_url(image_id, name)}
+                for name, variant in result["variants"].items()
+            }
+            crud.property_image.complete(
+                db,
+                db_obj=image,
+                width=result["width"],
+                height=result["height"],
+                variants=variants,
+                gallery_url=variant_url(image_id, GALLERY_VARIANT),
+            )
+        db.commit()
+
+
+async def process_upload(image_id: int, store: BlobStore, digest: str, job: Future) -> None:
+    """
+    Wait for the variants of an upload submitted as `job`, then record them and
+    add the image to its property. Run after the upload's response is sent.
+    """
+    try:
+        result = await asyncio.wrap_future(job)
+    except ImageError as e:
+        await run_in_threadpool(_record, image_id, None, str(e))
+        return
+    except Exception:
+        logger.exception("Processing image %s (%s) failed", image_id, digest)
+        await run_in_threadpool(_record, image_id, None, "Processing failed")
+        return
+    await run_in_threadpool(_record, image_id, result, None)
+
+
+def submit_variants(store: BlobStore, digest: str) -> Future:
+    return submit(
+        render_variants,
+        store,
+        digest,
+        variants=VARIANTS,
+        quality=settings.IMAGE_WEBP_QUALITY,
+        max_pixels=settings.IMAGE_MAX_PIXELS,
+    )
+
+
+async def render_on_demand(
+    store: BlobStore, cache: DiskLRUCache, source_digest: str, width: int
+) -> str:
+    """Path of the cached rendering of `source_digest` at `width`, rendering it if needed."""
+    key = f"{source_digest}-{width}.webp"
+    path = await run_in_threadpool(cache.get, key)
+    if path is not None:
+        return path
+    data = await asyncio.wrap_future(submit(
+        render_width,
+        store,
+        source_digest,
+        width=width,
+        quality=settings.IMAGE_WEBP_QUALITY,
+        max_pixels=settings.IMAGE_MAX_PIXELS,
+    ))
+    return await run_in_threadpool(cache.put, key, data)
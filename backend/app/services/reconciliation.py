@@ -0,0 +1,291 @@
+"""
+Bank statement reconciliation.
+
+A statement is a CSV export with a header row and the columns `date`
+(YYYY-MM-DD), `amount`, and optionally `reference` (or `transaction_id`, the
+bank's transaction reference) and `contract_id`. It is read as a stream and
+reconciled in chunks, so memory stays flat however long the statement is:
+each chunk costs three lookups, whose results are hashed in memory,
+
+* payments by transaction id, for the chunk's references;
+* the chunk's contracts;
+* payments of those contracts around the chunk's dates, hashed by
+  (contract, amount in cents),
+
+followed by one bulk update and one bulk insert. Every line gets one result:
+
+* matched: a payment with the line's reference and amount, or else exactly
+  one payment of the contract with the same amount within `window_days`
+  and no reference yet, which is given the line's reference;
+* created: no such payment, but the amount is the rent of an active
+  contract whose term covers the date and which has no payment that month.
+  The missing payment is created;
+* ambiguous: the reference or the window matches more than one payment, or
+  the reference matches a payment of a different amount;
+* unmatched: anything else, including lines that do not parse.
+
+Writes go through the given session; roll it back for a dry run.
+"""
+import csv
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app import crud
+
+STATUSES = ("matched", "created", "ambiguous", "unmatched")
+REFERENCE_COLUMNS = ("reference", "transaction_id")
+
+
+class StatementError(ValueError):
+    pass
+
+
+@dataclass
+class StatementLine:
+    line: int
+    date: Optional[date] = None
+    amount_cents: Optional[int] = None
+    reference: Optional[str] = None
+    contract_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+def _cents(amount: Union[float, Decimal]) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _parse(line: int, row: Dict[str, str], reference_column: Optional[str]) -> StatementLine:
+    parsed = StatementLine(line=line)
+    reference = (row.get(reference_column) or "").strip() if reference_column else ""
+    parsed.reference = reference or None
+    try:
+        parsed.date = date.fromisoformat((row.get("date") or "").strip())
+    except ValueError:
+        parsed.error = "invalid date"
+        return parsed
+    try:
+        amount = Decimal((row.get("amount") or "").strip().replace(",", ""))
+    except InvalidOperation:
+        parsed.error = "invalid amount"
+        return parsed
+    if not amount.is_finite() or amount <= 0:
+        parsed.error = "not a credit"
+        return parsed
+    parsed.amount_cents = _cents(amount)
+    contract = (row.get("contract_id") or "").strip()
+    if contract:
+        if not contract.isdigit():
+            parsed.error = "invalid contract_id"
+            return parsed
+        parsed.contract_id = int(contract)
+    return parsed
+
+
+def read_statement(f: TextIO) -> Iterator[StatementLine]:
+    """Parse a statement lazily; raises StatementError if required columns are missing."""
+    reader = csv.DictReader(f)
+    fields = [name.strip().lower() for name in reader.fieldnames or ()]
+    missing = {"date", "amount"} - set(fields)
+    if missing:
+        raise StatementError(f"Statement is missing columns: {', '.join(sorted(missing))}")
+    reader.fieldnames = fields
+    reference_column = next((c for c in REFERENCE_COLUMNS if c in fields), None)
+    for row in reader:
+        yield _parse(reader.line_num, row, reference_column)
+
+
+def _chunks(lines: Iterable[StatementLine], size: int) -> Iterator[List[StatementLine]]:
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Reconciler:
+    def __init__(
+        self,
+        db: Session,
+        *,
+        owner_id: Optional[int] = None,
+        window_days: int = 3,
+        chunk_size: int = 5000,
+        payment_method: str = "bank_transfer",
+    ) -> None:
+        """Only payments and contracts of `owner_id`'s properties are considered, if given."""
+        self.db = db
+        self.owner_id = owner_id
+        self.window = timedelta(days=window_days)
+        self.chunk_size = chunk_size
+        self.payment_method = payment_method
+
+    def run(
+        self,
+        lines: Iterable[StatementLine],
+        emit: Callable[[Dict[str, Any]], None],
+        *,
+        after_chunk: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, int]:
+        """Reconcile `lines`, passing each line's result to `emit`; returns counts by status."""
+        counts: Counter = Counter()
+        for chunk in _chunks(lines, self.chunk_size):
+            for result in self._reconcile(chunk):
+                counts[result["status"]] += 1
+                emit(result)
+            if after_chunk is not None:
+                after_chunk()
+        return {status: counts[status] for status in STATUSES}
+
+    def _reconcile(self, chunk: List[StatementLine]) -> List[Dict[str, Any]]:
+        valid = [line for line in chunk if line.error is None]
+        by_reference: Dict[str, List[Dict[str, Any]]] = {}
+        references = {line.reference for line in valid if line.reference}
+        if references:
+            for id, _, amount, _, reference in crud.rent_payment.get_by_transaction_ids(
+                self.db, transaction_ids=references, owner_id=self.owner_id
+            ):
+                by_reference.setdefault(reference, []).append({"id": id, "amount_cents": _cents(amount)})
+
+        contracts: Dict[int, Tuple] = {}
+        candidates: Dict[Tuple[int, int], List[Tuple[date, int]]] = {}
+        paid_months = set()
+        contract_ids = {line.contract_id for line in valid if line.contract_id is not None}
+        if contract_ids:
+            for row in crud.rental_contract.get_terms_by_ids(
+                self.db, ids=contract_ids, owner_id=self.owner_id
+            ):
+                contracts[row[0]] = row
+            dated = [line.date for line in valid if line.contract_id in contracts]
+        else:
+            dated = []
+        if dated:
+            # Whole months, so that "already paid this month" sees every payment
+            date_from = (min(dated) - self.window).replace(day=1)
+            date_to = (max(dated) + self.window + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+            for id, contract_id, amount, payment_date, reference in crud.rent_payment.get_in_period(
+                self.db, contract_ids=contracts, date_from=date_from, date_to=date_to
+            ):
+                paid_months.add((contract_id, payment_date.year, payment_date.month))
+                if not reference:
+                    candidates.setdefault((contract_id, _cents(amount)), []).append((payment_date, id))
+
+        results = []
+        claimed: Dict[int, str] = {}
+        created: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        for line in chunk:
+            result = {
+                "line": line.line,
+                "date": line.date,
+                "amount": line.amount_cents / 100 if line.amount_cents is not None else None,
+                "reference": line.reference,
+                "contract_id": line.contract_id,
+                "payment_id": None,
+            }
+            results.append(result)
+            if line.error is not None:
+                result.update(status="unmatched", reason=line.error)
+                continue
+
+            payments = by_reference.get(line.reference) if line.reference else None
+            if payments:
+                if len(payments) > 1:
+                    result.update(status="ambiguous", reason="reference matches several payments")
+                elif payments[0]["amount_cents"] != line.amount_cents:
+                    result.update(
+                        status="ambiguous", reason="reference matches a payment of another amount",
+                        payment_id=payments[0]["id"],
+                    )
+                else:
+                    # A payment created from an earlier line gets its id after the insert
+                    result.update(status="matched", reason="reference", payment_id=payments[0]["id"])
+                continue
+            if line.contract_id is None:
+                result.update(
+                    status="unmatched",
+                    reason="unknown reference" if line.reference else "no reference or contract",
+                )
+                continue
+            contract = contracts.get(line.contract_id)
+            if contract is None:
+                result.update(status="unmatched", reason="unknown contract")
+                continue
+
+            in_window = [
+                (payment_date, id)
+                for payment_date, id in candidates.get((line.contract_id, line.amount_cents), ())
+                if abs(payment_date - line.date) <= self.window
+            ]
+            if len(in_window) > 1:
+                result.update(status="ambiguous", reason="several payments within the window")
+                continue
+            if in_window:
+                candidates[(line.contract_id, line.amount_cents)].remove(in_window[0])
+                payment_id = in_window[0][1]
+                if line.reference:
+                    claimed[payment_id] = line.reference
+                result.update(status="matched", reason="contract, amount and date", payment_id=payment_id)
+                continue
+
+            reason = self._not_due(contract, line, paid_months)
+            if reason:
+                result.update(status="unmatched", reason=reason)
+                continue
+            _, owner_id, _, _, _, due_day, _ = contract
+            payment = {
+                "contract_id": line.contract_id,
+                "amount": line.amount_cents / 100,
+                "payment_date": line.date,
+                "payment_method": self.payment_method,
+                "transaction_id": line.reference,
+                "is_late": line.date.day > due_day,
+                "late_fee": 0.0,
+                "notes": "Created from a bank statement",
+            }
+            paid_months.add((line.contract_id, line.date.year, line.date.month))
+            result.update(status="created", reason="outstanding rent")
+            created.append((payment, result))
+            if line.reference:
+                by_reference[line.reference] = [{"id": None, "amount_cents": line.amount_cents}]
+
+        crud.rent_payment.set_transaction_ids(self.db, transaction_ids=claimed)
+        ids = crud.rent_payment.create_many(
+            self.db,
+            objs_in=[payment for payment, _ in created],
+            owner_by_contract={id: contract[1] for id, contract in contracts.items()},
+        )
+        created_ids = {}
+        for id, (_, result) in zip(ids, created):
+            result["payment_id"] = id
+            if result["reference"]:
+                created_ids[result["reference"]] = id
+        if created_ids:
+            for result in results:
+                if result["status"] == "matched" and result["payment_id"] is None:
+                    result["payment_id"] = created_ids.get(result["reference"])
+        return results
+
+    def _not_due(self, contract: Tuple, line: StatementLine, paid_months: set) -> Optional[str]:
+        """Why `line` is not outstanding rent of `contract`, or None if it is."""
+        _, _, start_date, end_date, monthly_rent, _, is_active = contract
+        if not is_active:
+            return "contract is not active"
+        if not start_date <= line.date <= end_date + self.window:
+            return "outside the contract term"
+        if line.amount_cents != _cents(monthly_rent):
+            return "no payment of this amount"
+        if (line.contract_id, line.date.year, line.date.month) in paid_months:
+            return "rent for this month already paid"
+        return None
+
+
+def encode_result(result: Dict[str, Any]) -> bytes:
+    """One JSON line."""
+    return (json.dumps(result, separators=(",", ":"), default=str) + "\n").encode()
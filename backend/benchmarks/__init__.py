@@ -0,0 +1,7 @@
+"""
+Reproducible load benchmarks for the Property Rental API.
+
+`python -m benchmarks generate` fills a database with a synthetic dataset and
+`python -m benchmarks run` drives the API with a mixed workload, writing a
+JSON report that `python -m benchmarks compare` can diff against another run.
+"""
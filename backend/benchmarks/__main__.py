@@ -0,0 +1,344 @@
+"""
+Command line entry point:
+
+    python -m benchmarks generate --database-url postgresql://... --scale small --reset
+    python -m benchmarks run --base-url http://localhost:8000 --output results.json
+    python -m benchmarks compare baseline.json results.json
+    python -m benchmarks replay traffic.jsonl --in-process --speed 2 --output replay.json
+    python -m benchmarks capture-stats traffic.jsonl --output captured.json
+    python -m benchmarks cashflow --contracts 1000000 --months 36
+    python -m benchmarks encodings --items 100
+    python -m benchmarks affordability --tenants 1000 --properties 5
+    python -m benchmarks similarity --properties 100000
+    python -m benchmarks saved-searches --searches 200000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from dataclasses import replace
+from datetime import date
+
+MANIFEST = "bench_manifest.json"
+
+
+def _generate(args: argparse.Namespace) -> None:
+    from sqlalchemy import create_engine
+
+    from benchmarks.datagen import SCALES, generate
+
+    scale = SCALES[args.scale]
+    overrides = {
+        field: getattr(args, field)
+        for field in ("owners", "tenants", "properties", "contracts", "payments", "maintenance_requests")
+        if getattr(args, field) is not None
+    }
+    scale = replace(scale, **overrides)
+
+    def progress(table: str, loaded: int) -> None:
+        print(f"\r{table}: {loaded:,}", end="", file=sys.stderr, flush=True)
+
+    engine = create_engine(args.database_url)
+    manifest = generate(
+        engine,
+        scale,
+        seed=args.seed,
+        as_of=args.as_of,
+        chunk_size=args.chunk_size,
+        reset=args.reset,
+        progress=progress,
+    )
+    print(file=sys.stderr)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Dataset manifest written to {args.manifest}")
+
+
+def _run(args: argparse.Namespace) -> None:
+    if args.database_url:
+        # Must be set before the application settings are imported
+        os.environ["DATABASE_URL"] = args.database_url
+
+    import httpx
+
+    from benchmarks.datagen import Generator, Scale
+    from benchmarks.runner import DEFAULT_MIX, run_load
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    generator = Generator(
+        Scale(**manifest["scale"]),
+        seed=manifest["seed"],
+        as_of=date.fromisoformat(manifest["as_of"]),
+    )
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = {}
+        for part in args.mix.split(","):
+            name, _, weight = part.partition("=")
+            mix[name.strip()] = int(weight)
+
+    async def main():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        if args.in_process:
+            from app.main import app
+
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60.0
+            )
+        else:
+            client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0)
+        async with client:
+            return await run_load(
+                client,
+                generator,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                mix=mix,
+                seed=args.seed,
+            )
+
+    report = asyncio.run(main())
+    report["dataset"] = manifest
+    report["meta"]["target"] = "in-process" if args.in_process else args.base_url
+    _write_report(report, args.output)
+
+
+def _replay(args: argparse.Namespace) -> None:
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    import httpx
+
+    from benchmarks.datagen import BENCH_PASSWORD
+    from benchmarks.replay import load_capture, replay
+
+    records, skipped = load_capture(args.capture, limit=args.limit)
+    if skipped:
+        print(f"Skipping {skipped} requests whose body was too large to capture", file=sys.stderr)
+
+    async def main():
+        if args.in_process:
+            from app.main import app
+
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://replay", timeout=60.0
+            )
+        else:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0)
+        async with client:
+            return await replay(
+                client, records, speed=args.speed, concurrency=args.concurrency, password=args.password or BENCH_PASSWORD
+            )
+
+    report = asyncio.run(main())
+    report["meta"]["capture"] = args.capture
+    report["meta"]["target"] = "in-process" if args.in_process else args.base_url
+    _write_report(report, args.output)
+
+
+def _capture_stats(args: argparse.Namespace) -> None:
+    from benchmarks.replay import capture_summary, load_capture
+
+    records, _ = load_capture(args.capture)
+    report = capture_summary(records)
+    report["meta"]["capture"] = args.capture
+    _write_report(report, args.output)
+
+
+def _cashflow(args: argparse.Namespace) -> None:
+    from benchmarks.cashflow import bench_projection
+
+    report = bench_projection(
+        args.contracts,
+        months=args.months,
+        repeat=args.repeat,
+        seed=args.seed,
+        database_url=args.database_url,
+    )
+    print(json.dumps(report, indent=2))
+
+
+def _affordability(args: argparse.Namespace) -> None:
+    from benchmarks.affordability import bench_scoring
+
+    report = bench_scoring(args.tenants, args.properties, repeat=args.repeat, seed=args.seed)
+    print(json.dumps(report, indent=2))
+
+
+def _similarity(args: argparse.Namespace) -> None:
+    from benchmarks.similarity import bench_similarity
+
+    report = bench_similarity(
+        args.properties, k=args.k, queries=args.queries, repeat=args.repeat, seed=args.seed
+    )
+    print(json.dumps(report, indent=2))
+
+
+def _saved_searches(args: argparse.Namespace) -> None:
+    from benchmarks.saved_searches import bench_saved_searches
+
+    report = bench_saved_searches(
+        args.searches, cities=args.cities, listings=args.listings, repeat=args.repeat, seed=args.seed
+    )
+    print(json.dumps(report, indent=2))
+
+
+def _encodings(args: argparse.Namespace) -> None:
+    from benchmarks.encodings import bench_encodings
+
+    report = bench_encodings(args.items, repeat=args.repeat, seed=args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for route, results in report["pages"].items():
+        print(f"{route} ({report['items']} items)")
+        print(f"  {'format':<14} {'bytes':>9} {'ratio':>7} {'encode ms':>10}")
+        for name, row in results.items():
+            print(f"  {name:<14} {row['bytes']:>9} {row['ratio']:>7.3f} {row['best_ms']:>10.3f}")
+
+
+def _write_report(report: dict, output: str) -> None:
+    text = json.dumps(report, indent=2)
+    if not output:
+        print(text)
+        return
+    with open(output, "w") as f:
+        f.write(text)
+    total = report["total"]
+    print(
+        f"{total['requests']} requests, {total['throughput_rps']} req/s, "
+        f"p50 {total['latency_ms']['p50']}ms, p99 {total['latency_ms']['p99']}ms "
+        f"-> {output}"
+    )
+
+
+def _compare(args: argparse.Namespace) -> None:
+    from benchmarks.runner import compare
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    diff = compare(baseline, candidate)
+    if args.json:
+        print(json.dumps(diff, indent=2))
+        return
+
+    def fmt(value):
+        return "n/a" if value is None else f"{value:+.1f}%"
+
+    print(f"{'endpoint':<45} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for endpoint, row in diff.items():
+        if "only_in" in row:
+            print(f"{endpoint:<45} only in {row['only_in']}")
+            continue
+        print(
+            f"{endpoint:<45} {fmt(row['throughput_rps']):>9} {fmt(row['p50']):>9} "
+            f"{fmt(row['p95']):>9} {fmt(row['p99']):>9}"
+        )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Load a synthetic dataset")
+    gen.add_argument("--database-url", default=os.getenv("DATABASE_URL"), required=not os.getenv("DATABASE_URL"))
+    gen.add_argument("--scale", default="tiny", choices=["tiny", "small", "medium", "large"])
+    for field in ("owners", "tenants", "properties", "contracts", "payments", "maintenance-requests"):
+        gen.add_argument(f"--{field}", type=int, dest=field.replace("-", "_"))
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--as-of", type=date.fromisoformat, default=None, help="Reference date (YYYY-MM-DD)")
+    gen.add_argument("--chunk-size", type=int, default=10_000)
+    gen.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    gen.add_argument("--manifest", default=MANIFEST)
+    gen.set_defaults(func=_generate)
+
+    run = commands.add_parser("run", help="Drive the API with the mixed workload")
+    target = run.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8000")
+    target.add_argument("--in-process", action="store_true", help="Call app.main:app through ASGI")
+    run.add_argument("--database-url", help="Database for --in-process runs")
+    run.add_argument("--manifest", default=MANIFEST)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--duration", type=float, default=30.0)
+    run.add_argument("--warmup", type=float, default=5.0)
+    run.add_argument("--mix", help="Scenario weights, e.g. browse=60,login=5,owner_dashboard=20,payment=15")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", help="Write the JSON report here instead of stdout")
+    run.set_defaults(func=_run)
+
+    rep = commands.add_parser("replay", help="Re-issue captured traffic")
+    rep.add_argument("capture", help="JSON-lines file written by TRAFFIC_CAPTURE_PATH")
+    target = rep.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8000")
+    target.add_argument("--in-process", action="store_true", help="Call app.main:app through ASGI")
+    rep.add_argument("--database-url", help="Database for --in-process runs")
+    rep.add_argument("--speed", type=float, default=1.0, help="Time scale; 2 is twice as fast, 0 is unpaced")
+    rep.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    rep.add_argument("--password", help="Sent in place of redacted passwords (default: dataset password)")
+    rep.add_argument("--limit", type=int, help="Only replay the first N requests")
+    rep.add_argument("--output", help="Write the JSON report here instead of stdout")
+    rep.set_defaults(func=_replay)
+
+    stats = commands.add_parser("capture-stats", help="Latency report of the captured requests")
+    stats.add_argument("capture")
+    stats.add_argument("--output")
+    stats.set_defaults(func=_capture_stats)
+
+    cash = commands.add_parser("cashflow", help="Time the cash-flow projection")
+    cash.add_argument("--contracts", type=int, default=1_000_000)
+    cash.add_argument("--months", type=int, default=36)
+    cash.add_argument("--repeat", type=int, default=5)
+    cash.add_argument("--seed", type=int, default=0)
+    cash.add_argument("--database-url", help="Also time loading the rent roll of this database")
+    cash.set_defaults(func=_cashflow)
+
+    afford = commands.add_parser("affordability", help="Time tenant affordability scoring")
+    afford.add_argument("--tenants", type=int, default=1000)
+    afford.add_argument("--properties", type=int, default=5)
+    afford.add_argument("--repeat", type=int, default=5)
+    afford.add_argument("--seed", type=int, default=0)
+    afford.set_defaults(func=_affordability)
+
+    similar = commands.add_parser("similarity", help="Time the similar-property index")
+    similar.add_argument("--properties", type=int, default=100_000)
+    similar.add_argument("--k", type=int, default=10)
+    similar.add_argument("--queries", type=int, default=100)
+    similar.add_argument("--repeat", type=int, default=5)
+    similar.add_argument("--seed", type=int, default=0)
+    similar.set_defaults(func=_similarity)
+
+    saved = commands.add_parser("saved-searches", help="Time matching listings against saved searches")
+    saved.add_argument("--searches", type=int, default=200_000)
+    saved.add_argument("--cities", type=int, default=200)
+    saved.add_argument("--listings", type=int, default=100)
+    saved.add_argument("--repeat", type=int, default=5)
+    saved.add_argument("--seed", type=int, default=0)
+    saved.set_defaults(func=_saved_searches)
+
+    enc = commands.add_parser("encodings", help="Payload size and encode time per response format")
+    enc.add_argument("--items", type=int, default=100, help="Items per page")
+    enc.add_argument("--repeat", type=int, default=20)
+    enc.add_argument("--seed", type=int, default=0)
+    enc.add_argument("--json", action="store_true")
+    enc.set_defaults(func=_encodings)
+
+    cmp_ = commands.add_parser("compare", help="Diff two JSON reports")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("candidate")
+    cmp_.add_argument("--json", action="store_true")
+    cmp_.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Affordability scoring benchmark.
+
+Times `app.services.affordability` on synthetic applicants built directly as
+arrays: the scoring matrix alone, and the full ranking as the endpoint
+returns it (plain Python values for every tenant x property pair).
+"""
+from typing import Any, Dict
+
+import numpy as np
+
+from app.services.affordability import Applicants, rank, score
+from benchmarks.cashflow import _timed
+
+
+def synthetic_applicants(tenants: int, *, seed: int = 0) -> Applicants:
+    """`tenants` applicants, a tenth without a known income, most already renting."""
+    rng = np.random.default_rng(seed)
+    income = rng.integers(20, 400, tenants) * 10000.0 / 12.0
+    income[rng.random(tenants) < 0.1] = 0.0
+    payments = rng.integers(0, 60, tenants)
+    return Applicants(
+        tenant_id=np.arange(1, tenants + 1, dtype=np.int64),
+        monthly_income=income,
+        obligations=np.where(rng.random(tenants) < 0.6, rng.integers(20, 1200, tenants) * 50.0, 0.0),
+        payments=payments,
+        late_payments=rng.binomial(payments, 0.1),
+    )
+
+
+def bench_scoring(
+    tenants: int, properties: int, *, repeat: int = 5, seed: int = 0
+) -> Dict[str, Any]:
+    applicants = synthetic_applicants(tenants, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    rent = rng.integers(20, 1200, properties) * 50.0
+    property_ids = list(range(1, properties + 1))
+    report: Dict[str, Any] = {
+        "tenants": tenants,
+        "properties": properties,
+        "pairs": tenants * properties,
+        "score": _timed(lambda: score(applicants, rent), repeat),
+        "rank": _timed(lambda: rank(applicants, property_ids, rent), repeat),
+    }
+    report["pairs_per_second"] = round(report["pairs"] / (report["rank"]["best_ms"] / 1000.0))
+    return report
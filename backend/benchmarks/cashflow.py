@@ -0,0 +1,86 @@
+"""
+Cash-flow projection benchmark.
+
+Times `app.services.cashflow.project` on a synthetic rent roll built directly
+as arrays, so that a portfolio of a million contracts needs neither a
+database nor a million ORM rows. With a database URL the time to load a
+real rent roll (see `python -m benchmarks generate`) is measured as well.
+"""
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.services.cashflow import RentRoll, project
+
+
+def synthetic_rent_roll(contracts: int, *, seed: int = 0, as_of: Optional[date] = None) -> RentRoll:
+    """
+    `contracts` contracts over about as many properties, a tenth of them
+    vacant, with terms of six months to three years around `as_of`.
+    """
+    rng = np.random.default_rng(seed)
+    as_of = np.datetime64(as_of or date.today(), "D")
+    properties = max(1, int(contracts / 0.9))
+    start = as_of - rng.integers(0, 3 * 365, contracts)
+    return RentRoll(
+        contract_id=np.arange(1, contracts + 1, dtype=np.int64),
+        property_id=rng.integers(1, properties + 1, contracts),
+        start=start,
+        end=start + rng.integers(182, 3 * 365, contracts),
+        rent=rng.integers(20, 1200, contracts) * 50.0,
+        due_day=rng.choice(np.array([1, 5, 7, 10, 15, 28, 31]), contracts),
+        property_ids=np.arange(1, properties + 1, dtype=np.int64),
+        asking_rent=rng.integers(20, 1200, properties) * 50.0,
+    )
+
+
+def _timed(func, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "best_ms": round(min(timings) * 1000.0, 3),
+        "median_ms": round(float(np.median(timings)) * 1000.0, 3),
+    }
+
+
+def bench_projection(
+    contracts: int,
+    *,
+    months: int = 36,
+    repeat: int = 5,
+    seed: int = 0,
+    database_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    start = date.today().replace(day=1)
+    roll = synthetic_rent_roll(contracts, seed=seed)
+    report: Dict[str, Any] = {
+        "contracts": contracts,
+        "properties": len(roll.property_ids),
+        "months": months,
+        "project": _timed(lambda: project(roll, start=start, months=months), repeat),
+    }
+    report["contracts_per_second"] = round(contracts / (report["project"]["best_ms"] / 1000.0))
+    if database_url:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+
+        from app.services.cashflow import load_rent_roll
+
+        engine = create_engine(database_url)
+        with Session(engine) as db:
+            loaded = {}
+
+            def load() -> None:
+                loaded["roll"] = load_rent_roll(db)
+
+            report["load"] = _timed(load, 1)
+            report["loaded_contracts"] = len(loaded["roll"])
+            roll = loaded["roll"]
+            report["project_loaded"] = _timed(lambda: project(roll, start=start, months=months), repeat)
+        engine.dispose()
+    return report
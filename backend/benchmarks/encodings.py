@@ -0,0 +1,116 @@
+"""
+Response encoding benchmark.
+
+Encodes synthetic `/properties` and `/contracts/{id}/payments` pages the way
+the API does (response model, then `jsonable_encoder`) in every format the
+API negotiates, JSON or MessagePack, each uncompressed, gzipped or
+brotli-compressed, and reports the payload size and the time to produce it.
+Compression uses the levels configured for the compression middleware.
+"""
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas
+from app.api import responses
+from app.core.compression import _Compressor, brotli
+from app.core.config import settings
+
+CITIES = ["Mumbai", "Pune", "Bengaluru", "Chennai", "Hyderabad", "Delhi", "Kolkata"]
+TYPES = ["apartment", "house", "studio", "villa"]
+METHODS = ["upi", "bank_transfer", "card", "cash"]
+
+
+def property_page(items: int, *, seed: int = 0) -> List[Any]:
+    rng = random.Random(seed)
+    page = []
+    for i in range(1, items + 1):
+        city = rng.choice(CITIES)
+        page.append(schemas.Property(
+            id=i,
+            owner_id=rng.randint(1, items // 10 + 1),
+            title=f"{rng.randint(1, 4)} BHK {rng.choice(TYPES)} in {city}",
+            description="Well-lit home close to schools, shops and public transport. " * rng.randint(1, 3),
+            property_type=rng.choice(TYPES),
+            address=f"{rng.randint(1, 999)}, Sector {rng.randint(1, 80)}",
+            city=city,
+            state="Maharashtra",
+            zip_code=f"{rng.randint(400001, 499999)}",
+            bedrooms=rng.randint(1, 5),
+            bathrooms=float(rng.randint(1, 4)),
+            area_sqft=float(rng.randint(40, 400) * 10),
+            monthly_rent=float(rng.randint(20, 1200) * 50),
+            security_deposit=float(rng.randint(40, 2400) * 50),
+            is_available=rng.random() < 0.3,
+            amenities='["parking", "lift", "power backup"]',
+            images=f'["{settings.API_V1_STR}/properties/images/{i}/large"]',
+        ))
+    return jsonable_encoder(page)
+
+
+def payment_page(items: int, *, seed: int = 0) -> List[Any]:
+    rng = random.Random(seed)
+    first = date(2020, 1, 1)
+    page = []
+    for i in range(1, items + 1):
+        late = rng.random() < 0.1
+        page.append(schemas.RentPayment(
+            id=i,
+            contract_id=1,
+            amount=float(rng.randint(20, 1200) * 50),
+            payment_date=first + timedelta(days=30 * i + rng.randint(0, 10)),
+            payment_method=rng.choice(METHODS),
+            transaction_id=f"TXN{rng.getrandbits(48):012X}",
+            is_late=late,
+            late_fee=float(rng.randint(1, 20) * 50) if late else 0.0,
+            notes=None,
+        ))
+    return jsonable_encoder(page)
+
+
+def _formats() -> Dict[str, Callable[[Any], bytes]]:
+    def compressed(encode: Callable[[Any], bytes], encoding: str) -> Callable[[Any], bytes]:
+        def run(content: Any) -> bytes:
+            compressor = _Compressor(
+                encoding, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY
+            )
+            return compressor.compress(encode(content)) + compressor.finish()
+        return run
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    formats = {}
+    for media_type, (encode, _) in responses.ENCODERS.items():
+        if media_type == responses.MSGPACK and responses.msgpack is None:
+            continue
+        name = "msgpack" if media_type == responses.MSGPACK else "json"
+        formats[name] = encode
+        for encoding in encodings:
+            formats[f"{name}+{encoding}"] = compressed(encode, encoding)
+    return formats
+
+
+def _timed(func: Callable[[], bytes], repeat: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func()
+        timings.append(time.perf_counter() - started)
+    return {"bytes": len(body), "best_ms": round(min(timings) * 1000.0, 3)}
+
+
+def bench_encodings(items: int = 100, *, repeat: int = 20, seed: int = 0) -> Dict[str, Any]:
+    pages = {
+        "/properties": property_page(items, seed=seed),
+        "/contracts/{id}/payments": payment_page(items, seed=seed),
+    }
+    report: Dict[str, Any] = {"items": items, "pages": {}}
+    for route, content in pages.items():
+        results = {name: _timed(lambda: encode(content), repeat) for name, encode in _formats().items()}
+        baseline = results["json"]["bytes"]
+        for result in results.values():
+            result["ratio"] = round(result["bytes"] / baseline, 3)
+        report["pages"][route] = results
+    return report
@@ -0,0 +1,168 @@
+"""
+Replay of captured traffic (see app/core/traffic_capture.py).
+
+Requests are re-issued with their original relative timing divided by
+`speed`; speed 0 sends them as fast as `concurrency` allows. Authenticated
+requests get a freshly minted token for the captured user id and redacted
+password fields are filled in with `password`, so the target should run on a
+restored snapshot of the database the traffic was captured against (or on a
+generated dataset, whose users all share BENCH_PASSWORD).
+
+Latencies are summarised per route in the same report format as `run_load`,
+so replays of two builds can be diffed with `runner.compare`, and
+`capture_summary` turns the captured latencies into a report as well.
+"""
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+import httpx
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.core.traffic_capture import REDACTED
+from benchmarks.datagen import BENCH_PASSWORD
+from benchmarks.runner import Recorder, _git_commit
+
+
+def load_capture(path: str, *, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """Records in timestamp order, and how many were skipped for a truncated body."""
+    records = []
+    skipped = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("body_truncated"):
+                skipped += 1
+                continue
+            records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    if limit is not None:
+        records = records[:limit]
+    return records, skipped
+
+
+def endpoint_name(record: Dict[str, Any]) -> str:
+    """'GET /properties/{property_id}', matching the names used by the load runner."""
+    route = record.get("route") or record["path"]
+    if route.startswith(settings.API_V1_STR):
+        route = route[len(settings.API_V1_STR):]
+    return f"{record['method']} {route}"
+
+
+def capture_summary(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Report of the latencies observed while capturing."""
+    recorder = Recorder()
+    recorder.enabled = True
+    for record in records:
+        recorder.record(endpoint_name(record), record["status"], record["duration_ms"] / 1000.0)
+    duration = records[-1]["ts"] - records[0]["ts"] if len(records) > 1 else 0.0
+    report = recorder.summary(duration)
+    report["meta"] = {"source": "capture", "requests": len(records)}
+    return report
+
+
+class Replayer:
+    def __init__(self, client: httpx.AsyncClient, password: str, recorder: Recorder) -> None:
+        self.client = client
+        self.password = password
+        self.recorder = recorder
+        self.status_mismatches: Dict[str, int] = {}
+        self._tokens: Dict[int, str] = {}
+
+    def _headers(self, record: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if record.get("content_type"):
+            headers["Content-Type"] = record["content_type"]
+        user = record.get("user")
+        if user is not None:
+            if user not in self._tokens:
+                self._tokens[user] = f"Bearer {create_access_token(user)}"
+            headers["Authorization"] = self._tokens[user]
+        return headers
+
+    def _body(self, record: Dict[str, Any]) -> Optional[bytes]:
+        if "body_b64" in record:
+            return base64.b64decode(record["body_b64"])
+        if "body" not in record:
+            return None
+        body = record["body"]
+        content_type = record.get("content_type", "")
+        if content_type.startswith("application/json"):
+            body = body.replace(json.dumps(REDACTED), json.dumps(self.password))
+        elif content_type.startswith("application/x-www-form-urlencoded"):
+            body = body.replace(quote_plus(REDACTED), quote_plus(self.password))
+        return body.encode("utf-8")
+
+    async def send(self, record: Dict[str, Any]) -> None:
+        url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        endpoint = endpoint_name(record)
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                record["method"], url, headers=self._headers(record), content=self._body(record)
+            )
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 599
+        self.recorder.record(endpoint, status, time.perf_counter() - started)
+        if status != record.get("status"):
+            self.status_mismatches[endpoint] = self.status_mismatches.get(endpoint, 0) + 1
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    records: List[Dict[str, Any]],
+    *,
+    speed: float = 1.0,
+    concurrency: int = 64,
+    password: str = BENCH_PASSWORD,
+) -> Dict[str, Any]:
+    recorder = Recorder()
+    recorder.enabled = True
+    replayer = Replayer(client, password, recorder)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = []
+    max_lag = 0.0
+
+    async def issue(record: Dict[str, Any]) -> None:
+        try:
+            await replayer.send(record)
+        finally:
+            slots.release()
+
+    started = time.perf_counter()
+    first_ts = records[0]["ts"] if records else 0.0
+    for record in records:
+        if speed > 0:
+            due = started + (record["ts"] - first_ts) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        if speed > 0:
+            # How far behind the original schedule the target has pushed us
+            max_lag = max(max_lag, time.perf_counter() - due)
+        tasks.append(asyncio.create_task(issue(record)))
+    await asyncio.gather(*tasks)
+    measured = time.perf_counter() - started
+
+    report = recorder.summary(measured)
+    report["status_mismatches"] = replayer.status_mismatches
+    report["meta"] = {
+        "source": "replay",
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": _git_commit(),
+        "requests": len(records),
+        "speed": speed,
+        "concurrency": concurrency,
+        "duration_seconds": round(measured, 3),
+        "max_schedule_lag_ms": round(max_lag * 1000.0, 3),
+    }
+    return report
@@ -0,0 +1,268 @@
+"""
+Concurrent load runner.
+
+Each worker repeatedly picks a scenario from a weighted mix and issues the
+requests a real client would make for it. Latencies are recorded per endpoint
+(route template, not concrete URL) and summarised into a JSON report.
+"""
+import asyncio
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from benchmarks.datagen import BENCH_PASSWORD, CITIES, PROPERTY_TYPES, Generator
+
+API = settings.API_V1_STR
+
+DEFAULT_MIX = {"browse": 60, "login": 5, "owner_dashboard": 20, "payment": 15}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenarios: Dict[str, int] = defaultdict(int)
+        self.enabled = False
+
+    def record(self, endpoint: str, status: int, seconds: float) -> None:
+        if not self.enabled:
+            return
+        self.latencies[endpoint].append(seconds)
+        if status >= 400:
+            self.errors[endpoint] += 1
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        endpoints = {}
+        everything: List[float] = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values.sort()
+            everything.extend(values)
+            endpoints[endpoint] = self._stats(values, self.errors[endpoint], duration)
+        everything.sort()
+        return {
+            "endpoints": endpoints,
+            "total": self._stats(everything, sum(self.errors.values()), duration),
+            "scenarios": dict(self.scenarios),
+        }
+
+    @staticmethod
+    def _stats(values: List[float], errors: int, duration: float) -> Dict[str, Any]:
+        ms = lambda v: round(v * 1000.0, 3)
+        return {
+            "requests": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / duration, 2) if duration else 0.0,
+            "latency_ms": {
+                "mean": ms(sum(values) / len(values)) if values else 0.0,
+                "p50": ms(percentile(values, 50)),
+                "p95": ms(percentile(values, 95)),
+                "p99": ms(percentile(values, 99)),
+                "max": ms(values[-1]) if values else 0.0,
+            },
+        }
+
+
+class Workload:
+    """
+    The scenarios of the mixed workload. Ids are drawn from the dataset layout
+    described by `generator`, so every request targets rows that exist.
+    """
+
+    def __init__(
+        self, client: httpx.AsyncClient, generator: Generator, recorder: Recorder, rng: random.Random
+    ) -> None:
+        self.client = client
+        self.generator = generator
+        self.scale = generator.scale
+        self.recorder = recorder
+        self.rng = rng
+        self._tokens: Dict[int, Dict[str, str]] = {}
+
+    def _auth(self, user_id: int) -> Dict[str, str]:
+        # Tokens are minted locally so that only the login scenario pays for bcrypt
+        if user_id not in self._tokens:
+            self._tokens[user_id] = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+        return self._tokens[user_id]
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[Any]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 599
+        self.recorder.record(endpoint, status, time.perf_counter() - started)
+        if response is not None and status < 400:
+            return response.json()
+        return None
+
+    async def browse(self) -> None:
+        city, state = self.rng.choice(CITIES)
+        params: Dict[str, Any] = {"city": city}
+        if self.rng.random() < 0.5:
+            params["max_rent"] = self.rng.choice([15_000, 25_000, 40_000])
+        if self.rng.random() < 0.3:
+            params["min_bedrooms"] = self.rng.randint(1, 4)
+        if self.rng.random() < 0.2:
+            params["property_type"] = self.rng.choice(PROPERTY_TYPES)
+        listing = await self._request("GET /properties/", "GET", f"{API}/properties/", params=params)
+        for item in (listing or [])[: self.rng.randint(1, 3)]:
+            await self._request(
+                "GET /properties/{property_id}", "GET", f"{API}/properties/{item['id']}"
+            )
+
+    async def login(self) -> None:
+        if self.rng.random() < 0.5:
+            email = f"owner{self.rng.randrange(self.scale.owners)}@bench.example.com"
+        else:
+            email = f"tenant{self.rng.randrange(self.scale.tenants)}@bench.example.com"
+        await self._request(
+            "POST /auth/login", "POST", f"{API}/auth/login",
+            data={"username": email, "password": BENCH_PASSWORD},
+        )
+
+    async def owner_dashboard(self) -> None:
+        headers = self._auth(self.scale.owner_user_id(self.rng.randrange(self.scale.owners)))
+        await self._request(
+            "GET /owners/me/summary", "GET", f"{API}/owners/me/summary", headers=headers
+        )
+        await self._request(
+            "GET /properties/my-properties", "GET", f"{API}/properties/my-properties",
+            headers=headers,
+        )
+        contracts = await self._request("GET /contracts/", "GET", f"{API}/contracts/", headers=headers)
+        # The home screen fans out to payments and maintenance of the first contracts
+        for contract in (contracts or [])[:5]:
+            await self._request(
+                "GET /contracts/{contract_id}/payments", "GET",
+                f"{API}/contracts/{contract['id']}/payments", headers=headers,
+            )
+            await self._request(
+                "GET /contracts/{contract_id}/maintenance", "GET",
+                f"{API}/contracts/{contract['id']}/maintenance", headers=headers,
+            )
+
+    async def payment(self) -> None:
+        for _ in range(10):
+            index = self.rng.randrange(self.scale.active_contracts)
+            if self.generator.is_active_contract(index):
+                break
+        else:
+            return
+        tenant_user = self.scale.tenant_user_id(self.scale.contract_tenant_index(index))
+        contract_id = index + 1
+        await self._request(
+            "POST /contracts/{contract_id}/payments", "POST",
+            f"{API}/contracts/{contract_id}/payments",
+            headers=self._auth(tenant_user),
+            json={
+                "contract_id": contract_id,
+                "amount": self.generator.rent(self.scale.contract_property_index(index)),
+                "payment_date": self.generator.as_of.isoformat(),
+                "payment_method": "upi",
+                "transaction_id": f"RUN-{self.rng.getrandbits(48):012x}",
+            },
+        )
+
+
+async def _worker(workload: Workload, mix: Dict[str, int], deadline: float) -> None:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    while time.perf_counter() < deadline:
+        name = workload.rng.choices(names, weights)[0]
+        if workload.recorder.enabled:
+            workload.recorder.scenarios[name] += 1
+        await getattr(workload, name)()
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    generator: Generator,
+    *,
+    concurrency: int = 16,
+    duration: float = 30.0,
+    warmup: float = 5.0,
+    mix: Dict[str, int] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    mix = mix or DEFAULT_MIX
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    recorder = Recorder()
+    workloads = [
+        Workload(client, generator, recorder, random.Random(seed * 1_000_003 + n))
+        for n in range(concurrency)
+    ]
+    started = time.perf_counter()
+    deadline = started + warmup + duration
+    tasks = [asyncio.create_task(_worker(w, mix, deadline)) for w in workloads]
+
+    await asyncio.sleep(warmup)
+    recorder.enabled = True
+    measured_from = time.perf_counter()
+    await asyncio.gather(*tasks)
+    measured = time.perf_counter() - measured_from
+
+    report = recorder.summary(measured)
+    report["meta"] = {
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "concurrency": concurrency,
+        "duration_seconds": round(measured, 3),
+        "warmup_seconds": warmup,
+        "mix": mix,
+        "seed": seed,
+    }
+    return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change of throughput and latency percentiles per endpoint."""
+
+    def change(old: float, new: float) -> Optional[float]:
+        return round((new - old) / old * 100.0, 1) if old else None
+
+    result = {}
+    endpoints = sorted(set(baseline["endpoints"]) | set(candidate["endpoints"]))
+    for endpoint in endpoints + ["total"]:
+        old = baseline["total"] if endpoint == "total" else baseline["endpoints"].get(endpoint)
+        new = candidate["total"] if endpoint == "total" else candidate["endpoints"].get(endpoint)
+        if not old or not new:
+            result[endpoint] = {"only_in": "candidate" if new else "baseline"}
+            continue
+        result[endpoint] = {
+            "throughput_rps": change(old["throughput_rps"], new["throughput_rps"]),
+            **{
+                key: change(old["latency_ms"][key], new["latency_ms"][key])
+                for key in ("p50", "p95", "p99")
+            },
+        }
+    return result
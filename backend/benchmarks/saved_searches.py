@@ -0,0 +1,89 @@
+"""
+Saved-search matching benchmark.
+
+Builds an `app.core.search_index.SearchIndex` over synthetic saved searches
+and times loading it, matching listings against it as property creation
+does, and adding and removing single searches.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.core.search_index import Listing, SearchFilters, SearchIndex
+from benchmarks.cashflow import _timed
+
+TYPES = ["Apartment", "House", "Condo", "Villa", "Studio"]
+
+
+def _places(cities: int) -> List[str]:
+    return [f"City {i}" for i in range(cities)]
+
+
+def synthetic_searches(searches: int, *, cities: int = 200, seed: int = 0) -> List[SearchFilters]:
+    """Mostly by city, every one with a rent ceiling; a few by state or range only."""
+    rng = np.random.default_rng(seed)
+    places = _places(cities)
+    rows = []
+    for i in range(searches):
+        kind = rng.random()
+        city = places[rng.integers(cities)] if kind < 0.9 else None
+        state = f"State {rng.integers(cities // 10 or 1)}" if 0.9 <= kind < 0.97 else None
+        rows.append(SearchFilters(
+            id=i + 1,
+            user_id=int(rng.integers(1, searches // 5 + 2)),
+            city=city,
+            state=state,
+            min_bedrooms=int(rng.integers(1, 4)) if rng.random() < 0.5 else None,
+            max_rent=float(rng.integers(10, 300) * 500),
+            property_type=TYPES[rng.integers(len(TYPES))] if rng.random() < 0.3 else None,
+        ))
+    return rows
+
+
+def synthetic_listings(listings: int, *, cities: int = 200, seed: int = 0) -> List[Listing]:
+    rng = np.random.default_rng(seed)
+    places = _places(cities)
+    return [
+        Listing(
+            id=i + 1,
+            owner_id=0,
+            city=places[city],
+            state=f"State {city % (cities // 10 or 1)}",
+            property_type=TYPES[rng.integers(len(TYPES))],
+            bedrooms=int(rng.integers(1, 6)),
+            monthly_rent=float(rng.integers(10, 300) * 500),
+        )
+        for i, city in enumerate(rng.integers(0, cities, listings))
+    ]
+
+
+def bench_saved_searches(
+    searches: int, *, cities: int = 200, listings: int = 100, repeat: int = 5, seed: int = 0
+) -> Dict[str, Any]:
+    rows = synthetic_searches(searches, cities=cities, seed=seed)
+    index = SearchIndex()
+    report: Dict[str, Any] = {
+        "searches": searches,
+        "cities": cities,
+        "load": _timed(lambda: index.load(rows), 1),
+    }
+    probes = synthetic_listings(listings, cities=cities, seed=seed + 1)
+    report["matches_per_listing"] = sum(len(index.matches(p)) for p in probes) / listings
+
+    def match() -> None:
+        for probe in probes:
+            index.matches(probe)
+
+    timing = _timed(match, repeat)
+    report["match"] = {name: round(ms / listings, 3) for name, ms in timing.items()}
+
+    extra = [row._replace(id=searches + i + 1) for i, row in enumerate(rows[:listings])]
+
+    def add_and_remove() -> None:
+        index.add_all(extra)
+        for row in extra:
+            index.remove(row.id)
+
+    timing = _timed(add_and_remove, repeat)
+    report["add_and_remove"] = {name: round(ms / listings, 4) for name, ms in timing.items()}
+    return report
@@ -0,0 +1,65 @@
+"""
+Similar-property index benchmark.
+
+Builds an `app.core.similarity.SimilarityIndex` over synthetic listings and
+times loading it, k-nearest-neighbour queries, and single-property upserts
+as the CRUD write paths apply them.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.core.similarity import PropertyFeatures, SimilarityIndex
+from benchmarks.cashflow import _timed
+
+CITIES = ["Mumbai", "Pune", "Bangalore", "Chennai", "Delhi", "Hyderabad", "Kolkata", "Jaipur"]
+TYPES = ["Apartment", "House", "Condo", "Villa", "Studio"]
+AMENITIES = ["parking", "gym", "pool", "lift", "security", "garden", "power backup", "wifi"]
+
+
+def synthetic_listings(properties: int, *, seed: int = 0) -> List[PropertyFeatures]:
+    rng = np.random.default_rng(seed)
+    bedrooms = rng.integers(1, 6, properties)
+    return [
+        PropertyFeatures(
+            id=i + 1,
+            city=CITIES[rng.integers(len(CITIES))],
+            property_type=TYPES[rng.integers(len(TYPES))],
+            bedrooms=int(bedrooms[i]),
+            bathrooms=float(max(1, bedrooms[i] - rng.integers(0, 2))),
+            area_sqft=float(bedrooms[i] * rng.integers(350, 600)),
+            monthly_rent=float(rng.integers(10, 300) * 500),
+            amenities='["' + '", "'.join(rng.choice(AMENITIES, rng.integers(0, 5), replace=False)) + '"]',
+            is_available=bool(rng.random() < 0.7),
+        )
+        for i in range(properties)
+    ]
+
+
+def bench_similarity(
+    properties: int, *, k: int = 10, queries: int = 100, repeat: int = 5, seed: int = 0
+) -> Dict[str, Any]:
+    listings = synthetic_listings(properties, seed=seed)
+    index = SimilarityIndex()
+    report: Dict[str, Any] = {
+        "properties": properties,
+        "k": k,
+        "load": _timed(lambda: index.load(listings), 1),
+    }
+    probes = [listings[i] for i in np.random.default_rng(seed + 1).integers(0, properties, queries)]
+    load = lambda: listings  # noqa: E731 - the index is loaded already
+
+    def query() -> None:
+        for probe in probes:
+            index.similar(probe, k, load=load)
+
+    timing = _timed(query, repeat)
+    report["query"] = {name: round(ms / queries, 3) for name, ms in timing.items()}
+
+    def upsert() -> None:
+        for probe in probes:
+            index.upsert(probe._replace(monthly_rent=probe.monthly_rent + 100.0))
+
+    timing = _timed(upsert, repeat)
+    report["upsert"] = {name: round(ms / queries, 4) for name, ms in timing.items()}
+    return report
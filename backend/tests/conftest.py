@@ -0,0 +1,290 @@
+import io
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models
+from app.api import totals
+from app.core import rent_stats, search_index, similarity
+from app.core.blobstore import BlobStore, LocalBlobStore, get_blob_store
+from app.core.disk_cache import DiskLRUCache
+from app.core.security import create_access_token, get_password_hash
+from app.db import session as db_session
+from app.db.session import Base
+from app.main import app
+from app.services.images import get_variant_cache
+
+# A single in-memory SQLite database shared by every connection in the pool
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+# Hashing is deliberately slow, so every seeded user shares one hash
+PASSWORD = "password123"
+HASHED_PASSWORD = get_password_hash(PASSWORD)
+
+
+class QueryCounter:
+    """
+    Records every SQL statement sent to the test engine while active.
+    """
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        self.statements = []
+        self.active = True
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.active = False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@dataclass
+class Seed:
+    owner: models.User
+    other_owner: models.User
+    tenant_user: models.User
+    tenant: models.Tenant
+    properties: List[models.Property] = field(default_factory=list)
+    contracts: List[models.RentalContract] = field(default_factory=list)
+    payments: List[models.RentPayment] = field(default_factory=list)
+    maintenance_requests: List[models.MaintenanceRequest] = field(default_factory=list)
+    documents: List[models.ContractDocument] = field(default_factory=list)
+    images: List[models.PropertyImage] = field(default_factory=list)
+    vacant_property: models.Property = None
+    plain_user: models.User = None
+    admin: models.User = None
+    saved_search: models.SavedSearch = None
+
+    def headers(self, user: models.User) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+def _user(db: Session, email: str, **flags) -> models.User:
+    user = models.User(
+        email=email,
+        hashed_password=HASHED_PASSWORD,
+        full_name=email.split("@")[0].title(),
+        is_active=True,
+        **flags,
+    )
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _property(db: Session, owner: models.User, index: int, **values) -> models.Property:
+    data = dict(
+        title=f"Property {index}",
+        description="A place to live",
+        property_type="Apartment",
+        address=f"{index} Main Street",
+        city="Pune",
+        state="Maharashtra",
+        zip_code="411001",
+        bedrooms=2,
+        bathrooms=1.0,
+        area_sqft=850.0,
+        monthly_rent=20000.0 + index,
+        security_deposit=40000.0,
+        is_available=True,
+        owner_id=owner.id,
+    )
+    data.update(values)
+    obj = models.Property(**data)
+    db.add(obj)
+    db.flush()
+    return obj
+
+
+def image_bytes(width: int = 64, height: int = 48, format: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, format)
+    return buffer.getvalue()
+
+
+def _image(db: Session, store: BlobStore, prop: models.Property) -> models.PropertyImage:
+    """A processed image whose only variant is a thumbnail."""
+    original = store.put([image_bytes()])
+    thumb = store.put([image_bytes(32, 24, "WEBP")])
+    image = models.PropertyImage(
+        digest=original.digest,
+        content_type="image/png",
+        status="ready",
+        width=64,
+        height=48,
+        property_id=prop.id,
+    )
+    db.add(image)
+    db.flush()
+    image.variants = {
+        "thumb": {
+            "digest": thumb.digest, "size": thumb.size, "width": 32, "height": 24,
+            "url": f"/api/v1/properties/images/{image.id}/thumb",
+        },
+    }
+    db.flush()
+    return image
+
+
+def seed_database(db: Session, size: int = 2, store: Optional[BlobStore] = None) -> Seed:
+    """
+    Populate the database with `size` rented properties per owner, each with
+    `size` payments and maintenance requests, so that result sets scale with
+    `size` while the shape of the data stays the same. With a `store`, every
+    contract also gets a document and every rented property a processed image.
+    """
+    seed = Seed(
+        owner=_user(db, "owner@example.com", is_property_owner=True),
+        other_owner=_user(db, "other@example.com", is_property_owner=True),
+        tenant_user=_user(db, "tenant@example.com", is_tenant=True),
+        tenant=None,
+    )
+    seed.plain_user = _user(db, "plain@example.com")
+    seed.admin = _user(db, "admin@example.com", is_superuser=True)
+    seed.tenant = models.Tenant(
+        date_of_birth=date(1990, 1, 1),
+        identification_type="PAN",
+        identification_number="ABCDE1234F",
+        annual_income=1200000,
+        user_id=seed.tenant_user.id,
+    )
+    db.add(seed.tenant)
+    db.flush()
+
+    today = date.today()
+    for owner in (seed.owner, seed.other_owner):
+        for i in range(size):
+            prop = _property(db, owner, len(seed.properties), is_available=False)
+            seed.properties.append(prop)
+            contract = models.RentalContract(
+                start_date=today - timedelta(days=180),
+                end_date=today + timedelta(days=185),
+                monthly_rent=prop.monthly_rent,
+                security_deposit=prop.security_deposit,
+                payment_due_day=5,
+                property_id=prop.id,
+                tenant_id=seed.tenant.id,
+            )
+            db.add(contract)
+            db.flush()
+            seed.contracts.append(contract)
+            for j in range(size):
+                payment = models.RentPayment(
+                    amount=contract.monthly_rent,
+                    payment_date=today - timedelta(days=30 * j),
+                    payment_method="bank_transfer",
+                    transaction_id=f"TXN-{contract.id}-{j}",
+                    contract_id=contract.id,
+                )
+                request = models.MaintenanceRequest(
+                    title=f"Issue {j}",
+                    description="Something is broken",
+                    request_date=today - timedelta(days=j),
+                    priority="high" if j % 2 else "medium",
+                    contract_id=contract.id,
+                )
+                db.add_all([payment, request])
+                db.flush()
+                seed.payments.append(payment)
+                seed.maintenance_requests.append(request)
+            if store is not None:
+                blob = store.put([f"Lease agreement {contract.id}\n".encode() * 100])
+                document = models.ContractDocument(
+                    digest=blob.digest,
+                    size=blob.size,
+                    content_type="text/plain",
+                    filename=f"lease-{contract.id}.txt",
+                    contract_id=contract.id,
+                    uploaded_by_id=owner.id,
+                )
+                db.add(document)
+                db.flush()
+                seed.documents.append(document)
+                seed.images.append(_image(db, store, prop))
+        for i in range(size):
+            seed.properties.append(_property(db, owner, len(seed.properties)))
+    seed.vacant_property = _property(db, seed.owner, len(seed.properties))
+    seed.saved_search = models.SavedSearch(
+        name="Houses in Mumbai", city="Mumbai", min_bedrooms=2, property_type="House",
+        user_id=seed.tenant_user.id,
+    )
+    db.add(seed.saved_search)
+    # The seed bypasses the CRUD write paths that keep the counters current
+    for owner in (seed.owner, seed.other_owner):
+        crud.owner_summary.rebuild(db, owner_id=owner.id)
+    db.commit()
+    return seed
+
+
+@pytest.fixture
+def db(monkeypatch) -> Session:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # The in-memory indexes and rent sketches describe an earlier test's database
+    similarity.index.clear()
+    rent_stats.stats.clear()
+    search_index.index.clear()
+    monkeypatch.setattr(db_session, "SessionLocal", TestingSessionLocal)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def blob_store(tmp_path) -> LocalBlobStore:
+    return LocalBlobStore(str(tmp_path / "blobs"))
+
+
+@pytest.fixture
+def variant_cache(tmp_path) -> DiskLRUCache:
+    return DiskLRUCache(str(tmp_path / "image-cache"), 10 * 1024 * 1024)
+
+
+@pytest.fixture
+def client(db, blob_store, variant_cache) -> TestClient:
+    app.dependency_overrides[get_blob_store] = lambda: blob_store
+    app.dependency_overrides[get_variant_cache] = lambda: variant_cache
+    # Cached totals refer to an earlier test's database
+    totals.clear_cache()
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        app.dependency_overrides.pop(get_blob_store, None)
+        app.dependency_overrides.pop(get_variant_cache, None)
+
+
+@pytest.fixture
+def query_counter() -> QueryCounter:
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from app import models
+from app.core.config import settings
+from app.services.affordability import Applicants, rank
+from tests.conftest import _user, seed_database
+
+API = settings.API_V1_STR
+
+
+def test_scores_weigh_burden_and_reliability():
+    applicants = Applicants.from_rows(
+        # 10,000 a month; 20,000 a month; unknown income; 20,000 with 5,000 already rented
+        [(4, 240000), (1, 120000), (3, None), (2, 240000)],
+        [(2, 5000.0)],
+        [(2, 10, 5), (1, 4, 0)],
+    )
+    assert applicants.tenant_id.tolist() == [1, 2, 3, 4]
+    ranked = rank(applicants, [7, 8], np.array([3000.0, 9000.0]))
+
+    cheap = {r["tenant_id"]: r for r in ranked[0]["ranking"]}
+    # Burden at most 30%, no late payments: full marks
+    assert cheap[1]["score"] == 100.0 and cheap[1]["rent_burden"] == 0.3
+    assert cheap[4]["score"] == 100.0
+    # 40% burden is a third of the way to nothing; half the payments late
+    assert cheap[2]["rent_burden"] == 0.4
+    assert cheap[2]["score"] == pytest.approx(100 * (0.7 * 2 / 3 + 0.3 * 0.5), abs=0.1)
+    # No income: reliability only
+    assert cheap[3]["rent_burden"] is None and cheap[3]["score"] == 30.0
+    assert [r["tenant_id"] for r in ranked[0]["ranking"]] == [1, 4, 2, 3]
+
+    expensive = ranked[1]["ranking"]
+    assert [r["tenant_id"] for r in expensive] == [4, 1, 3, 2]
+    assert expensive[0]["rent_burden"] == 0.45
+
+    assert [len(p["ranking"]) for p in rank(applicants, [7, 8], np.array([1.0, 2.0]), top=2)] == [2, 2]
+
+
+def test_ranking_endpoint(client, db):
+    seed = seed_database(db)
+    applicants = []
+    for i, income in enumerate((600000, 3000000, None)):
+        user = _user(db, f"applicant{i}@example.com", is_tenant=True)
+        tenant = models.Tenant(annual_income=income, identification_number=f"APP{i}", user_id=user.id)
+        db.add(tenant)
+        db.flush()
+        applicants.append(tenant.id)
+    db.commit()
+    headers = seed.headers(seed.owner)
+    body = {"tenant_ids": applicants + [999], "property_ids": [seed.vacant_property.id]}
+
+    response = client.post(f"{API}/owners/me/affordability", json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["unknown_tenant_ids"] == [999]
+    (ranking,) = result["properties"]
+    assert ranking["property_id"] == seed.vacant_property.id
+    assert ranking["monthly_rent"] == seed.vacant_property.monthly_rent
+    assert [r["tenant_id"] for r in ranking["ranking"]] == [applicants[1], applicants[0], applicants[2]]
+
+    others = {**body, "property_ids": [seed.properties[-1].id]}
+    assert seed.properties[-1].owner_id == seed.other_owner.id
+    assert client.post(f"{API}/owners/me/affordability", json=others, headers=headers).status_code == 403
+    missing = {**body, "property_ids": [999]}
+    assert client.post(f"{API}/owners/me/affordability", json=missing, headers=headers).status_code == 404
+    as_tenant = seed.headers(seed.tenant_user)
+    assert client.post(f"{API}/owners/me/affordability", json=body, headers=as_tenant).status_code == 403
+
+
+def test_pairs_are_capped(client, db, monkeypatch):
+    seed = seed_database(db)
+    monkeypatch.setattr(settings, "AFFORDABILITY_MAX_PAIRS", 3)
+    body = {"tenant_ids": [1, 2], "property_ids": [seed.vacant_property.id, seed.properties[0].id]}
+    response = client.post(f"{API}/owners/me/affordability", json=body, headers=seed.headers(seed.owner))
+    assert response.status_code == 400
+    assert response.json() == {"detail": "At most 3 tenant and property pairs per request"}
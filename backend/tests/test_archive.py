@@ -0,0 +1,149 @@
+from datetime import date, timedelta
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app import crud, models
+from app.core.config import settings
+from app.services.archive import archive_cutoff, archive_ended_contracts
+from tests.conftest import _property, seed_database
+
+API = settings.API_V1_STR
+
+
+def _ended_contract(db, seed, index, *, paid_on, maintenance_status="completed", store=None):
+    prop = _property(db, seed.owner, 100 + index)
+    contract = models.RentalContract(
+        start_date=paid_on - timedelta(days=365),
+        end_date=paid_on + timedelta(days=1),
+        monthly_rent=prop.monthly_rent,
+        security_deposit=prop.security_deposit,
+        is_active=False,
+        property_id=prop.id,
+        tenant_id=seed.tenant.id,
+    )
+    db.add(contract)
+    db.flush()
+    db.add_all([
+        models.RentPayment(amount=contract.monthly_rent, payment_date=paid_on, contract_id=contract.id),
+        models.MaintenanceRequest(
+            title="Leak",
+            description="Kitchen tap",
+            request_date=paid_on,
+            status=maintenance_status,
+            contract_id=contract.id,
+        ),
+    ])
+    if store is not None:
+        blob = store.put([b"Old lease\n"])
+        db.add(models.ContractDocument(
+            digest=blob.digest,
+            size=blob.size,
+            content_type="text/plain",
+            filename="lease.txt",
+            contract_id=contract.id,
+        ))
+    db.flush()
+    return contract
+
+
+def _summary(db, owner_id):
+    summary = crud.owner_summary.rebuild(db, owner_id=owner_id)
+    columns = models.OwnerSummary.__table__.columns
+    return {c.name: getattr(summary, c.name) for c in columns if c.name != "updated_at"}
+
+
+def test_cutoff_never_reaches_into_the_current_month():
+    assert archive_cutoff(date(2024, 5, 20), 730) == date(2022, 5, 21)
+    assert archive_cutoff(date(2024, 5, 20), 0) == date(2024, 5, 1)
+
+
+def test_only_ended_and_quiet_contracts_are_archived(db):
+    seed = seed_database(db)
+    long_ago = date.today() - timedelta(days=1000)
+    ended = [_ended_contract(db, seed, i, paid_on=long_ago) for i in range(3)]
+    recent = _ended_contract(db, seed, 3, paid_on=date.today() - timedelta(days=100))
+    still_open = _ended_contract(db, seed, 4, paid_on=long_ago, maintenance_status="pending")
+    db.commit()
+    before = _summary(db, seed.owner.id)
+
+    commits = []
+    summary = archive_ended_contracts(
+        db, after_days=730, batch_size=2, after_batch=lambda: commits.append(db.commit())
+    )
+    assert summary == {
+        "batches": 2,
+        "rental_contracts": 3,
+        "rent_payments": 3,
+        "maintenance_requests": 3,
+        "contract_documents": 0,
+    }
+    assert len(commits) == 2
+
+    live = {c.id for c in db.query(models.RentalContract)}
+    assert live.isdisjoint(c.id for c in ended)
+    assert {recent.id, still_open.id} <= live
+    assert {c.id for c in db.query(models.ArchivedRentalContract)} == {c.id for c in ended}
+    assert db.query(models.RentPayment).filter(
+        models.RentPayment.contract_id.in_([c.id for c in ended])
+    ).count() == 0
+
+    # None of it was counted
+    assert _summary(db, seed.owner.id) == before
+
+    # Nothing left to do; archived ids are not handed out again
+    assert archive_ended_contracts(db, after_days=730, batch_size=2) == {"batches": 0}
+    assert _ended_contract(db, seed, 5, paid_on=long_ago).id > max(c.id for c in ended)
+
+
+def test_archived_data_is_read_only_when_asked(client, db, blob_store):
+    seed = seed_database(db)
+    archived = _ended_contract(
+        db, seed, 0, paid_on=date.today() - timedelta(days=1000), store=blob_store
+    )
+    db.commit()
+    archive_ended_contracts(db, after_days=730, batch_size=10)
+    db.commit()
+
+    headers = seed.headers(seed.owner)
+    url = f"{API}/contracts/{archived.id}"
+    for path in ("", "/payments", "/maintenance", "/documents"):
+        assert client.get(url + path, headers=headers).status_code == 404
+    assert client.get(url, params={"include_archived": True}, headers=headers).json()["id"] == archived.id
+    payments = client.get(f"{url}/payments", params={"include_archived": True}, headers=headers).json()
+    assert [p["contract_id"] for p in payments] == [archived.id]
+    requests = client.get(f"{url}/maintenance", params={"include_archived": True}, headers=headers).json()
+    assert [r["title"] for r in requests] == ["Leak"]
+    documents = client.get(f"{url}/documents", params={"include_archived": True}, headers=headers).json()
+    content = client.get(
+        f"{url}/documents/{documents[0]['id']}/content", params={"include_archived": True}, headers=headers
+    )
+    assert content.content == b"Old lease\n"
+
+    # Same permissions as live contracts
+    other = seed.headers(seed.other_owner)
+    assert client.get(url, params={"include_archived": True}, headers=other).status_code == 403
+
+    # Lists continue into the archive, page by page
+    live = client.get(f"{API}/contracts/", headers=headers).json()
+    assert archived.id not in [c["id"] for c in live]
+    everything = client.get(
+        f"{API}/contracts/", params={"include_archived": True, "with_total": True}, headers=headers
+    )
+    assert [c["id"] for c in everything.json()] == [c["id"] for c in live] + [archived.id]
+    assert everything.headers["x-total-count"] == str(len(live) + 1)
+    last_page = client.get(
+        f"{API}/contracts/", params={"include_archived": True, "skip": len(live)}, headers=headers
+    ).json()
+    assert [c["id"] for c in last_page] == [archived.id]
+    tenant = client.get(
+        f"{API}/contracts/", params={"include_archived": True}, headers=seed.headers(seed.tenant_user)
+    ).json()
+    assert tenant[-1]["id"] == archived.id
+
+
+def test_payments_are_range_partitioned_on_postgresql():
+    ddl = str(CreateTable(models.RentPayment.__table__).compile(dialect=postgresql.dialect()))
+    assert "PRIMARY KEY (id, payment_date)" in ddl
+    assert "PARTITION BY RANGE (payment_date)" in ddl
+    assert models.RentPayment.__mapper__.primary_key == (models.RentPayment.__table__.c.id,)
@@ -0,0 +1,80 @@
+from app.core.config import settings
+from tests.conftest import seed_database
+
+API = settings.API_V1_STR
+
+
+def _ids(*ids):
+    return {"ids": ",".join(str(i) for i in ids)}
+
+
+def test_properties_in_request_order(client, db):
+    seed = seed_database(db)
+    first, second = seed.properties[:2]
+    singles = {p.id: client.get(f"{API}/properties/{p.id}").json() for p in (first, second)}
+
+    response = client.get(f"{API}/properties/", params=_ids(second.id, 999, first.id))
+    assert response.status_code == 200
+    assert response.json() == [
+        singles[second.id],
+        {"id": 999, "detail": "Property not found"},
+        singles[first.id],
+    ]
+
+    # Unavailable properties are found too, and filters do not apply
+    rented = client.get(
+        f"{API}/properties/", params={**_ids(seed.vacant_property.id), "city": "Nowhere"}
+    ).json()
+    assert [p["id"] for p in rented] == [seed.vacant_property.id]
+
+    trimmed = client.get(f"{API}/properties/", params={**_ids(first.id, 999), "fields": "title"})
+    assert trimmed.json() == [{"title": first.title}, {"id": 999, "detail": "Property not found"}]
+
+
+def test_contract_permissions_are_checked_per_item(client, db):
+    seed = seed_database(db)
+    own = [c.id for c in seed.contracts if c.property.owner_id == seed.owner.id]
+    others = [c.id for c in seed.contracts if c.property.owner_id != seed.owner.id]
+    assert own and others
+    ids = [others[0], own[0], 999]
+
+    as_owner = client.get(f"{API}/contracts/", params=_ids(*ids), headers=seed.headers(seed.owner))
+    single = client.get(f"{API}/contracts/{own[0]}", headers=seed.headers(seed.owner)).json()
+    assert as_owner.json() == [
+        {"id": others[0], "detail": "Not enough permissions"},
+        single,
+        {"id": 999, "detail": "Contract not found"},
+    ]
+
+    # Each entry matches what the single-contract endpoint answers
+    for user in (seed.tenant_user, seed.other_owner, seed.plain_user):
+        headers = seed.headers(user)
+        batch = client.get(f"{API}/contracts/", params=_ids(*ids), headers=headers).json()
+        for id, entry in zip(ids, batch):
+            response = client.get(f"{API}/contracts/{id}", headers=headers)
+            assert entry == (response.json() if response.status_code == 200 else {"id": id, **response.json()})
+
+
+def test_tenants_batch(client, db):
+    seed = seed_database(db)
+    headers = seed.headers(seed.owner)
+    response = client.get(f"{API}/tenants/", params=_ids(999, seed.tenant.id), headers=headers)
+    assert response.json() == [
+        {"id": 999, "detail": "Tenant not found"},
+        client.get(f"{API}/tenants/{seed.tenant.id}", headers=headers).json(),
+    ]
+    assert client.get(f"{API}/tenants/", headers=headers).status_code == 400
+
+
+def test_ids_are_validated_and_capped(client, db, monkeypatch):
+    seed_database(db)
+    assert client.get(f"{API}/properties/", params={"ids": "1,two"}).json() == {
+        "detail": "ids must be comma-separated integers"
+    }
+    assert client.get(f"{API}/properties/", params={"ids": ","}).status_code == 400
+
+    monkeypatch.setattr(settings, "BATCH_MAX_IDS", 3)
+    assert client.get(f"{API}/properties/", params=_ids(1, 2, 3)).status_code == 200
+    response = client.get(f"{API}/properties/", params=_ids(1, 2, 3, 4))
+    assert response.status_code == 400
+    assert response.json() == {"detail": "At most 3 ids per request"}
@@ -0,0 +1,122 @@
+import calendar
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.cashflow import RentRoll, project, to_records
+from tests.conftest import seed_database
+
+API = settings.API_V1_STR
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _reference(contracts, properties, start, months):
+    """The projection computed one contract and one month at a time."""
+    asking = dict(properties)
+    rows = []
+    occupied_before = set()
+    for k in range(months):
+        month = _add_months(start, k)
+        last_day = calendar.monthrange(month.year, month.month)[1]
+        row = dict(month=month, expected_rent=0.0, paying_contracts=0, expiring_contracts=0,
+                   expiring_rent=0.0)
+        occupied = set()
+        for _, property_id, begin, end, rent, due_day in contracts:
+            due = month.replace(day=min(due_day, last_day))
+            if begin <= due <= end:
+                row["expected_rent"] += rent
+                row["paying_contracts"] += 1
+                if property_id in asking:
+                    occupied.add(property_id)
+            if (end.year, end.month) == (month.year, month.month):
+                row["expiring_contracts"] += 1
+                row["expiring_rent"] += rent
+        row["vacant_units"] = len(asking) - len(occupied)
+        row["vacancy_loss"] = sum(v for p, v in asking.items() if p not in occupied)
+        row["vacancies_starting"] = len(occupied_before - occupied) if k else 0
+        occupied_before = occupied
+        rows.append(row)
+    return rows
+
+
+def _random_portfolio(rng, n_contracts, n_properties):
+    properties = [(p, float(rng.randrange(10000, 60000, 500))) for p in range(1, n_properties + 1)]
+    contracts = []
+    for i in range(n_contracts):
+        begin = date(2023, 1, 1) + timedelta(days=rng.randrange(900))
+        end = begin + timedelta(days=rng.randrange(20, 800))
+        contracts.append((
+            i + 1,
+            rng.randrange(1, n_properties + 3),  # A few point at properties outside the portfolio
+            begin,
+            end,
+            float(rng.randrange(10000, 60000, 500)),
+            rng.choice([1, 5, 15, 28, 29, 30, 31]),
+        ))
+    return contracts, properties
+
+
+def test_projection_matches_row_by_row_reference():
+    rng = random.Random(7)
+    for _ in range(20):
+        contracts, properties = _random_portfolio(rng, rng.randrange(0, 60), rng.randrange(1, 25))
+        start = date(2024, rng.randrange(1, 13), 1)
+        months = rng.randrange(1, 37)
+        actual = to_records(project(RentRoll.from_rows(contracts, properties), start=start, months=months))
+        expected = _reference(contracts, properties, start, months)
+        for got, want in zip(actual, expected):
+            for key, value in want.items():
+                assert got[key] == (round(value, 2) if isinstance(value, float) else value), (
+                    key, got["month"]
+                )
+        assert len(actual) == months
+
+
+def test_due_day_is_clamped_to_short_months():
+    roll = RentRoll.from_rows(
+        [(1, 1, date(2024, 1, 31), date(2024, 3, 30), 1000.0, 31)], [(1, 1000.0)]
+    )
+    projection = project(roll, start=date(2024, 1, 1), months=4)
+    # Due Jan 31 and Feb 29; the term ends before Mar 31
+    assert projection["expected_rent"].tolist() == [1000.0, 1000.0, 0.0, 0.0]
+    assert projection["expiring_contracts"].tolist() == [0, 0, 1, 0]
+    assert projection["vacancies_starting"].tolist() == [0, 0, 1, 0]
+
+
+def test_back_to_back_contracts_are_not_a_vacancy():
+    roll = RentRoll.from_rows(
+        [
+            (1, 1, date(2024, 1, 1), date(2024, 6, 30), 1000.0, 1),
+            (2, 1, date(2024, 7, 1), date(2024, 12, 31), 1100.0, 1),
+        ],
+        [(1, 1000.0)],
+    )
+    projection = project(roll, start=date(2024, 1, 1), months=12)
+    assert not projection["vacancies_starting"].any()
+    assert np.array_equal(projection["vacant_units"], np.zeros(12))
+
+
+def test_cashflow_endpoint(client, db):
+    seed = seed_database(db)
+    today = date.today()
+    response = client.get(
+        f"{API}/owners/me/cashflow", params={"months": 24}, headers=seed.headers(seed.owner)
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["start_month"] == str(today.replace(day=1))
+    assert len(body["months"]) == 24
+    rents = sum(c.monthly_rent for c in seed.contracts[:2])
+    assert body["months"][1]["expected_rent"] == rents
+    assert body["months"][1]["vacant_units"] == 3
+
+    response = client.get(
+        f"{API}/owners/me/cashflow", params={"months": 37}, headers=seed.headers(seed.owner)
+    )
+    assert response.status_code == 422
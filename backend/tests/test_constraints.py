@@ -0,0 +1,47 @@
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.errors import unique_violation
+from tests.conftest import PASSWORD, seed_database
+
+API = settings.API_V1_STR
+
+
+def test_unique_violation_messages():
+    postgres = (
+        'duplicate key value violates unique constraint "ix_users_email"\n'
+        "DETAIL:  Key (email)=(owner@example.com) already exists."
+    )
+    assert unique_violation(IntegrityError("", {}, Exception(postgres))) == "email"
+    sqlite = "UNIQUE constraint failed: tenants.identification_number"
+    assert unique_violation(IntegrityError("", {}, Exception(sqlite))) == "identification_number"
+    foreign_key = "Key (property_id)=(5) is not present in table \"properties\"."
+    assert unique_violation(IntegrityError("", {}, Exception(foreign_key))) is None
+
+
+def test_duplicate_signups_are_rejected(client, db):
+    seed = seed_database(db)
+    response = client.post(
+        f"{API}/auth/register",
+        json={"email": seed.owner.email, "password": PASSWORD, "full_name": "Again"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The user with this email already exists in the system"
+
+    tenant = {
+        "date_of_birth": "1990-01-01",
+        "identification_type": "PAN",
+        "identification_number": "NEW0000001",
+    }
+    response = client.post(f"{API}/tenants/register", json=tenant, headers=seed.headers(seed.tenant_user))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User is already registered as a tenant"
+
+    tenant["identification_number"] = seed.tenant.identification_number
+    response = client.post(f"{API}/tenants/register", json=tenant, headers=seed.headers(seed.plain_user))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Identification number already registered"
+
+    tenant["identification_number"] = "NEW0000001"
+    response = client.post(f"{API}/tenants/register", json=tenant, headers=seed.headers(seed.plain_user))
+    assert response.status_code == 200, response.text
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import os
+
+from app import crud, models
+from app.api.responses import BlobResponse
+from app.core.config import settings
+from tests.conftest import TestingSessionLocal, seed_database
+
+API = settings.API_V1_STR
+CONTENT = b"%PDF-1.7\n" + bytes(range(256)) * 1000
+
+
+def _documents(seed, contract=None):
+    return f"{API}/contracts/{(contract or seed.contracts[0]).id}/documents"
+
+
+def _upload(client, seed, content=CONTENT, user=None, **params):
+    return client.post(
+        _documents(seed),
+        params={"filename": "lease.pdf", **params},
+        content=content,
+        headers={**seed.headers(user or seed.owner), "Content-Type": "application/pdf"},
+    )
+
+
+def _objects(store):
+    return sorted(
+        name for _, _, names in os.walk(os.path.join(store.root, "objects")) for name in names
+    )
+
+
+def test_upload_is_content_addressed_and_deduplicated(client, db, blob_store):
+    seed = seed_database(db)
+    first = _upload(client, seed)
+    assert first.status_code == 200, first.text
+    second = _upload(client, seed, user=seed.tenant_user, filename="copy.pdf")
+    assert second.status_code == 200, second.text
+
+    digest = hashlib.sha256(CONTENT).hexdigest()
+    assert first.json()["digest"] == second.json()["digest"] == digest
+    assert first.json()["size"] == len(CONTENT)
+    assert first.json()["content_type"] == "application/pdf"
+    assert first.json()["id"] != second.json()["id"]
+    assert _objects(blob_store) == [digest]
+    assert os.listdir(blob_store.tmp_dir) == []
+
+    with TestingSessionLocal() as session:
+        contract = session.get(models.RentalContract, seed.contracts[0].id)
+        assert contract.contract_file_url == (
+            f"{_documents(seed)}/{second.json()['id']}/content"
+        )
+        assert len(crud.contract_document.get_by_contract(session, contract_id=contract.id)) == 2
+
+    listed = client.get(_documents(seed), headers=seed.headers(seed.tenant_user))
+    assert [d["filename"] for d in listed.json()] == ["lease.pdf", "copy.pdf"]
+
+
+def test_upload_limits(client, db, blob_store, monkeypatch):
+    seed = seed_database(db)
+    monkeypatch.setattr(settings, "CONTRACT_DOCUMENT_MAX_BYTES", 1000)
+
+    def chunks():
+        for _ in range(5):
+            yield b"x" * 400
+
+    # Without Content-Length the limit is enforced while streaming
+    response = client.post(
+        _documents(seed), content=chunks(), headers=seed.headers(seed.owner)
+    )
+    assert response.status_code == 413
+    assert _upload(client, seed).status_code == 413
+    assert _upload(client, seed, content=b"").status_code == 400
+    assert _objects(blob_store) == []
+    assert os.listdir(blob_store.tmp_dir) == []
+
+
+def test_only_contract_parties(client, db, blob_store):
+    seed = seed_database(db)
+    assert _upload(client, seed, user=seed.other_owner).status_code == 403
+    assert _upload(client, seed, user=seed.plain_user).status_code == 403
+    assert client.post(
+        f"{API}/contracts/999999/documents", content=b"x", headers=seed.headers(seed.owner)
+    ).status_code == 404
+    assert _objects(blob_store) == []
+
+    document = _upload(client, seed).json()
+    url = f"{_documents(seed)}/{document['id']}/content"
+    assert client.get(url, headers=seed.headers(seed.other_owner)).status_code == 403
+    # A document is only reachable through its own contract
+    other = f"{_documents(seed, seed.contracts[1])}/{document['id']}/content"
+    assert client.get(other, headers=seed.headers(seed.owner)).status_code == 404
+
+
+def test_download_ranges_and_conditional_requests(client, db):
+    seed = seed_database(db)
+    document = _upload(client, seed).json()
+    url = f"{_documents(seed)}/{document['id']}/content"
+    headers = seed.headers(seed.tenant_user)
+    etag = f'"{document["digest"]}"'
+
+    full = client.get(url, headers=headers)
+    assert full.status_code == 200
+    assert full.content == CONTENT
+    assert full.headers["etag"] == etag
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.headers["content-type"] == "application/pdf"
+    assert full.headers["content-disposition"] == "attachment; filename*=utf-8''lease.pdf"
+    assert full.headers["x-content-type-options"] == "nosniff"
+
+    part = client.get(url, headers={**headers, "Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.content == CONTENT[100:200]
+    assert part.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+    tail = client.get(url, headers={**headers, "Range": "bytes=-10"})
+    assert tail.status_code == 206
+    assert tail.content == CONTENT[-10:]
+    rest = client.get(url, headers={**headers, "Range": f"bytes={len(CONTENT) - 5}-"})
+    assert rest.content == CONTENT[-5:]
+
+    unsatisfiable = client.get(url, headers={**headers, "Range": f"bytes={len(CONTENT)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(CONTENT)}"
+    # Multiple ranges may be answered with the whole content
+    multi = client.get(url, headers={**headers, "Range": "bytes=0-1,5-6"})
+    assert multi.status_code == 200 and multi.content == CONTENT
+
+    resumed = client.get(url, headers={**headers, "Range": "bytes=10-19", "If-Range": etag})
+    assert resumed.status_code == 206
+    changed = client.get(url, headers={**headers, "Range": "bytes=10-19", "If-Range": '"other"'})
+    assert changed.status_code == 200 and changed.content == CONTENT
+
+    cached = client.get(url, headers={**headers, "If-None-Match": f'W/{etag}, "x"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    head = client.head(url, headers=headers)
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len(CONTENT))
+    assert head.content == b""
+
+
+def test_missing_content_is_gone(client, db, blob_store):
+    seed = seed_database(db, store=blob_store)
+    document = seed.documents[0]
+    blob_store.delete(document.digest)
+    response = client.get(
+        f"{_documents(seed)}/{document.id}/content", headers=seed.headers(seed.owner)
+    )
+    assert response.status_code == 410
+
+
+def _call(response, extensions, headers=()):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "extensions": extensions,
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "body": os.pread(
+                message["file"].fileno(), message["count"], message["offset"]
+            )}
+        sent.append(message)
+
+    asyncio.run(response(scope, receive, send))
+    return sent
+
+
+def test_zero_copy_send(blob_store):
+    blob = blob_store.put([CONTENT])
+    response = BlobResponse(blob_store, blob)
+
+    start, body = _call(response, {"http.response.zerocopysend": {}}, [("range", "bytes=5-9")])
+    assert start["status"] == 206
+    assert body["type"] == "http.response.zerocopysend"
+    assert body["body"] == CONTENT[5:10]
+
+    start, body = _call(response, {"http.response.pathsend": {}})
+    assert body == {"type": "http.response.pathsend", "path": blob_store.local_path(blob.digest)}
+
+
+def test_accel_redirect(blob_store, monkeypatch):
+    monkeypatch.setattr(settings, "BLOB_STORE_ACCEL_REDIRECT", "/_blobs/")
+    blob = blob_store.put([CONTENT])
+    start, body = _call(BlobResponse(blob_store, blob), {})
+    headers = dict(start["headers"])
+    assert headers[b"x-accel-redirect"] == f"/_blobs/objects/{blob.digest[:2]}/{blob.digest}".encode()
+    assert body["body"] == b""
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core import events
+from app.core.config import settings
+from app.core.events import Broadcaster, Event, InMemoryEventBackend, encode_sse, stage
+from tests.conftest import seed_database
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def backend(monkeypatch) -> InMemoryEventBackend:
+    backend = InMemoryEventBackend(history=100)
+    monkeypatch.setattr(events, "broadcaster", Broadcaster(backend))
+    return backend
+
+
+def test_events_are_published_on_commit_only(db, backend):
+    db.connection()  # Events are staged after a write, inside a transaction
+    stage(db, "property.updated", {"id": 1})
+    db.rollback()
+    db.connection()
+    stage(db, "property.updated", {"id": 2})
+    assert backend.since("0") == []
+    db.commit()
+    assert [e.data for e in backend.since("0")] == [{"id": 2}]
+
+
+def test_write_paths_publish_events(client, db, backend):
+    seed = seed_database(db)
+    prop = seed.vacant_property
+    response = client.put(
+        f"{API}/properties/{prop.id}",
+        json={"is_available": False, "monthly_rent": 21000.0},
+        headers=seed.headers(seed.owner),
+    )
+    assert response.status_code == 200
+    updated, unavailable = backend.since("0")
+    assert updated.type == "property.updated"
+    assert updated.audience is None
+    assert updated.data["changes"]["is_available"] == {"old": True, "new": False}
+    assert updated.data["changes"]["monthly_rent"]["new"] == 21000.0
+    assert unavailable.type == "property.unavailable"
+
+    request = seed.maintenance_requests[0]
+    response = client.put(
+        f"{API}/contracts/maintenance/{request.id}",
+        json={"status": "completed"},
+        headers=seed.headers(seed.owner),
+    )
+    assert response.status_code == 200
+    (changed,) = backend.since(unavailable.id)
+    assert changed.type == "maintenance.status_changed"
+    assert changed.data == {
+        "id": request.id, "contract_id": request.contract_id, "old": "pending", "new": "completed"
+    }
+    assert changed.audience == {seed.owner.id, seed.tenant_user.id}
+
+
+def test_subscribers_get_visible_events_and_can_resume():
+    broadcaster = Broadcaster(InMemoryEventBackend())
+
+    async def run():
+        broadcaster.publish(Event("property.created", {"id": 1}))
+        stream = broadcaster.subscribe(7, last_event_id="0", types=["property", "payment.posted"])
+        received = [await stream.__anext__()]
+
+        def publish():
+            broadcaster.publish(Event("payment.posted", {"id": 5}, audience=frozenset({8})))
+            broadcaster.publish(Event("maintenance.created", {"id": 6}, audience=frozenset({7})))
+            broadcaster.publish(Event("payment.posted", {"id": 9}, audience=frozenset({7})))
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+        received.append(await asyncio.wait_for(stream.__anext__(), 1))
+        thread.join()
+        await stream.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert [e.data["id"] for e in received] == [1, 9]
+    assert broadcaster.subscriber_count == 0
+
+
+def test_heartbeat_and_wire_format():
+    broadcaster = Broadcaster(InMemoryEventBackend())
+
+    async def run():
+        stream = broadcaster.subscribe(1, heartbeat=0.01)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(run()) is None
+    assert encode_sse(None) == ": keep-alive\n\n"
+    event = Event("property.unavailable", {"id": 3}, id="12")
+    assert encode_sse(event) == 'id: 12\nevent: property.unavailable\ndata: {"id":3}\n\n'
+
+
+def test_stream_requires_authentication(client):
+    assert client.get(f"{API}/events/").status_code == 401
@@ -0,0 +1,87 @@
+import msgpack
+
+from app.core.config import settings
+from tests.conftest import seed_database
+
+API = settings.API_V1_STR
+CARD = "id,title,city,monthly_rent,images"
+
+
+def _selects(counter, table):
+    return [s for s in counter.statements if s.lstrip().startswith("SELECT") and f"FROM {table}" in s]
+
+
+def test_property_cards_skip_unused_columns(client, db, query_counter):
+    seed_database(db, size=3)
+    full = client.get(f"{API}/properties/").json()
+
+    with query_counter:
+        cards = client.get(f"{API}/properties/", params={"fields": CARD})
+    assert cards.status_code == 200, cards.text
+    assert cards.json() == [
+        {key: prop[key] for key in ("title", "city", "monthly_rent", "images", "id")} for prop in full
+    ]
+    # Schema order, whatever the order asked for
+    assert list(cards.json()[0]) == ["title", "city", "monthly_rent", "images", "id"]
+
+    [select] = _selects(query_counter, "properties")
+    for column in ("description", "amenities", "address", "owner_id"):
+        assert f"properties.{column}" not in select
+    assert "properties.title" in select
+
+    one = client.get(f"{API}/properties/{full[0]['id']}", params={"fields": "id,description"})
+    assert one.json() == {"description": full[0]["description"], "id": full[0]["id"]}
+
+    # Negotiation applies to trimmed responses too
+    packed = client.get(
+        f"{API}/properties/", params={"fields": CARD}, headers={"Accept": "application/msgpack"}
+    )
+    assert msgpack.unpackb(packed.content) == cards.json()
+
+
+def test_unknown_fields_are_rejected(client, db):
+    seed_database(db)
+    response = client.get(f"{API}/properties/", params={"fields": "id,hashed_password,owner"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Unknown fields: hashed_password, owner"}
+    assert client.get(f"{API}/properties/", params={"fields": " , "}).status_code == 400
+
+
+def test_users_never_expose_other_columns(client, db, query_counter):
+    seed = seed_database(db)
+    headers = seed.headers(seed.owner)
+    response = client.get(f"{API}/users/me", params={"fields": "email"}, headers=headers)
+    assert response.json() == {"email": "owner@example.com"}
+
+    with query_counter:
+        listed = client.get(f"{API}/users/", params={"fields": "id,full_name"}, headers=headers)
+    assert all(set(user) == {"id", "full_name"} for user in listed.json())
+    assert "hashed_password" not in _selects(query_counter, "users")[-1]
+    assert client.get(
+        f"{API}/users/", params={"fields": "hashed_password"}, headers=headers
+    ).status_code == 400
+
+
+def test_contract_fields_keep_permission_checks(client, db, query_counter):
+    seed = seed_database(db)
+    contract = seed.contracts[0]
+    url = f"{API}/contracts/{contract.id}"
+
+    with query_counter:
+        response = client.get(url, params={"fields": "monthly_rent"}, headers=seed.headers(seed.tenant_user))
+    assert response.json() == {"monthly_rent": contract.monthly_rent}
+    [select] = [s for s in _selects(query_counter, "rental_contracts") if "rental_contracts.id = " in s]
+    assert "rental_contracts.contract_terms" not in select
+
+    denied = client.get(url, params={"fields": "monthly_rent"}, headers=seed.headers(seed.other_owner))
+    assert denied.status_code == 403
+
+    headers = seed.headers(seed.owner)
+    full = client.get(f"{API}/contracts/", headers=headers).json()
+    listed = client.get(f"{API}/contracts/", params={"fields": "id,is_active"}, headers=headers)
+    assert listed.json() == [{"is_active": c["is_active"], "id": c["id"]} for c in full]
+
+    tenant = client.get(
+        f"{API}/tenants/me", params={"fields": "occupation"}, headers=seed.headers(seed.tenant_user)
+    )
+    assert tenant.json() == {"occupation": seed.tenant.occupation}
@@ -0,0 +1,98 @@
+import time
+from types import SimpleNamespace
+
+from app import crud
+from app.api import totals
+from app.core.config import settings
+from tests.conftest import TestingSessionLocal, _property, seed_database
+
+API = settings.API_V1_STR
+
+
+def _total(response):
+    assert response.status_code == 200, response.text
+    return response.headers["x-total-count"], response.headers["x-total-count-method"]
+
+
+def test_totals_are_opt_in(client, db):
+    seed_database(db)
+    response = client.get(f"{API}/properties/")
+    assert "x-total-count" not in response.headers
+
+
+def test_search_totals_by_strategy(client, db, monkeypatch):
+    seed_database(db, size=3)
+    available = len(client.get(f"{API}/properties/").json())
+    assert available > 2
+
+    monkeypatch.setattr(settings, "PROPERTY_SEARCH_TOTAL", "exact")
+    response = client.get(f"{API}/properties/", params={"with_total": True, "limit": 1})
+    assert len(response.json()) == 1
+    assert _total(response) == (str(available), "exact")
+
+    monkeypatch.setattr(settings, "PROPERTY_SEARCH_TOTAL", "capped")
+    monkeypatch.setattr(settings, "LIST_TOTAL_CAP", 2)
+    assert _total(client.get(f"{API}/properties/", params={"with_total": True})) == ("2+", "capped")
+    monkeypatch.setattr(settings, "LIST_TOTAL_CAP", 1000)
+    assert _total(
+        client.get(f"{API}/properties/", params={"with_total": True, "city": "Nowhere"})
+    ) == ("0", "capped")
+
+    # Unfiltered estimates come from the owner counters; filtered ones from the
+    # planner, or a capped count where there are no planner statistics (SQLite)
+    monkeypatch.setattr(settings, "PROPERTY_SEARCH_TOTAL", "estimated")
+    assert _total(client.get(f"{API}/properties/", params={"with_total": True})) == (
+        str(available), "counter"
+    )
+    assert _total(
+        client.get(f"{API}/properties/", params={"with_total": True, "city": "Pune"})
+    ) == (str(available), "capped")
+
+    # Totals come with trimmed responses too
+    trimmed = client.get(f"{API}/properties/", params={"with_total": True, "fields": "id"})
+    assert _total(trimmed) == (str(available), "counter")
+
+
+def test_search_totals_are_cached_per_filters(client, db, monkeypatch):
+    seed = seed_database(db)
+    monkeypatch.setattr(settings, "PROPERTY_SEARCH_TOTAL", "exact")
+    params = {"with_total": True, "city": "Pune"}
+    before, _ = _total(client.get(f"{API}/properties/", params=params))
+
+    with TestingSessionLocal() as session:
+        _property(session, seed.owner, 99)
+        session.commit()
+    assert _total(client.get(f"{API}/properties/", params=params))[0] == before
+    # Other filters are counted afresh
+    assert _total(
+        client.get(f"{API}/properties/", params={**params, "state": "Maharashtra"})
+    )[0] == str(int(before) + 1)
+
+    # Expired
+    later = time.monotonic() + settings.LIST_TOTAL_CACHE_SECONDS + 1
+    monkeypatch.setattr(totals, "time", SimpleNamespace(monotonic=lambda: later))
+    assert _total(client.get(f"{API}/properties/", params=params))[0] == str(int(before) + 1)
+
+
+def test_owner_scoped_totals_are_exact(client, db):
+    seed = seed_database(db, size=3)
+    headers = seed.headers(seed.owner)
+    owned = len(crud.property.get_multi_by_owner(db, owner_id=seed.owner.id))
+    response = client.get(
+        f"{API}/properties/my-properties", params={"with_total": True, "limit": 1}, headers=headers
+    )
+    assert _total(response) == (str(owned), "exact")
+
+    contracts = client.get(f"{API}/contracts/", headers=headers).json()
+    response = client.get(f"{API}/contracts/", params={"with_total": True, "limit": 1}, headers=headers)
+    assert len(response.json()) == 1
+    assert _total(response) == (str(len(contracts)), "exact")
+
+    tenant = seed.headers(seed.tenant_user)
+    mine = client.get(f"{API}/contracts/", headers=tenant).json()
+    assert _total(
+        client.get(f"{API}/contracts/", params={"with_total": True}, headers=tenant)
+    ) == (str(len(mine)), "exact")
+    assert _total(
+        client.get(f"{API}/contracts/", params={"with_total": True}, headers=seed.headers(seed.plain_user))
+    ) == ("0", "exact")
@@ -0,0 +1,81 @@
+from app import crud, models
+from app.core.config import settings
+from tests.conftest import TestingSessionLocal, seed_database
+
+API = settings.API_V1_STR
+
+
+def _owner_requests(db, seed):
+    owned = {p.id for p in seed.owner.owned_properties}
+    contracts = {c.id for c in seed.contracts if c.property_id in owned}
+    return [r for r in seed.maintenance_requests if r.contract_id in contracts]
+
+
+def test_queue_is_ordered_by_priority_then_age(client, db):
+    seed = seed_database(db)
+    emergency = models.MaintenanceRequest(
+        title="Flooding", description="Water everywhere", request_date=seed.payments[0].payment_date,
+        priority="emergency", contract_id=seed.contracts[0].id,
+    )
+    db.add(emergency)
+    db.commit()
+    assert emergency.priority_rank == 0
+
+    response = client.get(f"{API}/contracts/maintenance/queue", headers=seed.headers(seed.owner))
+    assert response.status_code == 200
+    queue = response.json()
+    expected = sorted(
+        _owner_requests(db, seed) + [emergency],
+        key=lambda r: (r.priority_rank, r.request_date, r.id),
+    )
+    assert [r["id"] for r in queue] == [r.id for r in expected]
+    assert queue[0]["id"] == emergency.id
+
+
+def test_claims_never_hand_out_the_same_request(client, db):
+    seed = seed_database(db)
+    headers = seed.headers(seed.owner)
+    pending = len(_owner_requests(db, seed))
+
+    claimed = []
+    for _ in range(pending):
+        response = client.post(f"{API}/contracts/maintenance/queue/claim", headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "in_progress"
+        assert body["assigned_to_id"] == seed.owner.id
+        claimed.append(body["id"])
+    assert len(set(claimed)) == pending
+
+    response = client.post(f"{API}/contracts/maintenance/queue/claim", headers=headers)
+    assert response.status_code == 404
+
+
+def test_transition_is_compare_and_set(db):
+    seed = seed_database(db)
+    request_id = seed.maintenance_requests[0].id
+
+    first, second = TestingSessionLocal(), TestingSessionLocal()
+    try:
+        mine = crud.maintenance_request.get(first, id=request_id)
+        theirs = crud.maintenance_request.get(second, id=request_id)
+        assert crud.maintenance_request.transition(first, db_obj=mine, status="in_progress", assignee_id=1)
+        first.commit()
+        # `theirs` still believes the request is pending
+        assert not crud.maintenance_request.transition(second, db_obj=theirs, status="rejected")
+        second.rollback()
+    finally:
+        first.close()
+        second.close()
+
+
+def test_invalid_transitions_are_rejected(client, db):
+    seed = seed_database(db)
+    url = f"{API}/contracts/maintenance/{seed.maintenance_requests[0].id}/transition"
+    headers = seed.headers(seed.owner)
+    response = client.post(url, json={"status": "completed"}, headers=headers)
+    assert response.status_code == 400
+    assert client.post(url, json={"status": "in_progress"}, headers=headers).status_code == 200
+    response = client.post(url, json={"status": "completed"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["completion_date"] is not None
@@ -0,0 +1,138 @@
+import numpy as np
+
+from app import crud, models, schemas
+from app.core import rent_stats
+from app.core.config import settings
+from tests.conftest import _user
+
+API = settings.API_V1_STR
+
+
+def _create(db, owner, rent, **values):
+    data = dict(
+        title="Flat",
+        property_type="Apartment",
+        address="1 Main Street",
+        city="Pune",
+        state="Maharashtra",
+        zip_code="411001",
+        bedrooms=2,
+        bathrooms=1.0,
+        monthly_rent=rent,
+        security_deposit=2 * rent,
+    )
+    data.update(values)
+    return crud.property.create_with_owner(db, obj_in=schemas.PropertyCreate(**data), owner_id=owner.id)
+
+
+def _saved(db):
+    return [(r.city, r.count) for r in db.query(models.RentSketch).populate_existing()]
+
+
+def _stats(client, **params):
+    response = client.get(f"{API}/market/rent-stats", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_sketch_percentiles_are_within_relative_accuracy():
+    rents = np.random.default_rng(0).lognormal(np.log(25000), 0.5, 10_000)
+    sketch = rent_stats.QuantileSketch()
+    for rent in rents:
+        sketch.add(rent)
+    ordered = np.sort(rents)
+    for q in (0.0, 0.25, 0.5, 0.75, 1.0):
+        exact = ordered[int(q * (len(rents) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= rent_stats.RELATIVE_ACCURACY * exact + 0.01
+    median = sketch.quantile(0.5)
+
+    # Taking rents out again is exact, and halves merge into the whole
+    first, second = rent_stats.QuantileSketch(), rent_stats.QuantileSketch()
+    for rent in rents[:5000]:
+        first.add(rent)
+        sketch.add(rent, -1)
+    for rent in rents[5000:]:
+        second.add(rent)
+    assert sketch.buckets == second.buckets
+    first.merge(second)
+    assert first.count == 10_000 and first.quantile(0.5) == median
+    assert rent_stats.QuantileSketch(first.to_json()).buckets == first.buckets
+    assert rent_stats.QuantileSketch().summary() == {"count": 0, "p25": None, "median": None, "p75": None}
+
+
+def test_stats_follow_committed_writes(client, db):
+    owner = _user(db, "owner@example.com", is_property_owner=True)
+    flats = [_create(db, owner, rent) for rent in (10000.0, 20000.0, 30000.0, 40000.0, 50000.0)]
+    _create(db, owner, 90000.0, property_type="House", bedrooms=4)
+    _create(db, owner, 5000.0, city="Chennai", state="Tamil Nadu")
+    db.commit()
+
+    stats = _stats(client, city="Pune", bedrooms=2, property_type="Apartment")
+    assert stats["count"] == 5 and stats["relative_accuracy"] == rent_stats.RELATIVE_ACCURACY
+    assert abs(stats["median"] - 30000.0) <= 300.0
+    assert abs(stats["p25"] - 20000.0) <= 200.0
+    assert _stats(client, city="Pune")["count"] == 6
+    assert _stats(client, city="Pune", property_type="House")["count"] == 1
+    assert _stats(client, city="Mumbai") == {
+        "city": "Mumbai", "bedrooms": None, "property_type": None,
+        "count": 0, "p25": None, "median": None, "p75": None,
+        "relative_accuracy": rent_stats.RELATIVE_ACCURACY,
+    }
+
+    crud.property.update(db, db_obj=flats[0], obj_in={"monthly_rent": 60000.0})
+    crud.property.remove(db, id=flats[1].id)
+    db.commit()
+    stats = _stats(client, city="Pune", bedrooms=2, property_type="Apartment")
+    assert stats["count"] == 4
+    assert abs(stats["median"] - 40000.0) <= 400.0
+
+    # Rolled back: never counted
+    _create(db, owner, 70000.0)
+    db.rollback()
+    assert _stats(client, city="Pune", bedrooms=2)["count"] == 4
+
+
+def test_unsaved_changes_are_saved_and_reloaded(client, db, monkeypatch):
+    owner = _user(db, "owner@example.com", is_property_owner=True)
+    for rent in (10000.0, 20000.0):
+        _create(db, owner, rent)
+    db.commit()
+    # Loading saves first
+    _stats(client, city="Pune")
+    assert _saved(db) == [("Pune", 2)]
+
+    _create(db, owner, 30000.0)
+    db.commit()
+    assert _stats(client, city="Pune")["count"] == 3
+    assert _saved(db) == [("Pune", 2)]  # Not due yet
+    monkeypatch.setattr(settings, "MARKET_STATS_SAVE_SECONDS", 0.0)
+    expected = _stats(client, city="Pune")
+    assert _saved(db) == [("Pune", 3)]
+
+    # Another worker starts from the table, which rebuilding reproduces
+    rent_stats.stats.clear()
+    assert _stats(client, city="Pune") == expected
+    assert crud.rent_sketch.rebuild(db) == 1
+    db.commit()
+    rent_stats.stats.clear()
+    assert _stats(client, city="Pune") == expected
+
+
+def test_deltas_counted_by_a_rebuild_are_not_saved_again(client, db, monkeypatch):
+    owner = _user(db, "owner@example.com", is_property_owner=True)
+    _create(db, owner, 10000.0)
+    db.commit()
+    _stats(client, city="Pune")
+    _create(db, owner, 20000.0)
+    db.commit()
+
+    # Rebuilt by the command line while this worker still holds the delta
+    crud.rent_sketch.rebuild(db)
+    db.commit()
+    _create(db, owner, 30000.0)
+    db.commit()
+    monkeypatch.setattr(settings, "MARKET_STATS_SAVE_SECONDS", 0.0)
+    # Only the listing created after the rebuild is added; reloaded from the table
+    assert _stats(client, city="Pune")["count"] == 3
+    assert _saved(db) == [("Pune", 3)]
+    assert rent_stats.stats.rebuilt_at == crud.rent_sketch.rebuilt_at(db)
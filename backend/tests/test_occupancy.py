@@ -0,0 +1,183 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, models
+from app.core.config import settings
+from app.db import occupancy
+from app.db.errors import exclusion_violation
+from app.models.rental_contract import OVERLAP_CONSTRAINT
+from tests.conftest import _property, seed_database
+
+API = settings.API_V1_STR
+
+
+def _contract(seed, property, start, end, **values):
+    return {
+        "property_id": property.id,
+        "tenant_id": seed.tenant.id,
+        "start_date": str(start),
+        "end_date": str(end),
+        "monthly_rent": property.monthly_rent,
+        "security_deposit": property.security_deposit,
+        **values,
+    }
+
+
+def test_overlapping_contracts_are_rejected(client, db):
+    seed = seed_database(db, size=1)
+    let = seed.contracts[0]
+    prop = seed.properties[0]
+    owner = seed.headers(seed.owner)
+
+    for start, end in [
+        (let.start_date - timedelta(days=30), let.start_date),  # Ends on its first day
+        (let.end_date, let.end_date + timedelta(days=365)),  # Starts on its last day
+        (let.start_date + timedelta(days=10), let.end_date - timedelta(days=10)),
+    ]:
+        response = client.post(f"{API}/contracts/", json=_contract(seed, prop, start, end), headers=owner)
+        assert response.status_code == 409, response.text
+        assert f"contract {let.id}" in response.json()["detail"]
+
+    after = let.end_date + timedelta(days=1)
+    response = client.post(
+        f"{API}/contracts/", json=_contract(seed, prop, after, after + timedelta(days=365)), headers=owner
+    )
+    assert response.status_code == 200, response.text
+    following = response.json()["id"]
+
+    # Extending the first contract now runs into the following one
+    response = client.put(
+        f"{API}/contracts/{let.id}", json={"end_date": str(after + timedelta(days=5))}, headers=owner
+    )
+    assert response.status_code == 409
+    assert f"contract {following}" in response.json()["detail"]
+
+    # Inactive contracts do not occupy the property
+    response = client.put(f"{API}/contracts/{let.id}", json={"is_active": False}, headers=owner)
+    assert response.status_code == 200, response.text
+    response = client.post(
+        f"{API}/contracts/", json=_contract(seed, prop, let.start_date, let.end_date), headers=owner
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.post(
+        f"{API}/contracts/",
+        json=_contract(seed, seed.vacant_property, date(2030, 2, 1), date(2030, 1, 1)),
+        headers=owner,
+    )
+    assert response.status_code == 400
+
+
+def test_overlap_probe_uses_the_occupancy_index(db):
+    seed = seed_database(db, size=1)
+    let = seed.contracts[0]
+    assert crud.rental_contract.find_overlap(
+        db, property_id=let.property_id, start_date=let.end_date, end_date=let.end_date
+    ).id == let.id
+    assert crud.rental_contract.find_overlap(
+        db, property_id=let.property_id, start_date=let.start_date, end_date=let.end_date, exclude_id=let.id
+    ) is None
+
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM rental_contracts"
+        " WHERE property_id = 1 AND is_active = 1 AND start_date <= '2030-01-01'"
+        " ORDER BY start_date DESC LIMIT 1"
+    )).all()
+    assert "ix_rental_contracts_occupancy" in str(plan)
+
+
+def test_overlaps_from_before_the_check_are_reported(db):
+    seed = seed_database(db, size=1)
+    prop = seed.vacant_property
+    # Written before overlaps were refused: the year, a lease inside it, one after
+    year, lease, later = (
+        models.RentalContract(
+            property_id=prop.id, tenant_id=seed.tenant.id, start_date=start, end_date=end,
+            monthly_rent=prop.monthly_rent, security_deposit=prop.security_deposit,
+        )
+        for start, end in [
+            (date(2031, 1, 1), date(2031, 12, 31)),
+            (date(2031, 2, 1), date(2031, 3, 31)),
+            (date(2032, 1, 1), date(2032, 12, 31)),
+        ]
+    )
+    db.add_all([year, lease, later])
+    db.commit()
+    db.execute(text("DROP INDEX ix_rental_contracts_occupancy"))
+
+    assert occupancy.ensure_occupancy(db.connection()) == [(prop.id, year.id, lease.id)]
+    assert "ix_rental_contracts_occupancy" in str(
+        db.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).all()
+    )
+    crud.rental_contract.update(db, db_obj=lease, obj_in={"is_active": False})
+    assert occupancy.find_overlaps(db.connection()) == []
+
+
+def test_properties_let_ahead_stay_on_the_market_around_the_lease(client, db):
+    seed = seed_database(db, size=1)
+    prop = seed.vacant_property
+    today = date.today()
+
+    def found(start, end=None):
+        params = {"available_from": str(start)}
+        if end:
+            params["available_to"] = str(end)
+        response = client.get(f"{API}/properties/", params=params)
+        assert response.status_code == 200, response.text
+        return prop.id in {p["id"] for p in response.json()}
+
+    assert found(today, today + timedelta(days=30))
+    start, end = today + timedelta(days=90), today + timedelta(days=455)
+    response = client.post(
+        f"{API}/contracts/", json=_contract(seed, prop, start, end), headers=seed.headers(seed.owner)
+    )
+    assert response.status_code == 200, response.text
+
+    # Unlisted by the booking, but free before and after the lease
+    assert found(today, today + timedelta(days=30))
+    assert found(end + timedelta(days=45))
+    assert not found(today, start)
+    assert not found(today + timedelta(days=100), today + timedelta(days=110))
+    assert not found(today)
+
+
+def test_search_by_availability_dates(client, db):
+    seed = seed_database(db, size=1)
+    let = seed.contracts[0]
+    rented = {c.property_id for c in seed.contracts}
+    vacant = {p.id for p in seed.properties if p.id not in rented} | {seed.vacant_property.id}
+    # Taken off the market by its owner, not let: never found
+    _property(db, seed.owner, 99, is_available=False)
+
+    def search(**params):
+        response = client.get(f"{API}/properties/", params=params)
+        assert response.status_code == 200, response.text
+        return {p["id"] for p in response.json()}
+
+    assert search(available_from=str(let.end_date)) == vacant
+    assert search(available_from=str(let.end_date + timedelta(days=1))) == vacant | rented
+    assert search(available_to=str(let.start_date - timedelta(days=1))) == vacant | rented
+    assert search(
+        available_from=str(let.start_date - timedelta(days=60)),
+        available_to=str(let.start_date - timedelta(days=1)),
+    ) == vacant | rented
+    assert search(available_from=str(let.end_date + timedelta(days=1)), city="Chennai") == set()
+
+    response = client.get(
+        f"{API}/properties/", params={"available_from": "2030-02-01", "available_to": "2030-01-01"}
+    )
+    assert response.status_code == 400
+
+
+def test_exclusion_violation_messages():
+    postgres = (
+        f'conflicting key value violates exclusion constraint "{OVERLAP_CONSTRAINT}"\n'
+        "DETAIL:  Key (property_id, daterange(start_date, end_date, '[]'::text))=(5, [2025-01-01,2026-01-01))"
+        " conflicts with existing key (property_id, daterange(start_date, end_date, '[]'::text))"
+        "=(5, [2025-06-01,2026-06-01))."
+    )
+    assert exclusion_violation(IntegrityError("", {}, Exception(postgres))) == OVERLAP_CONSTRAINT
+    sqlite = "UNIQUE constraint failed: users.email"
+    assert exclusion_violation(IntegrityError("", {}, Exception(sqlite))) is None
@@ -0,0 +1,206 @@
+from datetime import date, timedelta
+
+from app import crud, models, schemas
+from app.core.config import settings
+from app.crud.owner_summary import COUNTERS
+from tests.conftest import TestingSessionLocal, seed_database
+
+API = settings.API_V1_STR
+
+
+def _stored(owner_id):
+    with TestingSessionLocal() as session:
+        summary = session.get(models.OwnerSummary, owner_id)
+        return {
+            "rent_due_by_day": summary.rent_due_by_day,
+            "rent_collected": summary.rent_collected,
+            **{name: getattr(summary, name) for name in COUNTERS},
+        }
+
+
+def _rebuilt(owner_id):
+    with TestingSessionLocal() as session:
+        summary = crud.owner_summary.rebuild(session, owner_id=owner_id)
+        rebuilt = {
+            "rent_due_by_day": summary.rent_due_by_day,
+            "rent_collected": summary.rent_collected,
+            **{name: getattr(summary, name) for name in COUNTERS},
+        }
+        session.rollback()
+        return rebuilt
+
+
+def test_write_paths_keep_counters_in_step(client, db):
+    seed = seed_database(db)
+    owner = seed.headers(seed.owner)
+    tenant = seed.headers(seed.tenant_user)
+    today = date.today()
+
+    def ok(response):
+        assert response.status_code in (200, 202), response.text
+        return response.json()
+
+    new_property = ok(client.post(f"{API}/properties/", headers=owner, json={
+        "title": "New listing", "property_type": "House", "address": "1 New Road",
+        "city": "Mumbai", "state": "Maharashtra", "zip_code": "400001", "bedrooms": 3,
+        "bathrooms": 2.0, "monthly_rent": 45000.0, "security_deposit": 90000.0,
+    }))["id"]
+    # Started this month: due on the 10th of it
+    contract_id = ok(client.post(f"{API}/contracts/", headers=owner, json={
+        "property_id": seed.vacant_property.id, "tenant_id": seed.tenant.id,
+        "start_date": str(today.replace(day=1)), "end_date": str(today + timedelta(days=365)),
+        "monthly_rent": 30000.0, "security_deposit": 60000.0, "payment_due_day": 10,
+    }))["id"]
+    ok(client.put(f"{API}/contracts/{contract_id}", headers=owner, json={"monthly_rent": 32000.0}))
+    ok(client.put(f"{API}/contracts/{seed.contracts[0].id}", headers=owner, json={"is_active": False}))
+    ok(client.post(f"{API}/contracts/{contract_id}/payments", headers=tenant, json={
+        "contract_id": contract_id, "amount": 32000.0, "payment_date": str(today),
+    }))
+    request_id = ok(client.post(f"{API}/contracts/{contract_id}/maintenance", headers=tenant, json={
+        "contract_id": contract_id, "title": "No water", "description": "Pump failed",
+        "request_date": str(today), "priority": "emergency",
+    }))["id"]
+    ok(client.post(f"{API}/contracts/maintenance/queue/claim", headers=owner))
+    ok(client.put(f"{API}/contracts/maintenance/{request_id}", headers=owner, json={"priority": "low"}))
+    ok(client.delete(f"{API}/properties/{new_property}", headers=owner))
+
+    stored = _stored(seed.owner.id)
+    assert stored == _rebuilt(seed.owner.id)
+    assert stored["rent_due_by_day"]["10"] == 32000.0
+    assert stored["occupied_count"] == 3
+
+
+def test_only_contracts_due_this_month_count_as_rent_due(client, db):
+    seed = seed_database(db)
+    owner = seed.headers(seed.owner)
+    before = client.get(f"{API}/owners/me/summary", headers=owner).json()
+    today = date.today()
+    last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+    # Booked ahead, and ended last month without being deactivated
+    for start, end in [
+        (today + timedelta(days=90), today + timedelta(days=455)),
+        (last_month - timedelta(days=365), last_month + timedelta(days=20)),
+    ]:
+        response = client.post(f"{API}/contracts/", headers=owner, json={
+            "property_id": seed.vacant_property.id, "tenant_id": seed.tenant.id,
+            "start_date": str(start), "end_date": str(end),
+            "monthly_rent": 30000.0, "security_deposit": 60000.0, "payment_due_day": 1,
+        })
+        assert response.status_code == 200, response.text
+
+    after = client.get(f"{API}/owners/me/summary", headers=owner).json()
+    assert after["active_contracts"] == before["active_contracts"] + 2
+    for name in ("rent_due_this_month", "overdue_amount"):
+        assert after[name] == before[name]
+    assert _stored(seed.owner.id) == _rebuilt(seed.owner.id)
+
+    # Counters of last month are refreshed on the next read
+    stale = db.get(models.OwnerSummary, seed.owner.id)
+    stale.rent_month, stale.rent_due_by_day = last_month, {"1": 30000.0}
+    db.commit()
+    refreshed = client.get(f"{API}/owners/me/summary", headers=owner).json()
+    assert refreshed["rent_due_this_month"] == before["rent_due_this_month"]
+    # The lease booked ahead is due once its month comes
+    ahead = (today + timedelta(days=120)).replace(day=1)
+    summary = crud.owner_summary.rebuild(db, owner_id=seed.owner.id, today=ahead)
+    assert summary.rent_due_by_day["1"] >= 30000.0
+    db.rollback()
+
+
+def test_summary_endpoint(client, db):
+    seed = seed_database(db)
+    response = client.get(f"{API}/owners/me/summary", headers=seed.headers(seed.owner))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["property_count"] == 5
+    assert body["occupied_count"] == 2
+    assert body["occupancy_rate"] == 0.4
+    assert body["active_contracts"] == 2
+    assert body["pending_maintenance"] == 4
+    assert body["urgent_maintenance"] == 2
+
+    response = client.get(f"{API}/owners/me/summary", headers=seed.headers(seed.tenant_user))
+    assert response.status_code == 403
+
+
+def test_summary_is_built_on_first_read(client, db):
+    seed = seed_database(db)
+    db.query(models.OwnerSummary).delete()
+    db.commit()
+    response = client.get(f"{API}/owners/me/summary", headers=seed.headers(seed.owner))
+    assert response.json()["property_count"] == 5
+    assert db.get(models.OwnerSummary, seed.owner.id) is not None
+
+
+def test_overdue_amount_counts_rent_due_so_far():
+    summary = models.OwnerSummary(
+        property_count=3,
+        occupied_count=3,
+        rent_due_by_day={"1": 10000.0, "15": 20000.0, "31": 5000.0},
+        rent_month=date(2024, 2, 1),
+        rent_collected=4000.0,
+    )
+    figures = crud.owner_summary.figures(summary, today=date(2024, 2, 10))
+    assert figures["rent_collected_this_month"] == 4000.0
+    assert figures["overdue_amount"] == 6000.0
+    # Due on the 31st falls due on the last day of February
+    figures = crud.owner_summary.figures(summary, today=date(2024, 2, 29))
+    assert figures["overdue_amount"] == 31000.0
+    # Nothing collected yet in a month the counters have not seen
+    figures = crud.owner_summary.figures(summary, today=date(2024, 3, 1))
+    assert figures["rent_collected_this_month"] == 0.0
+    assert figures["overdue_amount"] == 10000.0
+
+
+def test_payments_roll_the_month_over(db):
+    seed = seed_database(db)
+    owner_id = seed.owner.id
+    summary = db.get(models.OwnerSummary, owner_id)
+    month = summary.rent_month
+    collected = summary.rent_collected
+
+    contract_id = seed.contracts[0].id
+
+    def pay(amount, payment_date):
+        crud.rent_payment.create(db, obj_in=schemas.RentPaymentCreate(
+            contract_id=contract_id, amount=amount, payment_date=payment_date
+        ))
+
+    pay(100.0, month)
+    pay(50.0, month - timedelta(days=1))
+    db.commit()
+    assert _stored(owner_id)["rent_collected"] == collected + 100.0
+
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    pay(70.0, next_month)
+    db.commit()
+    db.expire_all()
+    summary = db.get(models.OwnerSummary, owner_id)
+    assert (summary.rent_month, summary.rent_collected) == (next_month, 70.0)
+
+
+def test_first_writes_racing_to_create_the_summary(db, monkeypatch):
+    seed = seed_database(db)
+    owner_id = seed.other_owner.id
+    db.query(models.OwnerSummary).filter(models.OwnerSummary.owner_id == owner_id).delete()
+    db.commit()
+    stale = _rebuilt(owner_id)
+    get = db.get
+
+    def created_meanwhile(entity, ident, **kwargs):
+        # Another transaction inserts the row, without this one's property,
+        # between the lookup and the insert of the rebuild
+        if entity is models.OwnerSummary and get(entity, ident, **kwargs) is None:
+            db.add(models.OwnerSummary(owner_id=owner_id, **stale))
+            db.flush()
+            db.expunge(db.get(entity, ident))
+            return None
+        return get(entity, ident, **kwargs)
+
+    monkeypatch.setattr(db, "get", created_meanwhile)
+    crud.owner_summary.adjust(db, owner_id=owner_id, property_count=1)
+    crud.owner_summary.record_payment(db, owner_id=owner_id, amount=10.0, payment_date=date.today())
+    db.commit()
+    assert _stored(owner_id)["property_count"] == stale["property_count"] + 1
+    assert _stored(owner_id)["rent_collected"] == stale["rent_collected"] + 10.0
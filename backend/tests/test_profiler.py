@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.profiler import ProfilerBusy, SamplingProfiler, profiler
+from tests.conftest import seed_database
+
+API = settings.API_V1_STR
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_collapses_stacks_of_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        result = SamplingProfiler().profile(0.2, interval=0.005, memory=True)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result["samples"] > 1
+    lines = result["collapsed"].splitlines()
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy and all("tests.test_profiler:_busy_loop" in line for line in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert isinstance(result["allocations"], list)
+
+
+def test_only_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    thread = threading.Thread(target=profiler.profile, args=(0.3,), kwargs={"memory": False})
+    thread.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(ProfilerBusy):
+            profiler.profile(0.01)
+    finally:
+        thread.join()
+
+
+def test_profile_endpoint(client, db):
+    seed = seed_database(db)
+    params = {"seconds": 0.05, "memory": False, "format": "collapsed"}
+    response = client.post(f"{API}/admin/profile", params=params, headers=seed.headers(seed.admin))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert not profiler.running
+
+    response = client.post(f"{API}/admin/profile", params=params, headers=seed.headers(seed.owner))
+    assert response.status_code == 403
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import json
+import threading
+
+from PIL import Image
+
+from app import models
+from app.core.config import settings
+from app.core.disk_cache import DiskLRUCache
+from app.services import images
+from tests.conftest import TestingSessionLocal, image_bytes, seed_database
+
+API = settings.API_V1_STR
+
+
+def _upload(client, seed, content, user=None, prop=None):
+    return client.post(
+        f"{API}/properties/{(prop or seed.properties[0]).id}/images",
+        content=content,
+        headers=seed.headers(user or seed.owner),
+    )
+
+
+def _digest(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def _decode(response):
+    assert response.headers["content-type"] == "image/webp"
+    return Image.open(io.BytesIO(response.content))
+
+
+def test_upload_renders_variants_and_updates_images(client, db):
+    seed = seed_database(db)
+    response = _upload(client, seed, image_bytes(3000, 2000, "JPEG"))
+    assert response.status_code == 202, response.text
+    assert response.json()["status"] == "processing"
+    image_id = response.json()["id"]
+
+    # Rendering finishes before the test client returns
+    listed = client.get(f"{API}/properties/{seed.properties[0].id}/images").json()
+    assert [i["id"] for i in listed] == [image_id]
+    image = listed[0]
+    assert image["status"] == "ready"
+    assert (image["width"], image["height"]) == (3000, 2000)
+    assert {name: (v["width"], v["height"]) for name, v in image["variants"].items()} == {
+        "thumb": (160, 107), "small": (480, 320), "medium": (960, 640), "large": (1920, 1280),
+    }
+
+    thumb = client.get(image["variants"]["thumb"]["url"])
+    assert thumb.status_code == 200
+    assert thumb.headers["content-disposition"] == "inline"
+    assert thumb.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert _decode(thumb).size == (160, 107)
+
+    with TestingSessionLocal() as session:
+        prop = session.get(models.Property, seed.properties[0].id)
+        assert json.loads(prop.images) == [image["variants"]["large"]["url"]]
+
+
+def test_small_images_are_not_upscaled_and_exif_is_applied(client, db):
+    seed = seed_database(db)
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees
+    Image.new("RGB", (400, 200), "white").save(buffer, "JPEG", exif=exif)
+    image_id = _upload(client, seed, buffer.getvalue()).json()["id"]
+
+    image = client.get(f"{API}/properties/{seed.properties[0].id}/images").json()[0]
+    assert image["id"] == image_id
+    assert (image["width"], image["height"]) == (200, 400)
+    assert (image["variants"]["thumb"]["width"], image["variants"]["thumb"]["height"]) == (80, 160)
+    assert image["variants"]["large"]["height"] == 400
+    # Variants larger than the original are the original size, stored once
+    with TestingSessionLocal() as session:
+        variants = session.get(models.PropertyImage, image_id).variants
+    assert variants["large"]["digest"] == variants["medium"]["digest"]
+
+
+def test_on_demand_widths_are_cached(client, db, variant_cache):
+    seed = seed_database(db)
+    image_id = _upload(client, seed, image_bytes(1200, 800)).json()["id"]
+    url = f"{API}/properties/images/{image_id}"
+
+    first = client.get(f"{url}/300")
+    assert first.status_code == 200
+    assert _decode(first).size == (320, 213)
+    cached = variant_cache.size
+    assert cached > 0
+
+    again = client.get(f"{url}/310")
+    assert again.content == first.content
+    assert variant_cache.size == cached
+
+    # A width that matches a standard variant is served from the blob store
+    small = client.get(f"{url}/480")
+    assert small.headers["etag"] == f'"{_digest(small.content)}"'
+    assert _decode(small).size == (480, 320)
+    assert variant_cache.size == cached
+
+    assert client.get(f"{url}/huge").status_code == 404
+    assert client.get(f"{url}/0").status_code == 404
+
+
+def test_upload_rejections(client, db):
+    seed = seed_database(db)
+    assert _upload(client, seed, b"%PDF-1.7 not an image").status_code == 415
+    assert _upload(client, seed, image_bytes(), user=seed.other_owner).status_code == 403
+    assert _upload(client, seed, image_bytes(), user=seed.tenant_user).status_code == 403
+
+    # Looks like a PNG, but does not decode
+    response = _upload(client, seed, b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+    assert response.status_code == 202
+    image = client.get(f"{API}/properties/{seed.properties[0].id}/images").json()[0]
+    assert image["status"] == "failed"
+    assert image["error"].startswith("Not a supported image")
+    assert client.get(f"{API}/properties/images/{image['id']}/thumb").status_code == 404
+
+
+def test_pool_is_bounded(client, db, monkeypatch):
+    seed = seed_database(db)
+    images._get_pool()
+    monkeypatch.setattr(images, "_slots", threading.BoundedSemaphore(1))
+    images._slots.acquire()
+    response = _upload(client, seed, image_bytes())
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.put("c", b"c" * 10)
+    assert cache.get("a") is not None
+    cache.put("d", b"d" * 10)
+    assert cache.get("b") is None
+    assert {key for key in "acd" if cache.get(key)} == set("acd")
+    assert cache.size == 30
+
+    # Recency survives a restart through modification times
+    reopened = DiskLRUCache(str(tmp_path), max_bytes=30)
+    reopened.get("c")
+    reopened.put("e", b"e" * 10)
+    assert reopened.get("c") is not None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["c", "d", "e"]
@@ -0,0 +1,426 @@
+"""
+Per-endpoint SQL query budgets.
+
+Every route registered on the application must be listed in CASES with the
+maximum number of statements a single request may issue. List endpoints are
+additionally replayed against a larger dataset: their statement count has to
+stay flat as the result set grows, which is what catches N+1 access patterns.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+from app import models
+from app.core.config import settings
+from app.main import app
+from tests.conftest import PASSWORD, Seed, TestingSessionLocal, image_bytes, seed_database
+
+API = settings.API_V1_STR
+TODAY = date.today()
+
+
+@dataclass
+class Case:
+    method: str
+    route: str
+    budget: int
+    as_user: Optional[str] = None
+    path: Optional[Callable[[Seed], str]] = None
+    json: Optional[Callable[[Seed], Any]] = None
+    data: Optional[Callable[[Seed], Dict[str, str]]] = None
+    params: Optional[Dict[str, Any]] = None
+    files: Optional[Callable[[Seed], Dict[str, Any]]] = None
+    content: Optional[Callable[[Seed], bytes]] = None
+    status: int = 200
+    scales: bool = False
+
+    @property
+    def id(self) -> str:
+        suffix = f"-{self.as_user}" if self.as_user else ""
+        if self.status != 200:
+            suffix += f"-{self.status}"
+        return f"{self.method} {self.route}{suffix}"
+
+
+def _property_payload(seed: Seed) -> Dict[str, Any]:
+    return {
+        "title": "New listing",
+        "property_type": "House",
+        "address": "1 New Road",
+        "city": "Mumbai",
+        "state": "Maharashtra",
+        "zip_code": "400001",
+        "bedrooms": 3,
+        "bathrooms": 2.0,
+        "monthly_rent": 45000.0,
+        "security_deposit": 90000.0,
+    }
+
+
+def _statement(seed: Seed) -> str:
+    """One line matching by reference, one by contract and amount, one new payment."""
+    payment = seed.payments[0]
+    contract = seed.contracts[1]
+    lines = [
+        "date,amount,reference,contract_id",
+        f"{payment.payment_date},{payment.amount},{payment.transaction_id},",
+        f"{TODAY},{seed.payments[1].amount},BANK-1,{seed.payments[1].contract_id}",
+        f"{TODAY + timedelta(days=40)},{contract.monthly_rent},BANK-2,{contract.id}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _contract_payload(seed: Seed) -> Dict[str, Any]:
+    return {
+        "property_id": seed.vacant_property.id,
+        "tenant_id": seed.tenant.id,
+        "start_date": str(TODAY),
+        "end_date": str(TODAY + timedelta(days=365)),
+        "monthly_rent": seed.vacant_property.monthly_rent,
+        "security_deposit": seed.vacant_property.security_deposit,
+    }
+
+
+CASES = [
+    Case("GET", "/", 0, path=lambda s: "/"),
+    # Authentication
+    Case(
+        "POST", f"{API}/auth/login", 1,
+        data=lambda s: {"username": s.owner.email, "password": PASSWORD},
+    ),
+    Case(
+        "POST", f"{API}/auth/register", 1,
+        json=lambda s: {
+            "email": "new@example.com", "password": PASSWORD, "full_name": "New User"
+        },
+    ),
+    Case(
+        "POST", f"{API}/auth/register", 1, status=400,
+        json=lambda s: {"email": s.owner.email, "password": PASSWORD, "full_name": "Again"},
+    ),
+    Case("POST", f"{API}/auth/test-token", 1, as_user="owner"),
+    # Users
+    Case("GET", f"{API}/users/", 2, as_user="owner", scales=True),
+    Case("GET", f"{API}/users/me", 1, as_user="owner"),
+    Case("PUT", f"{API}/users/me", 2, as_user="owner", json=lambda s: {"full_name": "Renamed"}),
+    Case("GET", f"{API}/users/{{user_id}}", 2, as_user="owner", path=lambda s: f"{API}/users/{s.tenant_user.id}"),
+    Case(
+        "PUT", f"{API}/users/{{user_id}}", 3, as_user="owner",
+        path=lambda s: f"{API}/users/{s.plain_user.id}",
+        json=lambda s: {"phone_number": "9999999999"},
+    ),
+    # Properties
+    Case("GET", f"{API}/properties/", 1, scales=True),
+    Case("GET", f"{API}/properties/", 1, params={"city": "Pune", "min_bedrooms": 1}, scales=True),
+    Case("GET", f"{API}/properties/", 1, params={"available_from": str(TODAY)}, scales=True),
+    Case("GET", f"{API}/properties/", 1, params={"ids": "2,1,999"}),
+    Case("GET", f"{API}/properties/", 2, params={"city": "Pune", "with_total": True}),
+    # User, insert, owner summary; then saved searches changed?, index load
+    # (first use only), the match for the tenant's saved search
+    Case("POST", f"{API}/properties/", 6, as_user="owner", json=_property_payload),
+    Case("GET", f"{API}/properties/my-properties", 2, as_user="owner", scales=True),
+    Case("GET", f"{API}/properties/my-properties", 3, as_user="owner", params={"with_total": True}),
+    Case(
+        "GET", f"{API}/properties/{{property_id}}", 1,
+        path=lambda s: f"{API}/properties/{s.properties[0].id}",
+    ),
+    # Property, index load (first use only), similar properties
+    Case(
+        "GET", f"{API}/properties/{{property_id}}/similar", 3,
+        path=lambda s: f"{API}/properties/{s.properties[0].id}/similar",
+    ),
+    # User, property, insert; then, once rendered, image, locked property,
+    # image and property updates
+    Case(
+        "POST", f"{API}/properties/{{property_id}}/images", 7, as_user="owner",
+        path=lambda s: f"{API}/properties/{s.properties[0].id}/images",
+        content=lambda s: image_bytes(), status=202,
+    ),
+    Case(
+        "GET", f"{API}/properties/{{property_id}}/images", 1,
+        path=lambda s: f"{API}/properties/{s.properties[0].id}/images", scales=True,
+    ),
+    Case(
+        "GET", f"{API}/properties/images/{{image_id}}/{{variant}}", 1,
+        path=lambda s: f"{API}/properties/images/{s.images[0].id}/thumb",
+    ),
+    Case(
+        "PUT", f"{API}/properties/{{property_id}}", 3, as_user="owner",
+        path=lambda s: f"{API}/properties/{s.vacant_property.id}",
+        json=lambda s: {"monthly_rent": 21000.0},
+    ),
+    # Its saved-search matches go first: SQLite does not cascade them
+    Case(
+        "DELETE", f"{API}/properties/{{property_id}}", 6, as_user="owner",
+        path=lambda s: f"{API}/properties/{s.vacant_property.id}",
+    ),
+    # Tenants
+    Case(
+        "POST", f"{API}/tenants/register", 3, as_user="plain_user",
+        json=lambda s: {
+            "date_of_birth": "1992-02-02",
+            "identification_type": "Passport",
+            "identification_number": "P1234567",
+        },
+    ),
+    Case(
+        "POST", f"{API}/tenants/register", 2, as_user="plain_user", status=400,
+        json=lambda s: {
+            "date_of_birth": "1992-02-02",
+            "identification_type": "PAN",
+            "identification_number": s.tenant.identification_number,
+        },
+    ),
+    Case("GET", f"{API}/tenants/me", 2, as_user="tenant_user"),
+    Case("GET", f"{API}/tenants/", 2, as_user="owner", params={"ids": "1,999"}),
+    Case("PUT", f"{API}/tenants/me", 3, as_user="tenant_user", json=lambda s: {"occupation": "Engineer"}),
+    Case(
+        "GET", f"{API}/tenants/{{tenant_id}}", 2, as_user="owner",
+        path=lambda s: f"{API}/tenants/{s.tenant.id}",
+    ),
+    # Contracts
+    # Locks the property and probes its occupancy, locks the owner summary to
+    # add the rent due, then counts the property as occupied
+    Case("POST", f"{API}/contracts/", 10, as_user="owner", json=_contract_payload),
+    Case("GET", f"{API}/contracts/", 2, as_user="owner", scales=True),
+    Case("GET", f"{API}/contracts/", 3, as_user="tenant_user", scales=True),
+    Case("GET", f"{API}/contracts/", 3, as_user="owner", params={"with_total": True}),
+    Case("GET", f"{API}/contracts/", 2, as_user="owner", params={"ids": "1,2,3,999"}),
+    Case("GET", f"{API}/contracts/", 3, as_user="tenant_user", params={"ids": "1,2,3,999"}),
+    Case(
+        "GET", f"{API}/contracts/{{contract_id}}", 3, as_user="owner",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}",
+    ),
+    Case(
+        "PUT", f"{API}/contracts/{{contract_id}}", 4, as_user="owner",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}",
+        json=lambda s: {"signed_by_owner": True},
+    ),
+    Case(
+        "POST", f"{API}/contracts/{{contract_id}}/payments", 6, as_user="tenant_user",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/payments",
+        json=lambda s: {
+            "contract_id": s.contracts[0].id, "amount": 20000.0, "payment_date": str(TODAY)
+        },
+    ),
+    # Per chunk of statement lines: three lookups, then the bulk update, insert and counters;
+    # the line of next month starts it over: lock the counters, read its rent due, rewrite them
+    Case(
+        "POST", f"{API}/contracts/payments/reconcile", 9, as_user="owner",
+        files=lambda s: {"statement": ("statement.csv", _statement(s), "text/csv")},
+    ),
+    Case(
+        "GET", f"{API}/contracts/{{contract_id}}/payments", 4, as_user="owner",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/payments", scales=True,
+    ),
+    Case(
+        "POST", f"{API}/contracts/{{contract_id}}/maintenance", 6, as_user="tenant_user",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/maintenance",
+        json=lambda s: {
+            "contract_id": s.contracts[0].id,
+            "title": "Leaking tap",
+            "description": "Kitchen tap leaks",
+            "request_date": str(TODAY),
+        },
+    ),
+    Case(
+        "GET", f"{API}/contracts/{{contract_id}}/maintenance", 4, as_user="tenant_user",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/maintenance", scales=True,
+    ),
+    # User, contract, property or tenant, insert, tenant or property for the
+    # event audience, contract file URL update
+    Case(
+        "POST", f"{API}/contracts/{{contract_id}}/documents", 6, as_user="owner",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/documents",
+        params={"filename": "lease.pdf"}, content=lambda s: b"%PDF-1.7 signed lease",
+    ),
+    Case(
+        "GET", f"{API}/contracts/{{contract_id}}/documents", 4, as_user="tenant_user",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/documents", scales=True,
+    ),
+    Case(
+        "GET", f"{API}/contracts/{{contract_id}}/documents/{{document_id}}/content", 4,
+        as_user="tenant_user",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/documents/{s.documents[0].id}/content",
+    ),
+    Case(
+        "HEAD", f"{API}/contracts/{{contract_id}}/documents/{{document_id}}/content", 4,
+        as_user="owner",
+        path=lambda s: f"{API}/contracts/{s.contracts[0].id}/documents/{s.documents[0].id}/content",
+    ),
+    Case("GET", f"{API}/contracts/maintenance/queue", 2, as_user="owner", scales=True),
+    Case("POST", f"{API}/contracts/maintenance/queue/claim", 5, as_user="owner"),
+    Case(
+        "POST", f"{API}/contracts/maintenance/{{request_id}}/transition", 7, as_user="owner",
+        path=lambda s: f"{API}/contracts/maintenance/{s.maintenance_requests[0].id}/transition",
+        json=lambda s: {"status": "in_progress"},
+    ),
+    Case(
+        "PUT", f"{API}/contracts/maintenance/{{request_id}}", 7, as_user="owner",
+        path=lambda s: f"{API}/contracts/maintenance/{s.maintenance_requests[0].id}",
+        json=lambda s: {"status": "in_progress"},
+    ),
+    # Owners
+    # One primary-key lookup whatever the size of the portfolio
+    Case("GET", f"{API}/owners/me/summary", 2, as_user="owner"),
+    # User, then contract terms and asking rents as plain rows
+    Case("GET", f"{API}/owners/me/cashflow", 3, as_user="owner", params={"months": 36}),
+    Case(
+        "POST",
+        f"{API}/owners/me/affordability",
+        5,
+        as_user="owner",
+        json=lambda s: {"tenant_ids": [s.tenant.id], "property_ids": [s.vacant_property.id]},
+    ),
+    # Saved searches
+    Case(
+        "POST", f"{API}/searches/", 3, as_user="tenant_user",
+        json=lambda s: {"city": "Pune", "max_rent": 30000.0},
+    ),
+    Case("GET", f"{API}/searches/", 2, as_user="tenant_user"),
+    Case("GET", f"{API}/searches/inbox", 2, as_user="tenant_user"),
+    Case(
+        "DELETE", f"{API}/searches/{{search_id}}", 4, as_user="tenant_user",
+        path=lambda s: f"{API}/searches/{s.saved_search.id}",
+    ),
+    # Time of the last rebuild and sketches load (first use only); nothing
+    # unsaved to write
+    Case("GET", f"{API}/market/rent-stats", 2, params={"city": "Pune"}),
+    # Admin
+    Case("GET", f"{API}/admin/slow-queries", 1, as_user="admin"),
+    Case("DELETE", f"{API}/admin/slow-queries", 1, as_user="admin"),
+    Case("GET", f"{API}/admin/traces", 1, as_user="admin"),
+    Case("DELETE", f"{API}/admin/traces", 1, as_user="admin"),
+    Case("POST", f"{API}/admin/profile", 1, as_user="admin", params={"seconds": 0.05, "memory": False}),
+]
+
+# Routes that cannot be exercised as a single request/response cycle
+EXEMPT_ROUTES = {
+    ("GET", f"{API}/openapi.json"),
+    ("GET", "/docs"),
+    ("GET", "/docs/oauth2-redirect"),
+    ("GET", "/redoc"),
+    # Infinite Server-Sent Events stream; covered by tests/test_events.py
+    ("GET", f"{API}/events/"),
+}
+
+
+def _run(client, seed: Seed, case: Case, counter):
+    kwargs: Dict[str, Any] = {}
+    if case.as_user:
+        kwargs["headers"] = seed.headers(getattr(seed, case.as_user))
+    if case.json:
+        kwargs["json"] = case.json(seed)
+    if case.data:
+        kwargs["data"] = case.data(seed)
+    if case.params:
+        kwargs["params"] = case.params
+    if case.files:
+        kwargs["files"] = case.files(seed)
+    if case.content:
+        kwargs["content"] = case.content(seed)
+    path = case.path(seed) if case.path else case.route
+    with counter:
+        response = client.request(case.method, path, **kwargs)
+    assert response.status_code == case.status, response.text
+    return response
+
+
+def _seed(db, size: int, store) -> Seed:
+    seed = seed_database(db, size=size, store=store)
+    # Detach seeded objects so that reading their ids never hits the database
+    db.expunge_all()
+    return seed
+
+
+def grow_database(db, seed: Seed) -> None:
+    """
+    Add more users, properties, contracts and contract history for the owner
+    and tenant of an already seeded database.
+    """
+    today = date.today()
+    owner = db.get(models.User, seed.owner.id)
+    for i in range(3):
+        prop = models.Property(
+            title=f"Extra {i}", property_type="Apartment", address=f"{i} Side Street",
+            city="Pune", state="Maharashtra", zip_code="411002", bedrooms=2,
+            bathrooms=1.0, monthly_rent=18000.0, security_deposit=36000.0,
+            is_available=True, owner_id=owner.id,
+        )
+        rented = models.Property(
+            title=f"Rented {i}", property_type="Apartment", address=f"{i} Rented Road",
+            city="Pune", state="Maharashtra", zip_code="411003", bedrooms=2,
+            bathrooms=1.0, monthly_rent=19000.0, security_deposit=38000.0,
+            is_available=False, owner_id=owner.id,
+        )
+        db.add_all([prop, rented])
+        db.flush()
+        contract = models.RentalContract(
+            start_date=today, end_date=today + timedelta(days=365),
+            monthly_rent=19000.0, security_deposit=38000.0,
+            property_id=rented.id, tenant_id=seed.tenant.id,
+        )
+        db.add(contract)
+        db.add(models.User(
+            email=f"extra{i}@example.com", hashed_password="x", full_name=f"Extra {i}",
+        ))
+    first_contract = seed.contracts[0].id
+    for j in range(3):
+        db.add(models.RentPayment(
+            amount=20000.0, payment_date=today, contract_id=first_contract,
+        ))
+        db.add(models.MaintenanceRequest(
+            title=f"Extra issue {j}", description="More problems",
+            request_date=today, contract_id=first_contract,
+        ))
+        db.add(models.PropertyImage(
+            digest=seed.images[0].digest, content_type="image/png", status="processing",
+            property_id=seed.properties[0].id,
+        ))
+        db.add(models.ContractDocument(
+            digest=seed.documents[0].digest, size=seed.documents[0].size,
+            content_type="text/plain", filename=f"addendum-{j}.txt", contract_id=first_contract,
+        ))
+    db.commit()
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda c: c.id)
+def test_query_budget(client, db, blob_store, query_counter, case):
+    seed = _seed(db, size=2, store=blob_store)
+    _run(client, seed, case, query_counter)
+    assert query_counter.count <= case.budget, (
+        f"{case.id} issued {query_counter.count} statements "
+        f"(budget {case.budget}):\n" + "\n".join(query_counter.statements)
+    )
+
+
+@pytest.mark.parametrize("case", [c for c in CASES if c.scales], ids=lambda c: c.id)
+def test_query_count_independent_of_result_size(client, db, blob_store, query_counter, case):
+    seed = _seed(db, size=2, store=blob_store)
+    small = len(_run(client, seed, case, query_counter).json())
+    small_count = query_counter.count
+
+    with TestingSessionLocal() as session:
+        grow_database(session, seed)
+    large = len(_run(client, seed, case, query_counter).json())
+
+    assert large > small, f"{case.id} result set did not grow ({small} -> {large})"
+    assert query_counter.count == small_count, (
+        f"{case.id} issued {small_count} statements for {small} rows but "
+        f"{query_counter.count} for {large} rows:\n" + "\n".join(query_counter.statements)
+    )
+
+
+def test_every_route_has_a_budget():
+    covered = {(c.method, c.route) for c in CASES}
+    missing = []
+    for route in app.routes:
+        for method in getattr(route, "methods", None) or ():
+            if method in ("HEAD", "OPTIONS"):
+                continue
+            key = (method, route.path)
+            if key not in covered and key not in EXEMPT_ROUTES:
+                missing.append(f"{method} {route.path}")
+    assert not missing, "Routes without a query budget: " + ", ".join(sorted(missing))
@@ -0,0 +1,141 @@
+import io
+import json
+from datetime import date, timedelta
+
+from app import crud, models
+from app.core.config import settings
+from app.services.reconciliation import Reconciler, read_statement
+from tests.conftest import TestingSessionLocal, seed_database
+
+API = settings.API_V1_STR
+TODAY = date.today()
+
+
+def _post(client, seed, lines, user=None, **params):
+    statement = "date,amount,reference,contract_id\n" + "".join(line + "\n" for line in lines)
+    response = client.post(
+        f"{API}/contracts/payments/reconcile",
+        params=params,
+        files={"statement": ("statement.csv", statement, "text/csv")},
+        headers=seed.headers(user or seed.owner),
+    )
+    assert response.status_code == 200, response.text
+    first, *rest = [json.loads(line) for line in response.text.splitlines()]
+    return first, rest
+
+
+def _unreferenced_payment(db, contract, payment_date):
+    payment = models.RentPayment(
+        amount=contract.monthly_rent, payment_date=payment_date, contract_id=contract.id
+    )
+    db.add(payment)
+    db.commit()
+    return payment
+
+
+def test_statuses(client, db):
+    seed = seed_database(db)
+    contract = seed.contracts[0]
+    paid = seed.payments[0]
+    loose = _unreferenced_payment(db, seed.contracts[1], TODAY - timedelta(days=100))
+    missing_month = TODAY - timedelta(days=62)
+    summary, results = _post(client, seed, [
+        f"{paid.payment_date},{paid.amount},{paid.transaction_id},",
+        f"{paid.payment_date},1.00,{paid.transaction_id},",
+        f"{TODAY - timedelta(days=98)},{loose.amount},BANK-LOOSE,{loose.contract_id}",
+        f"{missing_month},{contract.monthly_rent},BANK-NEW,{contract.id}",
+        f"{missing_month},{contract.monthly_rent},BANK-NEW,{contract.id}",
+        f"{missing_month},{contract.monthly_rent},BANK-OTHER,{contract.id}",
+        f"{TODAY},12.34,BANK-NOPE,",
+        f"{TODAY},500,,{seed.contracts[-1].id}",
+        f"yesterday,500,,",
+    ])
+    assert [r["status"] for r in results] == [
+        "matched", "ambiguous", "matched", "created", "matched", "unmatched",
+        "unmatched", "unmatched", "unmatched",
+    ]
+    assert summary["summary"] == {"matched": 3, "created": 1, "ambiguous": 1, "unmatched": 4}
+    assert results[0]["payment_id"] == paid.id
+    assert results[2]["payment_id"] == loose.id
+    assert results[4]["payment_id"] == results[3]["payment_id"] is not None
+    assert results[5]["reason"] == "rent for this month already paid"
+    assert results[7]["reason"] == "unknown contract"  # Another owner's contract
+    assert results[8]["reason"] == "invalid date"
+
+    db.expire_all()
+    assert db.get(models.RentPayment, loose.id).transaction_id == "BANK-LOOSE"
+    created = db.get(models.RentPayment, results[3]["payment_id"])
+    assert (created.contract_id, created.payment_date, created.transaction_id) == (
+        contract.id, missing_month, "BANK-NEW"
+    )
+
+
+def test_several_payments_in_window_are_ambiguous(client, db):
+    seed = seed_database(db)
+    contract = seed.contracts[1]
+    _unreferenced_payment(db, contract, TODAY - timedelta(days=101))
+    _unreferenced_payment(db, contract, TODAY - timedelta(days=99))
+    _, results = _post(client, seed, [f"{TODAY - timedelta(days=100)},{contract.monthly_rent},,{contract.id}"])
+    assert results[0]["status"] == "ambiguous"
+
+
+def test_dry_run_writes_nothing(client, db):
+    seed = seed_database(db)
+    contract = seed.contracts[0]
+    count = db.query(models.RentPayment).count()
+    summary, results = _post(
+        client, seed, [f"{TODAY - timedelta(days=62)},{contract.monthly_rent},BANK-NEW,{contract.id}"],
+        dry_run=True,
+    )
+    assert results[0]["status"] == "created"
+    assert summary["dry_run"] is True
+    assert db.query(models.RentPayment).count() == count
+
+
+def test_claims_carry_over_between_chunks(db):
+    seed = seed_database(db)
+    contract = seed.contracts[1]
+    _unreferenced_payment(db, contract, TODAY - timedelta(days=100))
+    statement = io.StringIO(
+        "date,amount,reference,contract_id\n"
+        f"{TODAY - timedelta(days=100)},{contract.monthly_rent},BANK-A,{contract.id}\n"
+        f"{TODAY - timedelta(days=100)},{contract.monthly_rent},BANK-B,{contract.id}\n"
+    )
+    results = []
+    with TestingSessionLocal() as session:
+        summary = Reconciler(session, chunk_size=1).run(read_statement(statement), results.append)
+        session.commit()
+    assert [r["status"] for r in results] == ["matched", "unmatched"]
+    assert summary["matched"] == 1
+
+
+def test_created_payments_update_owner_counters(client, db):
+    seed = seed_database(db)
+    contract = seed.contracts[0]
+    before = db.get(models.OwnerSummary, seed.owner.id).rent_collected
+    _post(client, seed, [f"{TODAY},{contract.monthly_rent},BANK-TODAY,{contract.id}"])
+    # Today's month already has a payment for this contract, so nothing was created
+    db.expire_all()
+    assert db.get(models.OwnerSummary, seed.owner.id).rent_collected == before
+
+    other = seed.contracts[1]
+    db.query(models.RentPayment).filter(models.RentPayment.contract_id == other.id).delete()
+    db.commit()
+    crud.owner_summary.rebuild(db, owner_id=seed.owner.id)
+    db.commit()
+    before = db.get(models.OwnerSummary, seed.owner.id).rent_collected
+    _, results = _post(client, seed, [f"{TODAY},{other.monthly_rent},BANK-TODAY-2,{other.id}"])
+    assert results[0]["status"] == "created"
+    db.expire_all()
+    assert db.get(models.OwnerSummary, seed.owner.id).rent_collected == before + other.monthly_rent
+
+
+def test_statement_without_required_columns(client, db):
+    seed = seed_database(db)
+    response = client.post(
+        f"{API}/contracts/payments/reconcile",
+        files={"statement": ("statement.csv", "when,how much\n", "text/csv")},
+        headers=seed.headers(seed.owner),
+    )
+    assert response.status_code == 400
+    assert "amount" in response.json()["detail"]
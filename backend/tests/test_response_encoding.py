@@ -0,0 +1,169 @@
+import asyncio
+import gzip
+import json
+
+import brotli
+import msgpack
+
+from app.api.responses import preferred_media_type
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.config import settings
+from tests.conftest import seed_database
+
+API = settings.API_V1_STR
+MSGPACK = "application/msgpack"
+
+
+def _payments(client, seed, **headers):
+    return client.get(
+        f"{API}/contracts/{seed.contracts[0].id}/payments",
+        headers={**seed.headers(seed.owner), **headers},
+    )
+
+
+def test_media_type_negotiation():
+    assert preferred_media_type(None) == "application/json"
+    assert preferred_media_type("*/*") == "application/json"
+    assert preferred_media_type("application/json") == "application/json"
+    assert preferred_media_type("application/msgpack") == MSGPACK
+    assert preferred_media_type("application/x-msgpack, application/json") == MSGPACK
+    assert preferred_media_type("application/msgpack;q=0.5, application/json") == "application/json"
+    assert preferred_media_type("application/msgpack;q=0, */*") == "application/json"
+    assert preferred_media_type("application/vnd.msgpack, */*;q=0.1") == MSGPACK
+
+
+def test_encoding_negotiation():
+    assert choose_encoding("") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("*, br;q=0") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+
+
+def test_msgpack_matches_json(client, db):
+    seed = seed_database(db, size=3)
+    as_json = client.get(f"{API}/properties/")
+    as_msgpack = client.get(f"{API}/properties/", headers={"Accept": MSGPACK})
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_msgpack.headers["content-type"] == MSGPACK
+    assert "Accept" in as_msgpack.headers["vary"]
+    assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+    assert len(as_msgpack.content) < len(as_json.content)
+
+    # Errors stay JSON
+    missing = client.get(f"{API}/properties/999999", headers={"Accept": MSGPACK})
+    assert missing.status_code == 404
+    assert missing.json() == {"detail": "Property not found"}
+    assert _payments(client, seed, Accept=MSGPACK).headers["content-type"] == MSGPACK
+
+
+def test_compression_above_threshold(client, db):
+    seed = seed_database(db, size=3)
+    plain = client.get(f"{API}/properties/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert len(plain.content) >= settings.COMPRESSION_MINIMUM_SIZE
+
+    for encoding in ("br", "gzip"):
+        compressed = client.get(f"{API}/properties/", headers={"Accept-Encoding": encoding})
+        assert compressed.headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in compressed.headers["vary"]
+        assert int(compressed.headers["content-length"]) < len(plain.content)
+        assert compressed.json() == plain.json()
+
+    # Below the threshold
+    small = _payments(client, seed, **{"Accept-Encoding": "gzip, br"})
+    assert len(small.content) < settings.COMPRESSION_MINIMUM_SIZE
+    assert "content-encoding" not in small.headers
+
+
+def test_large_lists_are_streamed(client, db, monkeypatch):
+    seed = seed_database(db, size=3)
+    expected = _payments(client, seed, **{"Accept-Encoding": "identity"}).json()
+    monkeypatch.setattr(settings, "RESPONSE_STREAM_MIN_ITEMS", 2)
+    monkeypatch.setattr("app.api.responses.STREAM_BATCH_ITEMS", 2)
+
+    streamed = _payments(client, seed, **{"Accept-Encoding": "identity"})
+    assert "content-length" not in streamed.headers
+    assert streamed.json() == expected
+
+    with client.stream(
+        "GET",
+        f"{API}/contracts/{seed.contracts[0].id}/payments",
+        headers={**seed.headers(seed.owner), "Accept-Encoding": "gzip", "Accept": MSGPACK},
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert msgpack.unpackb(gzip.decompress(raw)) == expected
+
+
+def test_downloads_are_not_recompressed(client, db, blob_store):
+    seed = seed_database(db, store=blob_store)
+    document = seed.documents[0]
+    response = client.get(
+        f"{API}/contracts/{document.contract_id}/documents/{document.id}/content",
+        headers={**seed.headers(seed.owner), "Accept-Encoding": "gzip, br"},
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == str(document.size)
+
+
+def _run(app, accept_encoding):
+    middleware = CompressionMiddleware(app, minimum_size=10)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_event_streams_pass_through():
+    events = [b"data: one\n\n" * 10, b"data: two\n\n" * 10]
+
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream; charset=utf-8")],
+        })
+        for event in events:
+            await send({"type": "http.response.body", "body": event, "more_body": True})
+
+    start, *bodies = _run(app, "gzip, br")
+    assert b"content-encoding" not in dict(start["headers"])
+    # Each event goes out as soon as it is sent
+    assert [b["body"] for b in bodies] == events
+
+
+def test_streamed_brotli_round_trip():
+    chunks = [json.dumps({"row": i, "text": "x" * 50}).encode() for i in range(100)]
+
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", b"999")],
+        })
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    start, *bodies = _run(app, "br")
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"br"
+    assert b"content-length" not in headers
+    assert brotli.decompress(b"".join(b["body"] for b in bodies)) == b"".join(chunks)
@@ -0,0 +1,111 @@
+import random
+
+from app import crud, models
+from app.core import search_index
+from app.core.config import settings
+from tests.conftest import _property, seed_database
+
+API = settings.API_V1_STR
+
+LISTING = {
+    "title": "Family house",
+    "property_type": "House",
+    "address": "5 Hill Road",
+    "city": "Mumbai",
+    "state": "Maharashtra",
+    "zip_code": "400001",
+    "bedrooms": 3,
+    "bathrooms": 2.0,
+    "monthly_rent": 45000.0,
+    "security_deposit": 90000.0,
+}
+
+
+def test_index_agrees_with_the_filters():
+    rng = random.Random(0)
+    cities, states, types = ["Pune", "Mumbai", "Chennai"], ["Maharashtra", "Tamil Nadu"], ["House", "Apartment"]
+
+    def maybe(values):
+        return rng.choice(values + [None])
+
+    searches = [
+        search_index.SearchFilters(
+            id, 1, maybe(cities), maybe(states), maybe([0, 1, 2, 3, 4]),
+            maybe([10000.0, 20000.0, 25000.0, 40000.0]), maybe(types),
+        )
+        for id in range(1, 501)
+    ]
+    index = search_index.SearchIndex()
+    index.load(searches)
+    for id in range(1, 501, 3):
+        index.remove(id)
+    remaining = [s for s in searches if s.id % 3 != 1]
+    assert len(index) == len(remaining)
+
+    for i in range(200):
+        listing = search_index.Listing(
+            i, 2, rng.choice(cities), rng.choice(states), rng.choice(types),
+            rng.randint(1, 5), rng.choice([9999.0, 10000.0, 10001.0, 19000.0, 25000.0, 60000.0]),
+        )
+        assert index.matches(listing) == [s for s in remaining if s.accepts(listing)]
+
+
+def test_new_and_relisted_properties_reach_the_inbox(client, db):
+    seed = seed_database(db, size=1)
+    tenant = seed.headers(seed.tenant_user)
+    owner = seed.headers(seed.owner)
+    wide = client.post(f"{API}/searches/", json={"name": "Anything in Mumbai", "city": "Mumbai"}, headers=tenant)
+    assert wide.status_code == 200, wide.text
+    client.post(f"{API}/searches/", json={"city": "Mumbai", "max_rent": 40000.0}, headers=tenant)
+    client.post(f"{API}/searches/", json={"city": "Mumbai"}, headers=owner)  # Own listings never match
+    searches = client.get(f"{API}/searches/", headers=tenant).json()
+    assert [s["name"] for s in searches] == ["Houses in Mumbai", "Anything in Mumbai", None]
+
+    created = client.post(f"{API}/properties/", json=LISTING, headers=owner).json()
+    inbox = client.get(f"{API}/searches/inbox", headers=tenant).json()
+    assert [(m["saved_search_id"], m["property"]["id"]) for m in inbox] == [
+        (seed.saved_search.id, created["id"]),
+        (wide.json()["id"], created["id"]),
+    ]
+    assert client.get(f"{API}/searches/inbox", headers=owner).json() == []
+
+    # Let, then back on the market at a lower rent
+    client.put(f"{API}/properties/{created['id']}", json={"is_available": False}, headers=owner)
+    client.put(
+        f"{API}/properties/{created['id']}", json={"is_available": True, "monthly_rent": 38000.0}, headers=owner
+    )
+    newer = client.get(f"{API}/searches/inbox", params={"after_id": inbox[-1]["id"]}, headers=tenant).json()
+    assert len(newer) == 3 and newer[-1]["property"]["monthly_rent"] == 38000.0
+
+    response = client.delete(f"{API}/searches/{wide.json()['id']}", headers=owner)
+    assert response.status_code == 403
+    response = client.delete(f"{API}/searches/{wide.json()['id']}", headers=tenant)
+    assert response.status_code == 200
+    assert len(client.get(f"{API}/searches/inbox", headers=tenant).json()) == 3
+
+    response = client.delete(f"{API}/properties/{created['id']}", headers=owner)
+    assert response.status_code == 200, response.text
+    assert client.get(f"{API}/searches/inbox", headers=tenant).json() == []
+    assert db.query(models.SearchMatch).count() == 0
+    assert client.delete(f"{API}/searches/{wide.json()['id']}", headers=tenant).status_code == 404
+
+
+def test_searches_saved_elsewhere_are_picked_up(db):
+    seed = seed_database(db, size=1)
+    crud.saved_search.match_listing(db, property=seed.vacant_property)
+    assert search_index.index.loaded and len(search_index.index) == 1
+
+    # Saved and deleted by another worker: not staged here
+    db.add(models.SavedSearch(city="Pune", user_id=seed.plain_user.id))
+    db.delete(seed.saved_search)
+    db.flush()
+    matches = crud.saved_search.match_listing(db, property=_property(db, seed.other_owner, 99))
+    assert [m.user_id for m in matches] == [seed.plain_user.id]
+    assert len(search_index.index) == 1
+
+
+def test_saved_searches_per_user_are_limited(client, db, monkeypatch):
+    seed = seed_database(db, size=1)
+    monkeypatch.setattr(settings, "SAVED_SEARCHES_PER_USER", 1)
+    response = client.post(f"{API}/searches/", json={"city": "Pune"}, headers=seed.headers(seed.tenant_user))
+    assert response.status_code == 400
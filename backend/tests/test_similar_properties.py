@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+
+from app import crud, schemas
+from app.core import similarity
+from app.core.config import settings
+from tests.conftest import _property, _user
+
+API = settings.API_V1_STR
+
+
+def _listings(db):
+    owner = _user(db, "owner@example.com", is_property_owner=True)
+    target = _property(db, owner, 0, amenities='["parking", "gym"]')
+    listings = {
+        "twin": _property(db, owner, 1, amenities='["gym", "parking"]'),
+        "bigger": _property(db, owner, 2, bedrooms=3, area_sqft=1300.0, monthly_rent=30000.0),
+        "house": _property(db, owner, 3, property_type="House"),
+        "elsewhere": _property(db, owner, 4, city="Chennai", state="Tamil Nadu"),
+        "rented": _property(db, owner, 5, amenities='["gym", "parking"]', is_available=False),
+    }
+    db.commit()
+    return owner, target, listings
+
+
+def _copy(property):
+    fields = schemas.PropertyCreate.__fields__
+    return schemas.PropertyCreate(**{k: getattr(property, k) for k in fields})
+
+
+def _similar(client, property_id, **params):
+    response = client.get(f"{API}/properties/{property_id}/similar", params=params)
+    assert response.status_code == 200, response.text
+    return [p["id"] for p in response.json()]
+
+
+def test_nearest_first(client, db):
+    owner, target, listings = _listings(db)
+    ids = {p.id: name for name, p in listings.items()}
+    assert [ids[id] for id in _similar(client, target.id)] == ["twin", "bigger", "house", "elsewhere"]
+    assert [ids[id] for id in _similar(client, target.id, limit=2)] == ["twin", "bigger"]
+    trimmed = client.get(f"{API}/properties/{target.id}/similar", params={"fields": "id,city", "limit": 1})
+    assert trimmed.json() == [{"id": listings["twin"].id, "city": "Pune"}]
+    assert client.get(f"{API}/properties/999/similar").status_code == 404
+
+
+def test_index_follows_committed_writes(client, db):
+    owner, target, listings = _listings(db)
+    _similar(client, target.id)
+    assert len(similarity.index) == 6
+
+    # Rolled back: never indexed
+    crud.property.create_with_owner(db, obj_in=_copy(target), owner_id=owner.id)
+    db.rollback()
+    assert len(similarity.index) == 6
+
+    # Committed writes of the CRUD layer apply without reloading
+    clone = crud.property.create_with_owner(db, obj_in=_copy(target), owner_id=owner.id)
+    db.commit()
+    assert len(similarity.index) == 7
+    assert clone.id in _similar(client, target.id)[:2]  # Tied with the twin
+
+    crud.property.update(db, db_obj=clone, obj_in={"is_available": False})
+    db.commit()
+    assert clone.id not in _similar(client, target.id)
+    crud.property.remove(db, id=clone.id)
+    db.commit()
+    assert len(similarity.index) == 6
+
+
+def test_index_grows_and_reuses_rows():
+    index = similarity.SimilarityIndex(capacity=2)
+    rows = [
+        similarity.PropertyFeatures(i, "Pune", "Apartment", 1 + i % 3, 1.0, None, 10000.0 + i, None, True)
+        for i in range(1, 6)
+    ]
+    for row in rows:
+        index.upsert(row)
+    assert len(index) == 5
+    index.remove(2)
+    index.upsert(rows[1]._replace(id=9))
+    assert len(index) == 5 and index._used == 5
+    nearest = index.nearest(similarity.encode(rows[0]), 10, exclude=1)
+    assert sorted(id for id, _ in nearest) == [3, 4, 5, 9]
+    assert nearest[0][0] == 4  # Same bedrooms, closest rent
+    assert np.isclose(index.nearest(similarity.encode(rows[0]), 1)[0][1], 0.0, atol=0.05)
+
+
+def test_reload_reads_the_table_outside_the_lock(monkeypatch):
+    index = similarity.SimilarityIndex()
+    rows = [
+        similarity.PropertyFeatures(i, "Pune", "Apartment", 2, 1.0, None, 10000.0 + i, None, True)
+        for i in range(1, 4)
+    ]
+    written = rows[0]._replace(id=9)
+
+    def load():
+        # Another thread's write commits while the rows are read, after them
+        writer = threading.Thread(target=index.upsert, args=(written,))
+        writer.start()
+        writer.join(timeout=5)
+        assert not writer.is_alive()
+        return rows
+
+    index.similar(rows[0], 5, load=load)
+    assert len(index) == 4 and not index._recent
+    monkeypatch.setattr(settings, "SIMILAR_INDEX_MAX_AGE_SECONDS", -1.0)
+    index.similar(rows[0], 5, load=lambda: rows[:1])
+    assert len(index) == 1
+
+
+def test_amenities_are_read_leniently():
+    assert similarity._amenities('["Gym", "Pool"]') == ["Gym", "Pool"]
+    assert similarity._amenities('{"gym": true, "pool": false}') == ["gym"]
+    assert similarity._amenities("gym, pool") == ["gym", "pool"]
+    assert similarity._amenities(None) == []
+    features = similarity.PropertyFeatures(1, "Pune", "Flat", 1, 1.0, None, 1.0, '["gym", "pool"]', True)
+    amenities = similarity.encode(features)[similarity._AMENITIES:similarity._NUMERIC]
+    assert np.isclose(np.linalg.norm(amenities), 1.0)
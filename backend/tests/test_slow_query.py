@@ -0,0 +1,46 @@
+import time
+
+from app.core.config import settings
+from app.db import slow_query
+from app.db.slow_query import redact, slow_query_log
+from tests.conftest import engine, seed_database
+
+API = settings.API_V1_STR
+
+
+def test_redact_keeps_numbers_and_dates_only():
+    from datetime import date
+
+    assert redact(("owner@example.com", 3, 2.5, None, date(2024, 1, 31))) == [
+        "<str>", 3, 2.5, None, "2024-01-31"
+    ]
+    assert redact({"email": "x@example.com", "limit": 100}) == {"email": "<str>", "limit": 100}
+
+
+def test_slow_queries_are_attributed_and_explained(client, db, monkeypatch):
+    seed = seed_database(db)
+    slow_query.install(engine)
+    slow_query_log.clear()
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+
+    client.get(f"{API}/properties/", params={"city": "Pune"})
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+
+    entries = slow_query_log.entries()
+    search = next(e for e in entries if e["crud_method"] == "CRUDProperty.search_properties")
+    assert search["route"] == f"{API}/properties/"
+    assert search["method"] == "GET"
+    assert "<str>" in search["parameters"]
+
+    deadline = time.time() + 5
+    while search["plan"] is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert search["plan"] and "properties" in search["plan"]
+
+    admin_headers = seed.headers(seed.admin)
+    response = client.get(f"{API}/admin/slow-queries", headers=admin_headers)
+    assert response.status_code == 200
+    assert any(e["id"] == search["id"] for e in response.json())
+
+    response = client.get(f"{API}/admin/slow-queries", headers=seed.headers(seed.owner))
+    assert response.status_code == 403
@@ -0,0 +1,84 @@
+from app.core.config import settings
+from app.core.tracing import InMemorySpanExporter, instrument_engine, tracer
+from tests.conftest import PASSWORD, engine, seed_database
+
+API = settings.API_V1_STR
+
+
+def _traced_request(client, monkeypatch, *args, **kwargs):
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    instrument_engine(engine)
+    response = client.request(*args, **kwargs)
+    tracer.force_flush()
+    return response, {s["span_id"]: s for s in exporter.get_finished_spans()}
+
+
+def _parent(spans, span):
+    return spans[span["parent_span_id"]]
+
+
+def test_request_spans_are_nested(client, db, monkeypatch):
+    seed = seed_database(db)
+    response, spans = _traced_request(
+        client, monkeypatch, "GET", f"{API}/properties/my-properties", headers=seed.headers(seed.owner)
+    )
+    assert response.status_code == 200
+    by_name = {s["name"]: s for s in spans.values()}
+
+    root = by_name[f"GET {API}/properties/my-properties"]
+    assert root["parent_span_id"] is None
+    assert root["attributes"]["http.status_code"] == 200
+    assert len({s["trace_id"] for s in spans.values()}) == 1
+
+    assert _parent(spans, by_name["jwt.decode"])["name"] == "deps.get_current_user"
+    assert _parent(spans, by_name["deps.get_current_property_owner"])["name"] == "route.handler"
+    crud = by_name["CRUDProperty.get_multi_by_owner"]
+    assert _parent(spans, crud)["name"] == "endpoint.read_user_properties"
+    assert any(
+        s["name"] == "db.execute" and s["parent_span_id"] == crud["span_id"]
+        for s in spans.values()
+    )
+
+
+def test_login_records_bcrypt_and_incoming_trace(client, db, monkeypatch):
+    seed = seed_database(db)
+    trace_id, parent_id = "0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331"
+    response, spans = _traced_request(
+        client, monkeypatch, "POST", f"{API}/auth/login",
+        data={"username": seed.owner.email, "password": PASSWORD},
+        headers={"traceparent": f"00-{trace_id}-{parent_id}-01"},
+    )
+    assert response.status_code == 200
+    names = {s["name"] for s in spans.values()}
+    assert {"CRUDUser.authenticate", "bcrypt.verify"} <= names
+    assert all(s["trace_id"] == trace_id for s in spans.values())
+    root = next(s for s in spans.values() if s["name"] == f"POST {API}/auth/login")
+    assert root["parent_span_id"] == parent_id
+
+
+def test_unsampled_requests_record_nothing(client, db, monkeypatch):
+    seed_database(db)
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    assert client.get(f"{API}/properties/").status_code == 200
+    tracer.force_flush()
+    assert exporter.get_finished_spans() == []
+
+
+def test_sampled_parent_is_capped_by_the_sample_rate(client, db, monkeypatch):
+    seed_database(db)
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    traceparent = {"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"}
+    assert client.get(f"{API}/properties/", headers=traceparent).status_code == 200
+    tracer.force_flush()
+    assert exporter.get_finished_spans() == []
+
+    monkeypatch.setattr(tracer, "trust_parent", True)
+    assert client.get(f"{API}/properties/", headers=traceparent).status_code == 200
+    tracer.force_flush()
+    assert exporter.get_finished_spans() != []
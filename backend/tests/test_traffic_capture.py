@@ -0,0 +1,81 @@
+import asyncio
+import json
+from datetime import date
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.api import api_router
+from app.core.config import settings
+from app.core.request_context import RequestContextMiddleware
+from app.core.traffic_capture import REDACTED, CaptureWriter, TrafficCaptureMiddleware, redact_body
+from app.main import app
+from benchmarks.replay import capture_summary, load_capture, replay
+from tests.conftest import PASSWORD, seed_database
+
+API = settings.API_V1_STR
+
+
+def _capturing_app(writer: CaptureWriter) -> FastAPI:
+    captured = FastAPI()
+    captured.include_router(api_router, prefix=API)
+    captured.add_middleware(
+        TrafficCaptureMiddleware, writer=writer, sample_rate=1.0, exclude_prefixes=(f"{API}/admin",)
+    )
+    captured.add_middleware(RequestContextMiddleware)
+    return captured
+
+
+def test_redact_body():
+    assert json.loads(redact_body(b'{"email": "a@b.c", "password": "x"}', "application/json")) == {
+        "email": "a@b.c", "password": REDACTED
+    }
+    assert b"x" not in redact_body(b"username=a&password=x", "application/x-www-form-urlencoded")
+
+
+def test_capture_and_replay(db, tmp_path):
+    seed = seed_database(db)
+    path = tmp_path / "traffic.jsonl"
+    writer = CaptureWriter(str(path))
+    with TestClient(_capturing_app(writer)) as client:
+        client.post(f"{API}/auth/login", data={"username": seed.owner.email, "password": PASSWORD})
+        client.get(f"{API}/properties/", params={"city": "Pune", "max_rent": 50000})
+        client.get(f"{API}/properties/my-properties", headers=seed.headers(seed.owner))
+        client.post(
+            f"{API}/contracts/{seed.contracts[0].id}/maintenance",
+            headers=seed.headers(seed.tenant_user),
+            json={
+                "contract_id": seed.contracts[0].id,
+                "title": "Leaking tap",
+                "description": "Kitchen tap leaks",
+                "request_date": str(date.today()),
+            },
+        )
+        client.get(f"{API}/admin/slow-queries", headers=seed.headers(seed.admin))
+    writer.close()
+
+    assert PASSWORD not in path.read_text()
+    records, skipped = load_capture(str(path))
+    assert skipped == 0
+    assert [r["route"] for r in records] == [
+        f"{API}/auth/login",
+        f"{API}/properties/",
+        f"{API}/properties/my-properties",
+        f"{API}/contracts/{{contract_id}}/maintenance",
+    ]
+    assert records[1]["query"] == "city=Pune&max_rent=50000"
+    assert records[2]["user"] == seed.owner.id
+    assert records[3]["user"] == seed.tenant_user.id
+    assert all(r["status"] == 200 for r in records)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            return await replay(client, records, speed=0, password=PASSWORD)
+
+    report = asyncio.run(run())
+    assert report["status_mismatches"] == {}
+    assert report["total"]["requests"] == 4
+    assert "GET /properties/my-properties" in report["endpoints"]
+    assert set(capture_summary(records)["endpoints"]) == set(report["endpoints"])
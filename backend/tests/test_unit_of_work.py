@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import event
+
+from app import crud, models
+from app.core.config import settings
+from tests.conftest import TestingSessionLocal, engine, seed_database
+
+API = settings.API_V1_STR
+
+TENANT = {
+    "date_of_birth": "1990-01-01",
+    "occupation": "Engineer",
+    "annual_income": 1200000.0,
+    "identification_type": "PAN",
+    "identification_number": "UOW1234567",
+}
+
+
+@pytest.fixture
+def commits():
+    counted = []
+
+    def on_commit(conn):
+        counted.append(conn)
+
+    event.listen(engine, "commit", on_commit)
+    yield counted
+    event.remove(engine, "commit", on_commit)
+
+
+def test_register_tenant_commits_once(client, db, commits):
+    seed = seed_database(db)
+    del commits[:]
+    response = client.post(f"{API}/tenants/register", json=TENANT, headers=seed.headers(seed.plain_user))
+    assert response.status_code == 200, response.text
+    assert len(commits) == 1
+
+    with TestingSessionLocal() as check:
+        assert check.get(models.User, seed.plain_user.id).is_tenant
+        assert crud.tenant.get_by_user_id(check, user_id=seed.plain_user.id) is not None
+
+
+def test_failed_request_rolls_back_earlier_writes(client, db, commits, monkeypatch):
+    seed = seed_database(db)
+    del commits[:]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("user update failed")
+
+    monkeypatch.setattr(crud.user, "update", fail)
+    with pytest.raises(RuntimeError):
+        client.post(f"{API}/tenants/register", json=TENANT, headers=seed.headers(seed.plain_user))
+    assert commits == []
+
+    with TestingSessionLocal() as check:
+        assert crud.tenant.get_by_user_id(check, user_id=seed.plain_user.id) is None